@@ -1,77 +1,569 @@
 """
 Thread-safe caching utilities for the RUBLI API.
 
-Replaces ad-hoc _cache = {} patterns with bounded, thread-safe TTLCache.
+Replaces ad-hoc _cache = {} patterns with bounded, thread-safe caches.
 All caches are size-bounded (maxsize) and time-bounded (ttl seconds).
+
+Two tiers sit behind the ``AppCache`` API:
+
+- L1: a per-process TLRUCache per namespace (dict lookup, no serialization).
+- L2: ``SharedCacheStore``, a small SQLite key/value file shared by every
+  gunicorn worker on the host. A cold computation in one worker is visible
+  to the other five, and entries survive a restart/deploy as long as the
+  file lives on a persistent volume (RUBLI_CACHE_PATH).
+
+The shared tier is strictly best-effort: any error opening, reading or
+writing the file degrades to L1-only instead of failing the request.
+
+Every entry is keyed on the data epoch (api/data_epoch.py). When a pipeline
+stage bumps the epoch, all cached results become misses at once, so entries
+written with ``ttl=None`` can live until the data actually changes instead
+of expiring on a hand-tuned timer.
+
+Entries written with ``stale_ttl`` support stale-while-revalidate: past their
+``ttl`` (or once the epoch moves on) ``get`` treats them as misses, but
+``lookup`` still returns them, flagged stale, for ``stale_ttl`` more seconds.
+``FlightGroup`` (api/single_flight.py) uses this to serve the old value while
+one background refresh recomputes it. Code whose result is stamped with the
+current epoch (materialized payloads) runs under ``fresh_only()``, where
+``lookup`` ignores stale entries so those callers recompute instead.
 """
+import logging
+import os
+import pickle
+import sqlite3
 import threading
-from cachetools import TTLCache
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator
+
+from cachetools import TLRUCache
+
+logger = logging.getLogger("rubli.api.cache")
+
+# Shared cache file. Defaults to a sibling of the main DB; set to "" / "off"
+# to disable the shared tier (in-process caching only).
+_DEFAULT_CACHE_PATH = str(Path(__file__).parent.parent / "RUBLI_API_CACHE.db")
+CACHE_PATH = os.environ.get("RUBLI_CACHE_PATH", _DEFAULT_CACHE_PATH)
+# Upper bound for the whole shared file's payload bytes (default 512 MB).
+CACHE_MAX_BYTES = int(os.environ.get("RUBLI_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# How often (in set() calls) the global byte budget is re-checked.
+_BYTE_CHECK_EVERY = 64
+
+# ``ttl=None`` means "valid until the data epoch changes". These are the
+# backstop lifetimes for such entries: long once the DB carries an epoch,
+# short while it has never been stamped by a pipeline stage (epoch 0), since
+# then nothing would invalidate them.
+VERSIONED_MAX_TTL = 30 * 86400
+UNVERSIONED_TTL = int(os.environ.get("RUBLI_UNVERSIONED_CACHE_TTL", "3600"))
+
+
+_fresh_only: ContextVar[bool] = ContextVar("rubli_cache_fresh_only", default=False)
+
+
+@contextmanager
+def fresh_only() -> Iterator[None]:
+    """Within this block, ``lookup`` skips stale and previous-epoch entries."""
+    token = _fresh_only.set(True)
+    try:
+        yield
+    finally:
+        _fresh_only.reset(token)
+
+
+def fresh_required() -> bool:
+    """True inside ``fresh_only()``."""
+    return _fresh_only.get()
+
+
+def resolve_ttl(ttl: int | None, epoch: int) -> int:
+    """Concrete lifetime in seconds for a ``ttl`` that may be None (epoch-scoped)."""
+    if ttl is not None:
+        return ttl
+    return VERSIONED_MAX_TTL if epoch > 0 else UNVERSIONED_TTL
+
+
+class SharedCacheStore:
+    """Cross-process, persistent key/value store backed by a local SQLite file.
+
+    Values are pickled. Each entry carries an absolute ``expires_at`` so every
+    worker agrees on expiry. Bounded per namespace (entry count) and globally
+    (payload bytes); oldest entries are evicted first.
+    """
+
+    def __init__(self, path: str, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._sets = 0
+        self._disabled = False
+
+    def _conn(self) -> sqlite3.Connection | None:
+        """Per-thread connection, re-opened after a fork (gunicorn preload)."""
+        if self._disabled:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=2, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA busy_timeout = 2000")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    epoch INTEGER NOT NULL DEFAULT 0,
+                    fresh_until REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            for column in ("epoch INTEGER NOT NULL DEFAULT 0", "fresh_until REAL"):
+                try:
+                    conn.execute(f"ALTER TABLE cache_entries ADD COLUMN {column}")
+                except sqlite3.OperationalError:
+                    pass  # Column already exists
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_ns_stored "
+                "ON cache_entries(namespace, stored_at)"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS flight_leases (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    error BLOB
+                )
+            """)
+            conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Shared cache unavailable at %s (%s); using in-process only", self.path, e)
+            self._disabled = True
+            return None
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, namespace: str, key: str, epoch: int = 0,
+            stale: bool = False) -> tuple[float, object, float] | None:
+        """Return ``(expires_at, value, fresh_until)`` for a live entry of
+        ``epoch``, else None.
+
+        With ``stale=True`` an entry from an older epoch that was written with
+        a stale window is returned too, with ``fresh_until`` 0.
+        """
+        conn = self._conn()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at, COALESCE(fresh_until, expires_at), epoch "
+                "FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None or row[1] <= time.time():
+                return None
+            fresh_until = row[2]
+            if row[3] != epoch:
+                if not (stale and row[3] < epoch and row[1] > fresh_until):
+                    return None
+                fresh_until = 0.0
+            return row[1], pickle.loads(row[0]), fresh_until
+        except Exception as e:
+            logger.debug("Shared cache get failed for %s/%s: %s", namespace, key, e)
+            return None
+
+    def set(self, namespace: str, key: str, value, ttl: float, maxsize: int,
+            epoch: int = 0, stale_ttl: float = 0) -> None:
+        """Store a value fresh for ``ttl`` and servable stale ``stale_ttl`` longer.
+
+        Evicts the namespace's oldest entries beyond maxsize and entries left
+        over from older epochs (unless they carry a stale window).
+        """
+        conn = self._conn()
+        if conn is None:
+            return
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug("Shared cache skipped unpicklable value %s/%s: %s", namespace, key, e)
+            return
+        now = time.time()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries "
+                    "(namespace, key, value, size, stored_at, expires_at, epoch, fresh_until) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (namespace, key, blob, len(blob), now, now + ttl + stale_ttl, epoch,
+                     now + ttl),
+                )
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND (expires_at <= ? "
+                    "OR (epoch < ? AND expires_at <= COALESCE(fresh_until, expires_at)))",
+                    (namespace, now, epoch),
+                )
+                conn.execute(
+                    """
+                    DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                        SELECT key FROM cache_entries WHERE namespace = ?
+                        ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (namespace, namespace, maxsize),
+                )
+            self._sets += 1
+            if self._sets % _BYTE_CHECK_EVERY == 0:
+                self._enforce_byte_budget(conn)
+        except sqlite3.Error as e:
+            logger.debug("Shared cache set failed for %s/%s: %s", namespace, key, e)
+
+    def _enforce_byte_budget(self, conn: sqlite3.Connection) -> None:
+        """Drop expired entries, then the globally oldest, until under max_bytes."""
+        with conn:
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            excess = total - self.max_bytes
+            freed = 0
+            victims = []
+            for ns, key, size in conn.execute(
+                "SELECT namespace, key, size FROM cache_entries ORDER BY stored_at"
+            ):
+                victims.append((ns, key))
+                freed += size
+                if freed >= excess:
+                    break
+            conn.executemany(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims
+            )
+
+    def delete(self, namespace: str, key: str | None = None, pattern: str | None = None) -> None:
+        """Delete one key, keys containing ``pattern``, or the whole namespace."""
+        conn = self._conn()
+        if conn is None:
+            return
+        try:
+            with conn:
+                if key is not None:
+                    conn.execute(
+                        "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                        (namespace, key),
+                    )
+                elif pattern is not None:
+                    conn.execute(
+                        "DELETE FROM cache_entries WHERE namespace = ? AND instr(key, ?) > 0",
+                        (namespace, pattern),
+                    )
+                else:
+                    conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+        except sqlite3.Error as e:
+            logger.debug("Shared cache delete failed for %s: %s", namespace, e)
+
+    # -- Cross-process leases (used by api/single_flight.py) -------------------
+
+    @staticmethod
+    def _lease_owner() -> str:
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+    def acquire_lease(self, name: str, ttl: float) -> bool | None:
+        """Take lease ``name`` for ``ttl`` seconds.
+
+        Returns True if acquired, False if another live holder has it, and
+        None when the shared file is unavailable (callers then act alone).
+        """
+        conn = self._conn()
+        if conn is None:
+            return None
+        now = time.time()
+        try:
+            with conn:
+                # Expired leases and failed ones (kept only for waiters) are free.
+                conn.execute(
+                    "DELETE FROM flight_leases WHERE name = ? "
+                    "AND (expires_at <= ? OR error IS NOT NULL)",
+                    (name, now),
+                )
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO flight_leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                    (name, self._lease_owner(), now + ttl),
+                )
+            return cur.rowcount == 1
+        except sqlite3.Error as e:
+            logger.debug("Lease acquire failed for %s: %s", name, e)
+            return None
+
+    def lease_state(self, name: str) -> tuple[bool, bytes | None] | None:
+        """``(True, None)`` while held, ``(False, error)`` if the holder failed,
+        None once released or expired."""
+        conn = self._conn()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT error FROM flight_leases WHERE name = ? AND expires_at > ?",
+                (name, time.time()),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        return (row[0] is None, row[0])
+
+    def release_lease(self, name: str, error: bytes | None = None, linger: float = 5.0) -> None:
+        """Release a lease held by this thread. With ``error``, the row is kept
+        for ``linger`` seconds so waiting processes can re-raise it."""
+        conn = self._conn()
+        if conn is None:
+            return
+        try:
+            with conn:
+                if error is None:
+                    conn.execute(
+                        "DELETE FROM flight_leases WHERE name = ? AND owner = ?",
+                        (name, self._lease_owner()),
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE flight_leases SET error = ?, expires_at = ? "
+                        "WHERE name = ? AND owner = ?",
+                        (error, time.time() + linger, name, self._lease_owner()),
+                    )
+        except sqlite3.Error as e:
+            logger.debug("Lease release failed for %s: %s", name, e)
+
+    def stats(self) -> dict:
+        """Per-namespace live entry counts and payload bytes."""
+        conn = self._conn()
+        if conn is None:
+            return {"enabled": False}
+        try:
+            rows = conn.execute(
+                "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries "
+                "WHERE expires_at > ? GROUP BY namespace",
+                (time.time(),),
+            ).fetchall()
+        except sqlite3.Error as e:
+            return {"enabled": True, "error": str(e)}
+        return {
+            "enabled": True,
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "namespaces": {ns: {"size": n, "bytes": b} for ns, n, b in rows},
+        }
+
+
+def _ttu(_key, entry, _now):
+    """TLRUCache time-to-use: entries are stored as (expires_at, value, fresh_until)."""
+    return entry[0]
 
 
 class AppCache:
-    """Application-wide cache registry. Thread-safe with size and TTL bounds."""
+    """Application-wide cache registry. Thread-safe with size and TTL bounds.
 
-    def __init__(self):
+    Reads check the per-process L1 first, then the shared store; a shared hit
+    is promoted into L1 with the entry's original expiry. Writes go to both.
+    Both tiers are scoped to the current data epoch: L1 is dropped wholesale
+    when the epoch moves, L2 rows from older epochs only match ``lookup``
+    (as stale) and only if written with a stale window.
+    """
+
+    def __init__(self, store: SharedCacheStore | None = None, epoch_source=None):
         self._lock = threading.Lock()
-        self._caches: dict[str, TTLCache] = {}
+        self._caches: dict[str, TLRUCache] = {}
+        self._config: dict[str, tuple[int, int | None]] = {}
+        self._store = store
+        self._epoch_source = epoch_source
+        self._epoch = 0
+        # namespace -> [hits, stale hits, misses] since process start
+        self._counts: dict[str, list[int]] = {}
 
-    def get_cache(self, name: str, maxsize: int = 128, ttl: int = 600) -> TTLCache:
-        """Get or create a named TTLCache. Thread-safe."""
+    def _count(self, cache_name: str, slot: int) -> None:
+        with self._lock:
+            counts = self._counts.get(cache_name)
+            if counts is None:
+                counts = self._counts[cache_name] = [0, 0, 0]
+            counts[slot] += 1
+
+    def _current_epoch(self) -> int:
+        """Current data epoch; clears every L1 namespace when it has moved."""
+        if self._epoch_source is None:
+            return 0
+        epoch = self._epoch_source()
+        if epoch != self._epoch:
+            with self._lock:
+                if epoch != self._epoch:
+                    for cache in self._caches.values():
+                        cache.clear()
+                    self._epoch = epoch
+        return epoch
+
+    @property
+    def store(self) -> SharedCacheStore | None:
+        """The shared (cross-worker) tier, or None when running L1-only."""
+        return self._store
+
+    @property
+    def epoch(self) -> int:
+        """The data epoch cache entries are currently scoped to."""
+        return self._current_epoch()
+
+    def get_cache(self, name: str, maxsize: int = 128, ttl: int | None = 600) -> TLRUCache:
+        """Get or create a named L1 cache. Thread-safe."""
         with self._lock:
             if name not in self._caches:
-                self._caches[name] = TTLCache(maxsize=maxsize, ttl=ttl)
+                self._caches[name] = TLRUCache(maxsize=maxsize, ttu=_ttu, timer=time.time)
+                self._config[name] = (maxsize, ttl)
             return self._caches[name]
 
+    def _entry(self, cache_name: str, key: str, stale: bool) -> tuple | None:
+        """``(expires_at, value, fresh_until)`` from L1 if fresh, else L2
+        (promoted into L1), else whatever stale entry L1 still holds."""
+        epoch = self._current_epoch()
+        local = None
+        cache = self._caches.get(cache_name)
+        if cache is not None:
+            with self._lock:
+                local = cache.get(key)
+            if local is not None and local[2] > time.time():
+                return local
+        if self._store is None:
+            return local
+        hit = self._store.get(cache_name, key, epoch=epoch, stale=stale)
+        if hit is None:
+            return local
+        if hit[2] > 0:  # current epoch: promote into L1
+            maxsize, ttl = self._config.get(cache_name, (128, 600))
+            cache = self.get_cache(cache_name, maxsize=maxsize, ttl=ttl)
+            with self._lock:
+                cache[key] = hit
+        return hit
+
     def get(self, cache_name: str, key: str):
         """Get a value from a named cache. Returns None if not found/expired."""
-        cache = self._caches.get(cache_name)
-        if cache is None:
+        entry = self._entry(cache_name, key, stale=False)
+        if entry is None or entry[2] <= time.time():
+            self._count(cache_name, 2)
             return None
-        try:
-            return cache[key]
-        except KeyError:
+        self._count(cache_name, 0)
+        return entry[1]
+
+    def lookup(self, cache_name: str, key: str) -> tuple[object, bool] | None:
+        """``(value, is_fresh)`` including entries inside their stale window
+        (fresh entries only under ``fresh_only()``)."""
+        entry = self._entry(cache_name, key, stale=not fresh_required())
+        fresh = entry is not None and entry[2] > time.time()
+        if entry is None or (not fresh and fresh_required()):
+            self._count(cache_name, 2)
             return None
+        self._count(cache_name, 0 if fresh else 1)
+        return entry[1], fresh
 
-    def set(self, cache_name: str, key: str, value, maxsize: int = 128, ttl: int = 600):
-        """Set a value in a named cache. Creates cache if needed."""
+    def set(self, cache_name: str, key: str, value, maxsize: int = 128, ttl: int | None = 600,
+            stale_ttl: int = 0):
+        """Set a value in a named cache. Creates cache if needed.
+
+        ``ttl`` applies to this entry; ``maxsize`` bounds the namespace.
+        ``ttl=None`` keeps the entry until the data epoch changes.
+        ``stale_ttl`` keeps it available to ``lookup`` (flagged stale) for
+        that many seconds after it expires or its epoch is superseded.
+        """
+        epoch = self._current_epoch()
+        lifetime = resolve_ttl(ttl, epoch)
         cache = self.get_cache(cache_name, maxsize=maxsize, ttl=ttl)
-        cache[key] = value
+        now = time.time()
+        with self._lock:
+            cache[key] = (now + lifetime + stale_ttl, value, now + lifetime)
+        if self._store is not None:
+            self._store.set(cache_name, key, value, ttl=lifetime, maxsize=maxsize,
+                            epoch=epoch, stale_ttl=stale_ttl)
 
     def invalidate(self, cache_name: str, key: str | None = None):
         """Invalidate a specific key or entire cache."""
         cache = self._caches.get(cache_name)
-        if cache is None:
-            return
-        if key is None:
-            cache.clear()
-        else:
-            cache.pop(key, None)
+        if cache is not None:
+            with self._lock:
+                if key is None:
+                    cache.clear()
+                else:
+                    cache.pop(key, None)
+        if self._store is not None:
+            self._store.delete(cache_name, key=key)
+
+    def invalidate_matching(self, cache_name: str, pattern: str):
+        """Invalidate every key in a named cache that contains ``pattern``."""
+        cache = self._caches.get(cache_name)
+        if cache is not None:
+            with self._lock:
+                for k in [k for k in cache if pattern in k]:
+                    cache.pop(k, None)
+        if self._store is not None:
+            self._store.delete(cache_name, pattern=pattern)
 
     def stats(self) -> dict:
         """Return cache statistics for monitoring."""
         result = {}
         for name, cache in self._caches.items():
+            maxsize, ttl = self._config[name]
             result[name] = {
                 "size": len(cache),
-                "maxsize": cache.maxsize,
-                "ttl": cache.ttl,
+                "maxsize": maxsize,
+                "ttl": ttl,
             }
+        with self._lock:
+            counts = {name: list(c) for name, c in self._counts.items()}
+        for name, (hits, stale_hits, misses) in counts.items():
+            result.setdefault(name, {}).update(
+                hits=hits, stale_hits=stale_hits, misses=misses,
+            )
+        if self._store is not None:
+            result["_shared"] = self._store.stats()
+        result["_epoch"] = self._epoch
         return result
 
 
+def _build_store() -> SharedCacheStore | None:
+    if not CACHE_PATH or CACHE_PATH.lower() in ("off", "none", "0"):
+        return None
+    return SharedCacheStore(CACHE_PATH)
+
+
+def _data_epoch() -> int:
+    from .data_epoch import current_data_epoch
+    return current_data_epoch()
+
+
 # Global cache instance — import this in routers
-app_cache = AppCache()
+app_cache = AppCache(store=_build_store(), epoch_source=_data_epoch)
 
 
 class SimpleCache:
-    """Thread-safe in-memory cache with TTL support for expensive queries."""
+    """Thread-safe cache with per-entry TTL support for expensive queries.
 
-    def __init__(self):
+    Pass ``namespace`` to back the cache with ``app_cache`` (shared across
+    workers and restarts); without it entries live in this process only.
+    """
+
+    def __init__(self, namespace: str | None = None, maxsize: int = 256):
+        self._namespace = namespace
+        self._maxsize = maxsize
         self._cache: dict[str, dict] = {}
         self._lock = threading.Lock()
 
     def get(self, key: str):
         """Get cached value if not expired."""
+        if self._namespace is not None:
+            return app_cache.get(self._namespace, key)
         from datetime import datetime
         with self._lock:
             if key in self._cache:
@@ -81,9 +573,13 @@ class SimpleCache:
                 del self._cache[key]
             return None
 
-    def set(self, key: str, value, ttl_seconds: int = 3600) -> None:
-        """Set cached value with TTL."""
+    def set(self, key: str, value, ttl_seconds: int | None = 3600) -> None:
+        """Set cached value with TTL (``None``: until the data epoch changes)."""
+        if self._namespace is not None:
+            app_cache.set(self._namespace, key, value, maxsize=self._maxsize, ttl=ttl_seconds)
+            return
         from datetime import datetime, timedelta
+        ttl_seconds = resolve_ttl(ttl_seconds, app_cache.epoch)
         with self._lock:
             self._cache[key] = {
                 "value": value,
@@ -92,6 +588,12 @@ class SimpleCache:
 
     def invalidate(self, pattern: str = None) -> None:
         """Invalidate cache entries matching pattern (or all if None)."""
+        if self._namespace is not None:
+            if pattern is None:
+                app_cache.invalidate(self._namespace)
+            else:
+                app_cache.invalidate_matching(self._namespace, pattern)
+            return
         with self._lock:
             if pattern is None:
                 self._cache.clear()
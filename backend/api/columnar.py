@@ -0,0 +1,430 @@
+"""
+Columnar contract sidecar — memory-mapped NumPy columns for grouped aggregations.
+
+Year/sector/flow aggregations over the 3.1M-row ``contracts`` table are full
+scans in SQLite's row store (30-90s cold). The handful of columns they read
+fit in ~60 MB as flat arrays, so the pipeline exports them once per contracts
+version as ``.npy`` files:
+
+    <RUBLI_COLUMNAR_DIR or DB dir/columnar>/
+        manifest.json          {"contracts_version", "rows", "columns", "exported_at"}
+        amount.npy  year.npy  month.npy  sector.npy  institution.npy ...
+
+Each API worker memory-maps them read-only (``np.load(mmap_mode="r")``): the
+pages are shared through the OS page cache, and a grouped reduction is a
+``bincount`` over a boolean mask — milliseconds instead of a table scan.
+
+The sidecar is only used while its manifest version equals the current
+contracts version (api/data_epoch.py): a stage that rewrites ``contracts``
+makes it stale and callers fall back to SQL until the export that stage (or
+``precompute_stats.py``) runs lands. NULLs are stored as -1 (integer
+columns) or NaN (float columns).
+
+Export from a script:  python -m api.columnar [--db PATH] [--out DIR]
+"""
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .data_epoch import current_contracts_version, read_contracts_version
+
+logger = logging.getLogger("rubli.api.columnar")
+
+MANIFEST = "manifest.json"
+RISK_LEVELS = ("low", "medium", "high", "critical")
+HIGH_RISK_MIN_CODE = RISK_LEVELS.index("high")  # high and critical
+
+# name -> (SQL expression, dtype, NULL marker)
+COLUMNS: dict[str, tuple[str, str, float]] = {
+    "amount": ("amount_mxn", "float64", np.nan),
+    "year": ("contract_year", "int16", -1),
+    "month": ("contract_month", "int8", -1),
+    "sector": ("sector_id", "int16", -1),
+    "institution": ("institution_id", "int32", -1),
+    "vendor": ("vendor_id", "int32", -1),
+    "risk_score": ("risk_score", "float32", np.nan),
+    "risk_level": (
+        "CASE risk_level "
+        + " ".join(f"WHEN '{level}' THEN {code}" for code, level in enumerate(RISK_LEVELS))
+        + " END",
+        "int8", -1,
+    ),
+    "is_direct_award": ("is_direct_award", "int8", -1),
+    "is_single_bid": ("is_single_bid", "int8", -1),
+}
+
+_EXPORT_CHUNK = 200_000
+
+
+def default_dir() -> Path:
+    env = os.environ.get("RUBLI_COLUMNAR_DIR")
+    if env:
+        return Path(env)
+    from .dependencies import DB_PATH
+    return DB_PATH.parent / "columnar"
+
+
+# =============================================================================
+# Export (pipeline side)
+# =============================================================================
+
+def export_columns(conn: sqlite3.Connection, out_dir: Path | None = None) -> dict:
+    """Write every column of ``contracts`` in COLUMNS to ``out_dir`` and return the manifest.
+
+    Files are written to a sibling temp directory and swapped in, so workers
+    never see a half-written set (mapped files of the old set stay valid until
+    they are unmapped).
+    """
+    out_dir = Path(out_dir or default_dir())
+    tmp_dir = out_dir.with_name(f"{out_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    started = time.time()
+    version = read_contracts_version(conn)
+    rows = conn.execute("SELECT COUNT(*) FROM contracts").fetchone()[0]
+    arrays = {
+        name: np.lib.format.open_memmap(tmp_dir / f"{name}.npy", mode="w+", dtype=dtype, shape=(rows,))
+        for name, (_sql, dtype, _null) in COLUMNS.items()
+    }
+    select = ", ".join(sql for sql, _dtype, _null in COLUMNS.values())
+    cursor = conn.execute(f"SELECT {select} FROM contracts ORDER BY id")
+    filled = 0
+    while filled < rows:
+        chunk = cursor.fetchmany(_EXPORT_CHUNK)
+        if not chunk:
+            break
+        chunk = chunk[: rows - filled]
+        for i, (name, (_sql, dtype, null)) in enumerate(COLUMNS.items()):
+            values = [null if row[i] is None else row[i] for row in chunk]
+            arrays[name][filled:filled + len(chunk)] = np.asarray(values, dtype=dtype)
+        filled += len(chunk)
+    for array in arrays.values():
+        array.flush()
+    del arrays
+    if filled < rows:  # rows deleted while exporting
+        for name in COLUMNS:
+            np.save(tmp_dir / f"{name}.npy", np.load(tmp_dir / f"{name}.npy")[:filled])
+
+    manifest = {
+        "contracts_version": version,
+        "rows": filled,
+        "columns": {name: dtype for name, (_sql, dtype, _null) in COLUMNS.items()},
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    (tmp_dir / MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+    old_dir = out_dir.with_name(f"{out_dir.name}.old-{os.getpid()}")
+    if out_dir.exists():
+        out_dir.rename(old_dir)
+    tmp_dir.rename(out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    logger.info("Exported %d contracts x %d columns to %s in %.1fs",
+                filled, len(COLUMNS), out_dir, time.time() - started)
+    return manifest
+
+
+# =============================================================================
+# Memory-mapped access (API side)
+# =============================================================================
+
+@dataclass(frozen=True)
+class ContractColumns:
+    """Read-only memory-mapped contract columns for one contracts version."""
+
+    contracts_version: int
+    rows: int
+    amount: np.ndarray
+    year: np.ndarray
+    month: np.ndarray
+    sector: np.ndarray
+    institution: np.ndarray
+    vendor: np.ndarray
+    risk_score: np.ndarray
+    risk_level: np.ndarray
+    is_direct_award: np.ndarray
+    is_single_bid: np.ndarray
+
+
+class ColumnarStore:
+    """Per-process handle on the sidecar; remaps when a new export lands."""
+
+    def __init__(self, directory: Path | None = None):
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._columns: ContractColumns | None = None
+        self._manifest_mtime = 0.0
+
+    @property
+    def directory(self) -> Path:
+        return self._directory or default_dir()
+
+    def columns(self) -> ContractColumns | None:
+        """The mapped columns, or None when the sidecar is missing or stale."""
+        version = current_contracts_version()
+        current = self._columns
+        if current is not None and current.contracts_version == version:
+            return current
+        with self._lock:
+            self._reload()
+            current = self._columns
+        if current is None or current.contracts_version != version:
+            return None
+        return current
+
+    def _reload(self) -> None:
+        manifest_path = self.directory / MANIFEST
+        try:
+            mtime = manifest_path.stat().st_mtime
+        except OSError:
+            self._columns = None
+            return
+        if self._columns is not None and mtime == self._manifest_mtime:
+            return
+        try:
+            manifest = json.loads(manifest_path.read_text())
+            arrays = {
+                name: np.load(self.directory / f"{name}.npy", mmap_mode="r")
+                for name in COLUMNS
+            }
+        except (OSError, ValueError) as e:
+            logger.warning("Columnar sidecar unreadable at %s: %s", self.directory, e)
+            self._columns = None
+            return
+        if any(len(a) != manifest["rows"] for a in arrays.values()):
+            logger.warning("Columnar sidecar at %s has ragged columns; ignoring it", self.directory)
+            self._columns = None
+            return
+        self._columns = ContractColumns(
+            contracts_version=int(manifest.get("contracts_version", -1)),  # -1: pre-version export, stale
+            rows=int(manifest["rows"]), **arrays,
+        )
+        self._manifest_mtime = mtime
+        logger.info("Mapped columnar sidecar (contracts version %d, %d rows)",
+                    self._columns.contracts_version, self._columns.rows)
+
+
+columnar_store = ColumnarStore()
+
+
+def contract_columns() -> ContractColumns | None:
+    """Fresh memory-mapped contract columns, or None (use SQL)."""
+    return columnar_store.columns()
+
+
+# =============================================================================
+# Grouped reductions
+# =============================================================================
+
+def row_mask(
+    cols: ContractColumns,
+    *,
+    sector_id: int | None = None,
+    year: int | None = None,
+    start_year: int | None = None,
+    end_year: int | None = None,
+    direct_award_only: bool = False,
+    amount_between: tuple[float, float] | None = None,
+) -> np.ndarray:
+    """Boolean row filter with the usual analysis parameters (None = no filter).
+
+    ``amount_between`` bounds are exclusive; NULL amounts never match.
+    """
+    mask = np.ones(cols.rows, dtype=bool)
+    if amount_between is not None:
+        low, high = amount_between
+        mask &= (cols.amount > low) & (cols.amount < high)
+    if sector_id is not None:
+        mask &= cols.sector == sector_id
+    if year is not None:
+        mask &= cols.year == year
+    if start_year is not None:
+        mask &= cols.year >= start_year
+    if end_year is not None:
+        mask &= cols.year <= end_year
+    if direct_award_only:
+        mask &= cols.is_direct_award == 1
+    return mask
+
+
+# Dense tables (bincount / bitmap) are used while they stay this small.
+_DENSE_MAX = 64_000_000
+
+
+def _unique_inverse(code: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """``np.unique(code, return_inverse=True)`` via one argsort (several times faster)."""
+    if len(code) and int(code.max()) - int(code.min()) < _DENSE_MAX:
+        low = int(code.min())
+        present = np.bincount(code - low) > 0
+        slot = np.cumsum(present) - 1
+        return np.flatnonzero(present) + low, slot[code - low]
+    order = np.argsort(code, kind="stable")
+    ordered = code[order]
+    starts = np.empty(len(ordered), dtype=bool)
+    starts[:1] = True
+    np.not_equal(ordered[1:], ordered[:-1], out=starts[1:])
+    inverse = np.empty(len(code), dtype=np.int64)
+    inverse[order] = np.cumsum(starts) - 1
+    return ordered[starts], inverse
+
+
+def _group_codes(keys: list[np.ndarray]) -> tuple[np.ndarray, list[np.ndarray]]:
+    """Dense group index per row plus the key values of each group (sorted).
+
+    Keys must be non-negative.
+    """
+    spans = [int(key.max()) + 1 if len(key) else 1 for key in keys]
+    code = np.zeros(len(keys[0]), dtype=np.int64)
+    for key, span in zip(keys, spans):
+        code = code * span + key
+    uniq, inverse = _unique_inverse(code)
+    values = []
+    for span in reversed(spans):
+        values.append(uniq % span)
+        uniq = uniq // span
+    return inverse, list(reversed(values))
+
+
+def _distinct_per_group(group: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    """COUNT(DISTINCT values) per group, ignoring -1 (NULL)."""
+    present = values >= 0
+    if not present.any():
+        return np.zeros(groups, dtype=np.int64)
+    span = int(values.max()) + 1
+    pairs = group[present].astype(np.int64) * span + values[present]
+    if groups * span <= _DENSE_MAX:
+        seen = np.zeros(groups * span, dtype=bool)
+        seen[pairs] = True
+        return seen.reshape(groups, span).sum(axis=1)
+    pairs.sort()
+    distinct = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+    return np.bincount(distinct // span, minlength=groups)
+
+
+def yearly_stats(cols: ContractColumns, mask: np.ndarray, by_sector: bool = False) -> list[dict]:
+    """The year-over-year metric set per year (or per year and sector) over ``mask``.
+
+    Mirrors the SQL aggregate: NULL amounts/risk scores are ignored, flag
+    percentages are over every row in the group, single-bid over competitive
+    (``is_direct_award = 0``) rows, distinct counts skip NULL ids.
+    """
+    mask = mask & (cols.year >= 0)
+    if by_sector:
+        mask &= cols.sector >= 0
+    idx = np.flatnonzero(mask)
+    if not len(idx):
+        return []
+    keys = [cols.year[idx]] + ([cols.sector[idx]] if by_sector else [])
+    group, key_values = _group_codes(keys)
+    n = len(key_values[0])
+
+    contracts = np.bincount(group, minlength=n)
+    amount = cols.amount[idx]
+    has_amount = ~np.isnan(amount)
+    total_value = np.bincount(group[has_amount], weights=amount[has_amount], minlength=n)
+    risk = cols.risk_score[idx]
+    has_risk = ~np.isnan(risk)
+    risk_sum = np.bincount(group[has_risk], weights=risk[has_risk].astype(np.float64), minlength=n)
+    risk_n = np.bincount(group[has_risk], minlength=n)
+    direct = cols.is_direct_award[idx]
+    direct_n = np.bincount(group[direct == 1], minlength=n)
+    competitive_n = np.bincount(group[direct == 0], minlength=n)
+    single_n = np.bincount(group[cols.is_single_bid[idx] == 1], minlength=n)
+    high_n = np.bincount(group[cols.risk_level[idx] >= HIGH_RISK_MIN_CODE], minlength=n)
+    vendors = _distinct_per_group(group, cols.vendor[idx], n)
+    institutions = _distinct_per_group(group, cols.institution[idx], n)
+
+    rows = []
+    for g in range(n):
+        row = {"year": int(key_values[0][g])}
+        if by_sector:
+            row["sector_id"] = int(key_values[1][g])
+        row.update(
+            contracts=int(contracts[g]),
+            total_value=float(total_value[g]),
+            avg_risk=float(risk_sum[g] / risk_n[g]) if risk_n[g] else 0.0,
+            direct_award_pct=float(direct_n[g] * 100.0 / contracts[g]),
+            single_bid_pct=float(single_n[g] * 100.0 / competitive_n[g]) if competitive_n[g] else None,
+            high_risk_pct=float(high_n[g] * 100.0 / contracts[g]),
+            vendor_count=int(vendors[g]),
+            institution_count=int(institutions[g]),
+        )
+        rows.append(row)
+    return rows
+
+
+def top_pairs(
+    cols: ContractColumns,
+    mask: np.ndarray,
+    limit: int,
+    sort_by: str = "value",
+) -> list[dict]:
+    """Top (institution, vendor) pairs over ``mask`` by total amount or mean risk."""
+    mask = mask & (cols.institution >= 0) & (cols.vendor >= 0)
+    idx = np.flatnonzero(mask)
+    if not len(idx):
+        return []
+    group, (institution, vendor) = _group_codes([cols.institution[idx], cols.vendor[idx]])
+    n = len(institution)
+    amount = cols.amount[idx]
+    has_amount = ~np.isnan(amount)
+    total_value = np.bincount(group[has_amount], weights=amount[has_amount], minlength=n)
+    contracts = np.bincount(group, minlength=n)
+    risk = cols.risk_score[idx]
+    has_risk = ~np.isnan(risk)
+    risk_sum = np.bincount(group[has_risk], weights=risk[has_risk].astype(np.float64), minlength=n)
+    risk_n = np.bincount(group[has_risk], minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_risk = np.where(risk_n > 0, risk_sum / np.maximum(risk_n, 1), np.nan)
+
+    keep = np.flatnonzero(total_value > 0)
+    score = np.nan_to_num(avg_risk[keep], nan=-1.0) if sort_by == "risk" else total_value[keep]
+    if len(keep) > limit:
+        part = np.argpartition(-score, limit - 1)[:limit]
+        keep, score = keep[part], score[part]
+    order = keep[np.argsort(-score, kind="stable")]
+    return [
+        {
+            "institution_id": int(institution[g]),
+            "vendor_id": int(vendor[g]),
+            "total_value": float(total_value[g]),
+            "contract_count": int(contracts[g]),
+            "avg_risk": None if np.isnan(avg_risk[g]) else float(avg_risk[g]),
+        }
+        for g in order
+    ]
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the columnar contract sidecar")
+    parser.add_argument("--db", help="SQLite database (default: DATABASE_PATH)")
+    parser.add_argument("--out", help="Output directory (default: RUBLI_COLUMNAR_DIR or <db dir>/columnar)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    from .dependencies import DB_PATH
+    db = Path(args.db) if args.db else DB_PATH
+    if args.out:
+        out = Path(args.out)
+    else:
+        out = db.parent / "columnar" if args.db else default_dir()
+    conn = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    try:
+        manifest = export_columns(conn, out)
+    finally:
+        conn.close()
+    print(json.dumps(manifest))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Data epoch — a monotonically increasing version of the analytical data.
+
+Analytical results only change when a pipeline stage runs (precompute_stats,
+aria_pipeline, calculate_risk_scores_v6, ...). Each stage calls
+``bump_data_epoch(conn, stage)`` after its final commit; the API keys its
+caches on the current epoch, so cached results stay valid indefinitely and
+are invalidated exactly when the data changes.
+
+Stages that rewrite ``contracts`` itself (the scoring scripts) pass
+``contracts_changed=True``, which also advances the *contracts version*.
+Derived copies of the fact table (contracts_cube, the columnar sidecar) are
+stamped with that version rather than the data epoch, so stages that only
+touch other tables (ARIA, precompute_stats) do not retire them.
+
+Reviewer actions in the API (ARIA queue reviews, ground-truth promotions)
+change a handful of rows that some read endpoints show. They bump a separate
+*review epoch* instead (``bump_review_epoch``): it feeds the HTTP ETag, so
+clients revalidate, without retiring every cached result and materialized
+payload the way a data epoch bump does.
+
+Scripts import this module the same way they import ``api.config.constants``
+(``sys.path.insert(0, backend_dir)``); it has no FastAPI dependency.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger("rubli.api.data_epoch")
+
+EPOCH_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS data_epochs (
+        epoch INTEGER PRIMARY KEY AUTOINCREMENT,
+        stage TEXT NOT NULL,
+        bumped_at TEXT NOT NULL
+    )
+"""
+
+CONTRACTS_VERSION_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS contracts_versions (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        stage TEXT NOT NULL,
+        bumped_at TEXT NOT NULL
+    )
+"""
+
+REVIEW_EPOCH_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS review_epochs (
+        epoch INTEGER PRIMARY KEY AUTOINCREMENT,
+        source TEXT NOT NULL,
+        bumped_at TEXT NOT NULL
+    )
+"""
+
+# How often an API worker re-reads the epoch from the DB (seconds).
+EPOCH_POLL_S = float(os.environ.get("RUBLI_EPOCH_POLL_S", "5"))
+
+
+def bump_data_epoch(conn: sqlite3.Connection, stage: str, contracts_changed: bool = False) -> int:
+    """Record that ``stage`` changed the data. Commits and returns the new epoch.
+
+    Call AFTER the stage's own writes are committed, so an API worker that
+    observes the new epoch is guaranteed to read the new data. Pass
+    ``contracts_changed=True`` when the stage wrote to ``contracts``.
+    """
+    now = datetime.now().isoformat()
+    conn.execute(EPOCH_TABLE_DDL)
+    if contracts_changed:
+        conn.execute(CONTRACTS_VERSION_TABLE_DDL)
+        conn.execute("INSERT INTO contracts_versions (stage, bumped_at) VALUES (?, ?)", (stage, now))
+    cur = conn.execute("INSERT INTO data_epochs (stage, bumped_at) VALUES (?, ?)", (stage, now))
+    conn.commit()
+    return int(cur.lastrowid)
+
+
+def read_data_epoch(conn: sqlite3.Connection) -> int:
+    """Current epoch, or 0 if no pipeline stage has stamped this DB yet."""
+    try:
+        row = conn.execute("SELECT MAX(epoch) FROM data_epochs").fetchone()
+    except sqlite3.OperationalError:
+        return 0  # table not created yet
+    return int(row[0] or 0)
+
+
+def read_contracts_version(conn: sqlite3.Connection) -> int:
+    """Current contracts version, or 0 if no stage has recorded a contracts write."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM contracts_versions").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return int(row[0] or 0)
+
+
+def bump_review_epoch(conn: sqlite3.Connection, source: str) -> int:
+    """Record a reviewer write (``source``: the endpoint). Commits; returns the new review epoch.
+
+    Call after the write is committed. Also refreshes this worker's view so
+    its next response already carries the new ETag.
+    """
+    conn.execute(REVIEW_EPOCH_TABLE_DDL)
+    cur = conn.execute(
+        "INSERT INTO review_epochs (source, bumped_at) VALUES (?, ?)",
+        (source, datetime.now().isoformat()),
+    )
+    conn.commit()
+    _review_tracker.reset()
+    return int(cur.lastrowid)
+
+
+def read_review_epoch(conn: sqlite3.Connection) -> int:
+    """Current review epoch, or 0 if no reviewer write has been recorded."""
+    try:
+        row = conn.execute("SELECT MAX(epoch) FROM review_epochs").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return int(row[0] or 0)
+
+
+class _EpochTracker:
+    """Process-wide, poll-throttled view of one of the DB's epoch counters."""
+
+    def __init__(self, reader=read_data_epoch):
+        self._reader = reader
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._checked_at = 0.0
+
+    def current(self) -> int:
+        now = time.monotonic()
+        if now - self._checked_at < EPOCH_POLL_S:
+            return self._epoch
+        with self._lock:
+            if now - self._checked_at < EPOCH_POLL_S:
+                return self._epoch
+            self._epoch = self._read()
+            self._checked_at = time.monotonic()
+            return self._epoch
+
+    def _read(self) -> int:
+        from .dependencies import DB_PATH
+        if not DB_PATH.exists():
+            return self._epoch
+        try:
+            conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, timeout=2)
+            try:
+                return self._reader(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.debug("Data epoch read failed (%s); keeping epoch %d", e, self._epoch)
+            return self._epoch
+
+    def reset(self) -> None:
+        """Force the next ``current()`` call to re-read the DB."""
+        with self._lock:
+            self._checked_at = 0.0
+
+
+_tracker = _EpochTracker()
+_review_tracker = _EpochTracker(read_review_epoch)
+_contracts_tracker = _EpochTracker(read_contracts_version)
+
+
+def current_data_epoch() -> int:
+    """The data epoch as seen by this worker (re-read at most every EPOCH_POLL_S)."""
+    return _tracker.current()
+
+
+def refresh_data_epoch() -> int:
+    """Re-read the epoch immediately (e.g. after an in-process pipeline run)."""
+    _tracker.reset()
+    return _tracker.current()
+
+
+def current_review_epoch() -> int:
+    """The review epoch as seen by this worker (re-read at most every EPOCH_POLL_S)."""
+    return _review_tracker.current()
+
+
+def current_contracts_version() -> int:
+    """The contracts version as seen by this worker (re-read at most every EPOCH_POLL_S)."""
+    return _contracts_tracker.current()
@@ -0,0 +1,129 @@
+"""
+Statement deadlines — interrupt SQLite work once its time budget is spent.
+
+A deadline is a context variable, so it follows the request into the worker
+thread that runs a sync handler. Pooled and writer connections carry a
+progress handler (installed by ``instrument_connection`` in api/metrics.py)
+that asks ``check_progress()`` every few thousand VM instructions; once the
+active deadline has passed it returns non-zero and SQLite aborts the
+statement with ``OperationalError("interrupted")``. The thread and the disk
+bandwidth are released at once instead of the scan running to completion for
+a client that has already gone away.
+
+    with deadline(1.5, label="band_top"):
+        rows = conn.execute(slow_sql).fetchall()   # raises DeadlineExceeded
+
+Deadlines nest: an inner deadline never extends an outer one. Per-route
+budgets are set by ``DeadlineMiddleware`` (api/middleware/deadline.py);
+``DeadlineExceeded`` is answered with a 504 by the global error handlers.
+
+Connections that are not instrumented (scripts, ad-hoc ``sqlite3.connect``)
+can be passed as ``conn=`` to get the handler for the duration of the block.
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+# VM instructions between checks on connections given to ``deadline(conn=...)``.
+_PROGRESS_OPS = 10_000
+
+
+class DeadlineExceeded(TimeoutError):
+    """A statement was interrupted because its deadline passed."""
+
+    def __init__(self, label: str, budget_s: float):
+        self.label = label
+        self.budget_s = budget_s
+        super().__init__(f"{label} exceeded its {budget_s:g}s deadline")
+
+
+class Deadline:
+    """One budget: absolute expiry on the monotonic clock, plus whether it fired."""
+
+    __slots__ = ("label", "budget_s", "expires_at", "fired", "parent")
+
+    def __init__(self, label: str, budget_s: float, parent: "Deadline | None" = None):
+        self.label = label
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+        self.parent = parent
+        self.fired = False
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def fire(self) -> None:
+        """Mark this deadline and every enclosing one that has also run out."""
+        node: Deadline | None = self
+        while node is not None and node.expired():
+            node.fired = True
+            node = node.parent
+
+
+_current: ContextVar[Deadline | None] = ContextVar("rubli_deadline", default=None)
+
+
+def current_deadline() -> Deadline | None:
+    return _current.get()
+
+
+def check_progress() -> int:
+    """SQLite progress-handler body: non-zero interrupts the running statement."""
+    active = _current.get()
+    if active is not None and time.monotonic() >= active.expires_at:
+        active.fire()
+        return 1
+    return 0
+
+
+def is_interrupt(exc: BaseException) -> bool:
+    return isinstance(exc, sqlite3.OperationalError) and "interrupted" in str(exc)
+
+
+@contextmanager
+def deadline(
+    seconds: float | None,
+    label: str = "query",
+    conn: sqlite3.Connection | None = None,
+) -> Iterator[Deadline | None]:
+    """Interrupt SQLite statements in this block after ``seconds``.
+
+    ``None`` or a non-positive budget leaves the enclosing deadline (if any)
+    in force. A statement interrupted by this deadline — or an enclosing one —
+    surfaces as ``DeadlineExceeded`` when it escapes the block.
+    """
+    if seconds is None or seconds <= 0:
+        yield _current.get()
+        return
+    active = Deadline(label, seconds, parent=_current.get())
+    token = _current.set(active)
+    install = conn is not None and not getattr(conn, "deadline_checked", False)
+    if install:
+        conn.set_progress_handler(check_progress, _PROGRESS_OPS)
+    try:
+        yield active
+    except sqlite3.OperationalError as e:
+        if active.fired and is_interrupt(e):
+            raise DeadlineExceeded(label, seconds) from e
+        raise
+    finally:
+        if install:
+            conn.set_progress_handler(None, 0)
+        _current.reset(token)
+
+
+@contextmanager
+def detached() -> Iterator[None]:
+    """Run without any deadline (shared computations that outlive one caller)."""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
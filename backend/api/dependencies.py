@@ -1,12 +1,15 @@
 """Database connection and common dependencies for the API."""
 import sqlite3
 import os
+import threading
 from pathlib import Path
 from contextlib import contextmanager
 from typing import Generator
 
 from fastapi import Header, HTTPException, status
 
+from .metrics import InstrumentedConnection, finish_statement, instrument_connection
+
 # Write-key auth — set RUBLI_WRITE_KEY env var to enable.
 # In production (RUBLI_ENV != "dev"), missing key fails closed with 503.
 # In dev mode, missing key bypasses auth for ergonomics.
@@ -83,42 +86,136 @@ DB_PATH = Path(os.environ.get("DATABASE_PATH", str(Path(__file__).parent.parent
 # Query timeout in seconds (configurable via environment variable)
 DB_QUERY_TIMEOUT = int(os.environ.get("DB_QUERY_TIMEOUT", "30"))
 
+# Idle read connections kept per worker process. Each holds a warm page cache
+# (cache_size below), so this bounds per-worker memory: 4 × 32MB by default.
+DB_READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", "4"))
 
-def get_db_connection() -> sqlite3.Connection:
-    """Create a database connection with row factory and timeout.
 
-    The timeout prevents long-running queries from causing DoS.
-    Default is 30 seconds, configurable via DB_QUERY_TIMEOUT env var.
-    """
-    conn = sqlite3.connect(str(DB_PATH), timeout=DB_QUERY_TIMEOUT, check_same_thread=False)
+def _apply_read_pragmas(conn: sqlite3.Connection) -> None:
+    """Per-connection settings shared by the read pool and writer connections."""
     conn.row_factory = sqlite3.Row
     # Set busy timeout to handle concurrent access (5s — short enough to fail fast,
     # long enough for normal lock contention; 30s was too long and caused cascading failures)
     conn.execute("PRAGMA busy_timeout = 30000")
+    # Performance: 32MB page cache (was 200MB — reduces memory exhaustion under concurrent load)
+    conn.execute("PRAGMA cache_size = -32768")
+    conn.execute("PRAGMA mmap_size = 1073741824")
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Create a read-write database connection with row factory and timeout.
+
+    This is the writer path (watchlist, feedback, auth, reviews, persisted
+    caches). Read-only request handlers should use :func:`get_db` /
+    :func:`get_db_dep`, which reuse pooled connections.
+
+    The timeout prevents long-running queries from causing DoS.
+    Default is 30 seconds, configurable via DB_QUERY_TIMEOUT env var.
+    """
+    conn = sqlite3.connect(
+        str(DB_PATH), timeout=DB_QUERY_TIMEOUT, check_same_thread=False,
+        factory=InstrumentedConnection,
+    )
+    instrument_connection(conn, "write")
+    _apply_read_pragmas(conn)
     # WAL mode allows concurrent readers while one writer is active
     conn.execute("PRAGMA journal_mode = WAL")
     # read_uncommitted removed: reads dirty (uncommitted) data from other connections,
     # which is a data integrity risk — WAL already gives good read concurrency
     # Enforce referential integrity
     conn.execute("PRAGMA foreign_keys = ON")
-    # Performance: 32MB page cache (was 200MB — reduces memory exhaustion under concurrent load)
-    conn.execute("PRAGMA cache_size = -32768")
-    conn.execute("PRAGMA mmap_size = 1073741824")
     return conn
 
 
+class ReadConnectionPool:
+    """Long-lived, read-only connections reused across requests.
+
+    A fresh connection starts with an empty page cache and re-runs its
+    PRAGMAs; against the 5GB DB that setup dominated cold latency. Pooled
+    connections are opened once with ``mode=ro`` + ``query_only`` and keep
+    their warm caches. Checkout is LIFO so the hottest connection is reused
+    first; connections beyond ``max_idle`` are closed on release.
+
+    The pool is per process (re-created after a fork) and drops a connection
+    whose DB file was replaced underneath it (deploy swaps the file).
+    """
+
+    def __init__(self, max_idle: int = DB_READ_POOL_SIZE):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle: list[tuple[sqlite3.Connection, int]] = []
+        self._pid = os.getpid()
+
+    def _file_id(self) -> int:
+        try:
+            return DB_PATH.stat().st_ino
+        except OSError:
+            return -1
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{DB_PATH}?mode=ro", uri=True,
+            timeout=DB_QUERY_TIMEOUT, check_same_thread=False,
+            factory=InstrumentedConnection,
+        )
+        instrument_connection(conn, "read")
+        _apply_read_pragmas(conn)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        file_id = self._file_id()
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: inherited connections belong to the parent.
+                self._idle = []
+                self._pid = os.getpid()
+            while self._idle:
+                conn, conn_file_id = self._idle.pop()
+                if conn_file_id == file_id:
+                    return conn
+                conn.close()
+        return self._open()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            conn.close()
+            return
+        finish_statement(conn)
+        file_id = self._file_id()
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.max_idle:
+                self._idle.append((conn, file_id))
+                return
+        conn.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+
+_read_pool = ReadConnectionPool()
+
+
 @contextmanager
 def get_db() -> Generator[sqlite3.Connection, None, None]:
-    """Context manager for database connections.
+    """Context manager for pooled read-only database connections.
 
     Use for ``with get_db() as conn:`` in endpoint bodies and scripts.
     For FastAPI ``Depends()``, use :func:`get_db_dep` instead.
+    Writes on this connection fail (``query_only``); use :func:`get_db_writer`.
     """
-    conn = get_db_connection()
+    conn = _read_pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        _read_pool.release(conn)
 
 
 def get_db_dep() -> Generator[sqlite3.Connection, None, None]:
@@ -127,6 +224,25 @@ def get_db_dep() -> Generator[sqlite3.Connection, None, None]:
     FastAPI >=0.130 rejects ``@contextmanager``-wrapped generators in
     ``Depends()``. This unwrapped version works with all FastAPI versions.
     """
+    conn = _read_pool.acquire()
+    try:
+        yield conn
+    finally:
+        _read_pool.release(conn)
+
+
+@contextmanager
+def get_db_writer() -> Generator[sqlite3.Connection, None, None]:
+    """Context manager for a fresh read-write connection (writer path)."""
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def get_db_writer_dep() -> Generator[sqlite3.Connection, None, None]:
+    """``Depends(get_db_writer_dep)`` variant of :func:`get_db_writer`."""
     conn = get_db_connection()
     try:
         yield conn
@@ -11,7 +11,7 @@ import threading
 import time as _time_module
 from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from starlette.middleware.gzip import GZipMiddleware
@@ -50,8 +50,8 @@ except ImportError:
         "Rate limiting DISABLED — install slowapi for production"
     )
 
-from .dependencies import verify_database_exists
-from .middleware import RequestLoggingMiddleware, register_error_handlers
+from .dependencies import require_write_key, verify_database_exists
+from .middleware import DeadlineMiddleware, ETagMiddleware, RequestLoggingMiddleware, register_error_handlers
 
 # Create rate limiter instance (if available)
 # Use X-Forwarded-For when behind Caddy reverse proxy; fall back to remote address
@@ -108,157 +108,31 @@ from .routers.capture import router as capture_router
 from .routers.dossier import router as dossier_export_router
 from .routers.atlas import router as atlas_router
 from .routers.gap import router as gap_router
+from .routers.admin import router as admin_router
 
 logger = structlog.get_logger("rubli.api")
 
 
+# Render threads for the startup materialization pass; kept low so the
+# elected worker still has CPU for user requests.
+_WARMUP_MATERIALIZE_WORKERS = 2
+
+
 def _warmup_caches():
-    """Pre-populate expensive caches in a background thread so first requests are fast.
+    """Render missing materialized payloads, then start the story packages job.
 
-    Uses short timeouts (3s) to avoid blocking the thread pool with slow queries.
-    Slow endpoints that miss the warmup window will be cached on first user request.
-    IMPORTANT: Each request here blocks a thread pool thread, so keep list short
-    and wait between requests to avoid starving user requests.
+    Slow endpoints declare themselves with ``@materialized`` (api/materialized.py)
+    and are normally rendered by the pipeline (precompute_stats.py). This pass
+    only fills payloads that are absent or from an older data epoch, calling the
+    handlers directly — no HTTP self-requests, no request threads tied up — and
+    persists them to precomputed_stats, so every worker serves them.
     """
-    import urllib.request
-    import time
-    base = "http://127.0.0.1:8001"
-    # Wait for server to be fully ready before hitting it
-    time.sleep(3)
-    # Only warm the fastest endpoints — heavy queries (contracts/statistics)
-    # are better left to first user request to avoid blocking the thread pool
-    endpoints = [
-        # === Tier 0: Instant reads (pre-computed, < 1s) ===
-        "/api/v1/stats/dashboard/fast",                # Dashboard (highest priority, pre-computed)
-        "/api/v1/sectors",                             # Sectors list (small table)
-        *[f"/api/v1/sectors/{i}" for i in range(1, 13)],  # All 12 sector detail pages (fast with bug fix)
-        "/api/v1/aria/stats",                          # ARIA queue stats (8s cold — 248K row scan)
-        # === Tier 1: Critical cold-start thundering-herd candidates ===
-        # These MUST be warmed before user requests arrive. Run early before
-        # the Tier 2 slow endpoints (exec/summary = 90s) block the thread.
-        "/api/v1/analysis/vendor-concentration?top_n=3",  # 73-82s cold on VPS! Must warm early
-        "/api/v1/executive/capture-leaders",              # 48-51s cold — thundering herd observed
-        "/api/v1/analysis/value-concentration",           # 48s cold
-        "/api/v1/analysis/flash-vendors",                 # 60s cold
-        "/api/v1/analysis/admin-breakdown",               # 38s cold
-        "/api/v1/analysis/political-cycle",               # 56s+ cold
-        # === Tier 2: Page-specific warm (moderately slow) ===
-        "/api/v1/stats/data-quality",                  # Header quality badge (cached)
-        "/api/v1/executive/summary",                   # Executive section — 90s cold on VPS
-        "/api/v1/analysis/patterns/counts",            # DetectivePatterns page (LIKE queries on 3.1M rows)
-        "/api/v1/analysis/year-over-year",             # Shared by Trends, Patterns, Administrations
-        "/api/v1/contracts/statistics",                # Explore page (3.8s cold)
-        "/api/v1/analysis/overview",                   # Patterns page (8.8s cold)
-        "/api/v1/analysis/sector-year-breakdown",      # ProcurementIntelligence heatmap (slow cold)
-        "/api/v1/analysis/money-flow",                 # Dashboard money flow panel
-        "/api/v1/analysis/transparency/publication-delays",  # Dashboard transparency strip (11s cold)
-        "/api/v1/analysis/price-anomalies?min_z=3&limit=50",  # PriceIntelligence page (slow cold — 50s+)
-        "/api/v1/intersection/summary?top_n_per_quadrant=50",  # Intersection page (9s cold — warm to avoid spinner)
-        "/api/v1/network/communities",                     # Network communities (28s cold — warm to avoid UX lag)
-        "/api/v1/analysis/leads",                          # Investigation leads (169s cold!)
-        *[f"/api/v1/reports/sector/{i}" for i in range(1, 13)],  # Sector reports (346s cold each)
-        # Categories capture-dumbbell — top categories by spend; the
-        # /sectors?view=categories dumbbell fans 12 of these in parallel
-        # and the slow ones (Medicamentos, Alimentos) timeout uncached.
-        # Set built from 30h harness network log: every category id the
-        # frontend actually requested in production. Adding 21, 27, 28,
-        # 47, 77, 86, 90 (previously missed and 502-flooding the worker).
-        *[f"/api/v1/categories/{i}/top-vendors?limit=2" for i in [
-            5, 8, 20, 21, 22, 24, 26, 27, 28, 30, 47, 55, 57, 60, 63, 71,
-            73, 77, 86, 88, 90, 91,
-        ]],
-        # Vendor profile heavy endpoints for the top T1 vendors visited
-        # constantly via /thread/:id and /vendors/:id. 29277 (Grupo
-        # Farmacos) and 4325 (Vitalmex) are linked from the homepage hero
-        # AND the curated story tour, so a cold profile breaks the
-        # primary user journey. risk-waterfall + risk-timeline + linked-
-        # scandals are the slowest queries on the page.
-        *[
-            f"/api/v1/vendors/{vid}/{ep}"
-            for vid in [29277, 4325]
-            for ep in [
-                "risk-waterfall",
-                "risk-timeline",
-                "linked-scandals",
-                "peer-comparison",
-                "footprint",
-                "risk-profile",
-                "institutions?per_page=50",
-            ]
-        ],
-        # Sector sub-pages — now use precomputed fast paths so safe to warm
-        *[f"/api/v1/sectors/{i}/trends" for i in range(1, 13)],
-        *[f"/api/v1/sectors/{i}/timeline" for i in range(1, 13)],
-        *[f"/api/v1/analysis/risk-distribution?sector_id={i}" for i in range(1, 13)],
-        *[f"/api/v1/vendors/top?by=value&limit=10&sector_id={i}" for i in range(1, 13)],
-        # 2026-05-22 — Observatory galaxy batch endpoint. Cold path is 4-7s
-        # for sectors / patterns lens (per-request SQLite connection setup
-        # against 5GB deploy DB + 7×count + 7×SELECT-with-LEFT-JOIN). The
-        # in-process cache is per-gunicorn-worker (6 workers in prod), so
-        # we need ~10 hits per payload to statistically warm every worker.
-        # The browser cache (max-age=600) covers individual users, but new
-        # visitors and lens switches still pay the cold path until all
-        # workers have seen the (lens, codes, limit) tuple.
-        *([
-            "/api/v1/atlas/cluster-vendors-batch?lens=patterns&codes=P1,P2,P3,P4,P5,P6,P7&limit=10",
-            "/api/v1/atlas/cluster-vendors-batch?lens=sectors&codes=salud,educacion,infraestructura,energia,defensa,tecnologia,hacienda,gobernacion,agricultura,ambiente,trabajo,otros&limit=10",
-        ] * 10),
-        # Common single-cluster zoom queries — P5/P6/P2 are the most-clicked
-        # patterns; salud/energia/infraestructura are the most-clicked sectors.
-        # These power the AtlasVendorDrawer (200 vendors per cluster) and
-        # the floating-card top-3 list.
-        *[
-            f"/api/v1/atlas/cluster-vendors?lens=patterns&code={p}&limit=200"
-            for p in ["P5", "P6", "P2", "P1", "P3"]
-        ],
-        *[
-            f"/api/v1/atlas/cluster-vendors?lens=sectors&code={s}&limit=200"
-            for s in ["salud", "energia", "infraestructura", "educacion", "tecnologia"]
-        ],
-    ]
-    for ep in endpoints:
-        try:
-            # executive/summary cold on VPS = 90s; price-anomalies cold = 50s+; publication-delays = 11s
-            # Per-endpoint timeout based on observed cold-start latency
-            if "reports/sector" in ep:
-                timeout = 400  # 346s cold per audit; give headroom
-            elif "aria/stats" in ep:
-                timeout = 20   # 8s cold; fast after precomputed_stats write
-            elif "analysis/leads" in ep:
-                timeout = 30   # ~0ms after INDEXED BY fix; headroom for first-run
-            elif "/top-vendors" in ep:
-                timeout = 60  # biggest categories take ~30s cold
-            elif "/vendors/" in ep and ("waterfall" in ep or "timeline" in ep or "linked-scandals" in ep):
-                timeout = 45  # heavy SHAP / case-link queries
-            elif "executive" in ep:
-                timeout = 120
-            elif "vendor-concentration" in ep:
-                timeout = 120  # 73-82s cold on VPS — thundering herd observed
-            elif "price-anomalies" in ep:
-                timeout = 15  # fast after JOIN-order fix (0.01s benchmark)
-            elif "political-cycle" in ep or "flash-vendors" in ep or "value-concentration" in ep or "admin-breakdown" in ep:
-                timeout = 120  # 38-80s cold; give headroom
-            elif "intersection" in ep:
-                timeout = 20  # 9s cold; give headroom
-            elif "communities" in ep:
-                timeout = 45
-            elif "publication" in ep:
-                timeout = 30
-            elif "data-quality" in ep:
-                timeout = 120  # 85s live scan on first ever call; fast after precomputed_stats write
-            elif "statistics" in ep or "overview" in ep:
-                timeout = 12
-            elif "/atlas/" in ep:
-                # cluster-vendors cold = 4-7s; cluster-vendors-batch with 12
-                # sectors cold = 7s. Default 3s silently dropped these.
-                timeout = 20
-            else:
-                timeout = 3
-            urllib.request.urlopen(f"{base}{ep}", timeout=timeout)
-        except Exception as e:
-            logger.debug(f"Cache warmup skipped for {ep}: {e}")
-        # Breathe between requests so user requests aren't starved
-        time.sleep(0.5)
+    from .materialized import precompute
+    try:
+        summary = precompute(missing_only=True, workers=_WARMUP_MATERIALIZE_WORKERS)
+        logger.info("materialized_warmup_done", **summary)
+    except Exception as e:
+        logger.warning("materialized_warmup_failed", issue=str(e))
 
     # Trigger story packages background computation (2-min job; no HTTP timeout concern)
     try:
@@ -442,9 +316,78 @@ if RATE_LIMITING_ENABLED and limiter:
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
     app.add_middleware(SlowAPIMiddleware)
 
+# HTTP caching prefix groups, shared by the ETag and Cache-Control middleware
+# below so browsers and CDNs avoid redundant refetches.
+# - public paths (read-only analytics): cached by the browser, reused across sessions
+# - private paths (user workspace/watchlist): never cached
+# - mutating methods (POST/PATCH/DELETE): never cached
+_CACHE_PRIVATE_PREFIXES = (
+    "/api/v1/watchlist",
+    "/api/v1/workspace",
+    "/api/v1/feedback",
+    "/api/v1/auth",
+    "/api/v1/admin",
+)
+_CACHE_LONG_PREFIXES = (  # 1h — precomputed, only changes when pipeline runs
+    "/api/v1/stats",
+    "/api/v1/cases",
+)
+_CACHE_MED_PREFIXES = (  # 10min — analytical read-only aggregates
+    "/api/v1/analysis",
+    "/api/v1/sectors",
+    "/api/v1/network",
+    "/api/v1/subnational",
+    "/api/v1/industries",
+    "/api/v1/categories",
+    "/api/v1/procurement-health",
+    "/api/v1/collusion",
+    # 2026-05-22 — Observatory galaxy/zoom endpoints. Data only changes when
+    # the ARIA pipeline re-runs (manual, infrequent). The cluster-vendors-batch
+    # endpoint was paying 4.1s on every page refresh because the default
+    # `no-cache` fallthrough below was stripping the router-level header.
+    "/api/v1/atlas",
+)
+_CACHE_SHORT_PREFIXES = (  # 5min — entity profiles (change only with new data)
+    "/api/v1/vendors",
+    "/api/v1/institutions",
+    "/api/v1/contracts",
+    "/api/v1/investigation",
+)
+
+# Statement deadlines for GETs: once a route's budget is spent the running
+# SQLite statement is interrupted and the client gets a 504, instead of the
+# scan holding a worker thread after nginx (proxy_read_timeout 60s) has given
+# up. First matching prefix wins; None exempts it.
+_REQUEST_DEADLINE_S = float(os.environ.get("RUBLI_REQUEST_DEADLINE_S", "55") or 0)
+_ROUTE_DEADLINES_S = (
+    ("/api/v1/export", None),  # streamed bulk downloads
+    ("/api/v1/admin", None),
+    ("/api/v1/search", 15.0),  # typeahead: a slow answer is a useless answer
+)
+app.add_middleware(DeadlineMiddleware, routes=_ROUTE_DEADLINES_S, default=_REQUEST_DEADLINE_S)
+
 # Request logging middleware (must be added before CORS/GZip so it wraps them)
 app.add_middleware(RequestLoggingMiddleware)
 
+# ETag revalidation for the public read-only groups. Tags derive from the data
+# epoch + normalized request, so a matching If-None-Match gets a 304 before the
+# handler runs. Added before the auth gate so it runs inside it (a 304 is never
+# served to a caller the gate would reject). /investigation has review/evidence
+# writes between pipeline runs, and so do price-hypothesis reviews: no tags.
+# A tag is only truthful if every worker serves the same body for the whole
+# epoch, so tagged routes cache through app_cache (epoch-scoped) only — a
+# route that keeps a process-local or wall-clock cache belongs in the exclude
+# list (tests/test_etag.py checks this).
+_ETAG_EXCLUDE_PREFIXES = (
+    "/api/v1/investigation",
+    "/api/v1/analysis/price-hypotheses",
+)
+app.add_middleware(
+    ETagMiddleware,
+    prefixes=_CACHE_LONG_PREFIXES + _CACHE_MED_PREFIXES + _CACHE_SHORT_PREFIXES,
+    exclude=_ETAG_EXCLUDE_PREFIXES,
+)
+
 # ── Auth gate (2026-06-27 lockdown) ──────────────────────────────────────────
 # The entire API is private. Only login + health are public; every other
 # /api/v1 path requires a valid Bearer JWT, so the curated data cannot be read
@@ -511,43 +454,8 @@ async def security_headers(request: Request, call_next):
         response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
     return response
 
-# HTTP Cache-Control middleware
-# Adds appropriate caching headers so browsers and CDNs avoid redundant refetches.
-# - public paths (read-only analytics): cached by the browser, reused across sessions
-# - private paths (user workspace/watchlist): never cached
-# - mutating methods (POST/PATCH/DELETE): never cached
-_CACHE_PRIVATE_PREFIXES = (
-    "/api/v1/watchlist",
-    "/api/v1/workspace",
-    "/api/v1/feedback",
-    "/api/v1/auth",
-)
-_CACHE_LONG_PREFIXES = (  # 1h — precomputed, only changes when pipeline runs
-    "/api/v1/stats",
-    "/api/v1/cases",
-)
-_CACHE_MED_PREFIXES = (  # 10min — analytical read-only aggregates
-    "/api/v1/analysis",
-    "/api/v1/sectors",
-    "/api/v1/network",
-    "/api/v1/subnational",
-    "/api/v1/industries",
-    "/api/v1/categories",
-    "/api/v1/procurement-health",
-    "/api/v1/collusion",
-    # 2026-05-22 — Observatory galaxy/zoom endpoints. Data only changes when
-    # the ARIA pipeline re-runs (manual, infrequent). The cluster-vendors-batch
-    # endpoint was paying 4.1s on every page refresh because the default
-    # `no-cache` fallthrough below was stripping the router-level header.
-    "/api/v1/atlas",
-)
-_CACHE_SHORT_PREFIXES = (  # 5min — entity profiles (change only with new data)
-    "/api/v1/vendors",
-    "/api/v1/institutions",
-    "/api/v1/contracts",
-    "/api/v1/investigation",
-)
-
+# HTTP Cache-Control middleware — prefix groups are defined above (shared
+# with the ETag middleware).
 @app.middleware("http")
 async def cache_control(request: Request, call_next):
     response = await call_next(request)
@@ -614,6 +522,7 @@ app.include_router(ai_router, prefix="/api/v1")
 app.include_router(aria_router, prefix="/api/v1")
 app.include_router(atlas_router, prefix="/api/v1")
 app.include_router(alerts_router, prefix="/api/v1")
+app.include_router(admin_router, prefix="/api/v1")
 app.include_router(phi_router)  # PHI has its own /api/v1/procurement-health prefix
 app.include_router(scorecards_router)  # Scorecards has its own /api/v1/scorecards prefix
 app.include_router(stories_router)    # Story endpoints for journalist investigation starting-points
@@ -706,15 +615,32 @@ async def root():
 
 
 @app.get("/metrics", tags=["root"])
-async def metrics():
-    """Application metrics for monitoring."""
-    from .cache import app_cache
+async def metrics(format: str = "prometheus", _: None = Depends(require_write_key)):
+    """Application metrics for monitoring (this worker only).
 
-    uptime_seconds = round(_time_module.time() - _server_start_time)
-    return {
-        "uptime_seconds": uptime_seconds,
-        "cache": app_cache.stats(),
-    }
+    Prometheus text by default: per-route latency histograms and p50/p95/p99,
+    cache hits/misses per namespace, SQLite statement timing. ``?format=json``
+    returns uptime, cache stats and the per-route percentiles.
+
+    Statement labels are normalized SQL, so this sits outside the /api/v1 auth
+    gate but behind the admin write key, like /admin/slow-queries; scrapers
+    send it as X-Rubli-Key.
+    """
+    from fastapi.responses import PlainTextResponse
+    from .cache import app_cache
+    from .metrics import metrics as registry
+
+    cache_stats = app_cache.stats()
+    if format == "json":
+        uptime_seconds = round(_time_module.time() - _server_start_time)
+        return {
+            "uptime_seconds": uptime_seconds,
+            "cache": cache_stats,
+            "routes": registry.route_summary(),
+        }
+    return PlainTextResponse(
+        registry.render(cache_stats), media_type="text/plain; version=0.0.4",
+    )
 
 
 # Main entry point
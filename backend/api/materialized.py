@@ -0,0 +1,407 @@
+"""
+Materialized endpoints — precomputed response payloads for slow GET routes.
+
+An expensive endpoint declares itself materializable, together with the
+parameter grid worth precomputing:
+
+    @router.get("/sectors/{sector_id}/trends", response_model=...)
+    @materialized("sector_trends", grid=grid(sector_id=SECTOR_IDS))
+    def get_sector_trends(sector_id: int = Path(...), ...):
+        ...
+
+``precompute()`` renders every grid point by calling the handler directly
+(no HTTP, no request threads), in parallel, and stores each payload in
+``precomputed_stats`` under ``mv:<name>?<params>`` stamped with the data
+epoch it was rendered at. Requests whose parameters hit a grid point are
+answered from the stored payload. A grid point whose payload is absent or
+from an older epoch is rendered live once, as a single flight outside the
+request deadline, and served from the cache until the epoch changes; an
+off-grid parameter runs the live handler as before.
+
+Payloads are rendered under ``fresh_only()``: stale-while-revalidate caches
+inside the handler recompute instead of handing back the previous epoch's
+value, which would otherwise be stored stamped with the new epoch. A render
+during which the epoch moved is not stored.
+
+Rendering runs at the end of ``scripts/precompute_stats.py``. Every other
+stage that bumps the epoch (aria_pipeline, calculate_risk_scores_v6,
+score_all_models) re-renders absent/outdated payloads when it finishes via
+``scripts/refresh_materialized.py``. By hand:
+
+    python -m api.materialized                 # everything
+    python -m api.materialized sector_trends   # selected endpoints
+    python -m api.materialized --missing       # only absent/outdated payloads
+
+The elected warmup worker runs the ``--missing`` pass at startup, so a fresh
+deploy fills whatever the pipeline did not.
+"""
+import functools
+import importlib
+import inspect
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Iterable
+
+from fastapi import params as fastapi_params
+from fastapi.encoders import jsonable_encoder
+from pydantic_core import PydanticUndefined
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .cache import app_cache, fresh_only
+from .data_epoch import current_data_epoch, refresh_data_epoch
+from .dependencies import get_db, get_db_writer
+from .single_flight import flights
+
+logger = logging.getLogger("rubli.api.materialized")
+
+STAT_KEY_PREFIX = "mv:"
+
+# Parsed payloads are memoized per worker until the data epoch changes.
+_PAYLOAD_CACHE = "materialized"
+_PAYLOAD_CACHE_MAXSIZE = 512
+
+DEFAULT_WORKERS = 4
+
+# A grid point without a current payload is rendered live once (coalesced
+# across callers and workers) and kept as the payload until the epoch
+# changes. Followers wait this long for the leader — cold renders of the
+# slowest endpoints take minutes.
+_LIVE_RENDER_TIMEOUT_S = 600.0
+
+SECTOR_IDS = tuple(range(1, 13))
+
+
+@dataclass(frozen=True)
+class MaterializedEndpoint:
+    """A registered endpoint: the undecorated handler and its parameter grid."""
+
+    name: str
+    func: Callable[..., Any]
+    grid: tuple[dict, ...]
+
+    def points(self) -> list[dict]:
+        """Grid points with handler defaults filled in (the stored keys)."""
+        sig = inspect.signature(self.func)
+        return [_bind_point(sig, point) for point in self.grid]
+
+
+_registry: dict[str, MaterializedEndpoint] = {}
+_registry_lock = threading.Lock()
+
+
+def grid(**axes: Iterable[Any]) -> list[dict]:
+    """Cartesian product of parameter values: ``grid(sector_id=range(1, 13))``."""
+    names = list(axes)
+    return [dict(zip(names, combo)) for combo in itertools.product(*axes.values())]
+
+
+def registry() -> dict[str, MaterializedEndpoint]:
+    return dict(_registry)
+
+
+def stat_key(name: str, params: dict) -> str:
+    """``precomputed_stats`` key for one grid point (None-valued params omitted)."""
+    query = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+    return f"{STAT_KEY_PREFIX}{name}?{query}" if query else f"{STAT_KEY_PREFIX}{name}"
+
+
+# =============================================================================
+# Signature handling
+# =============================================================================
+
+def _unkeyed(param: inspect.Parameter) -> bool:
+    """Connections, request/response objects and dependencies are not parameters."""
+    if isinstance(param.default, fastapi_params.Depends):
+        return True
+    return param.annotation in (sqlite3.Connection, Request, Response)
+
+
+def _default(param: inspect.Parameter) -> Any:
+    default = param.default
+    if isinstance(default, fastapi_params.Param):
+        default = default.default
+    if default is inspect.Parameter.empty or default is ... or default is PydanticUndefined:
+        raise TypeError(f"required parameter {param.name!r} missing from grid point")
+    return default
+
+
+def _coerce(annotation: Any, value: Any) -> Any:
+    """Match what FastAPI would pass, so ``min_z=3`` and ``min_z=3.0`` share a key."""
+    if value is None:
+        return None
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    if typing.get_origin(annotation) is typing.Union and len(args) == 1:
+        annotation = args[0]
+    if annotation in (int, float, str, bool) and not isinstance(value, annotation):
+        return annotation(value)
+    return value
+
+
+def _bind_point(sig: inspect.Signature, point: dict) -> dict:
+    """Full keyed parameter set for ``point``: grid values over handler defaults."""
+    unknown = set(point) - set(sig.parameters)
+    if unknown:
+        raise TypeError(f"no parameter(s) {sorted(unknown)} on the handler")
+    bound = {}
+    for name, param in sig.parameters.items():
+        if _unkeyed(param):
+            continue
+        value = point[name] if name in point else _default(param)
+        bound[name] = _coerce(param.annotation, value)
+    return bound
+
+
+def _call_params(sig: inspect.Signature, args: tuple, kwargs: dict) -> dict:
+    """Keyed parameters of a live call (FastAPI passes everything by keyword)."""
+    try:
+        bound = sig.bind_partial(*args, **kwargs)
+    except TypeError:
+        return {}
+    params = {}
+    for name, param in sig.parameters.items():
+        if _unkeyed(param):
+            continue
+        if name in bound.arguments:
+            params[name] = _coerce(param.annotation, bound.arguments[name])
+        else:
+            try:
+                params[name] = _coerce(param.annotation, _default(param))
+            except TypeError:
+                return {}
+    return params
+
+
+# =============================================================================
+# Storage
+# =============================================================================
+
+def _read_envelope(conn: sqlite3.Connection, key: str) -> dict | None:
+    row = conn.execute(
+        "SELECT stat_value FROM precomputed_stats WHERE stat_key = ?", (key,)
+    ).fetchone()
+    if not row or not row[0]:
+        return None
+    return json.loads(row[0])
+
+
+def load_payload(key: str) -> Any:
+    """Stored payload for ``key`` if it was rendered at the current data epoch."""
+    cached = app_cache.get(_PAYLOAD_CACHE, key)
+    if cached is not None:
+        return cached
+    try:
+        with get_db() as conn:
+            envelope = _read_envelope(conn, key)
+    except (sqlite3.Error, ValueError) as e:
+        logger.debug("Materialized read of %s failed: %s", key, e)
+        return None
+    if envelope is None or envelope.get("epoch") != current_data_epoch():
+        return None
+    payload = envelope.get("payload")
+    if payload is not None:
+        app_cache.set(_PAYLOAD_CACHE, key, payload, maxsize=_PAYLOAD_CACHE_MAXSIZE, ttl=None)
+    return payload
+
+
+def _store_payload(key: str, payload: Any, epoch: int) -> None:
+    envelope = json.dumps({"epoch": epoch, "payload": payload}, default=str)
+    with get_db_writer() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO precomputed_stats (stat_key, stat_value, updated_at) "
+            "VALUES (?, ?, ?)",
+            (key, envelope, datetime.now().isoformat()),
+        )
+        conn.commit()
+
+
+# =============================================================================
+# Decorator
+# =============================================================================
+
+def materialized(name: str, *, grid: Iterable[dict] = ({},)):
+    """Register a GET handler as materializable over ``grid``.
+
+    Place it under ``@router.get`` and any ``@_rate_limit``, and above
+    ``@single_flight``, so the stored payload short-circuits everything below
+    it. The default grid is the handler's default parameters.
+    """
+    def decorator(func):
+        endpoint = MaterializedEndpoint(name, func, tuple(dict(p) for p in grid))
+        sig = inspect.signature(func)
+        with _registry_lock:
+            if name in _registry and _registry[name].func.__qualname__ != func.__qualname__:
+                raise ValueError(f"materialized endpoint {name!r} registered twice")
+            _registry[name] = endpoint
+        grid_keys: set[str] = set()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not grid_keys:
+                grid_keys.update(stat_key(name, p) for p in endpoint.points())
+            key = stat_key(name, _call_params(sig, args, kwargs))
+            if key in grid_keys:
+                payload = load_payload(key)
+                if payload is not None:
+                    return payload
+                # Run as a shared flight: outside the request's deadline (like
+                # any single_flight leader), so a cold render that outlives
+                # one caller's budget still lands for the next one.
+                return flights.do(
+                    _PAYLOAD_CACHE, key, lambda: _live_payload(func, args, kwargs),
+                    ttl=None, maxsize=_PAYLOAD_CACHE_MAXSIZE, timeout=_LIVE_RENDER_TIMEOUT_S,
+                    cache_if=lambda value: not isinstance(value, Response),
+                )
+            return func(*args, **kwargs)
+
+        wrapper.materialized = endpoint
+        return wrapper
+    return decorator
+
+
+def _live_payload(func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    """Handler result in stored-payload form (raw Responses pass through uncached)."""
+    with fresh_only():
+        result = func(*args, **kwargs)
+    return result if isinstance(result, Response) else jsonable_encoder(result)
+
+
+# =============================================================================
+# Rendering
+# =============================================================================
+
+def _render(endpoint: MaterializedEndpoint, point: dict) -> tuple[str, Any]:
+    """Call the handler for one grid point with synthetic request plumbing."""
+    sig = inspect.signature(endpoint.func)
+    params = _bind_point(sig, point)
+    kwargs = dict(params)
+    with ExitStack() as stack:
+        stack.enter_context(fresh_only())
+        for pname, param in sig.parameters.items():
+            if pname in kwargs:
+                continue
+            if param.annotation is Request:
+                kwargs[pname] = Request({
+                    "type": "http", "method": "GET", "path": "/", "headers": [],
+                    "query_string": b"", "client": ("127.0.0.1", 0),
+                })
+            elif param.annotation is Response:
+                kwargs[pname] = Response()
+            elif param.annotation is sqlite3.Connection or isinstance(param.default, fastapi_params.Depends):
+                kwargs[pname] = stack.enter_context(get_db())
+        result = endpoint.func(**kwargs)
+    if isinstance(result, Response):
+        raise TypeError(f"{endpoint.name} returned a raw Response; nothing to materialize")
+    return stat_key(endpoint.name, params), jsonable_encoder(result)
+
+
+def _is_current(key: str, epoch: int) -> bool:
+    try:
+        with get_db() as conn:
+            envelope = _read_envelope(conn, key)
+    except (sqlite3.Error, ValueError):
+        return False
+    return envelope is not None and envelope.get("epoch") == epoch
+
+
+def precompute(
+    names: Iterable[str] | None = None,
+    *,
+    workers: int = DEFAULT_WORKERS,
+    missing_only: bool = False,
+) -> dict:
+    """Render registered endpoints into ``precomputed_stats``.
+
+    ``names`` restricts the run to those endpoints; ``missing_only`` skips
+    grid points already stored at the current epoch. Returns counts of
+    rendered, skipped and failed points.
+    """
+    epoch = refresh_data_epoch()
+    selected = registry()
+    if names:
+        unknown = set(names) - set(selected)
+        if unknown:
+            raise KeyError(f"unknown materialized endpoint(s): {sorted(unknown)}")
+        selected = {n: selected[n] for n in names}
+
+    jobs = [(ep, point) for ep in selected.values() for point in ep.grid]
+    summary = {"epoch": epoch, "rendered": 0, "skipped": 0, "failed": 0}
+    if missing_only:
+        pending = []
+        for ep, point in jobs:
+            if _is_current(stat_key(ep.name, _bind_point(inspect.signature(ep.func), point)), epoch):
+                summary["skipped"] += 1
+            else:
+                pending.append((ep, point))
+        jobs = pending
+
+    def _run(ep: MaterializedEndpoint, point: dict) -> str:
+        started = time.monotonic()
+        key, payload = _render(ep, point)
+        rendered_at = refresh_data_epoch()
+        if rendered_at != epoch:
+            raise RuntimeError(f"data epoch moved from {epoch} to {rendered_at} during render")
+        _store_payload(key, payload, epoch)
+        logger.info("Materialized %s in %.1fs", key, time.monotonic() - started)
+        return key
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="materialize") as pool:
+        futures = {pool.submit(_run, ep, point): (ep.name, point) for ep, point in jobs}
+        for future in as_completed(futures):
+            name, point = futures[future]
+            try:
+                future.result()
+                summary["rendered"] += 1
+            except Exception as e:
+                summary["failed"] += 1
+                logger.warning("Materializing %s %s failed: %s", name, point, e)
+    return summary
+
+
+def load_registry() -> dict[str, MaterializedEndpoint]:
+    """Import every router so their ``@materialized`` declarations register."""
+    importlib.import_module(f"{__package__}.main")  # includes every router
+    return registry()
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render materialized endpoint payloads")
+    parser.add_argument("names", nargs="*", help="Endpoints to render (default: all)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--missing", action="store_true",
+                        help="Only render payloads absent or from an older data epoch")
+    parser.add_argument("--list", action="store_true", help="List registered endpoints and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    endpoints = load_registry()
+    if args.list:
+        for name, ep in sorted(endpoints.items()):
+            print(f"{name:40s} {len(ep.grid):4d} point(s)  {ep.func.__module__}.{ep.func.__qualname__}")
+        return 0
+
+    started = time.monotonic()
+    summary = precompute(args.names or None, workers=args.workers, missing_only=args.missing)
+    print(
+        f"Materialized {summary['rendered']} payload(s) at data epoch {summary['epoch']} "
+        f"({summary['skipped']} current, {summary['failed']} failed) "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    # Under ``-m`` this file is ``__main__``; routers register into the
+    # importable module, so dispatch through it.
+    raise SystemExit(importlib.import_module(f"{__package__}.materialized").main())
@@ -0,0 +1,332 @@
+"""
+In-process latency metrics, exposed on ``/metrics`` in Prometheus text format.
+
+Three sources feed one registry per worker process:
+
+- ``RequestLoggingMiddleware`` observes every request under its route
+  template (``/api/v1/vendors/{vendor_id}``, not the concrete URL);
+- ``AppCache`` counts hits, stale hits and misses per namespace;
+- pooled and writer SQLite connections are instrumented with
+  ``set_trace_callback`` (statement start) and ``set_progress_handler``
+  (VM activity): a statement's duration runs from its start to the last VM
+  tick before the next statement starts or the connection is released.
+  Statements are normalized (literals stripped) and the most expensive ones
+  by total time are exported with their text. The same progress handler
+  enforces statement deadlines (api/deadlines.py).
+
+Histograms use fixed buckets, so p50/p95/p99 are estimates interpolated within
+a bucket. Every gunicorn worker keeps its own registry; the ``worker`` label
+tells scrapes apart.
+"""
+import bisect
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable
+
+from .deadlines import check_progress
+
+# Upper bounds in seconds; the last bucket is +Inf.
+LATENCY_BUCKETS_S = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+SQL_METRICS_ENABLED = os.environ.get("RUBLI_SQL_METRICS", "1").lower() not in ("0", "false", "off")
+# VM instructions between progress callbacks: the resolution of statement timing.
+SQL_PROGRESS_OPS = int(os.environ.get("RUBLI_SQL_PROGRESS_OPS", "10000"))
+# Distinct normalized statements tracked / exported.
+_MAX_STATEMENTS = 500
+_EXPORTED_STATEMENTS = 50
+_STATEMENT_TEXT_MAX = 240
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse a statement to its shape: literals → ?, IN-lists → (?...)."""
+    sql = _LITERAL_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(?...)", sql)
+    sql = _SPACE_RE.sub(" ", sql).strip()
+    return sql[:_STATEMENT_TEXT_MAX]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram keyed by a label tuple."""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS_S):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> [bucket counts..., +Inf count], sum, max
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, seconds: float) -> None:
+        idx = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0.0]
+            series[0][idx] += 1
+            series[1] += seconds
+            if seconds > series[2]:
+                series[2] = seconds
+
+    def snapshot(self) -> dict[tuple, tuple[list[int], float, float]]:
+        with self._lock:
+            return {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+
+    def quantile(self, counts: list[int], q: float, max_seen: float) -> float:
+        """Estimate quantile ``q`` from bucket ``counts`` (linear within a bucket)."""
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else max_seen
+                upper = max(lower, min(upper, max_seen))
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return max_seen
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Metrics:
+    """Process-wide metric registry."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.requests = Histogram()
+        self.statements = Histogram()
+        self._lock = threading.Lock()
+        self._status: dict[tuple[str, str, str], int] = {}
+        # normalized sql -> [calls, total seconds, max seconds]
+        self._sql: dict[str, list] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        self.requests.observe((method, route), seconds)
+        key = (method, route, str(status))
+        with self._lock:
+            self._status[key] = self._status.get(key, 0) + 1
+
+    def observe_statement(self, pool: str, sql: str, seconds: float) -> None:
+        self.statements.observe((pool,), seconds)
+        with self._lock:
+            entry = self._sql.get(sql)
+            if entry is None:
+                if len(self._sql) >= _MAX_STATEMENTS:
+                    # Evict the cheapest statement so new hot paths still register.
+                    del self._sql[min(self._sql, key=lambda s: self._sql[s][1])]
+                entry = self._sql[sql] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    def route_summary(self) -> dict[str, dict]:
+        """``{"GET /route": {count, p50, p95, p99, max}}`` for the JSON view."""
+        out = {}
+        for (method, route), (counts, _total, max_seen) in sorted(self.requests.snapshot().items()):
+            out[f"{method} {route}"] = {
+                "count": sum(counts),
+                **{f"p{int(q * 100)}": round(self.requests.quantile(counts, q, max_seen), 4)
+                   for q in QUANTILES},
+                "max": round(max_seen, 4),
+            }
+        return out
+
+    def top_statements(self, limit: int = _EXPORTED_STATEMENTS) -> list[tuple[str, int, float, float]]:
+        with self._lock:
+            rows = [(sql, *v) for sql, v in self._sql.items()]
+        rows.sort(key=lambda r: r[2], reverse=True)
+        return rows[:limit]
+
+    def reset(self) -> None:
+        self.requests.reset()
+        self.statements.reset()
+        with self._lock:
+            self._status.clear()
+            self._sql.clear()
+
+    # -- exposition ---------------------------------------------------------
+
+    def render(self, cache_stats: dict | None = None) -> str:
+        """Prometheus text exposition (version 0.0.4)."""
+        worker = str(os.getpid())
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def sample(name: str, labels: dict, value) -> None:
+            labels = {"worker": worker, **labels}
+            rendered = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+            lines.append(f"{name}{{{rendered}}} {_fmt(value)}")
+
+        metric("rubli_uptime_seconds", "gauge", "Seconds since this worker started.")
+        sample("rubli_uptime_seconds", {}, round(time.time() - self.started_at))
+
+        self._render_histogram(
+            metric, sample, self.requests, ("method", "route"),
+            "rubli_http_request_duration_seconds", "HTTP request latency by route template.",
+        )
+        metric("rubli_http_requests_total", "counter", "HTTP requests by route template and status.")
+        with self._lock:
+            status = sorted(self._status.items())
+        for (method, route, code), n in status:
+            sample("rubli_http_requests_total", {"method": method, "route": route, "status": code}, n)
+
+        if cache_stats:
+            metric("rubli_cache_requests_total", "counter", "AppCache lookups by namespace and result.")
+            for ns, st in sorted(cache_stats.items()):
+                if ns.startswith("_") or not isinstance(st, dict):
+                    continue
+                for field, result in (("hits", "hit"), ("stale_hits", "stale"), ("misses", "miss")):
+                    sample("rubli_cache_requests_total",
+                           {"namespace": ns, "result": result}, st.get(field, 0))
+            metric("rubli_cache_entries", "gauge", "Per-worker (L1) entries by namespace.")
+            for ns, st in sorted(cache_stats.items()):
+                if not ns.startswith("_") and isinstance(st, dict) and "size" in st:
+                    sample("rubli_cache_entries", {"namespace": ns}, st["size"])
+            if "_epoch" in cache_stats:
+                metric("rubli_data_epoch", "gauge", "Data epoch the caches are scoped to.")
+                sample("rubli_data_epoch", {}, cache_stats["_epoch"])
+
+        self._render_histogram(
+            metric, sample, self.statements, ("pool",),
+            "rubli_sqlite_statement_duration_seconds", "SQLite statement execution time.",
+        )
+        top = self.top_statements()
+        metric("rubli_sqlite_statement_seconds_total", "counter",
+               f"Total time in the {_EXPORTED_STATEMENTS} most expensive normalized statements.")
+        for sql, _calls, total, _max in top:
+            sample("rubli_sqlite_statement_seconds_total", {"statement": sql}, round(total, 6))
+        metric("rubli_sqlite_statement_calls_total", "counter", "Executions of those statements.")
+        for sql, calls, _total, _max in top:
+            sample("rubli_sqlite_statement_calls_total", {"statement": sql}, calls)
+        metric("rubli_sqlite_statement_max_seconds", "gauge", "Slowest single execution of those statements.")
+        for sql, _calls, _total, max_s in top:
+            sample("rubli_sqlite_statement_max_seconds", {"statement": sql}, round(max_s, 6))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(metric, sample, hist: Histogram, label_names, name, help_text) -> None:
+        snap = sorted(hist.snapshot().items())
+        metric(name, "histogram", help_text)
+        for labels, (counts, total, _max) in snap:
+            base = dict(zip(label_names, labels))
+            cumulative = 0
+            for bound, n in zip(hist.buckets, counts):
+                cumulative += n
+                sample(f"{name}_bucket", {**base, "le": _fmt(bound)}, cumulative)
+            cumulative += counts[-1]
+            sample(f"{name}_bucket", {**base, "le": "+Inf"}, cumulative)
+            sample(f"{name}_sum", base, round(total, 6))
+            sample(f"{name}_count", base, cumulative)
+        metric(f"{name}_quantile", "gauge", f"Estimated p50/p95/p99 of {name}.")
+        for labels, (counts, _total, max_seen) in snap:
+            base = dict(zip(label_names, labels))
+            for q in QUANTILES:
+                sample(f"{name}_quantile", {**base, "quantile": q},
+                       round(hist.quantile(counts, q, max_seen), 6))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else f"{value:.1f}"
+    return str(value)
+
+
+metrics = Metrics()
+
+# Called with (raw expanded SQL, seconds) after every timed statement
+# (e.g. api/query_plans.py). Keep them cheap: they run on the query thread.
+statement_hooks: list[Callable[[str, float], None]] = []
+
+
+# =============================================================================
+# SQLite statement timing
+# =============================================================================
+
+class StatementTimer:
+    """Times statements on one connection (used by one thread at a time)."""
+
+    __slots__ = ("pool", "_sql", "_started", "_last_tick")
+
+    def __init__(self, pool: str):
+        self.pool = pool
+        self._sql: str | None = None
+        self._started = 0.0
+        self._last_tick = 0.0
+
+    def on_statement(self, sql: str) -> None:
+        self.finish()
+        now = time.perf_counter()
+        self._sql = sql
+        self._started = self._last_tick = now
+
+    def on_progress(self) -> int:
+        self._last_tick = time.perf_counter()
+        return check_progress()  # non-zero interrupts the statement (api/deadlines.py)
+
+    def finish(self) -> None:
+        """Record the statement in flight, if any (call before pooling/closing)."""
+        sql = self._sql
+        if sql is None:
+            return
+        self._sql = None
+        seconds = self._last_tick - self._started
+        metrics.observe_statement(self.pool, normalize_sql(sql), seconds)
+        for hook in statement_hooks:
+            hook(sql, seconds)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """``sqlite3.connect(factory=...)`` class that can carry a StatementTimer."""
+
+    statement_timer: StatementTimer | None = None
+    # True once a progress handler that enforces deadlines is installed for
+    # the connection's lifetime (timed or not), so deadline() leaves it alone.
+    deadline_checked: bool = False
+
+    def close(self) -> None:
+        finish_statement(self)
+        super().close()
+
+
+def instrument_connection(conn: sqlite3.Connection, pool: str) -> None:
+    """Attach statement timing to ``conn`` (an InstrumentedConnection).
+
+    The progress handler also enforces statement deadlines, so it is installed
+    even when timing is switched off.
+    """
+    if not isinstance(conn, InstrumentedConnection):
+        return
+    conn.deadline_checked = True
+    if not SQL_METRICS_ENABLED:
+        conn.set_progress_handler(check_progress, SQL_PROGRESS_OPS)
+        return
+    timer = conn.statement_timer = StatementTimer(pool)
+    conn.set_trace_callback(timer.on_statement)
+    conn.set_progress_handler(timer.on_progress, SQL_PROGRESS_OPS)
+
+
+def finish_statement(conn: sqlite3.Connection) -> None:
+    """Record the statement still open on ``conn`` (when it goes back to the pool)."""
+    timer = getattr(conn, "statement_timer", None)
+    if timer is not None:
+        timer.finish()
@@ -1,5 +1,7 @@
 """Middleware package for RUBLI API."""
 from .logging_middleware import RequestLoggingMiddleware
 from .error_handler import register_error_handlers
+from .etag import ETagMiddleware
+from .deadline import DeadlineMiddleware
 
-__all__ = ["RequestLoggingMiddleware", "register_error_handlers"]
+__all__ = ["RequestLoggingMiddleware", "register_error_handlers", "ETagMiddleware", "DeadlineMiddleware"]
@@ -0,0 +1,60 @@
+"""
+Per-route statement deadlines.
+
+Every matching GET runs under a ``deadline()`` (api/deadlines.py): once the
+budget is spent, the SQLite statement in progress is interrupted and the
+client gets a 504 ``DEADLINE_EXCEEDED`` instead of waiting on — or timing out
+at the gateway in front of — a scan nobody will read.
+
+Handlers often wrap database errors in their own 500/503; when the request's
+deadline is what fired, that response is replaced by the 504 so callers see
+one consistent timeout result.
+"""
+import structlog
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from ..deadlines import deadline
+from .error_handler import deadline_exceeded_response
+
+logger = structlog.get_logger("rubli.api.deadlines")
+
+
+class DeadlineMiddleware(BaseHTTPMiddleware):
+    """Apply ``routes`` (first matching ``(prefix, seconds)`` wins) or ``default``.
+
+    A ``None`` budget exempts the prefix.
+    """
+
+    def __init__(
+        self,
+        app,
+        routes: tuple[tuple[str, float | None], ...] = (),
+        default: float | None = None,
+        base_prefix: str = "/api/v1",
+    ):
+        super().__init__(app)
+        self.routes = routes
+        self.default = default
+        self.base_prefix = base_prefix
+
+    def budget_for(self, path: str) -> float | None:
+        if not path.startswith(self.base_prefix):
+            return None
+        for prefix, seconds in self.routes:
+            if path.startswith(prefix):
+                return seconds
+        return self.default
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        budget = self.budget_for(request.url.path) if request.method in ("GET", "HEAD") else None
+        if not budget or budget <= 0:
+            return await call_next(request)
+        with deadline(budget, label=request.url.path) as active:
+            response = await call_next(request)
+        if active.fired and response.status_code >= 500:
+            logger.warning("deadline_exceeded", deadline=active.label, budget_s=budget,
+                           status=response.status_code)
+            return deadline_exceeded_response(active.label, budget)
+        return response
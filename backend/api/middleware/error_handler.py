@@ -10,6 +10,9 @@ import structlog
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
+from ..deadlines import DeadlineExceeded
+from ..single_flight import SingleFlightTimeout
+
 logger = structlog.get_logger("rubli.api.errors")
 
 
@@ -42,6 +45,21 @@ class AmountValidationError(DomainError):
     error_code = "INVALID_AMOUNT"
 
 
+def deadline_exceeded_response(label: str, budget_s: float) -> JSONResponse:
+    """504 for a request whose SQLite work was interrupted by its deadline."""
+    return JSONResponse(
+        status_code=504,
+        headers={"Retry-After": "30"},
+        content={
+            "error": {
+                "code": "DEADLINE_EXCEEDED",
+                "message": "The query took too long and was cancelled. Narrow the filters or retry shortly.",
+                "details": {"deadline": label, "budget_s": budget_s},
+            }
+        },
+    )
+
+
 def register_error_handlers(app: FastAPI) -> None:
     """Register global exception handlers on the FastAPI app."""
 
@@ -71,6 +89,25 @@ def register_error_handlers(app: FastAPI) -> None:
             },
         )
 
+    @app.exception_handler(SingleFlightTimeout)
+    async def single_flight_timeout(request: Request, exc: SingleFlightTimeout) -> JSONResponse:
+        logger.warning("computation_pending", key=f"{exc.namespace}/{exc.key}", path=request.url.path)
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": "30"},
+            content={
+                "error": {
+                    "code": "COMPUTATION_PENDING",
+                    "message": "This result is still being computed. Please retry shortly.",
+                }
+            },
+        )
+
+    @app.exception_handler(DeadlineExceeded)
+    async def deadline_exceeded(request: Request, exc: DeadlineExceeded) -> JSONResponse:
+        logger.warning("deadline_exceeded", deadline=exc.label, budget_s=exc.budget_s, path=request.url.path)
+        return deadline_exceeded_response(exc.label, exc.budget_s)
+
     @app.exception_handler(ValueError)
     async def value_error_handler(request: Request, exc: ValueError) -> JSONResponse:
         logger.warning("validation_error", error=str(exc), path=request.url.path)
@@ -0,0 +1,75 @@
+"""
+ETag / If-None-Match revalidation for read-only analytics endpoints.
+
+The tag is derived from the data epoch (api/data_epoch.py) plus the
+normalized request (path, sorted query string, gzip negotiation), so it can
+be computed — and a matching ``If-None-Match`` answered with 304 — before
+the route handler runs. Responses only change when a pipeline stage bumps
+the epoch, which changes every tag at once. Reviewer writes (ARIA reviews,
+ground-truth promotions) bump the review epoch, which is folded into the tag
+too, so they are never masked by a 304.
+
+While the DB has never been stamped (epoch 0) no tags are issued: nothing
+would invalidate them.
+"""
+import hashlib
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from ..data_epoch import current_data_epoch, current_review_epoch
+
+
+def compute_etag(request: Request, epoch: int, review_epoch: int = 0) -> str:
+    """Strong ETag for ``request`` at data ``epoch`` and ``review_epoch``."""
+    query = urlencode(sorted(parse_qsl(request.url.query, keep_blank_values=True)))
+    gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    raw = f"{epoch}|{review_epoch}|{request.url.path}|{query}|{int(gzip)}"
+    digest = hashlib.sha256(raw.encode()).hexdigest()[:20]
+    return f'"e{epoch}-{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """RFC 9110 weak comparison of an If-None-Match header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == bare
+        for candidate in if_none_match.split(",")
+    )
+
+
+class ETagMiddleware(BaseHTTPMiddleware):
+    """Issue epoch-based ETags on GETs under ``prefixes``; answer matches with 304."""
+
+    def __init__(self, app, prefixes: tuple[str, ...], exclude: tuple[str, ...] = ()):
+        super().__init__(app)
+        self.prefixes = prefixes
+        self.exclude = exclude
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        path = request.url.path
+        if (
+            request.method not in ("GET", "HEAD")
+            or not path.startswith(self.prefixes)
+            or path.startswith(self.exclude)
+        ):
+            return await call_next(request)
+
+        epoch = current_data_epoch()
+        if epoch <= 0:
+            return await call_next(request)
+
+        etag = compute_etag(request, epoch, current_review_epoch())
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        response = await call_next(request)
+        if response.status_code == 200:
+            response.headers["ETag"] = etag
+        return response
@@ -4,7 +4,10 @@ Request logging middleware with structured JSON output.
 Logs every request with method, path, status, duration.
 Warns on slow queries (>2000ms).
 Adds X-Request-ID header for tracing.
+Feeds per-route latency histograms (api/metrics.py).
 """
+import functools
+import re
 import time
 import uuid
 
@@ -13,9 +16,33 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
 
+from ..metrics import metrics
+
 logger = structlog.get_logger("rubli.api")
 
 
+@functools.lru_cache(maxsize=1024)
+def _unanchored(pattern: str) -> re.Pattern:
+    return re.compile(pattern.lstrip("^"))
+
+
+def _route_template(request: Request) -> str:
+    """The matched route's path template; one label for unmatched paths so
+    scanners cannot blow up metric cardinality."""
+    route = request.scope.get("route")
+    template = getattr(route, "path_format", None)
+    if not template:
+        return "<unmatched>"
+    path = request.scope.get("path", "")
+    regex = getattr(route, "path_regex", None)
+    if regex is not None and not regex.match(path):
+        # Route of an included router: its template lacks the include prefix.
+        match = _unanchored(regex.pattern).search(path)
+        if match:
+            template = path[:match.start()] + template
+    return template
+
+
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
     """Log all API requests with timing and tracing."""
 
@@ -36,7 +63,9 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         try:
             response = await call_next(request)
         except Exception:
-            duration_ms = round((time.perf_counter() - start_time) * 1000, 1)
+            elapsed = time.perf_counter() - start_time
+            metrics.observe_request(request.method, _route_template(request), 500, elapsed)
+            duration_ms = round(elapsed * 1000, 1)
             logger.error(
                 "request_failed",
                 duration_ms=duration_ms,
@@ -44,7 +73,9 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             )
             raise
 
-        duration_ms = round((time.perf_counter() - start_time) * 1000, 1)
+        elapsed = time.perf_counter() - start_time
+        metrics.observe_request(request.method, _route_template(request), response.status_code, elapsed)
+        duration_ms = round(elapsed * 1000, 1)
 
         # Add tracing header
         response.headers["X-Request-ID"] = request_id
@@ -1,6 +1,6 @@
 """Common Pydantic models for pagination and responses."""
 from pydantic import BaseModel, Field
-from typing import TypeVar, Generic, List
+from typing import TypeVar, Generic, List, Optional
 from datetime import datetime
 
 T = TypeVar("T")
@@ -13,6 +13,12 @@ class PaginationMeta(BaseModel):
     per_page: int = Field(..., description="Items per page")
     total: int = Field(..., description="Total number of items")
     total_pages: int = Field(..., description="Total number of pages")
+    total_is_estimate: bool = Field(
+        False, description="True when total comes from a pre-aggregate rather than a count"
+    )
+    next_cursor: Optional[str] = Field(
+        None, description="Opaque cursor for the next page (pass as ?cursor=); null on the last page"
+    )
 
     @classmethod
     def create(cls, page: int, per_page: int, total: int) -> "PaginationMeta":
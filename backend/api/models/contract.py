@@ -158,6 +158,8 @@ class PaginationMeta(BaseModel):
     per_page: int
     total: int
     total_pages: int
+    total_is_estimate: bool = False
+    next_cursor: Optional[str] = None
 
 
 class ContractListResponse(BaseModel):
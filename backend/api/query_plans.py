@@ -0,0 +1,183 @@
+"""
+Slow-query plan capture — opt-in EXPLAIN QUERY PLAN diagnostics.
+
+Set ``RUBLI_SLOW_QUERY_MS`` (e.g. 500) to enable. Every statement timed by
+api/metrics.py that runs longer than the threshold is queued; a background
+thread re-plans it with ``EXPLAIN QUERY PLAN`` on its own read-only
+connection and records:
+
+- the normalized statement and the bound-parameter shape (literal counts and
+  IN-list lengths — the planner's choice often flips with list size);
+- the plan tree, flagged when it scans a watched table (``SCAN contracts``,
+  with or without ``USING INDEX``: both walk all 3.1M rows);
+- how often and how slowly that (statement, shape) pair has run.
+
+Each (statement, shape) pair is planned once; repeats only update counters.
+Flagged plans are logged as warnings and everything is listed on
+``GET /api/v1/admin/slow-queries``. Raw SQL (which carries literal values such
+as RFCs) is used for planning only and never stored or logged.
+"""
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from .metrics import normalize_sql, statement_hooks
+
+logger = logging.getLogger("rubli.api.query_plans")
+
+SLOW_QUERY_MS = float(os.environ.get("RUBLI_SLOW_QUERY_MS", "0") or 0)
+# Tables whose full scans are flagged.
+FLAG_TABLES = tuple(
+    t.strip() for t in os.environ.get("RUBLI_PLAN_FLAG_TABLES", "contracts").split(",") if t.strip()
+)
+_MAX_ENTRIES = 200
+_QUEUE_SIZE = 256
+_PLANNABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_IN_LIST_RE = re.compile(r"\bIN\s*\(([^()]*)\)", re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(\.\d+)?(?![\w.])")
+
+
+def param_shape(sql: str) -> str:
+    """Shape of the literals bound into an expanded statement."""
+    in_lists = [m.group(1).count(",") + 1 for m in _IN_LIST_RE.finditer(sql) if m.group(1).strip()]
+    unquoted = _STRING_RE.sub("", sql)
+    strings = len(_STRING_RE.findall(sql))
+    numbers = _NUMBER_RE.findall(unquoted)
+    floats = sum(1 for frac in numbers if frac)
+    parts = [f"ints={len(numbers) - floats}", f"floats={floats}", f"strings={strings}"]
+    if in_lists:
+        parts.append(f"in_lists={in_lists}")
+    return " ".join(parts)
+
+
+def _scan_flags(plan: list[str]) -> list[str]:
+    flags = []
+    for line in plan:
+        for table in FLAG_TABLES:
+            if re.search(rf"\bSCAN (TABLE )?{re.escape(table)}\b", line):
+                flags.append(line.strip())
+    return flags
+
+
+class SlowQueryLog:
+    """Captured plans of slow statements, keyed by (normalized SQL, shape)."""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS):
+        self.threshold_s = threshold_ms / 1000.0
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], dict] = {}
+        self._queue: queue.Queue = queue.Queue(maxsize=_QUEUE_SIZE)
+        self._thread: threading.Thread | None = None
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_s > 0
+
+    def observe(self, sql: str, seconds: float) -> None:
+        """Called for every timed statement; cheap unless it is slow."""
+        if not self.enabled or seconds < self.threshold_s:
+            return
+        if not sql.lstrip().upper().startswith(_PLANNABLE):
+            return
+        normalized = normalize_sql(sql)
+        key = (normalized, param_shape(sql))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["count"] += 1
+                entry["max_ms"] = max(entry["max_ms"], round(seconds * 1000, 1))
+                entry["last_ms"] = round(seconds * 1000, 1)
+                entry["last_seen"] = time.time()
+                return
+            # Reserve the key so concurrent repeats do not queue another EXPLAIN.
+            self._entries[key] = {
+                "statement": normalized, "param_shape": key[1], "plan": None, "flags": [],
+                "flagged": False, "count": 1, "max_ms": round(seconds * 1000, 1),
+                "last_ms": round(seconds * 1000, 1), "last_seen": time.time(),
+            }
+            if len(self._entries) > _MAX_ENTRIES:
+                oldest = min(self._entries, key=lambda k: self._entries[k]["last_seen"])
+                del self._entries[oldest]
+            self._ensure_thread()
+        try:
+            self._queue.put_nowait((key, sql))
+        except queue.Full:
+            pass
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True, name="slow-query-plans")
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            key, sql = self._queue.get()
+            try:
+                self._capture(key, sql)
+            except Exception as e:
+                logger.debug("Plan capture failed for %s: %s", key[0][:80], e)
+            finally:
+                self._queue.task_done()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            from .dependencies import DB_PATH
+            self._conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+        return self._conn
+
+    def explain(self, sql: str) -> list[str]:
+        """``EXPLAIN QUERY PLAN`` of ``sql`` as indented lines."""
+        rows = self._connection().execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        depth: dict[int, int] = {}
+        lines = []
+        for node_id, parent, _unused, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node_id] + detail)
+        return lines
+
+    def _capture(self, key: tuple[str, str], sql: str) -> None:
+        plan = self.explain(sql)
+        flags = _scan_flags(plan)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.update(plan=plan, flags=flags, flagged=bool(flags))
+            count, max_ms = entry["count"], entry["max_ms"]
+        if flags:
+            logger.warning(
+                "slow_query_full_scan: %.0fms x%d %s [%s] plan: %s",
+                max_ms, count, key[0], key[1], " | ".join(flags),
+            )
+        else:
+            logger.info("slow_query_plan: %.0fms %s [%s] plan: %s",
+                        max_ms, key[0], key[1], " | ".join(p.strip() for p in plan))
+
+    def flush(self) -> None:
+        """Block until every queued statement has been planned."""
+        self._queue.join()
+
+    def entries(self, flagged_only: bool = False) -> list[dict]:
+        """Captured entries, flagged first, then by worst latency."""
+        with self._lock:
+            items = [dict(e) for e in self._entries.values()]
+        if flagged_only:
+            items = [e for e in items if e["flagged"]]
+        items.sort(key=lambda e: (not e["flagged"], -e["max_ms"]))
+        return items
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_queries = SlowQueryLog()
+if slow_queries.enabled:
+    statement_hooks.append(slow_queries.observe)
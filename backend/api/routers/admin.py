@@ -0,0 +1,39 @@
+"""
+Admin diagnostics endpoints.
+
+Write-key protected (``X-Rubli-Key``); they expose internals, not data.
+"""
+from fastapi import APIRouter, Depends, Query
+
+from ..dependencies import require_write_key
+from ..query_plans import FLAG_TABLES, slow_queries
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    flagged_only: bool = Query(False, description="Only plans that fully scan a watched table"),
+    limit: int = Query(50, ge=1, le=200),
+    _: None = Depends(require_write_key),
+):
+    """Slow statements captured by this worker with their EXPLAIN QUERY PLAN.
+
+    Enabled by ``RUBLI_SLOW_QUERY_MS``; each gunicorn worker keeps its own log.
+    """
+    entries = slow_queries.entries(flagged_only=flagged_only)
+    return {
+        "enabled": slow_queries.enabled,
+        "threshold_ms": round(slow_queries.threshold_s * 1000, 1),
+        "flag_tables": list(FLAG_TABLES),
+        "total": len(entries),
+        "flagged": sum(1 for e in entries if e["flagged"]),
+        "data": entries[:limit],
+    }
+
+
+@router.delete("/slow-queries")
+def clear_slow_queries(_: None = Depends(require_write_key)):
+    """Forget captured statements (e.g. after deploying an index fix)."""
+    slow_queries.clear()
+    return {"cleared": True}
@@ -9,16 +9,18 @@ import sqlite3
 import logging
 import json
 import threading
-import time as _time
 from typing import Optional, List, Dict, Any, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response
 from pydantic import BaseModel, Field
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from ..dependencies import get_db, require_write_key
+from ..dependencies import get_db, get_db_writer, require_write_key
+from ..single_flight import single_flight
+from ..materialized import materialized
 from ..config.constants import MAX_CONTRACT_VALUE
+from ..columnar import contract_columns, row_mask, yearly_stats
 from ..services.active_model import normalize_coefficients
-from ..cache import SimpleCache
+from ..cache import SimpleCache, app_cache
 from ..config.temporal_events import TEMPORAL_EVENTS, TemporalEventData
 from ..helpers.analysis_helpers import (
     build_where_clause,
@@ -52,9 +54,9 @@ def _rate_limit(limit_string: str):
 
 
 # Global cache instance for analysis router
-_analysis_cache = SimpleCache()
+_analysis_cache = SimpleCache(namespace="analysis")
 
-SECTOR_YEAR_CACHE_TTL = 3600  # 1 hour
+SECTOR_YEAR_CACHE_TTL = None  # until the data epoch changes
 
 
 # =============================================================================
@@ -609,27 +611,23 @@ def get_risk_overview():
 # PATTERN COUNTS ENDPOINT (for DetectivePatterns page)
 # =============================================================================
 
-_pattern_counts_cache: Dict[str, Any] = {}
-_pattern_counts_ts: float = 0
+_pattern_counts_cache = SimpleCache(namespace="analysis_pattern_counts", maxsize=1)
 
 @router.get("/patterns/counts", response_model=Dict[str, Any])
+@materialized("analysis_pattern_counts")
 def get_pattern_counts():
     """
     Return all pattern match counts in a single request.
     Replaces 4+ separate per_page=1 queries from DetectivePatterns page.
-    Cached for 10 minutes.
+    Cached until the data epoch changes.
     """
-    import time
-    global _pattern_counts_cache, _pattern_counts_ts
-
-    now = time.time()
-    if _pattern_counts_cache and (now - _pattern_counts_ts) < 600:
-        return _pattern_counts_cache
+    cached = _pattern_counts_cache.get("counts")
+    if cached is not None:
+        return cached
 
     with get_db() as conn:
         result = analysis_service.get_pattern_counts(conn)
-        _pattern_counts_cache = result
-        _pattern_counts_ts = now
+        _pattern_counts_cache.set("counts", result, ttl_seconds=None)
         return result
 
 
@@ -645,9 +643,9 @@ def get_monthly_breakdown(
 ):
     """Get monthly breakdown of contracts for a specific year."""
     _cache_key = f"{year}:{sector_id}:{institution_id}"
-    _cached = _monthly_cache.get(_cache_key)
-    if _cached and (_time.time() - _cached["ts"]) < _MONTHLY_CACHE_TTL:
-        return _cached["data"]
+    _cached = app_cache.get(_MONTHLY_CACHE, _cache_key)
+    if _cached is not None:
+        return _cached
 
     try:
         with get_db() as conn:
@@ -714,7 +712,7 @@ def get_monthly_breakdown(
                 total_value=total_value, avg_risk=round(avg_risk, 4),
                 december_spike=december_spike
             )
-            _monthly_cache[_cache_key] = {"ts": _time.time(), "data": response}
+            app_cache.set(_MONTHLY_CACHE, _cache_key, response, maxsize=512, ttl=_MONTHLY_CACHE_TTL)
             return response
 
     except sqlite3.Error as e:
@@ -722,31 +720,28 @@ def get_monthly_breakdown(
         raise HTTPException(status_code=500, detail="Database error occurred")
 
 
-_yoy_cache: Dict[str, Any] = {}
-_YOY_CACHE_TTL = 600  # 10 minutes
+# Shared (cross-worker) app_cache namespaces. TTL None = valid until the
+# data epoch changes (a pipeline stage re-ran); see api/data_epoch.py.
+_YOY_CACHE = "analysis_yoy"
+_YOY_CACHE_TTL = None
 
-# Cache for monthly-breakdown (keyed by (year, sector_id, institution_id)); TTL 1 hour
-_monthly_cache: Dict[str, Any] = {}
-_MONTHLY_CACHE_TTL = 3600
+# Cache for monthly-breakdown (keyed by (year, sector_id, institution_id))
+_MONTHLY_CACHE = "analysis_monthly"
+_MONTHLY_CACHE_TTL = None
 
-# Cache for december-spike-analysis (keyed by (start_year, end_year, sector_id)); TTL 1 hour
-_dec_spike_cache: Dict[str, Any] = {}
-_DEC_SPIKE_CACHE_TTL = 3600
+# Cache for december-spike-analysis (keyed by (start_year, end_year, sector_id))
+_dec_spike_cache = SimpleCache(namespace="analysis_dec_spike")
 
 
 @router.get("/year-over-year", response_model=YearOverYearResponse)
+@materialized("analysis_year_over_year")
+@single_flight(_YOY_CACHE, ttl=_YOY_CACHE_TTL, maxsize=256)
 def get_year_over_year(
     sector_id: Optional[int] = Query(None, ge=1, le=12, description="Filter by sector"),
     start_year: Optional[int] = Query(None, ge=2002, le=2026, description="Start year"),
     end_year: Optional[int] = Query(None, ge=2002, le=2026, description="End year"),
 ):
     """Get year-over-year trends."""
-    import time as _time
-    cache_key = f"yoy:{sector_id}:{start_year}:{end_year}"
-    cached = _yoy_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _YOY_CACHE_TTL:
-        return cached["data"]
-
     with get_db() as conn:
         # Fast path for unfiltered case: use precomputed yearly_trends
         if sector_id is None and start_year is None and end_year is None:
@@ -776,7 +771,6 @@ def get_year_over_year(
                     "min_year": min(years) if years else 2002,
                     "max_year": max(years) if years else 2025,
                 }
-                _yoy_cache[cache_key] = {"ts": _time.time(), "data": result}
                 return result
 
         result = analysis_service.get_year_over_year(
@@ -785,7 +779,6 @@ def get_year_over_year(
             start_year=start_year,
             end_year=end_year,
         )
-        _yoy_cache[cache_key] = {"ts": _time.time(), "data": result}
         return result
 
 
@@ -812,8 +805,32 @@ class SectorYearBreakdownResponse(BaseModel):
     data_note: Optional[str] = None
 
 
+def _sector_year_rows_since_2018(cursor: sqlite3.Cursor) -> list:
+    """Live sector x year aggregate, 2018+ only (used when no faster source exists)."""
+    cursor.execute("""
+        SELECT
+            contract_year as year, sector_id,
+            COUNT(*) as contracts,
+            COALESCE(SUM(amount_mxn), 0) as total_value,
+            COALESCE(AVG(risk_score), 0) as avg_risk,
+            SUM(CASE WHEN is_direct_award = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as direct_award_pct,
+            SUM(CASE WHEN is_single_bid = 1 THEN 1 ELSE 0 END) * 100.0 /
+                NULLIF(SUM(CASE WHEN is_direct_award = 0 THEN 1 ELSE 0 END), 0) as single_bid_pct,
+            SUM(CASE WHEN risk_level IN ('high', 'critical') THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as high_risk_pct,
+            COUNT(DISTINCT vendor_id) as vendor_count,
+            COUNT(DISTINCT institution_id) as institution_count
+        FROM contracts
+        WHERE contract_year IS NOT NULL AND sector_id IS NOT NULL
+          AND contract_year >= 2018
+        GROUP BY contract_year, sector_id
+        ORDER BY contract_year, sector_id
+    """)
+    return cursor.fetchall()
+
+
 @router.get("/sector-year-breakdown", response_model=SectorYearBreakdownResponse)
 @_rate_limit("30/minute")
+@materialized("analysis_sector_year_breakdown")
 def get_sector_year_breakdown(request: Request):
     """Get sector x year cross-tabulation for administration analysis."""
     try:
@@ -848,31 +865,25 @@ def get_sector_year_breakdown(request: Request):
                     _analysis_cache.set(cache_key, result, ttl_seconds=SECTOR_YEAR_CACHE_TTL)
                     return result
 
-            # Fallback: live query limited to 2018+ (precomputed stat missing in this DB).
-            # Full-history query takes 750s on 3.1M rows; 2018+ is ~1M rows and finishes in ~30s.
-            logger.warning(
-                "sector_year_breakdown: precomputed_stats key missing; falling back to live query "
-                "truncated to 2018+. Historical data (2002-2017) will NOT be returned. "
-                "Run precompute_stats to restore full history."
-            )
-            cursor.execute("""
-                SELECT
-                    contract_year as year, sector_id,
-                    COUNT(*) as contracts,
-                    COALESCE(SUM(amount_mxn), 0) as total_value,
-                    COALESCE(AVG(risk_score), 0) as avg_risk,
-                    SUM(CASE WHEN is_direct_award = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as direct_award_pct,
-                    SUM(CASE WHEN is_single_bid = 1 THEN 1 ELSE 0 END) * 100.0 /
-                        NULLIF(SUM(CASE WHEN is_direct_award = 0 THEN 1 ELSE 0 END), 0) as single_bid_pct,
-                    SUM(CASE WHEN risk_level IN ('high', 'critical') THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as high_risk_pct,
-                    COUNT(DISTINCT vendor_id) as vendor_count,
-                    COUNT(DISTINCT institution_id) as institution_count
-                FROM contracts
-                WHERE contract_year IS NOT NULL AND sector_id IS NOT NULL
-                  AND contract_year >= 2018
-                GROUP BY contract_year, sector_id
-                ORDER BY contract_year, sector_id
-            """)
+            # Next: full history from the columnar sidecar (grouped bincount, no scan).
+            data_note = None
+            cols = contract_columns()
+            if cols is not None:
+                rows = yearly_stats(cols, row_mask(cols), by_sector=True)
+            else:
+                # Fallback: live query limited to 2018+ (precomputed stat missing in this DB).
+                # Full-history query takes 750s on 3.1M rows; 2018+ is ~1M rows and finishes in ~30s.
+                logger.warning(
+                    "sector_year_breakdown: precomputed_stats key missing; falling back to live query "
+                    "truncated to 2018+. Historical data (2002-2017) will NOT be returned. "
+                    "Run precompute_stats to restore full history."
+                )
+                rows = _sector_year_rows_since_2018(cursor)
+                data_note = (
+                    "Data is truncated to 2018–present. Historical records from 2002–2017 are "
+                    "unavailable because the precomputed_stats key 'sector_year_breakdown' is "
+                    "missing. Run precompute_stats to restore full history."
+                )
 
             data = [SectorYearItem(
                 year=row["year"], sector_id=row["sector_id"],
@@ -884,17 +895,9 @@ def get_sector_year_breakdown(request: Request):
                 high_risk_pct=round(row["high_risk_pct"], 2) if row["high_risk_pct"] else 0,
                 vendor_count=row["vendor_count"],
                 institution_count=row["institution_count"]
-            ) for row in cursor.fetchall()]
+            ) for row in rows]
 
-            result = SectorYearBreakdownResponse(
-                data=data,
-                total_rows=len(data),
-                data_note=(
-                    "Data is truncated to 2018–present. Historical records from 2002–2017 are "
-                    "unavailable because the precomputed_stats key 'sector_year_breakdown' is "
-                    "missing. Run precompute_stats to restore full history."
-                ),
-            )
+            result = SectorYearBreakdownResponse(data=data, total_rows=len(data), data_note=data_note)
             _analysis_cache.set(cache_key, result, ttl_seconds=SECTOR_YEAR_CACHE_TTL)
             return result
 
@@ -925,8 +928,7 @@ def get_temporal_events(
     return TemporalEventsResponse(events=events, total=len(events))
 
 
-_compare_periods_cache: Dict[str, Any] = {}
-_COMPARE_PERIODS_TTL = 3600  # 1 hour
+_compare_periods_cache = SimpleCache(namespace="analysis_compare_periods")
 
 
 @router.get("/compare-periods", response_model=PeriodComparisonResponse)
@@ -940,8 +942,8 @@ def compare_periods(
     """Compare procurement patterns between two time periods."""
     cache_key = f"{period1_start}:{period1_end}:{period2_start}:{period2_end}:{sector_id}"
     cached = _compare_periods_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _COMPARE_PERIODS_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
     try:
         with get_db() as conn:
             cursor = conn.cursor()
@@ -1021,7 +1023,7 @@ def compare_periods(
                 period1=period1, period2=period2,
                 changes=changes, significant_changes=significant
             )
-            _compare_periods_cache[cache_key] = {"ts": _time.time(), "data": response}
+            _compare_periods_cache.set(cache_key, response, ttl_seconds=None)
             return response
 
     except sqlite3.Error as e:
@@ -1038,8 +1040,8 @@ def get_december_spike_analysis(
     """Analyze year-end spending spikes across multiple years."""
     _spike_key = f"{start_year}:{end_year}:{sector_id}"
     _spike_cached = _dec_spike_cache.get(_spike_key)
-    if _spike_cached and (_time.time() - _spike_cached["ts"]) < _DEC_SPIKE_CACHE_TTL:
-        return _spike_cached["data"]
+    if _spike_cached is not None:
+        return _spike_cached
 
     try:
         with get_db() as conn:
@@ -1099,7 +1101,7 @@ def get_december_spike_analysis(
                 "pattern_detected": avg_spike > 1.3,
                 "description": f"December spending averages {avg_spike:.1f}x other months" if avg_spike > 1 else "No significant December spike pattern"
             }
-            _dec_spike_cache[_spike_key] = {"ts": _time.time(), "data": result}
+            _dec_spike_cache.set(_spike_key, result, ttl_seconds=None)
             return result
 
     except sqlite3.Error as e:
@@ -1211,8 +1213,7 @@ def list_price_hypotheses(
         raise HTTPException(status_code=500, detail="Database error occurred")
 
 
-_price_hyp_summary_cache: Dict[str, Any] = {}
-_PRICE_HYP_SUMMARY_CACHE_TTL = 3600  # 1 hour — expensive full-table scan
+_price_hyp_summary_cache = SimpleCache(namespace="analysis_price_hyp_summary")
 
 
 @router.get("/price-hypotheses/summary", response_model=PriceHypothesesSummaryResponse)
@@ -1220,8 +1221,8 @@ def get_price_hypotheses_summary():
     """Get summary statistics for price hypotheses, computed live across all contracts."""
     cache_key = "price_hyp_summary"
     cached = _price_hyp_summary_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _PRICE_HYP_SUMMARY_CACHE_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     try:
         with get_db() as conn:
@@ -1343,7 +1344,7 @@ def get_price_hypotheses_summary():
                 "recent_runs": recent_runs,
             }
 
-            _price_hyp_summary_cache[cache_key] = {"ts": _time.time(), "data": result}
+            _price_hyp_summary_cache.set(cache_key, result, ttl_seconds=None)
             return result
 
     except sqlite3.Error as e:
@@ -1463,7 +1464,7 @@ def get_price_hypothesis_detail(hypothesis_id: str = Path(...)):
 def review_price_hypothesis(hypothesis_id: str = Path(...), review: HypothesisReviewRequest = None, _: None = Depends(require_write_key)):
     """Review and validate a price hypothesis."""
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             cursor = conn.cursor()
 
             cursor.execute("SELECT id FROM price_hypotheses WHERE hypothesis_id = ?", (hypothesis_id,))
@@ -2032,17 +2033,15 @@ def get_false_negatives(
         raise HTTPException(status_code=500, detail="Database error occurred")
 
 
-_factor_analysis_result: dict | None = None
-_factor_analysis_ts: float = 0.0
-_FACTOR_ANALYSIS_TTL = 7200  # 2 hours — stable analytical endpoint
+_factor_analysis_cache = SimpleCache(namespace="analysis_factor_analysis", maxsize=1)
 
 
 @router.get("/validation/factor-analysis", response_model=FactorAnalysisResponse)
 def get_factor_analysis():
     """Analyze which risk factors are most effective at detecting known bad contracts."""
-    global _factor_analysis_result, _factor_analysis_ts
-    if _factor_analysis_result and (_time.time() - _factor_analysis_ts) < _FACTOR_ANALYSIS_TTL:
-        return _factor_analysis_result
+    cached = _factor_analysis_cache.get("factor_analysis")
+    if cached is not None:
+        return cached
     try:
         with get_db() as conn:
             cursor = conn.cursor()
@@ -2125,8 +2124,7 @@ def get_factor_analysis():
                     if f.lift > 1.5 and f.trigger_rate_known_bad > 10
                 ][:5]
             }
-            _factor_analysis_result = result
-            _factor_analysis_ts = _time.time()
+            _factor_analysis_cache.set("factor_analysis", result, ttl_seconds=None)
             return result
 
     except HTTPException:
@@ -2162,9 +2160,7 @@ class AnomalyListResponse(BaseModel):
 
 
 # Simple cache for anomalies
-_anomalies_cache: Dict[str, Any] = {}
-_anomalies_cache_time: Optional[datetime] = None
-ANOMALIES_CACHE_TTL = 300  # 5 minutes
+_anomalies_cache = SimpleCache(namespace="analysis_anomalies", maxsize=16)
 
 
 @router.get("/anomalies", response_model=AnomalyListResponse)
@@ -2177,14 +2173,12 @@ def get_anomalies(
     Returns precomputed anomalies for quick dashboard loading.
     For detailed anomaly detection with filters, use /sectors/analysis/anomalies.
     """
-    global _anomalies_cache, _anomalies_cache_time
-
     cache_key = f"anomalies_{severity or 'all'}"
 
     # Check cache first - return immediately if valid
-    if _anomalies_cache_time and (datetime.now() - _anomalies_cache_time).total_seconds() < ANOMALIES_CACHE_TTL:
-        if cache_key in _anomalies_cache:
-            return _anomalies_cache[cache_key]
+    cached = _anomalies_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     try:
         with get_db() as conn:
@@ -2299,8 +2293,7 @@ def get_anomalies(
             )
 
             # Update cache
-            _anomalies_cache[cache_key] = response
-            _anomalies_cache_time = datetime.now()
+            _anomalies_cache.set(cache_key, response, ttl_seconds=None)
 
             return response
 
@@ -2331,13 +2324,14 @@ class MoneyFlowResponse(BaseModel):
     total_contracts: int
 
 
-_money_flow_cache: Dict[str, Any] = {}
-_money_flow_cache_ts: float = 0
-_MONEY_FLOW_CACHE_TTL = 600  # 10 minutes
+_MONEY_FLOW_CACHE = "analysis_money_flow"
+_MONEY_FLOW_CACHE_TTL = None  # until the data epoch changes
 
 
 @router.get("/money-flow", response_model=MoneyFlowResponse)
 @_rate_limit("30/minute")
+@materialized("analysis_money_flow")
+@single_flight(_MONEY_FLOW_CACHE, ttl=_MONEY_FLOW_CACHE_TTL, maxsize=256)
 def get_money_flow(
     request: Request,
     sector_id: Optional[int] = Query(None, ge=1, le=12),
@@ -2352,18 +2346,8 @@ def get_money_flow(
     Filtered path (year or direct_award_only): queries contracts directly.
     sort_by: 'value' (default, by total_value DESC) or 'risk' (by avg_risk DESC).
     """
-    import time as _time
-    global _money_flow_cache, _money_flow_cache_ts
-
-    cache_key = f"flow:{sector_id}:{year}:{limit}:{direct_award_only}:{sort_by}"
-    now = _time.time()
-    if _money_flow_cache and (now - _money_flow_cache_ts) < _MONEY_FLOW_CACHE_TTL:
-        cached = _money_flow_cache.get(cache_key)
-        if cached:
-            return cached
-
     with get_db() as conn:
-        result = analysis_service.get_money_flow(
+        return analysis_service.get_money_flow(
             conn,
             sector_id=sector_id,
             year=year,
@@ -2371,9 +2355,6 @@ def get_money_flow(
             direct_award_only=direct_award_only,
             sort_by=sort_by,
         )
-        _money_flow_cache[cache_key] = result
-        _money_flow_cache_ts = _time.time()
-        return result
 
 
 # =============================================================================
@@ -2399,9 +2380,7 @@ class RiskFactorAnalysisResponse(BaseModel):
     top_cooccurrences: List[FactorCooccurrence]
 
 
-_risk_factor_analysis_cache: Dict[str, Any] = {}
-_risk_factor_analysis_cache_ts: float = 0
-_RISK_FACTOR_ANALYSIS_CACHE_TTL = 600  # 10 minutes
+_risk_factor_analysis_cache = SimpleCache(namespace="analysis_risk_factor_analysis")
 
 
 @router.get("/risk-factor-analysis", response_model=RiskFactorAnalysisResponse)
@@ -2415,18 +2394,13 @@ def get_risk_factor_analysis(
     Parses the comma-separated risk_factors column, extracts base factor names
     (before first colon), computes frequencies and pairwise co-occurrence lift.
     """
-    import time as _time
     from itertools import combinations
     from collections import Counter
 
-    global _risk_factor_analysis_cache, _risk_factor_analysis_cache_ts
-
     cache_key = f"rfa:{sector_id}:{year}"
-    now = _time.time()
-    if _risk_factor_analysis_cache and (now - _risk_factor_analysis_cache_ts) < _RISK_FACTOR_ANALYSIS_CACHE_TTL:
-        cached = _risk_factor_analysis_cache.get(cache_key)
-        if cached:
-            return cached
+    cached = _risk_factor_analysis_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     try:
         with get_db() as conn:
@@ -2534,8 +2508,7 @@ def get_risk_factor_analysis(
                 top_cooccurrences=top_cooccurrences,
             )
 
-            _risk_factor_analysis_cache[cache_key] = result
-            _risk_factor_analysis_cache_ts = _time.time()
+            _risk_factor_analysis_cache.set(cache_key, result, ttl_seconds=None)
 
             return result
 
@@ -2561,9 +2534,7 @@ class FactorLiftResponse(BaseModel):
     population_total: int
 
 
-_factor_lift_cache: Dict[str, Any] = {}
-_factor_lift_cache_ts: float = 0
-_FACTOR_LIFT_CACHE_TTL = 1800  # 30 minutes
+_factor_lift_cache = SimpleCache(namespace="analysis_factor_lift", maxsize=1)
 
 
 @router.get("/validation/factor-lift", response_model=FactorLiftResponse)
@@ -2576,11 +2547,9 @@ def get_factor_lift():
     """
     from collections import Counter
 
-    global _factor_lift_cache, _factor_lift_cache_ts
-
-    now = _time.time()
-    if _factor_lift_cache and (now - _factor_lift_cache_ts) < _FACTOR_LIFT_CACHE_TTL:
-        return _factor_lift_cache
+    cached = _factor_lift_cache.get("factor_lift")
+    if cached is not None:
+        return cached
 
     try:
         with get_db() as conn:
@@ -2659,8 +2628,7 @@ def get_factor_lift():
                 gt_total=gt_total,
                 population_total=pop_total,
             )
-            _factor_lift_cache = result
-            _factor_lift_cache_ts = now
+            _factor_lift_cache.set("factor_lift", result, ttl_seconds=None)
             return result
 
     except sqlite3.Error as e:
@@ -2690,9 +2658,7 @@ class InstitutionRankingsResponse(BaseModel):
     total_institutions: int
 
 
-_institution_rankings_cache: Dict[str, Any] = {}
-_institution_rankings_cache_ts: float = 0
-_INSTITUTION_RANKINGS_CACHE_TTL = 600  # 10 minutes
+_institution_rankings_cache = SimpleCache(namespace="analysis_institution_rankings")
 
 
 @router.get("/institution-rankings", response_model=InstitutionRankingsResponse)
@@ -2710,15 +2676,10 @@ def get_institution_rankings(
     - 0.15-0.25: moderate concentration
     - >0.25: high concentration
     """
-    import time as _time
-    global _institution_rankings_cache, _institution_rankings_cache_ts
-
     cache_key = f"ir:{sort_by}:{min_contracts}:{limit}"
-    now = _time.time()
-    if _institution_rankings_cache and (now - _institution_rankings_cache_ts) < _INSTITUTION_RANKINGS_CACHE_TTL:
-        cached = _institution_rankings_cache.get(cache_key)
-        if cached:
-            return cached
+    cached = _institution_rankings_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     # Validate sort_by parameter
     sort_map = {
@@ -2828,8 +2789,7 @@ def get_institution_rankings(
                 total_institutions=total_institutions,
             )
 
-            _institution_rankings_cache[cache_key] = result
-            _institution_rankings_cache_ts = _time.time()
+            _institution_rankings_cache.set(cache_key, result, ttl_seconds=None)
 
             return result
 
@@ -2842,8 +2802,7 @@ def get_institution_rankings(
 # STRUCTURAL BREAKS ENDPOINT
 # =============================================================================
 
-_structural_breaks_cache: Dict[str, Any] = {}
-_STRUCTURAL_BREAKS_CACHE_TTL = 3600  # 1 hour — historical data, changes rarely
+_structural_breaks_cache = SimpleCache(namespace="analysis_structural_breaks")
 
 
 @router.get("/structural-breaks", response_model=Dict[str, Any])
@@ -2851,18 +2810,16 @@ def get_structural_breaks():
     """
     Detect statistically significant change points in procurement trends.
     Uses PELT algorithm (ruptures library).
-    Cached for 1 hour since it is computed from historical data.
+    Cached until the data epoch changes.
     """
-    import time as _time
-
     cache_key = "structural_breaks"
     cached = _structural_breaks_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _STRUCTURAL_BREAKS_CACHE_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     with get_db() as conn:
         result = analysis_service.get_structural_breaks(conn)
-        _structural_breaks_cache[cache_key] = {"ts": _time.time(), "data": result}
+        _structural_breaks_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
 
@@ -2870,8 +2827,7 @@ def get_structural_breaks():
 # ML PRICE ANOMALY ENDPOINT
 # =============================================================================
 
-_ml_anomalies_cache: Dict[str, Any] = {}
-_ML_ANOMALIES_CACHE_TTL = 30 * 60  # 30 minutes — pre-computed table, stable
+_ml_anomalies_cache = SimpleCache(namespace="analysis_ml_anomalies")
 
 
 @router.get("/prices/ml-anomalies", response_model=MLAnomaliesResponse)
@@ -2891,12 +2847,10 @@ def get_ml_price_anomalies(
     Run ``python -m scripts.compute_price_anomaly_scores`` to populate the
     ``contract_ml_anomalies`` table before calling this endpoint.
     """
-    import time as _time
-
     cache_key = f"ml_anomalies:{sector_id}:{limit}:{only_new}:{model}"
     cached = _ml_anomalies_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _ML_ANOMALIES_CACHE_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     try:
         with get_db() as conn:
@@ -2908,7 +2862,7 @@ def get_ml_price_anomalies(
             )
             if not cursor.fetchone():
                 result = {"data": [], "total": 0, "new_detections": 0}
-                _ml_anomalies_cache[cache_key] = {"ts": _time.time(), "data": result}
+                _ml_anomalies_cache.set(cache_key, result, ttl_seconds=None)
                 return result
 
             # ── Build WHERE clauses ──────────────────────────────────────────
@@ -2995,7 +2949,7 @@ def get_ml_price_anomalies(
                 "new_detections": new_detections,
             }
 
-            _ml_anomalies_cache[cache_key] = {"ts": _time.time(), "data": result}
+            _ml_anomalies_cache.set(cache_key, result, ttl_seconds=None)
             return result
 
     except sqlite3.Error as exc:
@@ -3007,8 +2961,7 @@ def get_ml_price_anomalies(
 # ANOMALY MODEL COMPARISON (Section 14.1)
 # =============================================================================
 
-_anomaly_comparison_cache: Dict[str, Any] = {}
-_ANOMALY_COMPARISON_TTL = 3600  # 1 hour
+_anomaly_comparison_cache = SimpleCache(namespace="analysis_anomaly_comparison")
 
 
 @router.get("/anomaly-comparison")
@@ -3017,12 +2970,11 @@ def get_anomaly_comparison():
     Compare price-only vs full-vector Isolation Forest anomaly detectors.
     Based on Ouyang, Goh & Lim (2022): full-vector outperforms price-only by 23% recall.
     """
-    import time as _time
     import sqlite3 as _sqlite3
 
     cached = _anomaly_comparison_cache.get("data")
-    if cached and (_time.time() - cached["ts"]) < _ANOMALY_COMPARISON_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     with get_db() as conn:
         conn.row_factory = _sqlite3.Row
@@ -3065,7 +3017,7 @@ def get_anomaly_comparison():
             ),
         }
 
-        _anomaly_comparison_cache["data"] = {"ts": _time.time(), "data": result}
+        _anomaly_comparison_cache.set("data", result, ttl_seconds=None)
         return result
 
 
@@ -3073,10 +3025,10 @@ def get_anomaly_comparison():
 # POLITICAL CYCLE ANALYSIS (Section 12.1)
 # =============================================================================
 
-_political_cycle_cache: Dict[str, Any] = {}
-_POLITICAL_CYCLE_TTL = 6 * 3600  # 6 hours
+_political_cycle_cache = SimpleCache(namespace="analysis_political_cycle")
 
 @router.get("/political-cycle", tags=["analysis"])
+@materialized("analysis_political_cycle")
 def get_political_cycle():
     """
     Analyze procurement patterns relative to Mexico's electoral/budget calendar.
@@ -3084,15 +3036,15 @@ def get_political_cycle():
     """
     cache_key = "political_cycle"
     cached = _political_cycle_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _POLITICAL_CYCLE_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     try:
         with get_db() as _pc:
             row = _pc.execute("SELECT stat_value FROM precomputed_stats WHERE stat_key=?", (cache_key,)).fetchone()
         if row and row["stat_value"]:
             result = json.loads(row["stat_value"])
-            _political_cycle_cache[cache_key] = {"ts": _time.time(), "data": result}
+            _political_cycle_cache.set(cache_key, result, ttl_seconds=None)
             return result
     except Exception:
         pass
@@ -3190,9 +3142,9 @@ def get_political_cycle():
             "q4_election_interaction": q4_interaction,
         }
 
-        _political_cycle_cache[cache_key] = {"ts": _time.time(), "data": result}
+        _political_cycle_cache.set(cache_key, result, ttl_seconds=None)
         try:
-            with get_db() as wconn:
+            with get_db_writer() as wconn:
                 wconn.execute(
                     "INSERT OR REPLACE INTO precomputed_stats(stat_key,stat_value,updated_at) VALUES(?,?,datetime('now'))",
                     (cache_key, json.dumps(result, default=str)),
@@ -3207,19 +3159,19 @@ def get_political_cycle():
 # PUBLICATION DELAY TRANSPARENCY (Section 12.2)
 # =============================================================================
 
-_pub_delay_cache: Dict[str, Any] = {}
-_PUB_DELAY_TTL = 6 * 3600  # 6 hours
+_pub_delay_cache = SimpleCache(namespace="analysis_pub_delay")
 
 @router.get("/transparency/publication-delays", tags=["analysis"])
 @_rate_limit("30/minute")
+@materialized("analysis_publication_delays")
 def get_publication_delays(request: Request):
     """
     Distribution of publication delay (days between contract date and COMPRANET publication).
     Measures government transparency in procurement reporting.
     """
     cached = _pub_delay_cache.get("pub_delays")
-    if cached and (_time.time() - cached["ts"]) < _PUB_DELAY_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     with get_db() as conn:
         # Fast path: read from precomputed_stats if available and fully formed
@@ -3238,7 +3190,7 @@ def get_publication_delays(request: Request):
                     and "by_year" in precomputed
                     and "total_with_delay_data" in precomputed
                 ):
-                    _pub_delay_cache["pub_delays"] = {"ts": _time.time(), "data": precomputed}
+                    _pub_delay_cache.set("pub_delays", precomputed, ttl_seconds=None)
                     return precomputed
         except Exception as pc_err:
             logger.debug(f"precomputed_stats fast path skipped: {pc_err}")
@@ -3317,15 +3269,14 @@ def get_publication_delays(request: Request):
             "by_year": by_year,
         }
 
-        _pub_delay_cache["pub_delays"] = {"ts": _time.time(), "data": result}
+        _pub_delay_cache.set("pub_delays", result, ttl_seconds=None)
         return result
 
 # ---------------------------------------------------------------------------
 # Threshold Gaming Analysis (Coviello, Guglielmo & Spagnolo 2018; Szucs 2023)
 # ---------------------------------------------------------------------------
 
-_threshold_gaming_cache: Dict[str, Any] = {}
-_THRESHOLD_GAMING_TTL = 6 * 3600
+_threshold_gaming_cache = SimpleCache(namespace="analysis_threshold_gaming")
 
 
 @router.get("/threshold-gaming", tags=["analysis"])
@@ -3336,8 +3287,8 @@ def get_threshold_gaming():
     threshold gaming to avoid competitive bidding requirements.
     """
     cached = _threshold_gaming_cache.get("tg")
-    if cached and (_time.time() - cached["ts"]) < _THRESHOLD_GAMING_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     with get_db() as conn:
         cursor = conn.cursor()
@@ -3409,7 +3360,7 @@ def get_threshold_gaming():
             else:
                 raise
 
-        _threshold_gaming_cache["tg"] = {"ts": _time.time(), "data": result}
+        _threshold_gaming_cache.set("tg", result, ttl_seconds=None)
         return result
 
 
@@ -3439,9 +3390,7 @@ _SECTOR_NAMES: dict[int, str] = {
     9: "agricultura", 10: "ambiente", 11: "trabajo", 12: "otros",
 }
 
-_asf_sector_cache: dict = {}
-_asf_sector_cache_lock = threading.Lock()
-_ASF_SECTOR_TTL = 86400  # 24 hours
+_asf_sector_cache = SimpleCache(namespace="analysis_asf_sector")
 
 
 @router.get("/sectors/{sector_id}/asf-findings", response_model=SectorASFResponse)
@@ -3450,10 +3399,9 @@ def get_sector_asf_findings(sector_id: int = Path(..., ge=1, le=12)):
     import threading as _threading
 
     cache_key = f"asf_sector_{sector_id}"
-    with _asf_sector_cache_lock:
-        entry = _asf_sector_cache.get(cache_key)
-        if entry and datetime.now() < entry["expires_at"]:
-            return entry["value"]
+    entry = _asf_sector_cache.get(cache_key)
+    if entry is not None:
+        return entry
 
     ramo_codes = _SECTOR_RAMOS.get(sector_id, [])
     sector_name = _SECTOR_NAMES.get(sector_id, "otros")
@@ -3501,12 +3449,7 @@ def get_sector_asf_findings(sector_id: int = Path(..., ge=1, le=12)):
         years_audited=len(findings),
     )
 
-    with _asf_sector_cache_lock:
-        from datetime import datetime as _dt, timedelta as _td
-        _asf_sector_cache[cache_key] = {
-            "value": result,
-            "expires_at": _dt.now() + _td(seconds=_ASF_SECTOR_TTL),
-        }
+    _asf_sector_cache.set(cache_key, result, ttl_seconds=None)
     return result
 
 
@@ -3514,9 +3457,7 @@ def get_sector_asf_findings(sector_id: int = Path(..., ge=1, le=12)):
 # ASF Institution Summary (cross-reference with RUBLI risk scores)
 # ---------------------------------------------------------------------------
 
-_asf_inst_summary_cache: dict = {}
-_asf_inst_summary_lock = threading.Lock()
-_ASF_INST_SUMMARY_TTL = 86400  # 24 hours
+_asf_inst_summary_cache = SimpleCache(namespace="analysis_asf_inst_summary")
 
 
 @router.get("/asf-institution-summary", response_model=ASFInstitutionSummaryResponse)
@@ -3529,10 +3470,9 @@ def get_asf_institution_summary():
     - High RUBLI, no ASF = procurement-phase only (execution fraud not yet audited)
     - Low RUBLI + ASF = execution-phase fraud (Limitation 9.1 made visible)
     """
-    with _asf_inst_summary_lock:
-        entry = _asf_inst_summary_cache.get("data")
-        if entry and datetime.now() < entry["expires_at"]:
-            return entry["value"]
+    entry = _asf_inst_summary_cache.get("data")
+    if entry is not None:
+        return entry
 
     with get_db() as conn:
         conn.row_factory = sqlite3.Row
@@ -3591,11 +3531,7 @@ def get_asf_institution_summary():
         total_amount_mxn=total_amount,
     )
 
-    with _asf_inst_summary_lock:
-        _asf_inst_summary_cache["data"] = {
-            "value": result,
-            "expires_at": datetime.now() + timedelta(seconds=_ASF_INST_SUMMARY_TTL),
-        }
+    _asf_inst_summary_cache.set("data", result, ttl_seconds=None)
 
     return result
 
@@ -4093,12 +4029,12 @@ def get_factor_baselines_sector_year(
 # PRICE ANOMALIES (z_price_ratio based — always populated, unlike price_hypotheses)
 # =============================================================================
 
-_price_anomalies_cache: Dict[str, Any] = {}
-_PRICE_ANOMALIES_TTL = 1800  # 30 min
+_price_anomalies_cache = SimpleCache(namespace="analysis_price_anomalies")
 
 
 @router.get("/price-anomalies")
 @_rate_limit("30/minute")
+@materialized("analysis_price_anomalies")
 def get_price_anomalies(
     request: Request,
     sector_id: Optional[int] = Query(None, ge=1, le=12),
@@ -4113,10 +4049,9 @@ def get_price_anomalies(
     which is always available and covers all 3.1M contracts.
     """
     cache_key = f"{sector_id}:{min_z}:{limit}"
-    if cache_key in _price_anomalies_cache:
-        entry = _price_anomalies_cache[cache_key]
-        if _time.time() - entry["ts"] < _PRICE_ANOMALIES_TTL:
-            return entry["data"]
+    cached = _price_anomalies_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     try:
         with get_db() as conn:
@@ -4327,7 +4262,7 @@ def get_price_anomalies(
                 "data": [dict(zip(cols, r)) for r in rows],
             }
 
-            _price_anomalies_cache[cache_key] = {"ts": _time.time(), "data": result}
+            _price_anomalies_cache.set(cache_key, result, ttl_seconds=None)
             return result
 
     except Exception as exc:
@@ -4366,11 +4301,12 @@ _ADMIN_ERAS = [
     ("sheinbaum",   2025, 2030),
 ]
 
-_admin_breakdown_cache = SimpleCache()
+_admin_breakdown_cache = SimpleCache(namespace="analysis_admin_breakdown")
 _admin_breakdown_lock = threading.Lock()
 
 
 @router.get("/admin-breakdown", response_model=AdminBreakdownResponse)
+@materialized("analysis_admin_breakdown")
 def get_admin_breakdown(response: Response):
     """Per-administration vendor concentration and corruption statistics."""
     cache_key = "admin_breakdown"
@@ -4516,7 +4452,7 @@ def get_admin_breakdown(response: Response):
     )
     _admin_breakdown_cache.set(cache_key, result, ttl_seconds=3600)
     try:
-        with get_db() as wconn:
+        with get_db_writer() as wconn:
             wconn.execute(
                 "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at) VALUES(?,?,datetime('now'))",
                 (cache_key, result.model_dump_json()),
@@ -4663,9 +4599,9 @@ class AdminInstitutionsResponse(BaseModel):
     cached_at: Optional[str] = None
 
 
-_admin_vendors_cache = SimpleCache()
+_admin_vendors_cache = SimpleCache(namespace="analysis_admin_vendors")
 _admin_vendors_lock = threading.Lock()
-_admin_institutions_cache = SimpleCache()
+_admin_institutions_cache = SimpleCache(namespace="analysis_admin_institutions")
 _admin_institutions_lock = threading.Lock()
 
 
@@ -4816,7 +4752,7 @@ def get_admin_breakdown_vendors(
         )
         _admin_vendors_cache.set(cache_key, result, ttl_seconds=3600)
         try:
-            with get_db() as wconn:
+            with get_db_writer() as wconn:
                 wconn.execute(
                     "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at)"
                     " VALUES(?,?,datetime('now'))",
@@ -4984,7 +4920,7 @@ def get_admin_breakdown_institutions(
         )
         _admin_institutions_cache.set(cache_key, result, ttl_seconds=3600)
         try:
-            with get_db() as wconn:
+            with get_db_writer() as wconn:
                 wconn.execute(
                     "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at)"
                     " VALUES(?,?,datetime('now'))",
@@ -7,17 +7,15 @@ industry risk clusters, seasonal risk, monthly risk summary, procedure risk
 comparison, top-by-period, sector growth, and year summary.
 """
 
-import json
 import sqlite3
 import logging
-import threading
-import time as _time
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
 from fastapi import APIRouter, HTTPException, Query, Path
 from pydantic import BaseModel, Field
 
+from ..cache import SimpleCache
 from ..dependencies import get_db
+from ..materialized import materialized
 from ..config.constants import MAX_CONTRACT_VALUE
 from ..helpers.analysis_helpers import table_exists
 
@@ -153,44 +151,20 @@ class ProcedureRiskResponse(BaseModel):
 # MODULE-LEVEL CACHES
 # =============================================================================
 
-_inst_risk_factors_cache: dict = {}
-_inst_risk_factors_lock = threading.Lock()
-_INST_RISK_FACTORS_TTL = 3600
-
-_industry_clusters_cache: Dict[str, Any] = {}
-_industry_clusters_lock = threading.Lock()
-_INDUSTRY_CLUSTERS_TTL = 3600  # 1 hour
-
-_seasonal_risk_cache: Dict[str, Any] = {}
-_SEASONAL_RISK_TTL = 3600  # 1 hour
-
-_monthly_risk_summary_cache: Dict[str, Any] = {}
-_MONTHLY_RISK_SUMMARY_TTL = 3600  # 1 hour
-
-_proc_risk_cache: Dict[str, Any] = {}
-_PROC_RISK_TTL = 3600  # 1 hour
-
-_top_period_cache: Dict[str, Any] = {}
-_TOP_PERIOD_TTL = 86400  # 24 hours
-
-_sector_growth_cache: Dict[str, Any] = {}
-_SECTOR_GROWTH_TTL = 86400  # 24 hours
-
-_year_summary_cache: Dict[str, Any] = {}
-_YEAR_SUMMARY_TTL = 86400  # 24 hours
-
-# value-concentration and flash-vendors are pure aggregations on contracts;
-# stale-but-fast is fine. 1h TTL matches sibling endpoints. Without these
-# caches both endpoints take 48–60s and miss the 30s axios timeout.
-_value_concentration_cache: Dict[str, Any] = {}
-_VALUE_CONCENTRATION_TTL = 3600
-_value_concentration_lock = threading.Lock()
-_VC_DB_KEY = "vc_default"
-
-_flash_vendors_cache: Dict[str, Any] = {}
-_FLASH_VENDORS_TTL = 3600
-_flash_vendors_lock = threading.Lock()
-_FV_DB_KEY = "fv_default"
+# Backed by app_cache with ttl=None: entries are scoped to the data epoch, so
+# a pipeline run invalidates them in every worker at once. value-concentration
+# and flash-vendors take 48–60s cold, past the 30s axios timeout; their default
+# views are also served from the materialized payloads.
+_inst_risk_factors_cache = SimpleCache(namespace="analysis_inst_risk_factors")
+_industry_clusters_cache = SimpleCache(namespace="analysis_industry_clusters")
+_seasonal_risk_cache = SimpleCache(namespace="analysis_seasonal_risk")
+_monthly_risk_summary_cache = SimpleCache(namespace="analysis_monthly_risk_summary")
+_proc_risk_cache = SimpleCache(namespace="analysis_procedure_risk")
+_top_period_cache = SimpleCache(namespace="analysis_top_period")
+_sector_growth_cache = SimpleCache(namespace="analysis_sector_growth")
+_year_summary_cache = SimpleCache(namespace="analysis_year_summary")
+_value_concentration_cache = SimpleCache(namespace="analysis_value_concentration")
+_flash_vendors_cache = SimpleCache(namespace="analysis_flash_vendors")
 
 _MONTH_NAMES_SHORT = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
                       'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
@@ -214,10 +188,9 @@ def get_institution_risk_factors(
     for heatmap visualization.
     """
     cache_key = f"inst_rf:{limit}:{sector_id}"
-    with _inst_risk_factors_lock:
-        entry = _inst_risk_factors_cache.get(cache_key)
-        if entry and datetime.now() < entry["expires_at"]:
-            return entry["value"]
+    cached = _inst_risk_factors_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     z_features = [
         "z_single_bid", "z_direct_award", "z_price_ratio",
@@ -315,11 +288,7 @@ def get_institution_risk_factors(
 
     result = InstitutionRiskFactorsResponse(data=items, total=len(items))
 
-    with _inst_risk_factors_lock:
-        _inst_risk_factors_cache[cache_key] = {
-            "value": result,
-            "expires_at": datetime.now() + timedelta(seconds=_INST_RISK_FACTORS_TTL),
-        }
+    _inst_risk_factors_cache.set(cache_key, result, ttl_seconds=None)
 
     return result
 
@@ -329,6 +298,7 @@ def get_institution_risk_factors(
 # =============================================================================
 
 @router.get("/value-concentration", response_model=ValueConcentrationResponse)
+@materialized("analysis_value_concentration")
 def get_value_concentration(
     min_pct: float = Query(10.0, ge=1.0, le=100.0, description="Minimum share percentage (1-100)"),
     limit: int = Query(20, ge=1, le=200, description="Maximum records to return"),
@@ -340,22 +310,11 @@ def get_value_concentration(
     Identifies market concentration and potential lock-in situations.
     """
     cache_key = f"vc:{min_pct}:{limit}"
-    is_default = (min_pct == 10.0 and limit == 20)
 
     cached = _value_concentration_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _VALUE_CONCENTRATION_TTL:
-        return cached["data"]
-
-    if is_default:
-        try:
-            with get_db() as _pc:
-                row = _pc.execute("SELECT stat_value FROM precomputed_stats WHERE stat_key=?", (_VC_DB_KEY,)).fetchone()
-            if row and row["stat_value"]:
-                result = ValueConcentrationResponse(**json.loads(row["stat_value"]))
-                _value_concentration_cache[cache_key] = {"ts": _time.time(), "data": result}
-                return result
-        except Exception:
-            pass
+    if cached is not None:
+        return cached
+
     try:
         min_share = min_pct / 100.0
         with get_db() as conn:
@@ -415,17 +374,7 @@ def get_value_concentration(
             for row in rows
         ]
         result = ValueConcentrationResponse(data=items, total=len(items), min_pct=min_pct)
-        _value_concentration_cache[cache_key] = {"ts": _time.time(), "data": result}
-        if is_default:
-            try:
-                with get_db() as wconn:
-                    wconn.execute(
-                        "INSERT OR REPLACE INTO precomputed_stats(stat_key,stat_value,updated_at) VALUES(?,?,datetime('now'))",
-                        (_VC_DB_KEY, result.model_dump_json()),
-                    )
-                    wconn.commit()
-            except Exception as e:
-                logger.warning("value_concentration persist failed: %s", e)
+        _value_concentration_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
     except sqlite3.OperationalError as e:
@@ -441,6 +390,7 @@ def get_value_concentration(
 # =============================================================================
 
 @router.get("/flash-vendors", response_model=FlashVendorsResponse)
+@materialized("analysis_flash_vendors")
 def get_flash_vendors(
     max_active_years: int = Query(3, ge=1, le=10, description="Maximum window between first and last contract year"),
     min_value: float = Query(500_000_000.0, ge=0.0, description="Minimum total contract value (MXN)"),
@@ -455,22 +405,11 @@ def get_flash_vendors(
     Results are sorted by avg_risk_score DESC.
     """
     cache_key = f"fv:{max_active_years}:{min_value}:{limit}"
-    is_fv_default = (max_active_years == 3 and min_value == 500_000_000.0 and limit == 50)
 
     cached = _flash_vendors_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _FLASH_VENDORS_TTL:
-        return cached["data"]
-
-    if is_fv_default:
-        try:
-            with get_db() as _pc:
-                row = _pc.execute("SELECT stat_value FROM precomputed_stats WHERE stat_key=?", (_FV_DB_KEY,)).fetchone()
-            if row and row["stat_value"]:
-                result = FlashVendorsResponse(**json.loads(row["stat_value"]))
-                _flash_vendors_cache[cache_key] = {"ts": _time.time(), "data": result}
-                return result
-        except Exception:
-            pass
+    if cached is not None:
+        return cached
+
 
     try:
         with get_db() as conn:
@@ -546,17 +485,7 @@ def get_flash_vendors(
             max_active_years=max_active_years,
             min_value=min_value,
         )
-        _flash_vendors_cache[cache_key] = {"ts": _time.time(), "data": result}
-        if is_fv_default:
-            try:
-                with get_db() as wconn:
-                    wconn.execute(
-                        "INSERT OR REPLACE INTO precomputed_stats(stat_key,stat_value,updated_at) VALUES(?,?,datetime('now'))",
-                        (_FV_DB_KEY, result.model_dump_json()),
-                    )
-                    wconn.commit()
-            except Exception as e:
-                logger.warning("flash_vendors persist failed: %s", e)
+        _flash_vendors_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
     except sqlite3.OperationalError as e:
@@ -584,10 +513,9 @@ def get_industry_risk_clusters(
     Sorted by avg_risk_score descending.
     """
     cache_key = f"{sector_id}:{min_contracts}"
-    with _industry_clusters_lock:
-        cached = _industry_clusters_cache.get(cache_key)
-        if cached and datetime.now() < cached["expires_at"]:
-            return cached["value"]
+    cached = _industry_clusters_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     try:
         with get_db() as conn:
@@ -717,11 +645,7 @@ def get_industry_risk_clusters(
                 min_contracts=min_contracts,
             )
 
-            with _industry_clusters_lock:
-                _industry_clusters_cache[cache_key] = {
-                    "value": result,
-                    "expires_at": datetime.now() + timedelta(seconds=_INDUSTRY_CLUSTERS_TTL),
-                }
+            _industry_clusters_cache.set(cache_key, result, ttl_seconds=None)
 
             return result
 
@@ -745,8 +669,8 @@ def get_seasonal_risk(
     """
     cache_key = "seasonal:{}:{}".format(month, sector_id)
     cached = _seasonal_risk_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _SEASONAL_RISK_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     month_str = "{:02d}".format(month)
     sector_filter = "AND c.sector_id = ?" if sector_id else ""
@@ -797,7 +721,7 @@ def get_seasonal_risk(
         items.sort(key=lambda x: x.risk_premium_pct, reverse=True)
 
         result = SeasonalRiskResponse(month=month, data=items)
-        _seasonal_risk_cache[cache_key] = {"ts": _time.time(), "data": result}
+        _seasonal_risk_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
     except sqlite3.OperationalError as e:
@@ -822,8 +746,8 @@ def get_monthly_risk_summary(
     """
     cache_key = "monthly_risk_summary:{}".format(sector_id)
     cached = _monthly_risk_summary_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _MONTHLY_RISK_SUMMARY_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     sector_filter = "AND sector_id = ?" if sector_id else ""
     params: List[Any] = []
@@ -890,7 +814,7 @@ def get_monthly_risk_summary(
             data=items,
             overall_avg_risk=round(overall_avg, 6),
         )
-        _monthly_risk_summary_cache[cache_key] = {"ts": _time.time(), "data": result}
+        _monthly_risk_summary_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
     except sqlite3.OperationalError as e:
@@ -916,8 +840,8 @@ def get_procedure_risk_comparison(
     """
     cache_key = "proc:{}:{}".format(sector_id, year)
     cached = _proc_risk_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _PROC_RISK_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     conditions = ["c.risk_score IS NOT NULL", "COALESCE(c.amount_mxn, 0) <= ?"]
     params = [100_000_000_000]
@@ -965,7 +889,7 @@ def get_procedure_risk_comparison(
             ))
 
         result = ProcedureRiskResponse(data=items, total=len(items))
-        _proc_risk_cache[cache_key] = {"ts": _time.time(), "data": result}
+        _proc_risk_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
     except sqlite3.OperationalError as e:
@@ -1000,8 +924,8 @@ def get_top_by_period(
 
     cache_key = f"top_period_{start_year}_{end_year}_{entity}_{by}_{limit}"
     cached = _top_period_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _TOP_PERIOD_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     order_col = "total_value_mxn" if by == "value" else "total_contracts"
 
@@ -1063,7 +987,7 @@ def get_top_by_period(
             "by": by,
             "data": data,
         }
-        _top_period_cache[cache_key] = {"ts": _time.time(), "data": result}
+        _top_period_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
     except sqlite3.OperationalError as e:
@@ -1086,8 +1010,8 @@ def get_sector_growth(year: int = Query(..., ge=2003, le=2025)):
     """
     cache_key = f"sector_growth_{year}"
     cached = _sector_growth_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _SECTOR_GROWTH_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     sql = """
         WITH current_year AS (
@@ -1162,7 +1086,7 @@ def get_sector_growth(year: int = Query(..., ge=2003, le=2025)):
             })
 
         result = {"year": year, "prior_year": year - 1, "data": data}
-        _sector_growth_cache[cache_key] = {"ts": _time.time(), "data": result}
+        _sector_growth_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
     except sqlite3.OperationalError as e:
@@ -1186,8 +1110,8 @@ def get_year_summary(year: int = Path(..., ge=2002, le=2026)):
     """
     cache_key = f"year_summary_{year}"
     cached = _year_summary_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _YEAR_SUMMARY_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     try:
         with get_db() as conn:
@@ -1327,7 +1251,7 @@ def get_year_summary(year: int = Path(..., ge=2002, le=2026)):
             "top_institutions": top_institutions,
             "risk_level_counts": risk_level_counts,
         }
-        _year_summary_cache[cache_key] = {"ts": _time.time(), "data": result}
+        _year_summary_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
     except sqlite3.OperationalError as e:
@@ -20,7 +20,8 @@ from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from pydantic import BaseModel
 
 from ..cache import app_cache
-from ..dependencies import get_db, get_db_dep, require_write_key
+from ..data_epoch import bump_review_epoch, refresh_data_epoch
+from ..dependencies import get_db_dep, get_db_writer, get_db_writer_dep, require_write_key
 
 logger = logging.getLogger(__name__)
 
@@ -360,7 +361,7 @@ class ReviewUpdate(BaseModel):
 def patch_aria_review(
     vendor_id: int,
     body: ReviewUpdate,
-    conn: sqlite3.Connection = Depends(get_db_dep),
+    conn: sqlite3.Connection = Depends(get_db_writer_dep),
     _: None = Depends(require_write_key),
 ):
     """Update the review status for a vendor in the ARIA queue."""
@@ -391,6 +392,7 @@ def patch_aria_review(
         (body.status, body.reviewer_name, body.notes, vendor_id),
     )
     conn.commit()
+    bump_review_epoch(conn, "aria_queue_review")
 
     row = conn.execute("SELECT * FROM aria_queue WHERE vendor_id = ?", (vendor_id,)).fetchone()
     d = _row_to_dict(row)
@@ -424,7 +426,7 @@ class PromoteGTRequest(BaseModel):
 def promote_to_ground_truth(
     vendor_id: int,
     body: PromoteGTRequest,
-    conn: sqlite3.Connection = Depends(get_db_dep),
+    conn: sqlite3.Connection = Depends(get_db_writer_dep),
     _: None = Depends(require_write_key),
 ):
     """Promote a confirmed ARIA lead to the ground truth corpus."""
@@ -475,6 +477,7 @@ def promote_to_ground_truth(
             (body.reviewer_name, vendor_id),
         )
     conn.commit()
+    bump_review_epoch(conn, "aria_promote_gt")
     app_cache.invalidate("aria", _STATS_CACHE_KEY)
 
     return {
@@ -694,7 +697,7 @@ def get_aria_stats(conn: sqlite3.Connection = Depends(get_db_dep)):
 
     # Persist to precomputed_stats so container restarts skip the live scan
     try:
-        with get_db() as wconn:
+        with get_db_writer() as wconn:
             wconn.execute(
                 "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at)"
                 " VALUES(?, ?, datetime('now'))",
@@ -796,7 +799,7 @@ class GTUpdateReview(BaseModel):
 def patch_gt_update_review(
     update_id: int,
     body: GTUpdateReview,
-    conn: sqlite3.Connection = Depends(get_db_dep),
+    conn: sqlite3.Connection = Depends(get_db_writer_dep),
     _: None = Depends(require_write_key),
 ):
     """Approve or reject an ARIA ground truth update proposal."""
@@ -826,6 +829,7 @@ def patch_gt_update_review(
         (body.status, body.reviewer_name, body.review_notes, update_id),
     )
     conn.commit()
+    bump_review_epoch(conn, "aria_gt_update_review")
 
     row = conn.execute("SELECT * FROM aria_gt_updates WHERE id = ?", (update_id,)).fetchone()
     d = _row_to_dict(row)
@@ -921,6 +925,7 @@ def _launch_full_pipeline(
             _run_status["phase"] = None
             _run_status["completed_at"] = datetime.now(timezone.utc).isoformat()
         app_cache.invalidate("aria", _STATS_CACHE_KEY)  # invalidate after run
+        refresh_data_epoch()  # pipeline bumped the epoch; retire cached results now
 
 
 @router.post("/run", status_code=202)
@@ -14,14 +14,14 @@ Lens mapping:
 import json
 import logging
 import sqlite3
-import time
-import threading
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Query, Response
 from pydantic import BaseModel, Field
 
+from ..cache import SimpleCache, app_cache
 from ..dependencies import get_db_dep
+from ..materialized import materialized
 
 logger = logging.getLogger(__name__)
 
@@ -62,58 +62,69 @@ _SECTOR_LABEL_FALLBACK: dict[str, tuple[str, str]] = {
 
 
 # ---------------------------------------------------------------------------
-# In-process cache for the batch endpoint
+# Shared cache for the batch endpoint
 # ---------------------------------------------------------------------------
 #
 # Galaxy data only changes when the ARIA pipeline re-runs (typically once
 # per retrain or once per CENTINELA refresh). We measured 4.1s cold and 4.1s
 # warm for the same (lens, codes, limit) tuple over the public edge — most
 # of which is per-request SQLite connection setup with cache_size/mmap_size
-# PRAGMAs against a 5GB DB. An in-process TTL cache collapses every repeat
-# call into a dict lookup and lets `Cache-Control: public, max-age=300` on
-# the response take over the rest.
+# PRAGMAs against a 5GB DB. The cache collapses every repeat call into a
+# lookup and lets `Cache-Control: public, max-age=300` on the response take
+# over the rest.
 #
-# Cache key is a frozen tuple of (lens, normalized-codes, limit). Codes are
-# sorted to make the key insensitive to order — a request for `P1,P2,P3` and
-# `P3,P2,P1` hit the same entry. Frontend already sorts its codes for the
-# react-query key.
+# Entries live in the shared app_cache, so one cold computation serves every
+# gunicorn worker (and survives a restart) instead of each worker paying the
+# cold path once.
 #
-# TTL = 600s. ARIA pipeline runs are explicit, manual events; a 10-minute
-# staleness window is well inside the rate of legitimate data movement.
-
-_BATCH_CACHE_TTL_S = 600.0
-_batch_cache: dict[tuple, tuple[float, "ClusterVendorsBatchResponse"]] = {}
-_batch_cache_lock = threading.Lock()
-
-
-def _batch_cache_key(lens: str, codes: list[str], limit: int) -> tuple:
-    return (lens, tuple(sorted(codes)), limit)
-
-
-def _batch_cache_get(key: tuple) -> Optional["ClusterVendorsBatchResponse"]:
-    with _batch_cache_lock:
-        entry = _batch_cache.get(key)
-        if entry is None:
-            return None
-        expires_at, payload = entry
-        if time.monotonic() > expires_at:
-            _batch_cache.pop(key, None)
-            return None
-        return payload
-
-
-def _batch_cache_put(key: tuple, payload: "ClusterVendorsBatchResponse") -> None:
-    with _batch_cache_lock:
-        _batch_cache[key] = (time.monotonic() + _BATCH_CACHE_TTL_S, payload)
-        # Bound the cache so a long-running process can't grow it forever.
-        # 256 entries is enough for every (lens × code-set × limit) combo the
-        # Observatory typically requests (4 lenses × ~16 reasonable code-sets
-        # × ~4 limits = 256). On overflow, drop the oldest entry by recreating
-        # the dict from the most recent insertions.
-        if len(_batch_cache) > 256:
-            keep = list(_batch_cache.items())[-128:]
-            _batch_cache.clear()
-            _batch_cache.update(keep)
+# Cache key is (lens, normalized-codes, limit). Codes are sorted to make the
+# key insensitive to order — a request for `P1,P2,P3` and `P3,P2,P1` hit the
+# same entry. Frontend already sorts its codes for the react-query key.
+#
+# No TTL: galaxy data only moves when the ARIA pipeline re-runs, and
+# aria_pipeline.py bumps the data epoch when it commits, which retires every
+# entry at once (api/data_epoch.py).
+
+_BATCH_CACHE = "atlas_batch"
+_BATCH_CACHE_TTL_S = None
+# 256 entries is enough for every (lens × code-set × limit) combo the
+# Observatory typically requests (4 lenses × ~16 code-sets × ~4 limits).
+_BATCH_CACHE_MAXSIZE = 256
+
+
+def _batch_cache_key(lens: str, codes: list[str], limit: int) -> str:
+    return f"{lens}:{','.join(sorted(codes))}:{limit}"
+
+
+# Materialized payloads (api/materialized.py): the two full-galaxy batches the
+# Observatory loads on open, and the most-clicked single-cluster zooms that
+# feed the AtlasVendorDrawer (P5/P6/P2 patterns; salud/energia/infraestructura
+# sectors).
+_MATERIALIZED_BATCHES = [
+    {"lens": "patterns", "codes": "P1,P2,P3,P4,P5,P6,P7", "limit": 10},
+    {
+        "lens": "sectors",
+        "codes": "salud,educacion,infraestructura,energia,defensa,tecnologia,"
+                 "hacienda,gobernacion,agricultura,ambiente,trabajo,otros",
+        "limit": 10,
+    },
+]
+_MATERIALIZED_CLUSTERS = [
+    *({"lens": "patterns", "code": p, "limit": 200} for p in ["P5", "P6", "P2", "P1", "P3"]),
+    *({"lens": "sectors", "code": s, "limit": 200}
+      for s in ["salud", "energia", "infraestructura", "educacion", "tecnologia"]),
+]
+
+
+def _batch_cache_get(key: str) -> Optional["ClusterVendorsBatchResponse"]:
+    return app_cache.get(_BATCH_CACHE, key)
+
+
+def _batch_cache_put(key: str, payload: "ClusterVendorsBatchResponse") -> None:
+    app_cache.set(
+        _BATCH_CACHE, key, payload,
+        maxsize=_BATCH_CACHE_MAXSIZE, ttl=_BATCH_CACHE_TTL_S,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -191,9 +202,7 @@ class ClusterStatsResponse(BaseModel):
 # Cluster aggregates (faithful-encoding Observatory scatter)
 # ---------------------------------------------------------------------------
 
-_STATS_CACHE_TTL_S = 600.0
-_stats_cache: dict[str, tuple[float, "ClusterStatsResponse"]] = {}
-_stats_cache_lock = threading.Lock()
+_stats_cache = SimpleCache(namespace="atlas_cluster_stats", maxsize=4)
 
 
 @router.get("/cluster-stats", response_model=ClusterStatsResponse)
@@ -213,12 +222,10 @@ def get_cluster_stats(
     if lens not in ("patterns", "sectors"):
         return ClusterStatsResponse(lens=lens, clusters=[])
 
-    now = time.time()
-    with _stats_cache_lock:
-        hit = _stats_cache.get(lens)
-        if hit and now - hit[0] < _STATS_CACHE_TTL_S:
-            response.headers["Cache-Control"] = "public, max-age=300"
-            return hit[1]
+    hit = _stats_cache.get(lens)
+    if hit is not None:
+        response.headers["Cache-Control"] = "public, max-age=300"
+        return hit
 
     items: list[ClusterStatItem] = []
     if lens == "patterns":
@@ -265,8 +272,7 @@ def get_cluster_stats(
             ))
 
     payload = ClusterStatsResponse(lens=lens, clusters=items)
-    with _stats_cache_lock:
-        _stats_cache[lens] = (now, payload)
+    _stats_cache.set(lens, payload, ttl_seconds=None)
     response.headers["Cache-Control"] = "public, max-age=300"
     return payload
 
@@ -292,6 +298,7 @@ def _risk_level(score: Optional[float]) -> Optional[str]:
 # ---------------------------------------------------------------------------
 
 @router.get("/cluster-vendors", response_model=ClusterVendorsResponse)
+@materialized("atlas_cluster_vendors", grid=_MATERIALIZED_CLUSTERS)
 def get_cluster_vendors(
     lens: str = Query(..., description="Lens type: patterns, sectors, categories, terms"),
     code: str = Query(..., description="Cluster code, e.g. P5, salud, cat_medications"),
@@ -329,6 +336,7 @@ def get_cluster_vendors(
 
 
 @router.get("/cluster-vendors-batch", response_model=ClusterVendorsBatchResponse)
+@materialized("atlas_cluster_vendors_batch", grid=_MATERIALIZED_BATCHES)
 def get_cluster_vendors_batch(
     response: Response,
     lens: str = Query(..., description="Lens type: patterns, sectors, categories, terms"),
@@ -347,7 +355,7 @@ def get_cluster_vendors_batch(
     in a `{ lens, clusters: [...] }` envelope.
 
     Caching (2026-05-22):
-      • In-process TTL cache (600s) keyed on (lens, sorted-codes, limit).
+      • Shared cache keyed on (data epoch, lens, sorted-codes, limit).
         Galaxy data only changes when the ARIA pipeline re-runs; the cold
         path used to be 4.1s end-to-end and warm was *also* 4.1s because
         every request opened a fresh SQLite connection. The cache makes
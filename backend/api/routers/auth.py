@@ -17,7 +17,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, EmailStr, Field
 from jose import jwt
 
-from ..dependencies import get_db
+from ..dependencies import get_db_writer
 from ..middleware.auth_jwt import JWT_SECRET, JWT_ALGORITHM, get_current_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -85,7 +85,7 @@ def _user_to_out(row: sqlite3.Row) -> UserOut:
 @router.post("/register", response_model=AuthResponse, status_code=201)
 def register(body: RegisterIn):
     """Create a new user account and return a JWT."""
-    with get_db() as conn:
+    with get_db_writer() as conn:
         existing = conn.execute(
             "SELECT id FROM users WHERE email = ?", (body.email,)
         ).fetchone()
@@ -112,7 +112,7 @@ def register(body: RegisterIn):
 @router.post("/login", response_model=AuthResponse)
 def login(body: LoginIn):
     """Authenticate and return a JWT."""
-    with get_db() as conn:
+    with get_db_writer() as conn:
         row = conn.execute(
             "SELECT id, email, name, password_hash, created_at FROM users WHERE email = ? AND is_active = 1",
             (body.email,),
@@ -132,7 +132,7 @@ def login(body: LoginIn):
 def me(current_user: dict = Depends(get_current_user)):
     """Return the authenticated user's profile."""
     user_id = int(current_user["sub"])
-    with get_db() as conn:
+    with get_db_writer() as conn:
         row = conn.execute(
             "SELECT id, email, name, created_at FROM users WHERE id = ? AND is_active = 1",
             (user_id,),
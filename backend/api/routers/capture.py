@@ -21,7 +21,7 @@ from typing import Optional
 from fastapi import APIRouter, Depends, Query
 
 from ..cache import app_cache
-from ..dependencies import get_db, get_db_dep
+from ..dependencies import get_db_dep, get_db_writer
 
 logger = logging.getLogger(__name__)
 
@@ -541,7 +541,7 @@ def get_capture_landscape(conn: sqlite3.Connection = Depends(get_db_dep)):
     response = _build_landscape(conn)
     app_cache.set("capture", "landscape:v1", response, maxsize=4, ttl=3600)
     try:
-        with get_db() as wconn:
+        with get_db_writer() as wconn:
             wconn.execute(
                 "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at) "
                 "VALUES(?, ?, datetime('now'))",
@@ -10,34 +10,26 @@ Endpoints:
 from __future__ import annotations
 
 import json
-import threading
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, List, Optional
 
 from fastapi import APIRouter, HTTPException, Query
 
+from ..cache import SimpleCache
 from ..dependencies import get_db
 from ..models.scandal import ScandalDetail, ScandalListItem, ScandalStats
 
 router = APIRouter(prefix="/cases", tags=["cases"])
 
-# Simple in-memory cache (cases table is small, rarely changes)
-_cache: Dict[str, Dict[str, Any]] = {}
-_cache_lock = threading.Lock()
-_CACHE_TTL = 3600  # 1 hour
+# Cases table is small and only changes with the data epoch
+_cache = SimpleCache(namespace="cases")
 
 
 def _get(key: str) -> Any:
-    with _cache_lock:
-        entry = _cache.get(key)
-        if entry and datetime.now() < entry["expires"]:
-            return entry["value"]
-        return None
+    return _cache.get(key)
 
 
 def _set(key: str, value: Any) -> None:
-    with _cache_lock:
-        _cache[key] = {"value": value, "expires": datetime.now() + timedelta(seconds=_CACHE_TTL)}
+    _cache.set(key, value, ttl_seconds=None)
 
 
 def _row_to_list_item(row, linked_vendor_ids: Optional[List[int]] = None) -> dict:
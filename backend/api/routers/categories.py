@@ -6,23 +6,30 @@ based on the Mexican government's partida-especifica classification.
 """
 import json
 import logging
-import time as _time
-from typing import Any, Dict, Optional
+from typing import Optional
 
 from fastapi import APIRouter, Query, HTTPException
 
+from ..cache import SimpleCache
 from ..dependencies import get_db
+from ..materialized import grid, materialized
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
-# 1h cache for /{id}/top-vendors. The biggest categories (Medicamentos,
+# Cache for /{id}/top-vendors. The biggest categories (Medicamentos,
 # Alimentos y Viveres, Mantenimiento General) take 25-30+ seconds to
 # aggregate uncached — well past the 30s axios timeout. Vendor shares per
-# category only change with new ETL, so stale-but-fast is the right tradeoff.
-_top_vendors_cache: Dict[str, Any] = {}
-_TOP_VENDORS_TTL = 3600
+# category only change with new ETL, so entries live until the data epoch changes.
+_top_vendors_cache = SimpleCache(namespace="categories_top_vendors")
+
+# Categories the /sectors?view=categories capture-dumbbell requests (taken from
+# production network logs); their top-2 vendor lists are materialized.
+_MATERIALIZED_CATEGORY_IDS = [
+    5, 8, 20, 21, 22, 24, 26, 27, 28, 30, 47, 55, 57, 60, 63, 71,
+    73, 77, 86, 88, 90, 91,
+]
 
 
 def _table_exists(conn, table_name: str) -> bool:
@@ -942,6 +949,7 @@ def get_category_price_distribution(category_id: int):
 
 
 @router.get("/{category_id}/top-vendors")
+@materialized("category_top_vendors", grid=grid(category_id=_MATERIALIZED_CATEGORY_IDS, limit=[2]))
 def get_category_top_vendors(
     category_id: int,
     limit: int = Query(15, ge=1, le=30),
@@ -957,8 +965,8 @@ def get_category_top_vendors(
     """
     cache_key = f"tv:{category_id}:{limit}:{scope}"
     cached = _top_vendors_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _TOP_VENDORS_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
     with get_db() as conn:
         cur = conn.cursor()
         cur.execute("SELECT id, name_es FROM categories WHERE id = ?", (category_id,))
@@ -1046,7 +1054,7 @@ def get_category_top_vendors(
         "top3_share_pct": round(top3_share, 1),
         "data": vendors,
     }
-    _top_vendors_cache[cache_key] = {"ts": _time.time(), "data": result}
+    _top_vendors_cache.set(cache_key, result, ttl_seconds=None)
     return result
 
 
@@ -13,6 +13,7 @@ from fastapi import APIRouter, Query, HTTPException, Path
 from pydantic import BaseModel
 
 from ..dependencies import get_db
+from ..materialized import materialized
 from ..config.constants import MAX_CONTRACT_VALUE
 from ..models.contract import (
     ContractListItem,
@@ -23,6 +24,7 @@ from ..models.contract import (
     PaginationMeta,
 )
 from ..services.contract_service import contract_service
+from ..services.pagination import InvalidCursorError
 
 
 class ContractCompareResponse(BaseModel):
@@ -116,6 +118,8 @@ def list_contracts(
     # Pagination
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(50, ge=1, le=100, description="Items per page (max 100)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset pagination; overrides page)"),
+    count: str = Query("estimate", pattern="^(exact|cached|estimate)$", description="How the total is computed: exact, cached (by filters and data version) or estimate (pre-aggregates where possible)"),
     # Filters
     sector_id: Optional[int] = Query(None, ge=1, le=12, description="Filter by sector ID (1-12)"),
     year: Optional[int] = Query(None, ge=2002, le=2026, description="Filter by contract year"),
@@ -158,25 +162,30 @@ def list_contracts(
             )
 
     with get_db() as conn:
-        result = contract_service.list_contracts(
-            conn,
-            page=page,
-            per_page=per_page,
-            sector_id=sector_id,
-            year=year,
-            vendor_id=vendor_id,
-            institution_id=institution_id,
-            risk_level=risk_level,
-            is_direct_award=is_direct_award,
-            is_single_bid=is_single_bid,
-            risk_factor=risk_factor,
-            category_id=category_id,
-            min_amount=min_amount,
-            max_amount=max_amount,
-            search=search,
-            sort_by=sort_by,
-            sort_order=sort_order,
-        )
+        try:
+            result = contract_service.list_contracts(
+                conn,
+                cursor=cursor,
+                count_mode=count,
+                page=page,
+                per_page=per_page,
+                sector_id=sector_id,
+                year=year,
+                vendor_id=vendor_id,
+                institution_id=institution_id,
+                risk_level=risk_level,
+                is_direct_award=is_direct_award,
+                is_single_bid=is_single_bid,
+                risk_factor=risk_factor,
+                category_id=category_id,
+                min_amount=min_amount,
+                max_amount=max_amount,
+                search=search,
+                sort_by=sort_by,
+                sort_order=sort_order,
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         return ContractListResponse(
             data=[ContractListItem(**item) for item in result.data],
@@ -237,6 +246,7 @@ def contract_highlights(
 
 
 @router.get("/statistics", response_model=ContractStatistics)
+@materialized("contract_statistics")
 def get_contract_statistics(
     sector_id: Optional[int] = Query(None, ge=1, le=12, description="Filter by sector ID (1-12)"),
     year: Optional[int] = Query(None, ge=2002, le=2026, description="Filter by year"),
@@ -792,11 +802,14 @@ def get_contracts_by_vendor(
     vendor_id: int = Path(..., description="Vendor ID"),
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
 ):
     """Get all contracts for a specific vendor."""
     return list_contracts(
         page=page,
         per_page=per_page,
+        cursor=cursor,
+        count="estimate",
         vendor_id=vendor_id,
         sector_id=None,
         year=None,
@@ -819,11 +832,14 @@ def get_contracts_by_institution(
     institution_id: int = Path(..., description="Institution ID"),
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
 ):
     """Get all contracts for a specific institution."""
     return list_contracts(
         page=page,
         per_page=per_page,
+        cursor=cursor,
+        count="estimate",
         institution_id=institution_id,
         sector_id=None,
         year=None,
@@ -7,7 +7,7 @@ using precomputed tables for speed. Cached 10 minutes.
 
 import json
 import logging
-import threading
+import sqlite3
 import time
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
@@ -16,47 +16,46 @@ from typing import Any, Dict, Optional
 from fastapi import APIRouter, HTTPException, Response as FastAPIResponse
 from pydantic import BaseModel
 
-from ..dependencies import get_db
+from ..deadlines import deadline
+from ..dependencies import get_db, get_db_writer
+from ..materialized import materialized
+from ..single_flight import SingleFlightTimeout, flights
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/executive", tags=["executive"])
 
-# In-memory cache (thread-safe)
-_cache: dict = {"data": None, "expires": 0}
-_cache_lock = threading.Lock()
-_compute_lock = threading.Lock()  # Prevents cache stampede on cold start
+# Shared cache; cold builds are coalesced across workers (api/single_flight.py)
+_SUMMARY_CACHE = "executive_summary"
 CACHE_TTL = 600  # 10 minutes
+# Past CACHE_TTL the previous summary is served while one background refresh
+# rebuilds it (~90s cold), so no request blocks on the scheduled recompute.
+CACHE_STALE_TTL = 86400
 
 
 @router.get("/summary")
+@materialized("executive_summary")
 def get_executive_summary():
     """Return consolidated executive summary data.
 
     Uses precomputed_stats table for fast reads, with supplementary queries
     for administration breakdown and top vendors/institutions.
-    Cached for 10 minutes.
+    Fresh for 10 minutes, then served stale while it refreshes in the background.
     """
-    now = time.time()
-    if _cache["data"] and now < _cache["expires"]:
-        return _cache["data"]
-
-    # Prevent cache stampede: only one thread computes, others wait for result
-    with _compute_lock:
-        # Double-check after acquiring lock (another thread may have computed it)
-        now = time.time()
-        if _cache["data"] and now < _cache["expires"]:
-            return _cache["data"]
-        try:
-            with get_db() as conn:
-                result = _build_summary(conn)
-            with _cache_lock:
-                _cache["data"] = result
-                _cache["expires"] = time.time() + CACHE_TTL
-            return result
-        except Exception as e:
-            logger.error(f"Executive summary error: {e}")
-            raise HTTPException(status_code=500, detail="Failed to generate executive summary")
+    def _compute():
+        with get_db() as conn:
+            return _build_summary(conn)
+
+    try:
+        return flights.do(
+            _SUMMARY_CACHE, "summary", _compute,
+            maxsize=1, ttl=CACHE_TTL, stale_ttl=CACHE_STALE_TTL,
+        )
+    except SingleFlightTimeout:
+        raise
+    except Exception as e:
+        logger.error(f"Executive summary error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate executive summary")
 
 
 def _query_top_vendors(cur) -> list[dict]:
@@ -112,7 +111,7 @@ def _build_summary(conn) -> dict:
 
     # 1. Load precomputed stats (4 JSON blobs — fast)
     precomputed = {}
-    cur.execute("SELECT stat_key, stat_value FROM precomputed_stats")
+    cur.execute("SELECT stat_key, stat_value FROM precomputed_stats WHERE stat_key NOT LIKE 'mv:%'")
     for row in cur.fetchall():
         val = row["stat_value"]
         precomputed[row["stat_key"]] = json.loads(val) if isinstance(val, str) else val
@@ -475,8 +474,7 @@ def _build_summary(conn) -> dict:
 
 
 # Cache for capture leaders (longer TTL — data rarely changes)
-_capture_cache: dict = {"data": None, "expires": 0}
-_capture_lock = threading.Lock()  # Prevents per-worker stampede
+_CAPTURE_CACHE = "executive_capture"
 _CAPTURE_TTL = 3600  # 1 hour
 
 
@@ -496,12 +494,13 @@ def _get_capture_from_db() -> dict | None:
     """Read cached capture-leaders from DB (shared across all workers). Returns None if stale/missing."""
     try:
         with get_db() as conn:
-            _ensure_capture_table(conn)
             row = conn.execute(
                 "SELECT data_json, computed_at FROM precomputed_capture_leaders ORDER BY id DESC LIMIT 1"
             ).fetchone()
         if row and (time.time() - row["computed_at"]) < _CAPTURE_TTL:
             return json.loads(row["data_json"])
+    except sqlite3.OperationalError:
+        pass  # Table not created yet — first _write_capture_to_db creates it
     except Exception as e:
         logger.warning(f"DB capture cache read failed: {e}")
     return None
@@ -510,7 +509,7 @@ def _get_capture_from_db() -> dict | None:
 def _write_capture_to_db(data: dict) -> None:
     """Persist capture-leaders result to DB so all workers share it."""
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             _ensure_capture_table(conn)
             conn.execute("DELETE FROM precomputed_capture_leaders")
             conn.execute(
@@ -544,105 +543,99 @@ def _short_label(name: str) -> str:
 
 
 @router.get("/capture-leaders")
+@materialized("executive_capture_leaders")
 def get_capture_leaders():
     """Return top 5 institutional-capture leaders from capture_results with peer shares.
 
     Each row: institution label, top-vendor peak share %, second-vendor share %, capture gap.
     Used by Executive Summary Finding 04 (P6 Cleveland pair chart).
-    Cached 1 hour (in-process per-worker + DB-backed shared across all workers).
+    Cached 1 hour in the shared cache, with precomputed_capture_leaders as a
+    DB-backed fallback; concurrent cold requests share one computation.
     """
-    now = time.time()
-    # Layer 1: in-process cache (fastest — same worker, no I/O)
-    if _capture_cache["data"] and now < _capture_cache["expires"]:
-        return _capture_cache["data"]
-
-    # Layer 2: DB-backed cache (shared across workers — survives restarts)
-    with _capture_lock:
-        # Re-check in-process after acquiring lock (another thread may have just populated it)
-        if _capture_cache["data"] and time.time() < _capture_cache["expires"]:
-            return _capture_cache["data"]
-
-        db_cached = _get_capture_from_db()
-        if db_cached is not None:
-            _capture_cache["data"] = db_cached
-            _capture_cache["expires"] = time.time() + _CAPTURE_TTL
-            return db_cached
-
-        # Layer 3: expensive computation — runs at most once per TTL across all workers
-        try:
-            with get_db() as conn:
-                cur = conn.cursor()
-                cur.execute("""
-                    WITH capture_top5 AS (
-                        SELECT institution_id, vendor_id AS cap_vendor_id,
-                               institution_name, vendor_name AS cap_vendor_name,
-                               peak_year, peak_share_pct, score
-                        FROM capture_results
-                        ORDER BY score DESC LIMIT 5
-                    ),
-                    inst_peak_totals AS (
-                        SELECT c.institution_id,
-                               c.contract_year AS yr,
-                               SUM(c.amount_mxn) AS total
-                        FROM contracts c
-                        JOIN capture_top5 ct
-                             ON c.institution_id = ct.institution_id
-                            AND c.contract_year = ct.peak_year
-                        WHERE c.amount_mxn > 0
-                        GROUP BY c.institution_id, yr
-                    ),
-                    inst_vendor_shares AS (
-                        SELECT c.institution_id, c.vendor_id, v.name AS vendor_name,
-                               ROUND(SUM(c.amount_mxn) * 100.0 / ipt.total, 1) AS share_pct,
-                               ROW_NUMBER() OVER (
-                                   PARTITION BY c.institution_id
-                                   ORDER BY SUM(c.amount_mxn) DESC
-                               ) AS rn
-                        FROM contracts c
-                        JOIN vendors v ON c.vendor_id = v.id
-                        JOIN capture_top5 ct
-                             ON c.institution_id = ct.institution_id
-                            AND c.contract_year = ct.peak_year
-                        JOIN inst_peak_totals ipt ON c.institution_id = ipt.institution_id
-                        WHERE c.amount_mxn > 0
-                        GROUP BY c.institution_id, c.vendor_id, v.name, ipt.total
-                    )
-                    SELECT ct.institution_name,
-                           MAX(CASE WHEN ivs.rn = 1 THEN ivs.share_pct END) AS top_pct,
-                           MAX(CASE WHEN ivs.rn = 2 THEN ivs.share_pct END) AS second_pct,
-                           ct.peak_year,
-                           ct.score
-                    FROM capture_top5 ct
-                    JOIN inst_vendor_shares ivs
-                         ON ct.institution_id = ivs.institution_id AND ivs.rn <= 2
-                    GROUP BY ct.institution_id, ct.institution_name, ct.peak_year, ct.score
-                    ORDER BY ct.score DESC
-                """)
-                rows = cur.fetchall()
-
-            leaders = []
-            for row in rows:
-                top = round(row["top_pct"] or 0, 1)
-                second = round(row["second_pct"] or 0, 1)
-                leaders.append({
-                    "label": _short_label(row["institution_name"]),
-                    "institution_name": row["institution_name"],
-                    "top": top,
-                    "second": second,
-                    "gap": round(top - second, 1),
-                    "peak_year": row["peak_year"],
-                    "captured": (top - second) >= 40,
-                })
-
-            result = {"leaders": leaders}
-            _capture_cache["data"] = result
-            _capture_cache["expires"] = time.time() + _CAPTURE_TTL
-            _write_capture_to_db(result)  # persist for other workers
-            return result
-
-        except Exception as e:
-            logger.error(f"Capture leaders error: {e}")
-            raise HTTPException(status_code=500, detail="Failed to fetch capture leaders")
+    return flights.do(
+        _CAPTURE_CACHE, "leaders", _compute_capture_leaders, maxsize=1, ttl=_CAPTURE_TTL,
+    )
+
+
+def _compute_capture_leaders() -> dict:
+    """Cold path for /capture-leaders: DB-backed copy first, then the live query."""
+    db_cached = _get_capture_from_db()
+    if db_cached is not None:
+        return db_cached
+
+    # Expensive computation — runs at most once per TTL across all workers
+    try:
+        with get_db() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                WITH capture_top5 AS (
+                    SELECT institution_id, vendor_id AS cap_vendor_id,
+                           institution_name, vendor_name AS cap_vendor_name,
+                           peak_year, peak_share_pct, score
+                    FROM capture_results
+                    ORDER BY score DESC LIMIT 5
+                ),
+                inst_peak_totals AS (
+                    SELECT c.institution_id,
+                           c.contract_year AS yr,
+                           SUM(c.amount_mxn) AS total
+                    FROM contracts c
+                    JOIN capture_top5 ct
+                         ON c.institution_id = ct.institution_id
+                        AND c.contract_year = ct.peak_year
+                    WHERE c.amount_mxn > 0
+                    GROUP BY c.institution_id, yr
+                ),
+                inst_vendor_shares AS (
+                    SELECT c.institution_id, c.vendor_id, v.name AS vendor_name,
+                           ROUND(SUM(c.amount_mxn) * 100.0 / ipt.total, 1) AS share_pct,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY c.institution_id
+                               ORDER BY SUM(c.amount_mxn) DESC
+                           ) AS rn
+                    FROM contracts c
+                    JOIN vendors v ON c.vendor_id = v.id
+                    JOIN capture_top5 ct
+                         ON c.institution_id = ct.institution_id
+                        AND c.contract_year = ct.peak_year
+                    JOIN inst_peak_totals ipt ON c.institution_id = ipt.institution_id
+                    WHERE c.amount_mxn > 0
+                    GROUP BY c.institution_id, c.vendor_id, v.name, ipt.total
+                )
+                SELECT ct.institution_name,
+                       MAX(CASE WHEN ivs.rn = 1 THEN ivs.share_pct END) AS top_pct,
+                       MAX(CASE WHEN ivs.rn = 2 THEN ivs.share_pct END) AS second_pct,
+                       ct.peak_year,
+                       ct.score
+                FROM capture_top5 ct
+                JOIN inst_vendor_shares ivs
+                     ON ct.institution_id = ivs.institution_id AND ivs.rn <= 2
+                GROUP BY ct.institution_id, ct.institution_name, ct.peak_year, ct.score
+                ORDER BY ct.score DESC
+            """)
+            rows = cur.fetchall()
+
+        leaders = []
+        for row in rows:
+            top = round(row["top_pct"] or 0, 1)
+            second = round(row["second_pct"] or 0, 1)
+            leaders.append({
+                "label": _short_label(row["institution_name"]),
+                "institution_name": row["institution_name"],
+                "top": top,
+                "second": second,
+                "gap": round(top - second, 1),
+                "peak_year": row["peak_year"],
+                "captured": (top - second) >= 40,
+            })
+
+        result = {"leaders": leaders}
+        _write_capture_to_db(result)  # persist for other workers
+        return result
+
+    except Exception as e:
+        logger.error(f"Capture leaders error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch capture leaders")
 
 
 # ---------------------------------------------------------------------------
@@ -650,10 +643,9 @@ def get_capture_leaders():
 # concurrently so the frontend makes one round-trip instead of six.
 # ---------------------------------------------------------------------------
 
-# Separate cache dict so it doesn't interfere with the individual handler caches.
-_bundle_cache: dict = {"data": None, "expires": 0}
-_bundle_cache_lock = threading.Lock()
-_bundle_compute_lock = threading.Lock()
+# Separate shared-cache namespace so it doesn't interfere with the individual
+# handler caches. Shared across workers: one cold build serves them all.
+_BUNDLE_CACHE = "executive_bundle"
 _BUNDLE_TTL = 120  # 2 minutes — shorter than individual handlers (600s / 3600s)
 
 
@@ -764,31 +756,44 @@ _BUNDLE_FETCHERS: dict = {
 _BLOCK_TIMEOUT = 22  # seconds — shared deadline for all blocks (they run concurrently); stays under the ~30s gateway timeout while giving cold queries room to finish
 
 
+def _run_block(key: str, fn, expires_at: float) -> dict:
+    """Run one fetcher under the bundle's shared statement deadline."""
+    with deadline(expires_at - time.monotonic(), label=f"dashboard-bundle:{key}"):
+        return fn()
+
+
 def _build_bundle() -> dict:
     """Run all 6 fetchers concurrently and return the assembled bundle dict.
 
     Each fetcher runs in its own thread (submitted up-front, so they all run in
-    parallel).  We then wait for each future up to a SHARED deadline
-    (_BLOCK_TIMEOUT total — the futures run concurrently, so this caps the whole
-    call, not each block).  A block that misses the deadline or raises comes
-    back null — a timeout is NEVER allowed to propagate, so the endpoint cannot
-    500.  Stragglers are NOT waited on (shutdown(wait=False)); they finish in
-    the background and warm their own handler caches for the next request.
+    parallel) under a SHARED statement deadline (_BLOCK_TIMEOUT total — the
+    futures run concurrently, so this caps the whole call, not each block).
+    When it passes, a block's running SQLite statement is interrupted
+    (api/deadlines.py) and the block comes back null — a timeout is NEVER
+    allowed to propagate, so the endpoint cannot 500. Blocks backed by a
+    coalesced, cached computation (executive summary, capture leaders) are not
+    interrupted: they finish in the background and warm the cache for the next
+    request, so the pool is not waited on (shutdown(wait=False)).
     """
     results: dict = {}
     executor = ThreadPoolExecutor(max_workers=6)
     try:
-        future_to_key = {executor.submit(fn): key for key, fn in _BUNDLE_FETCHERS.items()}
-        deadline = time.time() + _BLOCK_TIMEOUT
+        expires_at = time.monotonic() + _BLOCK_TIMEOUT
+        future_to_key = {
+            executor.submit(_run_block, key, fn, expires_at): key
+            for key, fn in _BUNDLE_FETCHERS.items()
+        }
         for future, key in future_to_key.items():
-            remaining = max(0.1, deadline - time.time())
+            # Small grace so an interrupted block reports DeadlineExceeded
+            # rather than racing the wait.
+            remaining = max(0.1, expires_at - time.monotonic()) + 0.5
             try:
                 results[key] = future.result(timeout=remaining)
-            except Exception as exc:  # TimeoutError (too slow) or any failure
+            except Exception as exc:  # DeadlineExceeded, TimeoutError or any failure
                 logger.warning("dashboard-bundle: block '%s' unavailable: %s", key, exc)
                 results[key] = None
     finally:
-        # Never block the response on a stuck/slow block.
+        # Never block the response on a block still finishing a shared computation.
         executor.shutdown(wait=False)
 
     for key in _BUNDLE_FETCHERS:
@@ -803,31 +808,17 @@ def get_dashboard_bundle():
     The 6 blocks are fetched concurrently so total latency equals the slowest
     individual block (not their sum).  Each block uses the same caching path
     as its standalone endpoint; the bundle adds a 120-second in-process cache
-    on top so repeated cold-cache hits still converge quickly.
+    on top (shared across workers) so repeated cold-cache hits still converge
+    quickly.
 
     Any block that raises an exception is set to null rather than failing the
     whole response — the frontend falls back per-section.
     """
-    now = time.time()
-    # Fast path: in-process cache hit
-    if _bundle_cache["data"] and now < _bundle_cache["expires"]:
-        return _bundle_cache["data"]
-
-    # Prevent stampede on concurrent requests to a cold cache
-    with _bundle_compute_lock:
-        # Double-check after acquiring lock
-        now = time.time()
-        if _bundle_cache["data"] and now < _bundle_cache["expires"]:
-            return _bundle_cache["data"]
-
-        bundle = _build_bundle()
-
-        # Only cache a COMPLETE bundle. If a block timed out (null) we want the
-        # next request to retry it — the handler caches will have warmed by then
-        # — rather than serving the gap for the whole TTL.
-        if all(v is not None for v in bundle.values()):
-            with _bundle_cache_lock:
-                _bundle_cache["data"] = bundle
-                _bundle_cache["expires"] = time.time() + _BUNDLE_TTL
-
-        return bundle
+    # Only cache a COMPLETE bundle. If a block timed out (null) we want the
+    # next request to retry it — the handler caches will have warmed by then
+    # — rather than serving the gap for the whole TTL. Concurrent callers
+    # still share this one (possibly partial) build.
+    return flights.do(
+        _BUNDLE_CACHE, "bundle", _build_bundle, maxsize=1, ttl=_BUNDLE_TTL,
+        cache_if=lambda bundle: all(v is not None for v in bundle.values()),
+    )
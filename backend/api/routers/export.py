@@ -1,20 +1,27 @@
 """
 Export API endpoints.
 
-Provides data export functionality for contracts and vendors in CSV and Excel formats.
+Provides data export functionality for contracts and vendors in CSV and Excel
+formats, plus a columnar bulk export of contracts as Arrow IPC or Parquet.
+Rows are read with ``fetchmany`` and streamed as they are encoded, so worker
+memory stays flat regardless of ``limit``.
 """
 import csv
+import importlib.util
 import io
 import sqlite3
 import logging
-from copy import copy
-from typing import Optional
+import tempfile
+from contextlib import ExitStack
+from typing import Callable, Iterable, Iterator, Optional
 from datetime import datetime
 from fastapi import APIRouter, Query, HTTPException, Request
 from fastapi.responses import StreamingResponse
 
 from ..dependencies import get_db
 from ..config.constants import MAX_CONTRACT_VALUE
+from ..services.contract_text_index import contract_text_condition
+from ..services.risk_factor_index import risk_factor_condition
 
 try:
     from slowapi import Limiter
@@ -35,8 +42,15 @@ def rate_limit(limit_string: str):
 
 logger = logging.getLogger(__name__)
 
-# Export limits to prevent memory issues
-MAX_EXPORT_ROWS = 100_000
+# Row ceiling per export. Streaming keeps memory flat, so this bounds transfer
+# size and DB time (a full sector-year fits), not worker memory.
+MAX_EXPORT_ROWS = 1_000_000
+# Rows fetched from SQLite per round-trip while streaming.
+EXPORT_BATCH_ROWS = 5_000
+# Chunk size when streaming a finished XLSX file.
+_XLSX_CHUNK_BYTES = 1 << 20
+# Rows per Arrow record batch / Parquet row group in the bulk export.
+BULK_BATCH_ROWS = 65_536
 
 router = APIRouter(prefix="/export", tags=["export"])
 
@@ -50,8 +64,8 @@ _RISK_FACTOR_COLUMN_MAP = {
     # NOTE: "price_hyp" intentionally NOT mapped. There is no
     # `price_hypothesis_type` column — it is a token inside the
     # `risk_factors` TEXT column (387K rows), so it falls through to the
-    # `risk_factors LIKE '%price_hyp%'` path below. The same phantom-column
-    # mapping was removed from contract_service.py to keep list/export parity.
+    # contract_risk_factors lookup below (risk_factor_condition, shared with
+    # contract_service.py to keep list/export parity).
 }
 
 
@@ -80,20 +94,141 @@ def sanitize_csv_cell(value):
     return value
 
 
-def generate_csv(rows, columns):
-    """Generate CSV content from rows and columns with formula injection protection."""
+def stream_query_batches(
+    build_query: Callable[[sqlite3.Connection], tuple[str, list]],
+    batch_rows: Optional[int] = None,
+) -> Iterator[list]:
+    """Run ``build_query(conn)`` on a pooled connection and return its rows in batches.
+
+    The statement is executed and the first batch fetched before this returns,
+    so database errors still surface in the handler (as its 500). The
+    connection stays checked out until the returned generator is exhausted or
+    closed, e.g. when the client disconnects mid-download.
+    """
+    batch_rows = batch_rows or EXPORT_BATCH_ROWS
+    stack = ExitStack()
+    try:
+        conn = stack.enter_context(get_db())
+        sql, params = build_query(conn)
+        cursor = conn.execute(sql, params)
+        first = cursor.fetchmany(batch_rows)
+    except BaseException:
+        stack.close()
+        raise
+
+    def batches() -> Iterator[list]:
+        with stack:
+            batch = first
+            while batch:
+                yield batch
+                batch = cursor.fetchmany(batch_rows)
+
+    return batches()
+
+
+def iter_csv(batches: Iterable[list], columns: list[str]) -> Iterator[str]:
+    """Encode row batches as CSV text, one chunk per batch, with formula injection protection."""
     output = io.StringIO()
     writer = csv.writer(output)
-
-    # Sanitize column headers
     writer.writerow([sanitize_csv_cell(col) for col in columns])
+    for batch in batches:
+        for row in batch:
+            writer.writerow([sanitize_csv_cell(cell) for cell in row])
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+    if output.tell():
+        yield output.getvalue()
+
+
+def iter_xlsx(batches: Iterable[list], headers: list[str], title: str) -> Iterator[bytes]:
+    """Write row batches to a write-only workbook on disk, then stream the file.
+
+    openpyxl's write-only mode serializes each row as it is appended, so memory
+    does not grow with the row count. An XLSX is a zip whose directory comes
+    last, so bytes are sent once the sheet is complete.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    # Auto-width columns (approximate); must be set before rows are written
+    for i, col in enumerate(headers, 1):
+        ws.column_dimensions[get_column_letter(i)].width = max(len(col) + 2, 12)
+
+    bold = Font(bold=True)
+    header_row = []
+    for col in headers:
+        cell = WriteOnlyCell(ws, value=col)
+        cell.font = bold
+        header_row.append(cell)
+    ws.append(header_row)
+
+    # Data rows - sanitize all cells to prevent formula injection
+    for batch in batches:
+        for row in batch:
+            ws.append([sanitize_csv_cell(cell) for cell in row])
+
+    with tempfile.TemporaryFile() as output:
+        wb.save(output)
+        output.seek(0)
+        while chunk := output.read(_XLSX_CHUNK_BYTES):
+            yield chunk
+
+
+def arrow_schema(columns: Iterable[tuple[str, str, str]]):
+    """pyarrow schema for (name, SQL expression, Arrow type name) column specs."""
+    import pyarrow as pa
+
+    return pa.schema([pa.field(name, getattr(pa, type_name)()) for name, _, type_name in columns])
+
+
+def _record_batches(batches: Iterable[list], schema) -> Iterator:
+    """Transpose row batches into pyarrow RecordBatches of ``schema``."""
+    import pyarrow as pa
+
+    width = len(schema)
+    for batch in batches:
+        columns = list(zip(*batch)) if batch else [()] * width
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+            schema=schema,
+        )
+
+
+def iter_arrow(batches: Iterable[list], schema) -> Iterator[bytes]:
+    """Encode row batches as an Arrow IPC stream, one record batch per row batch."""
+    import pyarrow as pa
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for record_batch in _record_batches(batches, schema):
+            writer.write_batch(record_batch)
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def iter_parquet(batches: Iterable[list], schema) -> Iterator[bytes]:
+    """Encode row batches as a zstd Parquet file, one row group per row batch."""
+    import pyarrow.parquet as pq
+
+    sink = io.BytesIO()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for record_batch in _record_batches(batches, schema):
+            writer.write_batch(record_batch)
+            yield _drain(sink)
+    yield _drain(sink)
 
-    # Sanitize data rows
-    for row in rows:
-        writer.writerow([sanitize_csv_cell(cell) for cell in row])
 
-    output.seek(0)
-    return output
+def _drain(sink: io.BytesIO) -> bytes:
+    """Return and discard what has been written to ``sink`` so far."""
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate(0)
+    return data
 
 
 def build_contracts_where(
@@ -110,6 +245,7 @@ def build_contracts_where(
     category_id: Optional[int],
     risk_factor: Optional[str],
     search: Optional[str],
+    conn: Optional[sqlite3.Connection] = None,
 ) -> tuple[str, list]:
     """Build a parameterized WHERE clause for contract queries.
 
@@ -118,12 +254,14 @@ def build_contracts_where(
     for the same filter combination.
 
     Returns (where_clause_string, params_list).  The caller appends additional
-    params (e.g. LIMIT value) after this list.
-
-    Search implementation note: uses bilateral LIKE (%term%) across c.title and
-    c.description, identical to QueryBuilder.filter_search.  This is
-    index-defeating on the full 3.1M-row table but consistent with the list
-    endpoint. The MAX_EXPORT_ROWS cap limits the blast radius.
+    params (e.g. LIMIT value) after this list.  ``conn`` lets risk_factor
+    filters use the contract_risk_factors index and ``search`` use the
+    contracts_fts index once they are built.
+
+    Search implementation note: with contracts_fts built, search matches word
+    prefixes in c.title and c.description (contract_text_index.py), exactly
+    as the list endpoint does.  Without it (or without ``conn``) it falls back
+    to bilateral LIKE (%term%), identical to QueryBuilder.filter_search.
     """
     conditions: list[str] = ["COALESCE(c.amount_mxn, 0) <= ?"]
     params: list = [MAX_CONTRACT_VALUE]
@@ -178,12 +316,18 @@ def build_contracts_where(
             else:
                 conditions.append(clause)
         else:
-            # Fallback: LIKE scan for dynamic factors (co_bid, network, split, etc.)
-            # Leading wildcard prevents index use — same trade-off as the list endpoint.
-            conditions.append("c.risk_factors LIKE ?")
-            params.append(f"%{risk_factor}%")
-
-    if search is not None:
+            # Dynamic factors (co_bid, network, split, etc.): same inverted-index
+            # lookup (or LIKE fallback) as the list endpoint.
+            clause, factor_params = risk_factor_condition(conn, risk_factor)
+            conditions.append(clause)
+            params.extend(factor_params)
+
+    indexed = contract_text_condition(conn, search) if search is not None else None
+    if indexed is not None:
+        # contracts_fts lookup, as in the list endpoint.
+        conditions.append(indexed[0])
+        params.extend(indexed[1])
+    elif search is not None:
         # Escape LIKE special chars, mirror QueryBuilder.filter_search exactly.
         escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
         pattern = f"%{escaped}%"
@@ -195,6 +339,75 @@ def build_contracts_where(
     return " AND ".join(conditions), params
 
 
+# Contract projection shared by the CSV and bulk exports:
+# (column name, SQL expression, Arrow type name). Integers are int64 so any
+# value SQLite can store fits; see _SQL_STORAGE for the bulk export's casts.
+CONTRACT_EXPORT_COLUMNS: tuple[tuple[str, str, str], ...] = (
+    ("id", "c.id", "int64"),
+    ("contract_number", "c.contract_number", "string"),
+    ("procedure_number", "c.procedure_number", "string"),
+    ("title", "c.title", "string"),
+    ("description", "c.description", "string"),
+    ("amount_mxn", "c.amount_mxn", "float64"),
+    ("currency", "c.currency", "string"),
+    ("contract_date", "c.contract_date", "string"),
+    ("contract_year", "c.contract_year", "int64"),
+    ("start_date", "c.start_date", "string"),
+    ("end_date", "c.end_date", "string"),
+    ("sector_id", "c.sector_id", "int64"),
+    ("sector_name", "s.name_es", "string"),
+    ("vendor_id", "c.vendor_id", "int64"),
+    ("vendor_name", "v.name", "string"),
+    ("vendor_rfc", "CASE WHEN v.is_individual THEN NULL ELSE v.rfc END", "string"),
+    ("institution_id", "c.institution_id", "int64"),
+    ("institution_name", "i.name", "string"),
+    ("institution_type", "i.institution_type", "string"),
+    ("procedure_type", "c.procedure_type", "string"),
+    ("contract_type", "c.contract_type", "string"),
+    ("is_direct_award", "c.is_direct_award", "int64"),
+    ("is_single_bid", "c.is_single_bid", "int64"),
+    ("category_id", "c.category_id", "int64"),
+    ("risk_score", "c.risk_score", "float64"),
+    ("risk_level", "c.risk_level", "string"),
+    ("risk_factors", "c.risk_factors", "string"),
+)
+
+CONTRACT_EXPORT_FROM = """
+    FROM contracts c
+    LEFT JOIN sectors s ON c.sector_id = s.id
+    LEFT JOIN vendors v ON c.vendor_id = v.id
+    LEFT JOIN institutions i ON c.institution_id = i.id
+"""
+
+
+# SQLite storage class each Arrow type is cast to in a typed projection.
+_SQL_STORAGE = {"int64": "INTEGER", "float64": "REAL", "string": "TEXT"}
+
+
+def contract_export_select(where_clause: str, order_by: str, typed: bool = False) -> str:
+    """SELECT of CONTRACT_EXPORT_COLUMNS under ``where_clause``, ending in a ``LIMIT ?``.
+
+    ``typed`` casts every column to its Arrow type's storage class. SQLite
+    columns take values of any type, and the bulk export builds its Arrow
+    arrays while streaming, after the 200 has been sent: a stray text year
+    or real flag must not abort the download halfway.
+    """
+    if typed:
+        exprs = [(name, f"CAST({expr} AS {_SQL_STORAGE[type_name]})")
+                 for name, expr, type_name in CONTRACT_EXPORT_COLUMNS]
+    else:
+        exprs = [(name, expr) for name, expr, _ in CONTRACT_EXPORT_COLUMNS]
+    columns = ",\n        ".join(f"{expr} AS {name}" for name, expr in exprs)
+    return f"""
+    SELECT
+        {columns}
+    {CONTRACT_EXPORT_FROM}
+    WHERE {where_clause}
+    ORDER BY {order_by}
+    LIMIT ?
+    """
+
+
 @router.get("/contracts/csv")
 @rate_limit("10/minute")
 def export_contracts_csv(
@@ -218,7 +431,7 @@ def export_contracts_csv(
 
     Returns filtered contracts in CSV format for download.
     Supports the same 13 filter facets as the contracts list endpoint.
-    Maximum {MAX_EXPORT_ROWS} rows per export to prevent memory issues.
+    Rows are streamed in batches as they are read; at most MAX_EXPORT_ROWS per export.
     """
     if max_amount is not None and max_amount > MAX_CONTRACT_VALUE:
         raise HTTPException(
@@ -226,98 +439,48 @@ def export_contracts_csv(
             detail=f"max_amount exceeds maximum allowed value of {MAX_CONTRACT_VALUE}",
         )
 
+    def build_query(conn: sqlite3.Connection) -> tuple[str, list]:
+        where_clause, params = build_contracts_where(
+            sector_id=sector_id,
+            year=year,
+            institution_id=institution_id,
+            vendor_id=vendor_id,
+            risk_level=risk_level,
+            is_direct_award=is_direct_award,
+            is_single_bid=is_single_bid,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            category_id=category_id,
+            risk_factor=risk_factor,
+            search=search,
+            conn=conn,
+        )
+
+        query = contract_export_select(where_clause, order_by="c.contract_date DESC")
+        params.append(limit)
+        return query, params
+
     try:
-        with get_db() as conn:
-            cursor = conn.cursor()
-
-            where_clause, params = build_contracts_where(
-                sector_id=sector_id,
-                year=year,
-                institution_id=institution_id,
-                vendor_id=vendor_id,
-                risk_level=risk_level,
-                is_direct_award=is_direct_award,
-                is_single_bid=is_single_bid,
-                min_amount=min_amount,
-                max_amount=max_amount,
-                category_id=category_id,
-                risk_factor=risk_factor,
-                search=search,
-            )
-
-            query = f"""
-                SELECT
-                    c.id,
-                    c.contract_number,
-                    c.procedure_number,
-                    c.title,
-                    c.description,
-                    c.amount_mxn,
-                    c.currency,
-                    c.contract_date,
-                    c.contract_year,
-                    c.start_date,
-                    c.end_date,
-                    c.sector_id,
-                    s.name_es as sector_name,
-                    c.vendor_id,
-                    v.name as vendor_name,
-                    CASE WHEN v.is_individual THEN NULL ELSE v.rfc END as vendor_rfc,
-                    c.institution_id,
-                    i.name as institution_name,
-                    i.institution_type,
-                    c.procedure_type,
-                    c.contract_type,
-                    c.is_direct_award,
-                    c.is_single_bid,
-                    c.category_id,
-                    c.risk_score,
-                    c.risk_level,
-                    c.risk_factors
-                FROM contracts c
-                LEFT JOIN sectors s ON c.sector_id = s.id
-                LEFT JOIN vendors v ON c.vendor_id = v.id
-                LEFT JOIN institutions i ON c.institution_id = i.id
-                WHERE {where_clause}
-                ORDER BY c.contract_date DESC
-                LIMIT ?
-            """
-            params.append(limit)
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-
-            columns = [
-                "id", "contract_number", "procedure_number", "title", "description",
-                "amount_mxn", "currency", "contract_date", "contract_year",
-                "start_date", "end_date", "sector_id", "sector_name",
-                "vendor_id", "vendor_name", "vendor_rfc",
-                "institution_id", "institution_name", "institution_type",
-                "procedure_type", "contract_type",
-                "is_direct_award", "is_single_bid",
-                "category_id",
-                "risk_score", "risk_level", "risk_factors",
-            ]
-
-            # Convert rows to list format
-            data_rows = [list(row) for row in rows]
-            csv_output = generate_csv(data_rows, columns)
-
-            # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filters_str = ""
-            if sector_id:
-                filters_str += f"_sector{sector_id}"
-            if year:
-                filters_str += f"_year{year}"
-            if category_id:
-                filters_str += f"_cat{category_id}"
-            filename = f"contracts{filters_str}_{timestamp}.csv"
-
-            return StreamingResponse(
-                iter([csv_output.getvalue()]),
-                media_type="text/csv",
-                headers={"Content-Disposition": f"attachment; filename={filename}"}
-            )
+        batches = stream_query_batches(build_query)
+
+        columns = [name for name, _, _ in CONTRACT_EXPORT_COLUMNS]
+
+        # Generate filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filters_str = ""
+        if sector_id:
+            filters_str += f"_sector{sector_id}"
+        if year:
+            filters_str += f"_year{year}"
+        if category_id:
+            filters_str += f"_cat{category_id}"
+        filename = f"contracts{filters_str}_{timestamp}.csv"
+
+        return StreamingResponse(
+            iter_csv(batches, columns),
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
 
     except sqlite3.Error as e:
         logger.error(f"Database error in export_contracts_csv: {e}")
@@ -347,7 +510,7 @@ def export_contracts_excel(
 
     Returns filtered contracts in Excel format for download.
     Supports the same 13 filter facets as the contracts list endpoint.
-    Maximum {MAX_EXPORT_ROWS} rows per export to prevent memory issues.
+    Rows are streamed in batches as they are read; at most MAX_EXPORT_ROWS per export.
     """
     if max_amount is not None and max_amount > MAX_CONTRACT_VALUE:
         raise HTTPException(
@@ -355,129 +518,195 @@ def export_contracts_excel(
             detail=f"max_amount exceeds maximum allowed value of {MAX_CONTRACT_VALUE}",
         )
 
+    # openpyxl is optional; it is imported by iter_xlsx
+    if importlib.util.find_spec("openpyxl") is None:
+        raise HTTPException(
+            status_code=501,
+            detail="Excel export requires openpyxl. Install with: pip install openpyxl"
+        )
+
+    def build_query(conn: sqlite3.Connection) -> tuple[str, list]:
+        where_clause, params = build_contracts_where(
+            sector_id=sector_id,
+            year=year,
+            institution_id=institution_id,
+            vendor_id=vendor_id,
+            risk_level=risk_level,
+            is_direct_award=is_direct_award,
+            is_single_bid=is_single_bid,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            category_id=category_id,
+            risk_factor=risk_factor,
+            search=search,
+            conn=conn,
+        )
+
+        query = f"""
+            SELECT
+                c.id,
+                c.contract_number,
+                c.procedure_number,
+                c.title,
+                c.amount_mxn,
+                c.currency,
+                c.contract_date,
+                c.contract_year,
+                s.name_es as sector_name,
+                v.name as vendor_name,
+                CASE WHEN v.is_individual THEN NULL ELSE v.rfc END as vendor_rfc,
+                i.name as institution_name,
+                i.institution_type,
+                c.procedure_type,
+                c.is_direct_award,
+                c.is_single_bid,
+                c.category_id,
+                c.risk_score,
+                c.risk_level,
+                c.risk_factors
+            FROM contracts c
+            LEFT JOIN sectors s ON c.sector_id = s.id
+            LEFT JOIN vendors v ON c.vendor_id = v.id
+            LEFT JOIN institutions i ON c.institution_id = i.id
+            WHERE {where_clause}
+            ORDER BY c.contract_date DESC
+            LIMIT ?
+        """
+        params.append(limit)
+        return query, params
+
     try:
-        # Import openpyxl here to make it optional
-        try:
-            from openpyxl import Workbook
-            from openpyxl.utils import get_column_letter
-        except ImportError:
-            raise HTTPException(
-                status_code=501,
-                detail="Excel export requires openpyxl. Install with: pip install openpyxl"
-            )
-
-        with get_db() as conn:
-            cursor = conn.cursor()
-
-            where_clause, params = build_contracts_where(
-                sector_id=sector_id,
-                year=year,
-                institution_id=institution_id,
-                vendor_id=vendor_id,
-                risk_level=risk_level,
-                is_direct_award=is_direct_award,
-                is_single_bid=is_single_bid,
-                min_amount=min_amount,
-                max_amount=max_amount,
-                category_id=category_id,
-                risk_factor=risk_factor,
-                search=search,
-            )
-
-            query = f"""
-                SELECT
-                    c.id,
-                    c.contract_number,
-                    c.procedure_number,
-                    c.title,
-                    c.amount_mxn,
-                    c.currency,
-                    c.contract_date,
-                    c.contract_year,
-                    s.name_es as sector_name,
-                    v.name as vendor_name,
-                    CASE WHEN v.is_individual THEN NULL ELSE v.rfc END as vendor_rfc,
-                    i.name as institution_name,
-                    i.institution_type,
-                    c.procedure_type,
-                    c.is_direct_award,
-                    c.is_single_bid,
-                    c.category_id,
-                    c.risk_score,
-                    c.risk_level,
-                    c.risk_factors
-                FROM contracts c
-                LEFT JOIN sectors s ON c.sector_id = s.id
-                LEFT JOIN vendors v ON c.vendor_id = v.id
-                LEFT JOIN institutions i ON c.institution_id = i.id
-                WHERE {where_clause}
-                ORDER BY c.contract_date DESC
-                LIMIT ?
-            """
-            params.append(limit)
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-
-            # Create workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Contracts"
-
-            # Headers
-            headers = [
-                "ID", "Contract Number", "Procedure Number", "Title",
-                "Amount (MXN)", "Currency", "Contract Date", "Year",
-                "Sector", "Vendor Name", "Vendor RFC",
-                "Institution", "Institution Type", "Procedure Type",
-                "Direct Award", "Single Bid",
-                "Category ID",
-                "Risk Score", "Risk Level", "Risk Factors",
-            ]
-            ws.append(headers)
-
-            # Style header row
-            for col in range(1, len(headers) + 1):
-                cell = ws.cell(row=1, column=col)
-                font = copy(cell.font)
-                font.bold = True
-                cell.font = font
-
-            # Data rows - sanitize all cells to prevent formula injection
-            for row in rows:
-                sanitized_row = [sanitize_csv_cell(cell) for cell in row]
-                ws.append(sanitized_row)
-
-            # Auto-width columns (approximate)
-            for i, col in enumerate(headers, 1):
-                ws.column_dimensions[get_column_letter(i)].width = max(len(col) + 2, 12)
-
-            # Save to bytes
-            output = io.BytesIO()
-            wb.save(output)
-            output.seek(0)
-
-            # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filters_str = ""
-            if sector_id:
-                filters_str += f"_sector{sector_id}"
-            if year:
-                filters_str += f"_year{year}"
-            if category_id:
-                filters_str += f"_cat{category_id}"
-            filename = f"contracts{filters_str}_{timestamp}.xlsx"
-
-            return StreamingResponse(
-                iter([output.getvalue()]),
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                headers={"Content-Disposition": f"attachment; filename={filename}"}
-            )
+        batches = stream_query_batches(build_query)
+
+        headers = [
+            "ID", "Contract Number", "Procedure Number", "Title",
+            "Amount (MXN)", "Currency", "Contract Date", "Year",
+            "Sector", "Vendor Name", "Vendor RFC",
+            "Institution", "Institution Type", "Procedure Type",
+            "Direct Award", "Single Bid",
+            "Category ID",
+            "Risk Score", "Risk Level", "Risk Factors",
+        ]
+
+        # Generate filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filters_str = ""
+        if sector_id:
+            filters_str += f"_sector{sector_id}"
+        if year:
+            filters_str += f"_year{year}"
+        if category_id:
+            filters_str += f"_cat{category_id}"
+        filename = f"contracts{filters_str}_{timestamp}.xlsx"
+
+        return StreamingResponse(
+            iter_xlsx(batches, headers, title="Contracts"),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
 
     except sqlite3.Error as e:
         logger.error(f"Database error in export_contracts_excel: {e}")
         raise HTTPException(status_code=500, detail="Database error occurred")
 
 
+_BULK_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows", iter_arrow),
+    "parquet": ("application/vnd.apache.parquet", "parquet", iter_parquet),
+}
+
+
+@router.get("/contracts/bulk")
+@rate_limit("5/minute")
+def export_contracts_bulk(
+    request: Request,
+    format: str = Query("arrow", pattern="^(arrow|parquet)$", description="arrow (IPC stream) or parquet"),
+    sector_id: Optional[int] = Query(None, ge=1, le=12, description="Filter by sector ID (1-12)"),
+    year: Optional[int] = Query(None, ge=2002, le=2026, description="Filter by contract year"),
+    institution_id: Optional[int] = Query(None, description="Filter by institution ID"),
+    vendor_id: Optional[int] = Query(None, description="Filter by vendor ID"),
+    risk_level: Optional[str] = Query(None, description="Filter by risk level (low/medium/high/critical)"),
+    is_direct_award: Optional[bool] = Query(None, description="Filter direct awards"),
+    is_single_bid: Optional[bool] = Query(None, description="Filter single-bid contracts"),
+    min_amount: Optional[float] = Query(None, ge=0, description="Minimum contract amount"),
+    max_amount: Optional[float] = Query(None, le=100_000_000_000, description="Maximum contract amount"),
+    category_id: Optional[int] = Query(None, description="Filter by spending category (partida) ID"),
+    risk_factor: Optional[str] = Query(None, description="Filter by risk factor (e.g., co_bid, price_hyp, direct_award)"),
+    search: Optional[str] = Query(None, min_length=3, description="Full-text search in title/description"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum rows to export (default: all matching rows)"),
+):
+    """
+    Export contracts as Arrow IPC stream or Parquet for bulk analysis.
+
+    Same columns and 13 filter facets as the CSV export, typed (int64,
+    float64; flags as 0/1 integers, dates as ISO strings) and ordered by
+    contract ID.
+    Record batches of BULK_BATCH_ROWS rows are encoded and streamed as they
+    are read, so a full sector or year extract has no row ceiling. Load with
+    ``pyarrow.ipc.open_stream`` / ``pyarrow.parquet.read_table`` (or
+    ``pandas.read_parquet`` / ``polars.read_ipc_stream``).
+    """
+    if max_amount is not None and max_amount > MAX_CONTRACT_VALUE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"max_amount exceeds maximum allowed value of {MAX_CONTRACT_VALUE}",
+        )
+
+    # pyarrow is optional; it is imported by the encoders
+    if importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(
+            status_code=501,
+            detail="Bulk export requires pyarrow. Install with: pip install pyarrow"
+        )
+
+    def build_query(conn: sqlite3.Connection) -> tuple[str, list]:
+        where_clause, params = build_contracts_where(
+            sector_id=sector_id,
+            year=year,
+            institution_id=institution_id,
+            vendor_id=vendor_id,
+            risk_level=risk_level,
+            is_direct_award=is_direct_award,
+            is_single_bid=is_single_bid,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            category_id=category_id,
+            risk_factor=risk_factor,
+            search=search,
+            conn=conn,
+        )
+
+        # Primary-key order streams without a sort; LIMIT -1 is unlimited.
+        query = contract_export_select(where_clause, order_by="c.id", typed=True)
+        params.append(limit if limit is not None else -1)
+        return query, params
+
+    media_type, extension, encode = _BULK_FORMATS[format]
+    try:
+        batches = stream_query_batches(build_query, batch_rows=BULK_BATCH_ROWS)
+
+        # Generate filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filters_str = ""
+        if sector_id:
+            filters_str += f"_sector{sector_id}"
+        if year:
+            filters_str += f"_year{year}"
+        if category_id:
+            filters_str += f"_cat{category_id}"
+        filename = f"contracts{filters_str}_{timestamp}.{extension}"
+
+        return StreamingResponse(
+            encode(batches, arrow_schema(CONTRACT_EXPORT_COLUMNS)),
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+
+    except sqlite3.Error as e:
+        logger.error(f"Database error in export_contracts_bulk: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+
 @router.get("/vendors/csv")
 @rate_limit("10/minute")
 def export_vendors_csv(
@@ -494,115 +723,109 @@ def export_vendors_csv(
     Export vendors as CSV file.
 
     Returns vendors with aggregate statistics in CSV format for download.
-    Maximum {MAX_EXPORT_ROWS} rows per export to prevent memory issues.
+    Rows are streamed in batches as they are read; at most MAX_EXPORT_ROWS per export.
+    """
+    # Build WHERE clause
+    conditions = ["1=1"]
+    params: list = []
+
+    if has_rfc is not None:
+        if has_rfc:
+            conditions.append("v.rfc IS NOT NULL AND v.rfc != ''")
+        else:
+            conditions.append("(v.rfc IS NULL OR v.rfc = '')")
+
+    if search is not None:
+        escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        conditions.append("v.name LIKE ? ESCAPE '\\'")
+        params.append(pattern)
+
+    where_clause = " AND ".join(conditions)
+
+    # HAVING conditions
+    having_conditions = ["1=1"]
+    having_params: list = []
+
+    if min_contracts is not None:
+        having_conditions.append("COUNT(c.id) >= ?")
+        having_params.append(min_contracts)
+
+    if min_value is not None:
+        having_conditions.append("COALESCE(SUM(c.amount_mxn), 0) >= ?")
+        having_params.append(min_value)
+
+    if sector_id is not None:
+        having_conditions.append("""
+            (SELECT sector_id FROM contracts
+             WHERE vendor_id = v.id
+             GROUP BY sector_id
+             ORDER BY COUNT(*) DESC LIMIT 1) = ?
+        """)
+        having_params.append(sector_id)
+
+    if risk_level is not None:
+        # Filter vendors whose most common risk level matches the requested one.
+        # Uses a correlated subquery matching the pattern used for sector above.
+        having_conditions.append("""
+            (SELECT risk_level FROM contracts
+             WHERE vendor_id = v.id AND risk_level IS NOT NULL
+             GROUP BY risk_level
+             ORDER BY COUNT(*) DESC LIMIT 1) = ?
+        """)
+        having_params.append(risk_level.lower())
+
+    having_clause = " AND ".join(having_conditions)
+
+    query = f"""
+        SELECT
+            v.id,
+            v.name,
+            CASE WHEN v.is_individual THEN NULL ELSE v.rfc END as rfc,
+            v.name_normalized,
+            COUNT(c.id) as total_contracts,
+            COALESCE(SUM(c.amount_mxn), 0) as total_value_mxn,
+            COALESCE(AVG(c.amount_mxn), 0) as avg_contract_value,
+            COALESCE(AVG(c.risk_score), 0) as avg_risk_score,
+            SUM(CASE WHEN c.risk_level IN ('high', 'critical') THEN 1 ELSE 0 END) as high_risk_count,
+            SUM(CASE WHEN c.is_direct_award = 1 THEN 1 ELSE 0 END) as direct_award_count,
+            SUM(CASE WHEN c.is_single_bid = 1 THEN 1 ELSE 0 END) as single_bid_count,
+            MIN(c.contract_year) as first_contract_year,
+            MAX(c.contract_year) as last_contract_year,
+            COUNT(DISTINCT c.institution_id) as total_institutions,
+            COUNT(DISTINCT c.sector_id) as sectors_count
+        FROM vendors v
+        LEFT JOIN contracts c ON v.id = c.vendor_id
+            AND COALESCE(c.amount_mxn, 0) <= ?
+        WHERE {where_clause}
+        GROUP BY v.id, v.name, v.rfc, v.name_normalized
+        HAVING {having_clause}
+        ORDER BY total_contracts DESC
+        LIMIT ?
     """
+    query_params = [MAX_CONTRACT_VALUE] + params + having_params + [limit]
+
     try:
-        with get_db() as conn:
-            cursor = conn.cursor()
-
-            # Build WHERE clause
-            conditions = ["1=1"]
-            params: list = []
-
-            if has_rfc is not None:
-                if has_rfc:
-                    conditions.append("v.rfc IS NOT NULL AND v.rfc != ''")
-                else:
-                    conditions.append("(v.rfc IS NULL OR v.rfc = '')")
-
-            if search is not None:
-                escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
-                pattern = f"%{escaped}%"
-                conditions.append("v.name LIKE ? ESCAPE '\\'")
-                params.append(pattern)
-
-            where_clause = " AND ".join(conditions)
-
-            # HAVING conditions
-            having_conditions = ["1=1"]
-            having_params: list = []
-
-            if min_contracts is not None:
-                having_conditions.append("COUNT(c.id) >= ?")
-                having_params.append(min_contracts)
-
-            if min_value is not None:
-                having_conditions.append("COALESCE(SUM(c.amount_mxn), 0) >= ?")
-                having_params.append(min_value)
-
-            if sector_id is not None:
-                having_conditions.append("""
-                    (SELECT sector_id FROM contracts
-                     WHERE vendor_id = v.id
-                     GROUP BY sector_id
-                     ORDER BY COUNT(*) DESC LIMIT 1) = ?
-                """)
-                having_params.append(sector_id)
-
-            if risk_level is not None:
-                # Filter vendors whose most common risk level matches the requested one.
-                # Uses a correlated subquery matching the pattern used for sector above.
-                having_conditions.append("""
-                    (SELECT risk_level FROM contracts
-                     WHERE vendor_id = v.id AND risk_level IS NOT NULL
-                     GROUP BY risk_level
-                     ORDER BY COUNT(*) DESC LIMIT 1) = ?
-                """)
-                having_params.append(risk_level.lower())
-
-            having_clause = " AND ".join(having_conditions)
-
-            query = f"""
-                SELECT
-                    v.id,
-                    v.name,
-                    CASE WHEN v.is_individual THEN NULL ELSE v.rfc END as rfc,
-                    v.name_normalized,
-                    COUNT(c.id) as total_contracts,
-                    COALESCE(SUM(c.amount_mxn), 0) as total_value_mxn,
-                    COALESCE(AVG(c.amount_mxn), 0) as avg_contract_value,
-                    COALESCE(AVG(c.risk_score), 0) as avg_risk_score,
-                    SUM(CASE WHEN c.risk_level IN ('high', 'critical') THEN 1 ELSE 0 END) as high_risk_count,
-                    SUM(CASE WHEN c.is_direct_award = 1 THEN 1 ELSE 0 END) as direct_award_count,
-                    SUM(CASE WHEN c.is_single_bid = 1 THEN 1 ELSE 0 END) as single_bid_count,
-                    MIN(c.contract_year) as first_contract_year,
-                    MAX(c.contract_year) as last_contract_year,
-                    COUNT(DISTINCT c.institution_id) as total_institutions,
-                    COUNT(DISTINCT c.sector_id) as sectors_count
-                FROM vendors v
-                LEFT JOIN contracts c ON v.id = c.vendor_id
-                    AND COALESCE(c.amount_mxn, 0) <= ?
-                WHERE {where_clause}
-                GROUP BY v.id, v.name, v.rfc, v.name_normalized
-                HAVING {having_clause}
-                ORDER BY total_contracts DESC
-                LIMIT ?
-            """
-            cursor.execute(query, [MAX_CONTRACT_VALUE] + params + having_params + [limit])
-            rows = cursor.fetchall()
-
-            columns = [
-                "id", "name", "rfc", "name_normalized",
-                "total_contracts", "total_value_mxn", "avg_contract_value",
-                "avg_risk_score", "high_risk_count",
-                "direct_award_count", "single_bid_count",
-                "first_contract_year", "last_contract_year",
-                "total_institutions", "sectors_count",
-            ]
-
-            # Convert rows to list format
-            data_rows = [list(row) for row in rows]
-            csv_output = generate_csv(data_rows, columns)
-
-            # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"vendors_{timestamp}.csv"
-
-            return StreamingResponse(
-                iter([csv_output.getvalue()]),
-                media_type="text/csv",
-                headers={"Content-Disposition": f"attachment; filename={filename}"}
-            )
+        batches = stream_query_batches(lambda conn: (query, query_params))
+
+        columns = [
+            "id", "name", "rfc", "name_normalized",
+            "total_contracts", "total_value_mxn", "avg_contract_value",
+            "avg_risk_score", "high_risk_count",
+            "direct_award_count", "single_bid_count",
+            "first_contract_year", "last_contract_year",
+            "total_institutions", "sectors_count",
+        ]
+
+        # Generate filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"vendors_{timestamp}.csv"
+
+        return StreamingResponse(
+            iter_csv(batches, columns),
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
 
     except sqlite3.Error as e:
         logger.error(f"Database error in export_vendors_csv: {e}")
@@ -11,7 +11,7 @@ from pydantic import BaseModel
 from typing import Optional
 import sqlite3
 import logging
-from ..dependencies import get_db, require_write_key
+from ..dependencies import get_db_writer, require_write_key
 
 logger = logging.getLogger(__name__)
 
@@ -92,7 +92,7 @@ def submit_feedback(body: FeedbackIn, _: None = Depends(require_write_key)):
         )
 
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             _ensure_table(conn)
             conn.execute(
                 """
@@ -122,7 +122,7 @@ def get_feedback(entity_type: str, entity_id: int):
     Retrieve existing feedback for a specific entity, or null if none.
     """
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             _ensure_table(conn)
             row = conn.execute(
                 "SELECT * FROM risk_feedback WHERE entity_type = ? AND entity_id = ?",
@@ -138,7 +138,7 @@ def get_feedback(entity_type: str, entity_id: int):
 def delete_feedback(entity_type: str, entity_id: int, _: None = Depends(require_write_key)):
     """Remove feedback for a specific entity."""
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             _ensure_table(conn)
             conn.execute(
                 "DELETE FROM risk_feedback WHERE entity_type = ? AND entity_id = ?",
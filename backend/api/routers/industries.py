@@ -1,19 +1,15 @@
 """API router for industry taxonomy endpoints."""
-import threading
-import time
-
 from fastapi import APIRouter, HTTPException
 from typing import Optional
 
+from ..cache import SimpleCache
 from ..dependencies import get_db
 from ..models.industry import IndustryResponse, IndustryListResponse
 
 router = APIRouter(prefix="/industries", tags=["industries"])
 
-# Cache for the full industry list (rarely changes)
-_industry_cache: dict = {"data": None, "expires": 0}
-_industry_cache_lock = threading.Lock()
-INDUSTRY_CACHE_TTL = 3600  # 1 hour
+# Cache for the full industry list (changes only with the data epoch)
+_industry_cache = SimpleCache(namespace="industries", maxsize=1)
 
 
 @router.get("", response_model=IndustryListResponse)
@@ -26,9 +22,9 @@ def list_industries(include_stats: bool = True):
     """
     # Return cached result if available (stats query is expensive)
     if include_stats:
-        now = time.time()
-        if _industry_cache["data"] and now < _industry_cache["expires"]:
-            return _industry_cache["data"]
+        cached = _industry_cache.get("list")
+        if cached is not None:
+            return cached
 
     with get_db() as conn:
         cursor = conn.cursor()
@@ -94,9 +90,7 @@ def list_industries(include_stats: bool = True):
 
         # Cache if stats were included
         if include_stats:
-            with _industry_cache_lock:
-                _industry_cache["data"] = result
-                _industry_cache["expires"] = time.time() + INDUSTRY_CACHE_TTL
+            _industry_cache.set("list", result, ttl_seconds=None)
 
         return result
 
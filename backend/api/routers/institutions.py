@@ -2,13 +2,13 @@
 import math
 import logging
 import sqlite3 as _sqlite3
-import threading
 from collections import defaultdict
-from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, HTTPException, Query, Path, Response
 
+from ..cache import SimpleCache, app_cache
 from ..dependencies import get_db
+from ..single_flight import flights
 from ..config.constants import MAX_CONTRACT_VALUE
 from ..services.active_model import load_active_global_coefficients
 from ..models.institution import (
@@ -39,29 +39,23 @@ from ..models.common import PaginationMeta
 from ..models.contract import ContractListItem, ContractListResponse, PaginationMeta as ContractPaginationMeta
 from pydantic import BaseModel
 from ..services.institution_service import institution_service
+from ..services.pagination import InvalidCursorError
 from ..models.asf import ASFInstitutionResponse, ASFInstitutionFinding
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/institutions", tags=["institutions"])
 
-# Simple cache for expensive /top endpoint (avoids full 3.1M-row scan on every call)
-_top_cache: Dict[str, Dict[str, Any]] = {}
-_top_cache_lock = threading.Lock()
-_TOP_CACHE_TTL = 3600  # 1 hour
+# Cache for expensive /top endpoint (avoids full 3.1M-row scan on every call)
+_top_cache = SimpleCache(namespace="institutions_top")
 
 
 def _get_top_cache(key: str) -> Any:
-    with _top_cache_lock:
-        entry = _top_cache.get(key)
-        if entry and datetime.now() < entry["expires_at"]:
-            return entry["value"]
-        return None
+    return _top_cache.get(key)
 
 
 def _set_top_cache(key: str, value: Any) -> None:
-    with _top_cache_lock:
-        _top_cache[key] = {"value": value, "expires_at": datetime.now() + timedelta(seconds=_TOP_CACHE_TTL)}
+    _top_cache.set(key, value, ttl_seconds=None)
 
 # Risk baselines from taxonomy (duplicated here for API use)
 INSTITUTION_RISK_BASELINES = {
@@ -107,6 +101,8 @@ AUTONOMY_BASELINES = {
 def list_institutions(
     page: int = Query(1, ge=1, description="Page number (1-indexed)"),
     per_page: int = Query(50, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset pagination; overrides page)"),
+    count: str = Query("cached", pattern="^(exact|cached|estimate)$", description="How the total is computed: exact, cached (by filters and data version) or estimate (pre-aggregates where possible)"),
     institution_type: Optional[str] = Query(None, description="Filter by institution type code"),
     size_tier: Optional[str] = Query(None, description="Filter by size tier"),
     autonomy_level: Optional[str] = Query(None, description="Filter by autonomy level"),
@@ -137,22 +133,27 @@ def list_institutions(
             )
 
     with get_db() as conn:
-        result = institution_service.list_institutions(
-            conn,
-            page=page,
-            per_page=per_page,
-            institution_type=institution_type,
-            size_tier=size_tier,
-            autonomy_level=autonomy_level,
-            sector_id=sector_id,
-            state_code=state_code,
-            search=search,
-            min_contracts=min_contracts,
-            is_legally_decentralized=is_legally_decentralized,
-            risk_level=risk_level,
-            sort_by=sort_by,
-            sort_order=sort_order,
-        )
+        try:
+            result = institution_service.list_institutions(
+                conn,
+                cursor=cursor,
+                count_mode=count,
+                page=page,
+                per_page=per_page,
+                institution_type=institution_type,
+                size_tier=size_tier,
+                autonomy_level=autonomy_level,
+                sector_id=sector_id,
+                state_code=state_code,
+                search=search,
+                min_contracts=min_contracts,
+                is_legally_decentralized=is_legally_decentralized,
+                risk_level=risk_level,
+                sort_by=sort_by,
+                sort_order=sort_order,
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         institutions = [InstitutionResponse(**row) for row in result.data]
 
@@ -1179,11 +1180,11 @@ def get_institution_vendors(
 # Z2 "La Captura" — institution vendor-pool dossier
 # =============================================================================
 
-# 30-min TTL cache for the Z2 vendor-pool payload. Keyed by institution_id.
-_z2_pool_cache: Dict[int, VendorPoolResponse] = {}
-_z2_pool_cache_ts: Dict[int, float] = {}
-_z2_pool_lock = threading.Lock()
+# 30-min TTL shared cache for the Z2 vendor-pool payload. Keyed by institution_id.
+_Z2_POOL_CACHE = "institutions_z2_pool"
 _Z2_POOL_TTL_S = 1800  # 30 minutes
+_Z2_POOL_MAXSIZE = 512
+_Z2_WARMUP_TIMEOUT_S = 300
 
 # 2026-05-31 — cold-start fallback (same pattern as /stats/data-quality).
 # The full computation includes a live aggregate over contracts WHERE
@@ -1192,17 +1193,15 @@ _Z2_POOL_TTL_S = 1800  # 30 minutes
 # is empty → every cold caller exceeds the 60s Caddy edge timeout and
 # Z2 never loads. Fix: serve a degraded fast response (precomputed top
 # vendors with zero HR/DA/SB flag counts) immediately, and warm the
-# full response in a background daemon thread. Subsequent requests hit
-# the warm cache. Set of institution_ids currently being warmed avoids
-# spawning duplicate threads on burst-cold-start.
-_z2_warmup_in_flight: set = set()
-_z2_warmup_lock = threading.Lock()
+# full response in a background single-flight computation (one per
+# institution across all workers, however bursty the cold start).
+# Subsequent requests hit the warm cache.
 
 
 def _z2_compute_full(institution_id: int) -> Optional[VendorPoolResponse]:
     """Heavy full Z2 computation — precomputed top vendors + live aggregate
     for HR/DA/SB flag counts + ARIA lookup. ~60s for IMSS, ~10s for small
-    institutions. Writes to _z2_pool_cache on success. Returns None for
+    institutions. The caller caches the result. Returns None for
     404 cases. Extracted so the cold-start background warmup thread can
     invoke it without re-entering the HTTP handler."""
     with get_db() as conn:
@@ -1267,9 +1266,6 @@ def _z2_compute_full(institution_id: int) -> Optional[VendorPoolResponse]:
                 data=[],
                 total=inst_vendor_count,
             )
-            with _z2_pool_lock:
-                _z2_pool_cache[institution_id] = empty
-                _z2_pool_cache_ts[institution_id] = datetime.now().timestamp()
             return empty
 
         vendor_ids = [r["vendor_id"] for r in top_rows]
@@ -1373,10 +1369,6 @@ def _z2_compute_full(institution_id: int) -> Optional[VendorPoolResponse]:
         total=inst_vendor_count,
     )
 
-    with _z2_pool_lock:
-        _z2_pool_cache[institution_id] = response
-        _z2_pool_cache_ts[institution_id] = datetime.now().timestamp()
-
     # (2026-06-12) A dead "slice to caller's limit" block here referenced an
     # out-of-scope `limit` — every warmup raised a NameError that _warm's
     # except swallowed; harmless only because the cache write above ran first.
@@ -1555,14 +1547,12 @@ def get_institution_vendor_pool(
     _z2_compute_degraded for the two execution paths.
     """
     # Cache hit — slice down if caller wants fewer than the cached 50
-    with _z2_pool_lock:
-        ts = _z2_pool_cache_ts.get(institution_id, 0)
-        if datetime.now().timestamp() - ts < _Z2_POOL_TTL_S and institution_id in _z2_pool_cache:
-            cached = _z2_pool_cache[institution_id]
-            response.headers["Cache-Control"] = "public, max-age=300"
-            if limit >= len(cached.data):
-                return cached
-            return cached.model_copy(update={"data": cached.data[:limit]})
+    cached = app_cache.get(_Z2_POOL_CACHE, str(institution_id))
+    if cached is not None:
+        response.headers["Cache-Control"] = "public, max-age=300"
+        if limit >= len(cached.data):
+            return cached
+        return cached.model_copy(update={"data": cached.data[:limit]})
 
     # Cold start — the fast path now reads the backfilled at-rest counts, so
     # when every row carries scoped flags the response IS complete: promote it
@@ -1575,31 +1565,21 @@ def get_institution_vendor_pool(
         v.high_risk_pct is not None for v in degraded.data
     )
     if is_complete or not degraded.data:
-        with _z2_pool_lock:
-            _z2_pool_cache[institution_id] = degraded
-            _z2_pool_cache_ts[institution_id] = datetime.now().timestamp()
+        app_cache.set(
+            _Z2_POOL_CACHE, str(institution_id), degraded,
+            maxsize=_Z2_POOL_MAXSIZE, ttl=_Z2_POOL_TTL_S,
+        )
         response.headers["Cache-Control"] = "public, max-age=300"
         if limit < len(degraded.data):
             return degraded.model_copy(update={"data": degraded.data[:limit]})
         return degraded
 
-    # Legacy fallback (un-backfilled DB or post-backfill rows): spawn the heavy
-    # warmup if no other thread is doing it for this institution.
-    with _z2_warmup_lock:
-        warmup_needed = institution_id not in _z2_warmup_in_flight
-        if warmup_needed:
-            _z2_warmup_in_flight.add(institution_id)
-
-    if warmup_needed:
-        def _warm():
-            try:
-                _z2_compute_full(institution_id)
-            except Exception as e:
-                logger.warning("z2 background warmup failed for inst %d: %s", institution_id, e)
-            finally:
-                with _z2_warmup_lock:
-                    _z2_warmup_in_flight.discard(institution_id)
-        threading.Thread(target=_warm, daemon=True, name=f"z2-warmup-{institution_id}").start()
+    # Legacy fallback (un-backfilled DB or post-backfill rows): start the heavy
+    # warmup unless some worker is already computing this institution.
+    flights.start(
+        _Z2_POOL_CACHE, str(institution_id), lambda: _z2_compute_full(institution_id),
+        maxsize=_Z2_POOL_MAXSIZE, ttl=_Z2_POOL_TTL_S, timeout=_Z2_WARMUP_TIMEOUT_S,
+    )
 
     response.headers["Cache-Control"] = "no-store"  # don't cache incomplete
     if limit < len(degraded.data):
@@ -1631,9 +1611,7 @@ class VendorLoyaltyResponse(BaseModel):
     vendors: List[VendorLoyaltyItem]
     year_range: List[int]
 
-_loyalty_cache: Dict[int, Any] = {}
-_loyalty_cache_ts: Dict[int, float] = {}
-_loyalty_lock = threading.Lock()
+_loyalty_cache = SimpleCache(namespace="institutions_loyalty", maxsize=1024)
 
 @router.get("/{institution_id:int}/vendor-loyalty", response_model=VendorLoyaltyResponse)
 def get_vendor_loyalty(
@@ -1645,11 +1623,10 @@ def get_vendor_loyalty(
     Returns top N vendors by total value, with per-year breakdown.
     Useful for detecting long-term capture relationships.
     """
-    cache_key = institution_id * 100 + top_n
-    with _loyalty_lock:
-        ts = _loyalty_cache_ts.get(cache_key, 0)
-        if datetime.now().timestamp() - ts < 1800 and cache_key in _loyalty_cache:
-            return _loyalty_cache[cache_key]
+    cache_key = f"{institution_id}:{top_n}"
+    cached = _loyalty_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     with get_db() as conn:
         cur = conn.cursor()
@@ -1735,9 +1712,7 @@ def get_vendor_loyalty(
         vendors=vendor_items,
         year_range=year_range,
     )
-    with _loyalty_lock:
-        _loyalty_cache[cache_key] = result
-        _loyalty_cache_ts[cache_key] = datetime.now().timestamp()
+    _loyalty_cache.set(cache_key, result, ttl_seconds=None)
     return result
 
 
@@ -1763,9 +1738,7 @@ class PeerComparisonResponse(BaseModel):
     peer_count: int
     metrics: List[PeerMetric]
 
-_peer_cache: Dict[int, Any] = {}
-_peer_cache_ts: Dict[int, float] = {}
-_peer_lock = threading.Lock()
+_peer_cache = SimpleCache(namespace="institutions_peers", maxsize=1024)
 
 def _percentile_rank(value: float, values: List[float]) -> int:
     if not values:
@@ -1780,10 +1753,9 @@ def get_peer_comparison(institution_id: int = Path(...)):
     Returns percentile ranks and distribution (min/p25/median/p75/max) for
     avg_risk_score, high_risk_pct, and direct_award_pct.
     """
-    with _peer_lock:
-        ts = _peer_cache_ts.get(institution_id, 0)
-        if datetime.now().timestamp() - ts < 3600 and institution_id in _peer_cache:
-            return _peer_cache[institution_id]
+    cached = _peer_cache.get(str(institution_id))
+    if cached is not None:
+        return cached
 
     with get_db() as conn:
         cur = conn.cursor()
@@ -1854,9 +1826,7 @@ def get_peer_comparison(institution_id: int = Path(...)):
         peer_count=len(peers),
         metrics=metrics,
     )
-    with _peer_lock:
-        _peer_cache[institution_id] = result
-        _peer_cache_ts[institution_id] = datetime.now().timestamp()
+    _peer_cache.set(str(institution_id), result, ttl_seconds=None)
     return result
 
 
@@ -1984,8 +1954,7 @@ def list_autonomy_levels():
 # CRI SCATTER — Fazekas-style institution risk scatter (Section 12.3)
 # =============================================================================
 
-_cri_scatter_cache: Dict[str, Any] = {}
-_CRI_SCATTER_TTL = 6 * 3600  # 6 hours
+_cri_scatter_cache = SimpleCache(namespace="institutions_cri_scatter")
 
 @router.get("/cri-scatter")
 def get_cri_scatter(
@@ -1998,11 +1967,10 @@ def get_cri_scatter(
     vs avg_risk_score (Y), bubble size = total_contracts.
     Used in Sectors.tsx to visualize institutional risk landscape.
     """
-    import time as _t
     cache_key = f"cri_{sector_id}_{min_contracts}_{limit}"
     cached = _cri_scatter_cache.get(cache_key)
-    if cached and (_t.time() - cached["ts"]) < _CRI_SCATTER_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     with get_db() as conn:
         import sqlite3
@@ -2049,15 +2017,14 @@ def get_cri_scatter(
         ]
 
         result = {"data": data, "total": len(data)}
-        _cri_scatter_cache[cache_key] = {"ts": _t.time(), "data": result}
+        _cri_scatter_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
 
 # ---------------------------------------------------------------------------
 # Concentration Rankings (HHI-based supplier diversity)
 # ---------------------------------------------------------------------------
-_hhi_cache: Dict[str, Any] = {}
-_HHI_TTL = 7200  # 2 hours
+_hhi_cache = SimpleCache(namespace="institutions_hhi")
 
 
 @router.get("/concentration-rankings")
@@ -2072,12 +2039,11 @@ def get_concentration_rankings(
     >2500 = highly concentrated; <1000 = competitive.
     Based on Prozorro (Ukraine) analytics / Fazekas CRI methodology.
     """
-    import time as _time
     import sqlite3
     cache_key = f"hhi_{year}_{sector_id}_{limit}"
     cached = _hhi_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _HHI_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     with get_db() as conn:
         conn.row_factory = sqlite3.Row
@@ -2208,7 +2174,7 @@ def get_concentration_rankings(
             "least_concentrated": least_concentrated,
             "note": "HHI >2500 = highly concentrated (few dominant vendors). Based on Prozorro analytics / Fazekas CRI methodology.",
         }
-        _hhi_cache[cache_key] = {"ts": _time.time(), "data": result}
+        _hhi_cache.set(cache_key, result, ttl_seconds=None)
         return result
 
 
@@ -2298,9 +2264,7 @@ def get_institution_officials(
 # ---------------------------------------------------------------------------
 
 # Simple 24h cache for ASF findings (changes at most annually)
-_asf_inst_cache: Dict[str, Any] = {}
-_asf_inst_cache_lock = threading.Lock()
-_ASF_INST_CACHE_TTL = 86400  # 24 hours
+_asf_inst_cache = SimpleCache(namespace="institutions_asf_inst")
 
 
 @router.get("/{institution_id:int}/ground-truth-status")
@@ -2337,10 +2301,9 @@ def get_institution_asf_findings(institution_id: int = Path(..., ge=1)):
     import sqlite3 as _sqlite3
 
     cache_key = f"asf_inst_{institution_id}"
-    with _asf_inst_cache_lock:
-        entry = _asf_inst_cache.get(cache_key)
-        if entry and datetime.now() < entry["expires_at"]:
-            return entry["value"]
+    entry = _asf_inst_cache.get(cache_key)
+    if entry is not None:
+        return entry
 
     with get_db() as conn:
         conn.row_factory = _sqlite3.Row
@@ -2402,9 +2365,5 @@ def get_institution_asf_findings(institution_id: int = Path(..., ge=1)):
             years_audited=len(findings),
         )
 
-    with _asf_inst_cache_lock:
-        _asf_inst_cache[cache_key] = {
-            "value": result,
-            "expires_at": datetime.now() + timedelta(seconds=_ASF_INST_CACHE_TTL),
-        }
+    _asf_inst_cache.set(cache_key, result, ttl_seconds=None)
     return result
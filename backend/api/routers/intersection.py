@@ -32,19 +32,18 @@ registry hits (EFOS, SFP, ground truth).
 import json
 import logging
 import sqlite3
-import threading
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from ..cache import app_cache
-from ..dependencies import get_db, get_db_dep
+from ..dependencies import get_db_dep, get_db_writer
+from ..materialized import materialized
+from ..single_flight import flights
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/intersection", tags=["intersection"])
 
-_intersection_lock = threading.Lock()
-
 # Risk thresholds aligned with the active model (see docs/RISK_METHODOLOGY_v6.md):
 # Critical >= 0.60, High >= 0.40, Medium >= 0.25, Low < 0.25.
 # High+ = "RUBLI flags"; < Medium = "RUBLI doesn't flag."
@@ -129,7 +128,147 @@ def _vendor_row(r: sqlite3.Row) -> dict:
     }
 
 
+def _compute_intersection_summary(conn: sqlite3.Connection, top_n: int, db_key: str) -> dict:
+    """Run the full ladder/ledger scans (~10-20s cold) and persist under ``db_key``."""
+    flags = _RUBLI_FLAGS_THRESHOLD
+
+    # ── Two Worlds: RUBLI model flags × the official record ─────────────
+    # The official record is EFOS + SFP ONLY — NOT ground truth, which is
+    # RUBLI's own training corpus (counting it as "agreement" is circular).
+    # One pass yields all five Venn regions.
+    worlds_row = conn.execute(
+        f"""
+        SELECT
+            SUM(CASE WHEN avg_risk_score >= {flags} THEN 1 ELSE 0 END) AS model_flags,
+            SUM(CASE WHEN {_REG} THEN 1 ELSE 0 END) AS official_record,
+            SUM(CASE WHEN avg_risk_score >= {flags} AND {_REG} THEN 1 ELSE 0 END) AS overlap,
+            SUM(CASE WHEN avg_risk_score >= {flags} AND NOT {_REG} THEN 1 ELSE 0 END) AS model_only,
+            SUM(CASE WHEN avg_risk_score < {flags} AND {_REG} THEN 1 ELSE 0 END) AS blind_spots,
+            SUM(CASE WHEN avg_risk_score >= {flags} AND in_ground_truth=1 AND NOT {_REG}
+                     THEN 1 ELSE 0 END) AS self_documented
+        FROM aria_queue
+        """
+    ).fetchone()
+    high_risk_total = worlds_row["model_flags"] or 0
+
+    # ── The Ghost Ledger: the actionable core of the model-only crescent ─
+    ghost_where = (
+        f"avg_risk_score >= {flags} AND {_NOREG} "
+        f"AND total_contracts >= {_MIN_CONTRACTS} "
+        f"AND primary_pattern IN ({_ghost_in}) "
+        f"AND {_FP_CLEAN} AND {_no_structural_fp} AND {_no_public_entity}"
+    )
+    ghost_count = conn.execute(
+        f"SELECT COUNT(*) FROM aria_queue WHERE {ghost_where}"
+    ).fetchone()[0]
+    ghost_vendors = [
+        _vendor_row(r)
+        for r in conn.execute(
+            f"SELECT {_BASE_COLS} FROM aria_queue WHERE {ghost_where} "
+            f"ORDER BY ips_final DESC LIMIT ?",
+            (top_n,),
+        ).fetchall()
+    ]
+
+    # ── Set-aside: legitimate scale we excluded (auditability) ──────────
+    set_aside_where = (
+        f"avg_risk_score >= {flags} AND {_NOREG} "
+        f"AND (NOT ({_FP_CLEAN}) OR total_value_mxn > {_SET_ASIDE_VALUE_FLOOR})"
+    )
+    set_aside_count = conn.execute(
+        f"SELECT COUNT(*) FROM aria_queue WHERE {set_aside_where}"
+    ).fetchone()[0]
+    set_aside_sample = [
+        _vendor_row(r)
+        for r in conn.execute(
+            f"SELECT {_BASE_COLS} FROM aria_queue WHERE {set_aside_where} "
+            f"ORDER BY total_value_mxn DESC LIMIT 6"
+        ).fetchall()
+    ]
+
+    # ── Overlap zone (the 46): genuine model↔state agreement ────────────
+    confirmed_vendors = [
+        _vendor_row(r)
+        for r in conn.execute(
+            f"SELECT {_BASE_COLS} FROM aria_queue "
+            f"WHERE avg_risk_score >= {flags} AND {_REG} "
+            f"ORDER BY avg_risk_score DESC, total_value_mxn DESC LIMIT ?",
+            (top_n,),
+        ).fetchall()
+    ]
+
+    # ── Blind-spot crescent: state flagged, model clear (humility) ──────
+    blindspot_vendors = [
+        _vendor_row(r)
+        for r in conn.execute(
+            f"SELECT {_BASE_COLS} FROM aria_queue "
+            f"WHERE avg_risk_score < {flags} AND {_REG} "
+            f"ORDER BY total_value_mxn DESC LIMIT ?",
+            (top_n,),
+        ).fetchall()
+    ]
+
+    # ── Registry breakdown (transparency) ───────────────────────────────
+    rb = conn.execute(
+        """
+        SELECT
+            SUM(CASE WHEN is_efos_definitivo=1 THEN 1 ELSE 0 END) AS efos_hits,
+            SUM(CASE WHEN is_sfp_sanctioned=1 THEN 1 ELSE 0 END) AS sfp_hits,
+            SUM(CASE WHEN in_ground_truth=1 THEN 1 ELSE 0 END) AS gt_hits
+        FROM aria_queue
+        WHERE (is_efos_definitivo=1 OR is_sfp_sanctioned=1 OR in_ground_truth=1)
+        """
+    ).fetchone()
+
+    response = {
+        "thresholds": {
+            "rubli_flags": _RUBLI_FLAGS_THRESHOLD,
+            "rubli_clean": _RUBLI_CLEAN_THRESHOLD,
+            "min_contracts": _MIN_CONTRACTS,
+            "ghost_patterns": list(_GHOST_PATTERNS),
+            "set_aside_value_floor": _SET_ASIDE_VALUE_FLOOR,
+        },
+        "high_risk_total": high_risk_total,
+        # The Venn: five regions of RUBLI-model-flags × official-record.
+        "worlds": {
+            "model_flags": high_risk_total,
+            "official_record": worlds_row["official_record"] or 0,
+            "overlap": worlds_row["overlap"] or 0,
+            "model_only": worlds_row["model_only"] or 0,
+            "blind_spots": worlds_row["blind_spots"] or 0,
+            "self_documented": worlds_row["self_documented"] or 0,
+            "ghost_signature": ghost_count,
+        },
+        # Drill-downs — one ranked list per clickable Venn zone.
+        "zones": {
+            "ghost": {"count": ghost_count, "vendors": ghost_vendors},
+            "confirmed": {"count": worlds_row["overlap"] or 0, "vendors": confirmed_vendors},
+            "blindspot": {"count": worlds_row["blind_spots"] or 0, "vendors": blindspot_vendors},
+        },
+        "set_aside": {"count": set_aside_count, "sample": set_aside_sample},
+        "registry_breakdown": {
+            "efos_definitivo": rb["efos_hits"] or 0,
+            "sfp_sanctioned": rb["sfp_hits"] or 0,
+            "in_ground_truth": rb["gt_hits"] or 0,
+        },
+    }
+
+    try:
+        with get_db_writer() as wconn:
+            wconn.execute(
+                "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at)"
+                " VALUES(?, ?, datetime('now'))",
+                (db_key, json.dumps(response, default=str)),
+            )
+            wconn.commit()
+    except Exception as e:
+        logger.warning("intersection_summary persist failed: %s", e)
+
+    return response
+
+
 @router.get("/summary")
+@materialized("intersection_summary")
 def get_intersection_summary(
     top_n: int = Query(20, ge=1, le=60, description="Ghost-ledger rows to return"),
     conn: sqlite3.Connection = Depends(get_db_dep),
@@ -175,149 +314,12 @@ def get_intersection_summary(
     except Exception:
         pass
 
-    # Mutex: only one worker runs the scans; others wait and re-check.
-    with _intersection_lock:
-        cached2 = app_cache.get("intersection", cache_key)
-        if cached2 is not None:
-            return cached2
-
-        flags = _RUBLI_FLAGS_THRESHOLD
-
-        # ── Two Worlds: RUBLI model flags × the official record ─────────────
-        # The official record is EFOS + SFP ONLY — NOT ground truth, which is
-        # RUBLI's own training corpus (counting it as "agreement" is circular).
-        # One pass yields all five Venn regions.
-        worlds_row = conn.execute(
-            f"""
-            SELECT
-                SUM(CASE WHEN avg_risk_score >= {flags} THEN 1 ELSE 0 END) AS model_flags,
-                SUM(CASE WHEN {_REG} THEN 1 ELSE 0 END) AS official_record,
-                SUM(CASE WHEN avg_risk_score >= {flags} AND {_REG} THEN 1 ELSE 0 END) AS overlap,
-                SUM(CASE WHEN avg_risk_score >= {flags} AND NOT {_REG} THEN 1 ELSE 0 END) AS model_only,
-                SUM(CASE WHEN avg_risk_score < {flags} AND {_REG} THEN 1 ELSE 0 END) AS blind_spots,
-                SUM(CASE WHEN avg_risk_score >= {flags} AND in_ground_truth=1 AND NOT {_REG}
-                         THEN 1 ELSE 0 END) AS self_documented
-            FROM aria_queue
-            """
-        ).fetchone()
-        high_risk_total = worlds_row["model_flags"] or 0
-
-        # ── The Ghost Ledger: the actionable core of the model-only crescent ─
-        ghost_where = (
-            f"avg_risk_score >= {flags} AND {_NOREG} "
-            f"AND total_contracts >= {_MIN_CONTRACTS} "
-            f"AND primary_pattern IN ({_ghost_in}) "
-            f"AND {_FP_CLEAN} AND {_no_structural_fp} AND {_no_public_entity}"
-        )
-        ghost_count = conn.execute(
-            f"SELECT COUNT(*) FROM aria_queue WHERE {ghost_where}"
-        ).fetchone()[0]
-        ghost_vendors = [
-            _vendor_row(r)
-            for r in conn.execute(
-                f"SELECT {_BASE_COLS} FROM aria_queue WHERE {ghost_where} "
-                f"ORDER BY ips_final DESC LIMIT ?",
-                (top_n,),
-            ).fetchall()
-        ]
-
-        # ── Set-aside: legitimate scale we excluded (auditability) ──────────
-        set_aside_where = (
-            f"avg_risk_score >= {flags} AND {_NOREG} "
-            f"AND (NOT ({_FP_CLEAN}) OR total_value_mxn > {_SET_ASIDE_VALUE_FLOOR})"
-        )
-        set_aside_count = conn.execute(
-            f"SELECT COUNT(*) FROM aria_queue WHERE {set_aside_where}"
-        ).fetchone()[0]
-        set_aside_sample = [
-            _vendor_row(r)
-            for r in conn.execute(
-                f"SELECT {_BASE_COLS} FROM aria_queue WHERE {set_aside_where} "
-                f"ORDER BY total_value_mxn DESC LIMIT 6"
-            ).fetchall()
-        ]
-
-        # ── Overlap zone (the 46): genuine model↔state agreement ────────────
-        confirmed_vendors = [
-            _vendor_row(r)
-            for r in conn.execute(
-                f"SELECT {_BASE_COLS} FROM aria_queue "
-                f"WHERE avg_risk_score >= {flags} AND {_REG} "
-                f"ORDER BY avg_risk_score DESC, total_value_mxn DESC LIMIT ?",
-                (top_n,),
-            ).fetchall()
-        ]
-
-        # ── Blind-spot crescent: state flagged, model clear (humility) ──────
-        blindspot_vendors = [
-            _vendor_row(r)
-            for r in conn.execute(
-                f"SELECT {_BASE_COLS} FROM aria_queue "
-                f"WHERE avg_risk_score < {flags} AND {_REG} "
-                f"ORDER BY total_value_mxn DESC LIMIT ?",
-                (top_n,),
-            ).fetchall()
-        ]
-
-        # ── Registry breakdown (transparency) ───────────────────────────────
-        rb = conn.execute(
-            """
-            SELECT
-                SUM(CASE WHEN is_efos_definitivo=1 THEN 1 ELSE 0 END) AS efos_hits,
-                SUM(CASE WHEN is_sfp_sanctioned=1 THEN 1 ELSE 0 END) AS sfp_hits,
-                SUM(CASE WHEN in_ground_truth=1 THEN 1 ELSE 0 END) AS gt_hits
-            FROM aria_queue
-            WHERE (is_efos_definitivo=1 OR is_sfp_sanctioned=1 OR in_ground_truth=1)
-            """
-        ).fetchone()
-
-        response = {
-            "thresholds": {
-                "rubli_flags": _RUBLI_FLAGS_THRESHOLD,
-                "rubli_clean": _RUBLI_CLEAN_THRESHOLD,
-                "min_contracts": _MIN_CONTRACTS,
-                "ghost_patterns": list(_GHOST_PATTERNS),
-                "set_aside_value_floor": _SET_ASIDE_VALUE_FLOOR,
-            },
-            "high_risk_total": high_risk_total,
-            # The Venn: five regions of RUBLI-model-flags × official-record.
-            "worlds": {
-                "model_flags": high_risk_total,
-                "official_record": worlds_row["official_record"] or 0,
-                "overlap": worlds_row["overlap"] or 0,
-                "model_only": worlds_row["model_only"] or 0,
-                "blind_spots": worlds_row["blind_spots"] or 0,
-                "self_documented": worlds_row["self_documented"] or 0,
-                "ghost_signature": ghost_count,
-            },
-            # Drill-downs — one ranked list per clickable Venn zone.
-            "zones": {
-                "ghost": {"count": ghost_count, "vendors": ghost_vendors},
-                "confirmed": {"count": worlds_row["overlap"] or 0, "vendors": confirmed_vendors},
-                "blindspot": {"count": worlds_row["blind_spots"] or 0, "vendors": blindspot_vendors},
-            },
-            "set_aside": {"count": set_aside_count, "sample": set_aside_sample},
-            "registry_breakdown": {
-                "efos_definitivo": rb["efos_hits"] or 0,
-                "sfp_sanctioned": rb["sfp_hits"] or 0,
-                "in_ground_truth": rb["gt_hits"] or 0,
-            },
-        }
-        app_cache.set("intersection", cache_key, response, maxsize=8, ttl=600)
-
-    # Persist outside the lock so a slow disk write doesn't block waiters.
-    try:
-        with get_db() as wconn:
-            wconn.execute(
-                "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at)"
-                " VALUES(?, ?, datetime('now'))",
-                (db_key, json.dumps(response, default=str)),
-            )
-            wconn.commit()
-    except Exception as e:
-        logger.warning("intersection_summary persist failed: %s", e)
-
-    return response
+    # Single flight: concurrent cold callers (in any worker) share one scan.
+    return flights.do(
+        "intersection", cache_key,
+        lambda: _compute_intersection_summary(conn, top_n, db_key),
+        maxsize=8, ttl=600, timeout=180,
+    )
 
 
 # NOTE: GET /quadrant/{quadrant} removed 2026-06-11 — the contradiction-quadrant
@@ -14,7 +14,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Path
 from pydantic import BaseModel, Field
 from datetime import datetime
 
-from ..dependencies import get_db_connection, get_db, require_write_key
+from ..data_epoch import bump_review_epoch
+from ..dependencies import get_db, get_db_writer, require_write_key
 from ..config.constants import get_risk_level
 from ..models.asf import ASFCase, ASFMatchesResponse
 
@@ -663,7 +664,7 @@ def review_case(
     """
     Update case review status (for human validation).
     """
-    with get_db() as conn:
+    with get_db_writer() as conn:
         cursor = conn.cursor()
 
         # Validate status
@@ -884,7 +885,7 @@ def add_evidence(
     Append external evidence (news articles, ASF audits, legal docs) to a case.
     Optionally updates validation_status.
     """
-    with get_db() as conn:
+    with get_db_writer() as conn:
         cursor = conn.cursor()
 
         # Get existing news_hits
@@ -951,7 +952,7 @@ def promote_to_ground_truth(
     Promote a corroborated investigation case to ground_truth_cases + ground_truth_vendors.
     Creates the bridge for retraining the v4.0 risk model.
     """
-    with get_db() as conn:
+    with get_db_writer() as conn:
         cursor = conn.cursor()
 
         # Get case
@@ -1021,6 +1022,7 @@ def promote_to_ground_truth(
             vendors_promoted += 1
 
         conn.commit()
+        bump_review_epoch(conn, "investigation_promote_gt")
 
         return {
             "success": True,
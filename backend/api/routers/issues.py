@@ -12,7 +12,7 @@ from typing import Optional
 import sqlite3
 import logging
 
-from ..dependencies import get_db, require_write_key
+from ..dependencies import get_db_writer, require_write_key
 
 logger = logging.getLogger(__name__)
 
@@ -94,7 +94,7 @@ def submit_issue(body: IssueIn):
         raise HTTPException(status_code=400, detail="description is required")
 
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             _ensure_table(conn)
             cursor = conn.execute(
                 """
@@ -128,7 +128,7 @@ def list_issues(
 ):
     """List submitted issues (admin view)."""
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             _ensure_table(conn)
             conditions: list[str] = []
             params: list = []
@@ -159,7 +159,7 @@ def update_issue_status(issue_id: int, status: str, _: None = Depends(require_wr
             detail=f"status must be one of {sorted(VALID_STATUSES)}",
         )
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             _ensure_table(conn)
             conn.execute(
                 "UPDATE user_issues SET status = ? WHERE id = ?",
@@ -8,12 +8,13 @@ import json
 import sqlite3
 import logging
 import threading
-import time
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, HTTPException, Query, Path, Request
 from pydantic import BaseModel, Field
 
-from ..dependencies import get_db
+from ..cache import SimpleCache
+from ..dependencies import get_db, get_db_writer
+from ..materialized import materialized
 from ..config.constants import MAX_CONTRACT_VALUE
 from ..services.network_service import network_service
 
@@ -37,25 +38,8 @@ def _rate_limit(limit_string: str):
     return lambda f: f
 
 
-# Thread-safe cache for expensive network queries
-class _NetworkCache:
-    def __init__(self):
-        self._lock = threading.Lock()
-        self._store: Dict[str, Any] = {}
-        self._expiry: Dict[str, float] = {}
-
-    def get(self, key: str):
-        with self._lock:
-            if key in self._store and time.time() < self._expiry.get(key, 0):
-                return self._store[key]
-            return None
-
-    def set(self, key: str, value: Any, ttl: int = 3600):
-        with self._lock:
-            self._store[key] = value
-            self._expiry[key] = time.time() + ttl
-
-_network_cache = _NetworkCache()
+# Cache for expensive network queries, valid until the data epoch changes
+_network_cache = SimpleCache(namespace="network", maxsize=1024)
 
 # Mutex preventing 6 Gunicorn workers from computing communities simultaneously.
 # Same double-checked-locking + precomputed_stats pattern as aria.py / intersection.py.
@@ -277,7 +261,7 @@ def get_network_graph(
         total_value=data["total_value"],
     )
     if cache_key:
-        _network_cache.set(cache_key, result, ttl=3600)
+        _network_cache.set(cache_key, result, ttl_seconds=None)
     return result
 
 
@@ -675,7 +659,7 @@ def get_pattern_spotlight():
             ))
 
     result = PatternSpotlightResponse(patterns=patterns_out)
-    _network_cache.set("pattern_spotlight", result, ttl=7200)
+    _network_cache.set("pattern_spotlight", result, ttl_seconds=None)
     return result
 
 
@@ -695,6 +679,7 @@ class CommunitiesResponse(BaseModel):
 
 @router.get("/communities", response_model=CommunitiesResponse)
 @_rate_limit("20/minute")
+@materialized("network_communities")
 def get_communities(
     request: Request,
     min_size: int = Query(3, ge=2, description="Minimum community size"),
@@ -726,7 +711,7 @@ def get_communities(
                 ).fetchone()
             if row and row["stat_value"]:
                 persisted = CommunitiesResponse(**json.loads(row["stat_value"]))
-                _network_cache.set(cache_key, persisted, ttl=3600)
+                _network_cache.set(cache_key, persisted, ttl_seconds=None)
                 return persisted
         except Exception:
             pass
@@ -770,12 +755,12 @@ def get_communities(
         graph_ready=data["graph_ready"],
     )
 
-    _network_cache.set(cache_key, result, ttl=3600)
+    _network_cache.set(cache_key, result, ttl_seconds=None)
 
     if is_default:
         try:
             payload = result.model_dump()
-            with get_db() as wconn:
+            with get_db_writer() as wconn:
                 wconn.execute(
                     "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at) VALUES(?, ?, datetime('now'))",
                     (_COMMUNITIES_DB_KEY, json.dumps(payload, default=str)),
@@ -842,7 +827,7 @@ def _get_sanction_keys(conn: sqlite3.Connection) -> tuple:
         if name and str(name).strip():
             name_keys.add(str(name).strip().upper())
     result = (rfc_keys, name_keys)
-    _network_cache.set("trama_sanction_keys", result, ttl=86400)
+    _network_cache.set("trama_sanction_keys", result, ttl_seconds=None)
     return result
 
 
@@ -868,7 +853,7 @@ def _get_gt_vendor_counts(conn: sqlite3.Connection) -> Dict[int, int]:
         """
     )
     result: Dict[int, int] = {r["vendor_id"]: r["case_count"] for r in cursor.fetchall()}
-    _network_cache.set("trama_gt_counts", result, ttl=3600)
+    _network_cache.set("trama_gt_counts", result, ttl_seconds=None)
     return result
 
 
@@ -979,7 +964,7 @@ def get_community_index(request: Request):
             ).fetchone()
         if row and row["stat_value"]:
             persisted = CommunityIndexResponse(**json.loads(row["stat_value"]))
-            _network_cache.set("trama_index", persisted, ttl=3600)
+            _network_cache.set("trama_index", persisted, ttl_seconds=None)
             return persisted
     except Exception:
         pass
@@ -994,12 +979,12 @@ def get_community_index(request: Request):
         with get_db() as conn:
             result = _build_community_index(conn)
 
-        _network_cache.set("trama_index", result, ttl=3600)
+        _network_cache.set("trama_index", result, ttl_seconds=None)
 
         # Persist to DB
         try:
             payload = result.model_dump()
-            with get_db() as wconn:
+            with get_db_writer() as wconn:
                 wconn.execute(
                     "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at) "
                     "VALUES(?, ?, datetime('now'))",
@@ -1133,7 +1118,7 @@ def get_community_detail(
         graph_ready=True,
     )
 
-    _network_cache.set(cache_key, result, ttl=3600)
+    _network_cache.set(cache_key, result, ttl_seconds=None)
     return result
 
 
@@ -1547,7 +1532,7 @@ def get_community_graph(
         stats=stats,
     )
 
-    _network_cache.set(cache_key, result, ttl=3600)
+    _network_cache.set(cache_key, result, ttl_seconds=None)
     return result
 
 
@@ -1743,7 +1728,7 @@ def get_institution_capture(
                 ).fetchone()
             if row and row["stat_value"]:
                 full = InstitutionCaptureResponse(**json.loads(row["stat_value"]))
-                _network_cache.set("trama_capture", full, ttl=3600)
+                _network_cache.set("trama_capture", full, ttl_seconds=None)
         except Exception:
             full = None
 
@@ -1753,10 +1738,10 @@ def get_institution_capture(
             if full is None:
                 with get_db() as conn:
                     full = _build_institution_capture(conn)
-                _network_cache.set("trama_capture", full, ttl=3600)
+                _network_cache.set("trama_capture", full, ttl_seconds=None)
                 try:
                     payload = full.model_dump()
-                    with get_db() as wconn:
+                    with get_db_writer() as wconn:
                         wconn.execute(
                             "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at) "
                             "VALUES(?, ?, datetime('now'))",
@@ -1876,5 +1861,5 @@ def get_institution_star(
         total_vendors=base["vendor_count"] or 0,
         vendors=vendors,
     )
-    _network_cache.set(cache_key, result, ttl=3600)
+    _network_cache.set(cache_key, result, ttl_seconds=None)
     return result
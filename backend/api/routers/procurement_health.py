@@ -10,12 +10,11 @@ and verifiable from raw COMPRANET data.
 import sqlite3
 import json
 import logging
-import threading
-import time
 from typing import Optional, Dict, Any, List
 from fastapi import APIRouter, Query, HTTPException
 
 from ..dependencies import get_db
+from ..single_flight import flights
 
 logger = logging.getLogger(__name__)
 
@@ -420,9 +419,11 @@ _GRADE_ORDER = {
     "A": 8, "S": 9, "N/A": -1,
 }
 
-# In-memory fallback cache — prevents the 538s live computation from running on every request
-_phi_cache: dict = {"data": None, "expires": 0, "computing": False}
-_phi_lock = threading.Lock()
+# Fallback cache for the live computation when phi_sectors is not precomputed —
+# prevents the 538s computation from running on every request. Entries live
+# until the data epoch changes.
+_PHI_CACHE = "phi_sectors_live"
+_PHI_TIMEOUT_S = 900
 
 
 def _load_precomputed(conn: sqlite3.Connection, key: str):
@@ -442,35 +443,27 @@ def _load_precomputed(conn: sqlite3.Connection, key: str):
 # Endpoints
 # ---------------------------------------------------------------------------
 
-def _run_phi_computation(year_min: Optional[int], year_max: Optional[int], cache_key: str) -> None:
-    """Compute PHI in a background thread and populate the in-memory cache."""
-    try:
-        with get_db() as conn:
-            sectors = conn.execute("SELECT id, name_en as name FROM sectors ORDER BY id").fetchall()
-            results = []
-            for s in sectors:
-                phi = _compute_sector_phi(conn, sector_id=s["id"],
-                                          year_min=year_min, year_max=year_max)
-                results.append({"sector_id": s["id"], "sector_name": s["name"], **phi})
-            results.sort(key=lambda x: _GRADE_ORDER.get(x.get("grade", "N/A"), 5))
-            national = _compute_sector_phi(conn, year_min=year_min, year_max=year_max)
-            result = {
-                "methodology": _METHODOLOGY,
-                "thresholds": THRESHOLDS,
-                "national": {"sector_name": "National (all sectors)", **national},
-                "sectors": results,
-                "source": "live",
-            }
-        with _phi_lock:
-            _phi_cache["data"] = result
-            _phi_cache["key"] = cache_key
-            _phi_cache["expires"] = time.time() + 3600
-            _phi_cache["computing"] = False
-        logger.info("PHI /sectors background computation complete")
-    except Exception as e:
-        logger.error("PHI /sectors background computation failed: %s", e)
-        with _phi_lock:
-            _phi_cache["computing"] = False
+def _compute_all_sectors_phi(year_min: Optional[int], year_max: Optional[int]) -> dict:
+    """Compute the PHI report card for all sectors live (runs in the background)."""
+    logger.warning("PHI /sectors starting background computation (year_min=%s year_max=%s)",
+                   year_min, year_max)
+    with get_db() as conn:
+        sectors = conn.execute("SELECT id, name_en as name FROM sectors ORDER BY id").fetchall()
+        results = []
+        for s in sectors:
+            phi = _compute_sector_phi(conn, sector_id=s["id"],
+                                      year_min=year_min, year_max=year_max)
+            results.append({"sector_id": s["id"], "sector_name": s["name"], **phi})
+        results.sort(key=lambda x: _GRADE_ORDER.get(x.get("grade", "N/A"), 5))
+        national = _compute_sector_phi(conn, year_min=year_min, year_max=year_max)
+    logger.info("PHI /sectors background computation complete")
+    return {
+        "methodology": _METHODOLOGY,
+        "thresholds": THRESHOLDS,
+        "national": {"sector_name": "National (all sectors)", **national},
+        "sectors": results,
+        "source": "live",
+    }
 
 
 @router.get("/sectors")
@@ -494,25 +487,14 @@ async def phi_all_sectors(
                     "source": "precomputed",
                 }
 
-    # phi_sectors missing: check in-memory cache or start background computation
-    cache_key = f"{year_min}_{year_max}"
-    now = time.time()
-    with _phi_lock:
-        if _phi_cache.get("data") and _phi_cache.get("key") == cache_key and now < _phi_cache.get("expires", 0):
-            return _phi_cache["data"]
-        if _phi_cache.get("computing"):
-            raise HTTPException(
-                status_code=503,
-                detail="PHI sector data is being computed (~8 minutes). Please retry shortly.",
-                headers={"Retry-After": "60"},
-            )
-        # Start background computation
-        _phi_cache["computing"] = True
-
-    logger.warning("PHI /sectors starting background computation (year_min=%s year_max=%s)",
-                   year_min, year_max)
-    t = threading.Thread(target=_run_phi_computation, args=(year_min, year_max, cache_key), daemon=True)
-    t.start()
+    # phi_sectors missing: serve the live result or start its background computation
+    result = flights.get_or_start(
+        _PHI_CACHE, f"{year_min}_{year_max}",
+        lambda: _compute_all_sectors_phi(year_min, year_max),
+        maxsize=16, ttl=None, timeout=_PHI_TIMEOUT_S,
+    )
+    if result is not None:
+        return result
     raise HTTPException(
         status_code=503,
         detail="PHI sector data is being computed (~8 minutes). Please retry shortly.",
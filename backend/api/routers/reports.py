@@ -9,21 +9,22 @@ Provides comprehensive reports for journalists and investigators:
 """
 
 import logging
-import time as _time
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, HTTPException, Query, Path
 from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
 
+from ..cache import SimpleCache
 from ..dependencies import get_db
+from ..materialized import SECTOR_IDS, grid, materialized
 from ..services.report_service import report_service
+from ..services.risk_factor_index import FACTOR_IDS, risk_factor_index_ready
 
-# 24h cache for sector reports — full sector analytics rebuild takes 346s on
-# 3M rows (audit 2026-05-04). Reports are static between ETL runs; cache TTL
-# matches the daily ETL cadence.
-_sector_report_cache: Dict[int, Any] = {}
-_SECTOR_REPORT_TTL = 86400
+# Sector reports — full sector analytics rebuild takes 346s on 3M rows
+# (audit 2026-05-04). Reports are static between ETL runs, so entries live
+# until the data epoch changes.
+_sector_report_cache = SimpleCache(namespace="sector_reports", maxsize=16)
 
 logger = logging.getLogger(__name__)
 
@@ -437,6 +438,7 @@ class SectorReport(BaseModel):
 
 
 @router.get("/sector/{sector_id}", response_model=SectorReport)
+@materialized("sector_report", grid=grid(sector_id=SECTOR_IDS))
 def get_sector_report(
     sector_id: int = Path(..., ge=1, le=12, description="Sector ID (1-12)"),
 ):
@@ -450,9 +452,9 @@ def get_sector_report(
     - Risk factor patterns
     - Year-over-year trends
     """
-    cached = _sector_report_cache.get(sector_id)
-    if cached and (_time.time() - cached["ts"]) < _SECTOR_REPORT_TTL:
-        return cached["data"]
+    cached = _sector_report_cache.get(str(sector_id))
+    if cached is not None:
+        return cached
 
     with get_db() as conn:
         data = report_service.generate_sector_report(conn, sector_id)
@@ -476,7 +478,7 @@ def get_sector_report(
         year_trends=data["year_trends"],
         notable_findings=data["notable_findings"],
     )
-    _sector_report_cache[sector_id] = {"ts": _time.time(), "data": result}
+    _sector_report_cache.set(str(sector_id), result, ttl_seconds=None)
     return result
 
 
@@ -541,9 +543,14 @@ def get_thematic_report(
                 title = "Threshold Splitting Detection"
                 methodology = """Detection of potential threshold splitting through same-day
                 contracts to same vendor/institution combinations."""
-                # Contracts where risk_factors contains 'split'
-                where_clause = "risk_factors LIKE '%split%'"
-                baseline_clause = "risk_factors NOT LIKE '%split%' OR risk_factors IS NULL"
+                # Contracts carrying a split_N factor (bitmask once indexed)
+                if risk_factor_index_ready(conn):
+                    split_bit = 1 << FACTOR_IDS["split"]
+                    where_clause = f"(risk_factor_mask & {split_bit}) != 0"
+                    baseline_clause = f"(risk_factor_mask & {split_bit}) = 0"
+                else:
+                    where_clause = "risk_factors LIKE '%split%'"
+                    baseline_clause = "risk_factors NOT LIKE '%split%' OR risk_factors IS NULL"
 
             # Get affected contracts summary
             cursor.execute(f"""
@@ -12,6 +12,7 @@ from fastapi import APIRouter, Query
 from pydantic import BaseModel
 
 from ..dependencies import get_db
+from ..services.name_search_index import INSTITUTION_FTS, VENDOR_FTS, ranked_matches
 
 logger = logging.getLogger(__name__)
 
@@ -66,10 +67,18 @@ class FederatedSearchResponse(BaseModel):
 def _search_vendors(q: str, limit: int) -> list[VendorResult]:
     try:
         with get_db() as conn:
-            # Use name_normalized index when available (2x faster than raw name LIKE).
-            # Also match rfc prefix. LEFT JOINs attach watchlist flags at query time.
+            # Trigram index (rowid = contract-volume rank) answers top-k directly;
+            # short terms or a missing index fall back to the name_normalized/RFC LIKE scan.
+            ids = ranked_matches(conn, VENDOR_FTS, q, limit)
+            if ids is not None:
+                where = f"v.id IN ({','.join('?' * len(ids))})" if ids else "0"
+                params: tuple = tuple(ids)
+            else:
+                where = "v.name_normalized LIKE ? OR (v.rfc IS NOT NULL AND v.rfc LIKE ?)"
+                params = (f"%{q}%", f"%{q}%")
+            # LEFT JOINs attach watchlist flags at query time.
             cur = conn.execute(
-                """
+                f"""
                 SELECT v.id, v.name, v.rfc,
                        COALESCE(vs.total_contracts, 0) AS contracts,
                        vs.avg_risk_score,
@@ -82,12 +91,11 @@ def _search_vendors(q: str, limit: int) -> list[VendorResult]:
                 LEFT JOIN (
                     SELECT rfc, MIN(stage) AS stage FROM sat_efos_vendors GROUP BY rfc
                 ) efos ON v.rfc IS NOT NULL AND v.rfc != '' AND v.rfc = efos.rfc
-                WHERE v.name_normalized LIKE ?
-                   OR (v.rfc IS NOT NULL AND v.rfc LIKE ?)
+                WHERE {where}
                 ORDER BY contracts DESC
                 LIMIT ?
                 """,
-                (f"%{q}%", f"%{q}%", limit),
+                (*params, limit),
             )
             rows = cur.fetchall()
         return [
@@ -110,17 +118,24 @@ def _search_vendors(q: str, limit: int) -> list[VendorResult]:
 def _search_institutions(q: str, limit: int) -> list[InstitutionResult]:
     try:
         with get_db() as conn:
+            ids = ranked_matches(conn, INSTITUTION_FTS, q, limit)
+            if ids is not None:
+                where = f"i.id IN ({','.join('?' * len(ids))})" if ids else "0"
+                params: tuple = tuple(ids)
+            else:
+                where = "i.name LIKE ? OR COALESCE(i.siglas, '') LIKE ?"
+                params = (f"%{q}%", f"%{q}%")
             cur = conn.execute(
-                """
+                f"""
                 SELECT i.id, i.name, i.institution_type,
                        COALESCE(ist.total_contracts, 0) AS total_contracts
                 FROM institutions i
                 LEFT JOIN institution_stats ist ON i.id = ist.institution_id
-                WHERE i.name LIKE ? OR COALESCE(i.siglas, '') LIKE ?
+                WHERE {where}
                 ORDER BY total_contracts DESC
                 LIMIT ?
                 """,
-                (f"%{q}%", f"%{q}%", limit),
+                (*params, limit),
             )
             rows = cur.fetchall()
         return [
@@ -151,8 +166,9 @@ def sanitize_fts_query(q: str) -> str:
 def _search_contracts(q: str, limit: int) -> list[ContractResult]:
     """Search contracts by title using FTS5 if available, falling back to LIKE.
 
-    FTS5 table `contracts_fts` (rowid = contracts.id, content = title) is built
-    once by the migration script and reduces this query from ~24s → <200ms.
+    FTS5 table `contracts_fts` (rowid = contracts.id, content = title and
+    description, see services/contract_text_index.py) is built once by the
+    migration script and reduces this query from ~24s → <200ms.
     If the FTS table doesn't exist we fall back to the slow LIKE scan so the
     endpoint still works on dev environments without the migration applied.
     """
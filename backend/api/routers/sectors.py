@@ -13,15 +13,20 @@ from fastapi import APIRouter, Query, HTTPException, Path, Request
 from ..dependencies import get_db
 from ..config.constants import MAX_CONTRACT_VALUE
 from ..cache import SimpleCache
+from ..single_flight import single_flight
+from ..materialized import SECTOR_IDS, grid, materialized
+from ..services.analysis_service import analysis_service
+from ..services.query_builder import AggregateQuery
 
 
 # Global cache instance
-_cache = SimpleCache()
+_cache = SimpleCache(namespace="sectors")
 
-# Cache TTL constants
-SECTORS_CACHE_TTL = 7200      # 2 hours for sector statistics
-ANALYSIS_CACHE_TTL = 3600     # 1 hour for analysis overview
-CONCENTRATION_CACHE_TTL = 7200  # 2 hours for vendor concentration
+# Cache TTL constants. None = valid until the data epoch changes (sector
+# aggregates only move when a pipeline stage runs; see api/data_epoch.py).
+SECTORS_CACHE_TTL = None
+ANALYSIS_CACHE_TTL = None
+CONCENTRATION_CACHE_TTL = None
 
 # Optional rate limiting - gracefully degrade if not available
 try:
@@ -78,6 +83,7 @@ SECTOR_COLORS = {
 
 
 @router.get("/sectors", response_model=SectorListResponse)
+@materialized("sectors_list")
 def list_sectors(
     year: Optional[int] = Query(None, ge=2002, le=2026, description="Filter by year"),
 ):
@@ -422,6 +428,7 @@ def get_sectors_trends_bundle():
 
 
 @router.get("/sectors/{sector_id}", response_model=SectorDetailResponse)
+@materialized("sector_detail", grid=grid(sector_id=SECTOR_IDS))
 def get_sector(
     sector_id: int = Path(..., ge=1, le=12, description="Sector ID (1-12)"),
 ):
@@ -566,31 +573,23 @@ def get_sector(
                     pass
 
             if not trends:
-                # Fallback: live trends query — limit to last 10 years to keep it fast
-                trends_query = """
-                    SELECT
-                        contract_year,
-                        COUNT(*) as total_contracts,
-                        COALESCE(SUM(amount_mxn), 0) as total_value,
-                        COALESCE(AVG(risk_score), 0) as avg_risk,
-                        ROUND(SUM(CASE WHEN is_direct_award = 1 THEN 1.0 ELSE 0 END) / COUNT(*) * 100, 2) as direct_pct,
-                        ROUND(SUM(CASE WHEN is_single_bid = 1 THEN 1.0 ELSE 0 END) / COUNT(*) * 100, 2) as single_pct
-                    FROM contracts
-                    WHERE sector_id = ? AND contract_year IS NOT NULL
-                      AND contract_year >= 2015
-                    GROUP BY contract_year
-                    ORDER BY contract_year
-                """
-                cursor.execute(trends_query, (sector_id,))
-                trends_rows = cursor.fetchall()
+                # Fallback: live trends (contracts_cube when current) — last 10 years
+                trends_rows = analysis_service.aggregate(
+                    conn,
+                    AggregateQuery("contracts", "total_value", "avg_risk", "direct_awards", "single_bids")
+                    .filter("sector_id", "=", sector_id)
+                    .filter("contract_year", ">=", 2015)
+                    .group_by("contract_year")
+                    .order_by("contract_year"),
+                )
                 trends = [
                     SectorTrend(
-                        year=row[0],
-                        total_contracts=row[1],
-                        total_value_mxn=row[2],
-                        avg_risk_score=round(row[3], 4),
-                        direct_award_pct=row[4] or 0,
-                        single_bid_pct=row[5] or 0,
+                        year=row["contract_year"],
+                        total_contracts=row["contracts"],
+                        total_value_mxn=row["total_value"] or 0,
+                        avg_risk_score=round(row["avg_risk"] or 0, 4),
+                        direct_award_pct=round(row["direct_awards"] * 100.0 / row["contracts"], 2),
+                        single_bid_pct=round(row["single_bids"] * 100.0 / row["contracts"], 2),
                     )
                     for row in trends_rows
                 ]
@@ -612,6 +611,7 @@ def get_sector(
 
 
 @router.get("/sectors/{sector_id}/timeline")
+@materialized("sector_timeline", grid=grid(sector_id=SECTOR_IDS))
 def get_sector_timeline(
     sector_id: int = Path(..., ge=1, le=12, description="Sector ID (1-12)"),
 ):
@@ -701,6 +701,7 @@ def get_sector_timeline(
 
 
 @router.get("/sectors/{sector_id}/trends", response_model=SectorTrendListResponse)
+@materialized("sector_trends", grid=grid(sector_id=SECTOR_IDS))
 def get_sector_trends(
     sector_id: int = Path(..., ge=1, le=12, description="Sector ID"),
     start_year: Optional[int] = Query(None, ge=2002, description="Start year"),
@@ -798,6 +799,7 @@ def get_sector_trends(
 
 @router.get("/analysis/overview", response_model=AnalysisOverview)
 @rate_limit("30/minute")
+@materialized("analysis_overview")
 def get_analysis_overview(request: Request):
     """
     Get high-level analysis overview.
@@ -923,6 +925,7 @@ def get_analysis_overview(request: Request):
 
 
 @router.get("/analysis/risk-distribution", response_model=RiskDistributionListResponse)
+@materialized("analysis_risk_distribution", grid=grid(sector_id=SECTOR_IDS))
 def get_risk_distribution(
     sector_id: Optional[int] = Query(None, ge=1, le=12, description="Filter by sector ID (1-12)"),
     year: Optional[int] = Query(None, description="Filter by year"),
@@ -1018,43 +1021,19 @@ def get_risk_distribution(
                         _cache.set(cache_key, result, ttl_seconds=7200)
                         return result
 
-            # Slow path: live query with filters
-            # safe: conditions list contains only hardcoded column names, values are parameterized
-            conditions = []
-            params: list = []
-
-            if sector_id:
-                conditions.append("sector_id = ?")
-                params.append(sector_id)
-
-            if year:
-                conditions.append("contract_year = ?")
-                params.append(year)
-
-            where_clause = " AND ".join(conditions) if conditions else "1=1"
-
-            query = f"""
-                SELECT
-                    risk_level,
-                    COUNT(*) as count,
-                    SUM(amount_mxn) as total_value
-                FROM contracts
-                WHERE {where_clause}
-                GROUP BY risk_level
-                ORDER BY
-                    CASE risk_level
-                        WHEN 'low' THEN 1
-                        WHEN 'medium' THEN 2
-                        WHEN 'high' THEN 3
-                        WHEN 'critical' THEN 4
-                        ELSE 5
-                    END
-            """
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-
-            cursor.execute(f"SELECT COUNT(*) FROM contracts WHERE {where_clause}", params)
-            total = cursor.fetchone()[0]
+            # Slow path: live aggregate with filters (contracts_cube when current)
+            rows = analysis_service.aggregate(
+                conn,
+                AggregateQuery("contracts", "total_value")
+                .filter("sector_id", "=", sector_id or None)
+                .filter("contract_year", "=", year or None)
+                .group_by("risk_level")
+                .order_by(
+                    "CASE risk_level WHEN 'low' THEN 1 WHEN 'medium' THEN 2 "
+                    "WHEN 'high' THEN 3 WHEN 'critical' THEN 4 ELSE 5 END"
+                ),
+            )
+            total = sum(row["contracts"] for row in rows)
 
             distribution = [
                 RiskDistribution(
@@ -1076,6 +1055,8 @@ def get_risk_distribution(
 
 
 @router.get("/analysis/vendor-concentration", response_model=SectorComparisonListResponse)
+@materialized("analysis_vendor_concentration", grid=[{"top_n": 3}])
+@single_flight("sectors_vendor_concentration", ttl=CONCENTRATION_CACHE_TTL, timeout=180)
 def get_vendor_concentration(
     top_n: int = Query(10, ge=1, le=50, description="Number of top vendors"),
 ):
@@ -1083,15 +1064,10 @@ def get_vendor_concentration(
     Get vendor concentration analysis.
 
     Returns sectors ranked by concentration of contracts among top vendors.
-    Response is cached for 2 hours to improve performance.
+    Cached until the data changes; a burst of cold requests (70-80s scan)
+    shares a single computation across workers.
     Uses per-sector queries instead of a single window function for speed.
     """
-    # Check cache first
-    cache_key = f"vendor_concentration:{top_n}"
-    cached = _cache.get(cache_key)
-    if cached is not None:
-        return cached
-
     try:
         with get_db() as conn:
             cursor = conn.cursor()
@@ -1145,11 +1121,7 @@ def get_vendor_concentration(
             for i, item in enumerate(items):
                 item.rank = i + 1
 
-            response = SectorComparisonListResponse(data=items)
-
-            # Cache the response for 2 hours
-            _cache.set(cache_key, response, CONCENTRATION_CACHE_TTL)
-            return response
+            return SectorComparisonListResponse(data=items)
 
     except sqlite3.Error as e:
         logger.error(f"Database error in get_vendor_concentration: {e}")
@@ -1157,17 +1129,13 @@ def get_vendor_concentration(
 
 
 @router.get("/analysis/direct-award-rate", response_model=SectorComparisonListResponse)
+@single_flight("sectors_direct_award_rate", ttl=SECTORS_CACHE_TTL)
 def get_direct_award_rate():
     """
     Get direct award rate by sector.
 
     Returns sectors ranked by percentage of direct awards.
     """
-    cache_key = "direct_award_rate"
-    cached = _cache.get(cache_key)
-    if cached is not None:
-        return cached
-
     try:
         with get_db() as conn:
             cursor = conn.cursor()
@@ -1196,9 +1164,7 @@ def get_direct_award_rate():
                 for i, row in enumerate(rows)
             ]
 
-            response = SectorComparisonListResponse(data=items)
-            _cache.set(cache_key, response, SECTORS_CACHE_TTL)
-            return response
+            return SectorComparisonListResponse(data=items)
 
     except sqlite3.Error as e:
         logger.error(f"Database error in get_direct_award_rate: {e}")
@@ -1206,6 +1172,7 @@ def get_direct_award_rate():
 
 
 @router.get("/analysis/single-bid-rate", response_model=SectorComparisonListResponse)
+@single_flight("sectors_single_bid_rate", ttl=SECTORS_CACHE_TTL)
 def get_single_bid_rate():
     """
     Get single bid rate by sector.
@@ -1213,11 +1180,6 @@ def get_single_bid_rate():
     Returns sectors ranked by percentage of single-bid contracts
     (competitive procedures with only one bidder).
     """
-    cache_key = "single_bid_rate"
-    cached = _cache.get(cache_key)
-    if cached is not None:
-        return cached
-
     try:
         with get_db() as conn:
             cursor = conn.cursor()
@@ -1246,9 +1208,7 @@ def get_single_bid_rate():
                 for i, row in enumerate(rows)
             ]
 
-            response = SectorComparisonListResponse(data=items)
-            _cache.set(cache_key, response, SECTORS_CACHE_TTL)
-            return response
+            return SectorComparisonListResponse(data=items)
 
     except sqlite3.Error as e:
         logger.error(f"Database error in get_single_bid_rate: {e}")
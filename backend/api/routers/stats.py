@@ -1,8 +1,6 @@
 """API router for classification and database statistics endpoints."""
 import json
 import logging
-import threading
-import time
 from fastapi import APIRouter, Response
 
 logger = logging.getLogger(__name__)
@@ -10,31 +8,17 @@ from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
-from ..dependencies import get_db
+from ..cache import SimpleCache, app_cache
+from ..dependencies import get_db, get_db_writer
+from ..single_flight import flights
+from ..services.analysis_service import analysis_service
+from ..services.query_builder import AggregateQuery
 
 
 # =============================================================================
-# SIMPLE THREAD-SAFE CACHE
+# CACHE (valid until the data epoch changes)
 # =============================================================================
-class _StatsCache:
-    """Thread-safe TTL cache for expensive stats queries."""
-    def __init__(self):
-        self._lock = threading.Lock()
-        self._store: Dict[str, Any] = {}
-        self._expiry: Dict[str, float] = {}
-
-    def get(self, key: str):
-        with self._lock:
-            if key in self._store and time.time() < self._expiry.get(key, 0):
-                return self._store[key]
-            return None
-
-    def set(self, key: str, value: Any, ttl: int = 3600):
-        with self._lock:
-            self._store[key] = value
-            self._expiry[key] = time.time() + ttl
-
-_stats_cache = _StatsCache()
+_stats_cache = SimpleCache(namespace="stats")
 from ..models.stats import (
     ClassificationStatsResponse,
     IndustryCoverage,
@@ -115,7 +99,7 @@ def get_database_stats(response: Response):
             min_year=min_year,
             max_year=max_year,
         )
-        _stats_cache.set("database_stats", result, ttl=300)
+        _stats_cache.set("database_stats", result, ttl_seconds=None)
         response.headers["Cache-Control"] = "public, max-age=300"
         return result
 
@@ -284,10 +268,11 @@ def get_fast_dashboard(response: Response):
                 cached_at=None
             )
 
-        # Fetch all precomputed stats
+        # Fetch all precomputed stats (not the materialized endpoint payloads)
         cursor.execute("""
             SELECT stat_key, stat_value, updated_at
             FROM precomputed_stats
+            WHERE stat_key NOT LIKE 'mv:%'
         """)
         rows = cursor.fetchall()
 
@@ -345,18 +330,17 @@ def get_fast_dashboard(response: Response):
         overview = stats.get('overview', {})
         if not risk_distribution or all(r.get("count", 0) == 0 for r in risk_distribution):
             try:
-                rd_rows = cursor.execute("""
-                    SELECT risk_level, COUNT(*) as cnt,
-                           ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM contracts), 2) as pct,
-                           COALESCE(SUM(amount_mxn), 0) as total_value
-                    FROM contracts
-                    WHERE risk_level IS NOT NULL
-                    GROUP BY risk_level
-                """).fetchall()
+                # contracts_cube when current, else a contracts scan
+                rd_rows = analysis_service.aggregate(
+                    conn, AggregateQuery("contracts", "total_value").group_by("risk_level"),
+                )
+                all_contracts = sum(r["contracts"] for r in rd_rows)
+                rd_rows = [r for r in rd_rows if r["risk_level"] is not None]
                 if rd_rows:
                     risk_distribution = [
-                        {"risk_level": r["risk_level"], "count": r["cnt"],
-                         "percentage": r["pct"], "total_value_mxn": r["total_value"]}
+                        {"risk_level": r["risk_level"], "count": r["contracts"],
+                         "percentage": round(r["contracts"] * 100.0 / all_contracts, 2),
+                         "total_value_mxn": r["total_value"] or 0}
                         for r in rd_rows
                     ]
             except Exception as e:
@@ -480,8 +464,11 @@ class DataQualityResponse(BaseModel):
     last_calculated: Optional[str] = Field(None, description="When quality was last calculated")
 
 
-_data_quality_lock = threading.Lock()
-_data_quality_scan_in_flight = threading.Event()
+# Shared cache for the full DataQualityResponse; the scan is single-flight
+# across workers (api/single_flight.py).
+_DQ_CACHE = "stats_data_quality"
+_DQ_CACHE_TTL = 7200
+_DQ_SCAN_TIMEOUT_S = 300
 
 
 def _build_degraded_dq_response() -> Optional[DataQualityResponse]:
@@ -527,7 +514,7 @@ def get_data_quality(response: Response):
 
     Returns overall quality score, grade distribution, quality by data period,
     field completeness rates, and key issues to address.
-    Cached for 2 hours in-process. Full result persisted to precomputed_stats
+    Cached for 2 hours (shared across workers). Full result persisted to precomputed_stats
     so subsequent container restarts serve instantly (no 85-second live scan).
 
     2026-05-31 — added cold-start fallback. The 85-second live scan exceeds
@@ -537,7 +524,7 @@ def get_data_quality(response: Response):
     `data_quality` summary key (good enough for the badge) and kick off the
     heavy scan in a background thread so the NEXT request gets full data.
     """
-    cached = _stats_cache.get("data_quality")
+    cached = app_cache.get(_DQ_CACHE, "full")
     if cached is not None:
         response.headers["Cache-Control"] = "public, max-age=3600"
         return cached
@@ -556,7 +543,7 @@ def get_data_quality(response: Response):
     if row is not None:
         try:
             result = DataQualityResponse(**json.loads(row["stat_value"]))
-            _stats_cache.set("data_quality", result, ttl=7200)
+            app_cache.set(_DQ_CACHE, "full", result, maxsize=1, ttl=_DQ_CACHE_TTL)
             response.headers["Cache-Control"] = "public, max-age=3600"
             return result
         except Exception as e:
@@ -567,29 +554,20 @@ def get_data_quality(response: Response):
     # gets the full payload. Without this fallback the 85s scan exceeds the
     # 60s edge proxy timeout, leaving every caller with a connection error.
     degraded = _build_degraded_dq_response()
-    if degraded is not None and not _data_quality_scan_in_flight.is_set():
-        _data_quality_scan_in_flight.set()
-        def _warmup():
-            try:
-                # Synthetic Response object — we only call the scan path for
-                # its side effects (cache write + precomputed_stats persist).
-                _run_data_quality_scan()
-            except Exception as e:
-                logger.warning("background data_quality warmup failed: %s", e)
-            finally:
-                _data_quality_scan_in_flight.clear()
-        threading.Thread(target=_warmup, daemon=True, name="dq-warmup").start()
+    if degraded is not None:
+        flights.start(
+            _DQ_CACHE, "full", _run_data_quality_scan,
+            maxsize=1, ttl=_DQ_CACHE_TTL, timeout=_DQ_SCAN_TIMEOUT_S,
+        )
         response.headers["Cache-Control"] = "no-store"  # don't cache degraded
         return degraded
 
-    # Mutex: only one worker performs the 85-second live scan; the rest wait, then hit cache.
-    with _data_quality_lock:
-        cached2 = _stats_cache.get("data_quality")
-        if cached2 is not None:
-            response.headers["Cache-Control"] = "public, max-age=3600"
-            return cached2
-
-    result = _run_data_quality_scan()
+    # No summary to degrade to: one worker performs the 85-second live scan,
+    # every other caller waits for its result.
+    result = flights.do(
+        _DQ_CACHE, "full", _run_data_quality_scan,
+        maxsize=1, ttl=_DQ_CACHE_TTL, timeout=_DQ_SCAN_TIMEOUT_S,
+    )
     response.headers["Cache-Control"] = "public, max-age=3600"
     return result
 
@@ -597,8 +575,9 @@ def get_data_quality(response: Response):
 def _run_data_quality_scan() -> DataQualityResponse:
     """Heavy 85-second full-table scan that produces DataQualityResponse.
     Extracted from get_data_quality() so the cold-start background warmup
-    thread can run it without re-entering the HTTP handler. Writes both
-    in-memory cache and precomputed_stats on success."""
+    thread can run it without re-entering the HTTP handler. Persists to
+    precomputed_stats on success; callers go through ``flights`` so the
+    shared cache is filled once."""
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -749,12 +728,11 @@ def _run_data_quality_scan() -> DataQualityResponse:
             key_issues=key_issues,
             last_calculated=last_calculated
         )
-        _stats_cache.set("data_quality", result, ttl=7200)
 
         # Persist full result to precomputed_stats so next container restart is instant.
         try:
             payload = json.dumps(result.model_dump())
-            with get_db() as wconn:
+            with get_db_writer() as wconn:
                 wconn.execute(
                     "INSERT OR REPLACE INTO precomputed_stats(stat_key, stat_value, updated_at)"
                     " VALUES('data_quality_full', ?, datetime('now'))",
@@ -824,6 +802,6 @@ def get_exchange_rates(response: Response):
         current_year=current_year,
         current_rate=current_rate,
     )
-    _stats_cache.set("exchange_rates", result, ttl=86400)
+    _stats_cache.set("exchange_rates", result, ttl_seconds=None)
     response.headers["Cache-Control"] = "public, max-age=86400"
     return result
@@ -5,9 +5,9 @@ Bilingual: pass ?lang=en for English, default is ?lang=es for Spanish.
 """
 import json
 import logging
-import threading
-import time
 from fastapi import APIRouter, HTTPException, Query
+from ..cache import SimpleCache
+from ..single_flight import flights
 from ..dependencies import get_db
 
 logger = logging.getLogger(__name__)
@@ -15,68 +15,59 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/stories", tags=["stories"])
 
 # ---------------------------------------------------------------------------
-# In-memory cache — the 8 package queries take ~2 min cold on 3.1M rows.
-# First request starts a background thread; 503 is returned until ready.
-# Cache TTL: 1 hour (data is historical, changes only on rescore).
+# Shared cache — the 8 package queries take ~2 min cold on 3.1M rows.
+# First request starts a background computation; 503 is returned until ready.
+# The computed packages live in app_cache (shared by every worker, survives
+# restarts) and the computation is single-flight across workers, so a burst
+# of cold requests runs it once.
+# No TTL: data is historical and changes only on rescore, which bumps the
+# data epoch (api/data_epoch.py). After a bump the previous packages keep
+# being served (stale-while-revalidate) while one background run rebuilds
+# them; only a truly cold cache answers 503.
 # ---------------------------------------------------------------------------
-_stories_cache: dict = {"data": None, "expires": 0.0, "computing": False}
-_stories_lock = threading.Lock()
+_STORIES_CACHE = "stories"
+_STORIES_KEY = "packages:es"
+_STORIES_TTL = None
+_STORIES_STALE_TTL = 7 * 86400
+_STORIES_TIMEOUT_S = 600
+_STORIES_OPTIONS = dict(
+    maxsize=4, ttl=_STORIES_TTL, stale_ttl=_STORIES_STALE_TTL, timeout=_STORIES_TIMEOUT_S,
+)
 
-# Simple TTL caches for individual story endpoints (1-hour TTL)
-_story_individual_cache: dict[str, dict] = {}
-_story_individual_lock = threading.Lock()
+# Caches for individual story endpoints, valid until the data epoch changes
+_story_individual_cache = SimpleCache(namespace="stories_individual")
 
 
 def _get_cached(key: str) -> dict | None:
-    with _story_individual_lock:
-        entry = _story_individual_cache.get(key)
-        if entry and time.time() < entry["expires"]:
-            return entry["data"]
-    return None
+    return _story_individual_cache.get(key)
 
 
-def _set_cached(key: str, data: dict, ttl: int = 3600) -> None:
-    with _story_individual_lock:
-        _story_individual_cache[key] = {"data": data, "expires": time.time() + ttl}
+def _set_cached(key: str, data: dict) -> None:
+    _story_individual_cache.set(key, data, ttl_seconds=None)
 
 
-def _run_packages_computation() -> None:
-    """Compute all 8 story packages in background and populate the cache."""
+def _compute_packages() -> dict:
+    """Compute all 8 story packages (Spanish)."""
     logger.info("Story packages: background computation started")
-    try:
-        with get_db() as conn:
-            packages = [
-                _build_ghost_companies_package(conn),
-                _build_top_suspicious_package(conn),
-                _build_administration_comparison_package(conn),
-                _build_efos_vendors_package(conn),
-                _build_sector_overpricing_package(conn),
-                _build_new_vendor_risk_package(conn),
-                _build_monopoly_capture_package(conn),
-                _build_direct_award_surge_package(conn),
-            ]
-        with _stories_lock:
-            _stories_cache["data"] = {"packages": packages}
-            _stories_cache["expires"] = time.time() + 3600  # 1-hour TTL
-            _stories_cache["computing"] = False
-        logger.info("Story packages: background computation complete (%d packages)", len(packages))
-    except Exception as e:
-        logger.error("Story packages: background computation failed: %s", e)
-        with _stories_lock:
-            _stories_cache["computing"] = False
-
-
-def warm_stories_cache() -> None:
-    """Trigger background cache warm-up. Safe to call multiple times (idempotent)."""
-    with _stories_lock:
-        if _stories_cache.get("computing") or (
-            _stories_cache.get("data") and time.time() < _stories_cache.get("expires", 0.0)
-        ):
-            return  # Already warm or computing
-        _stories_cache["computing"] = True
-    t = threading.Thread(target=_run_packages_computation, daemon=True)
-    t.start()
-    logger.info("Story packages: cache warm-up triggered")
+    with get_db() as conn:
+        packages = [
+            _build_ghost_companies_package(conn),
+            _build_top_suspicious_package(conn),
+            _build_administration_comparison_package(conn),
+            _build_efos_vendors_package(conn),
+            _build_sector_overpricing_package(conn),
+            _build_new_vendor_risk_package(conn),
+            _build_monopoly_capture_package(conn),
+            _build_direct_award_surge_package(conn),
+        ]
+    logger.info("Story packages: background computation complete (%d packages)", len(packages))
+    return {"packages": packages}
+
+
+def warm_stories_cache() -> dict | None:
+    """Return the cached packages (possibly stale) or None, triggering a
+    background (re)build when missing or stale. Safe to call repeatedly."""
+    return flights.get_or_start(_STORIES_CACHE, _STORIES_KEY, _compute_packages, **_STORIES_OPTIONS)
 
 
 # ---------------------------------------------------------------------------
@@ -1348,19 +1339,17 @@ def story_packages(lang: str = Query("es", pattern="^(en|es)$")):
     """
     Return all 8 pre-packaged investigation story templates with live data.
     Pass ?lang=en for English narrative; default is Spanish.
-    Served from in-memory cache (~1ms). First call after cold start returns 503
-    while background computation runs (~2 min). Retry-After: 30 header is set.
+    Served from the shared cache (~1ms), stale while a rebuild runs after a
+    data change. Only a cold cache returns 503 while the background
+    computation runs (~2 min). Retry-After: 30 header is set.
     NOTE: cache is language-neutral (Spanish); lang param re-renders strings on the fly.
     """
-    now = time.time()
-    with _stories_lock:
-        data_ready = _stories_cache.get("data") and now < _stories_cache.get("expires", 0.0)
-        computing = _stories_cache.get("computing")
+    cached = warm_stories_cache()
+    data_ready = cached is not None
 
     if data_ready and lang == "es":
         # Fast path: cached Spanish data matches default
-        with _stories_lock:
-            return _stories_cache["data"]
+        return cached
 
     if data_ready and lang == "en":
         # Re-run builders with lang="en" against live DB (not cached for EN)
@@ -1377,20 +1366,7 @@ def story_packages(lang: str = Query("es", pattern="^(en|es)$")):
             ]
         return {"packages": packages}
 
-    if computing:
-        raise HTTPException(
-            status_code=503,
-            detail="Story packages are being computed. Please retry in 30-60 seconds.",
-            headers={"Retry-After": "30"},
-        )
-
-    # Cold start: start background computation (Spanish default)
-    with _stories_lock:
-        _stories_cache["computing"] = True
-
-    logger.info("Story packages: starting background computation (first request)")
-    t_thread = threading.Thread(target=_run_packages_computation, daemon=True)
-    t_thread.start()
+    # Cold start: warm_stories_cache() started (or joined) the computation
     raise HTTPException(
         status_code=503,
         detail="Story packages are being computed. Please retry in 30-60 seconds.",
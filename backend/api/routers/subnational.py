@@ -12,16 +12,15 @@ Coverage note (served in every response):
 """
 
 import logging
-import time as _time
 from typing import Any, Optional
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
+from ..cache import SimpleCache
 from ..dependencies import get_db
 
 # ── Module-level response cache ───────────────────────────────────────────────
-_states_cache: dict[str, Any] = {}
-_STATES_CACHE_TTL = 3600  # 1 hour
+_states_cache = SimpleCache(namespace="subnational_states")
 
 log = logging.getLogger(__name__)
 
@@ -226,8 +225,8 @@ async def list_states(
 
     cache_key = f"{min_contracts}:{year}"
     cached = _states_cache.get(cache_key)
-    if cached and (_time.time() - cached["ts"]) < _STATES_CACHE_TTL:
-        return cached["data"]
+    if cached is not None:
+        return cached
 
     year_key = year if year is not None else 0
 
@@ -281,7 +280,7 @@ async def list_states(
         total_vendors=sum(s.vendor_count for s in states),
         coverage_note=COVERAGE_NOTE,
     )
-    _states_cache[cache_key] = {"ts": _time.time(), "data": response}
+    _states_cache.set(cache_key, response, ttl_seconds=None)
     return response
 
 
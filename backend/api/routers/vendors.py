@@ -12,15 +12,16 @@ import json
 import math
 import logging
 import sqlite3
-import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, List, Any, Dict
 from fastapi import APIRouter, HTTPException, Query, Path, Request
 from fastapi.responses import StreamingResponse
 from collections import Counter
 from pydantic import BaseModel
 
+from ..cache import SimpleCache
 from ..dependencies import get_db, require_write_key
+from ..materialized import SECTOR_IDS, grid, materialized
 from ..config.constants import MAX_CONTRACT_VALUE
 
 
@@ -62,6 +63,8 @@ from ..models.asf import ASFCase
 from ..models.common import PaginationMeta
 from ..models.contract import ContractListItem, ContractListResponse, PaginationMeta as ContractPaginationMeta
 from ..services.vendor_service import vendor_service
+from ..services.pagination import InvalidCursorError
+from ..services.peer_percentiles import ALL_SECTORS, percentile_index
 from ..services.active_model import load_active_global_coefficients
 
 logger = logging.getLogger(__name__)
@@ -85,23 +88,20 @@ def _rate_limit(limit_string: str):
         return _vendors_limiter.limit(limit_string)
     return lambda f: f
 
-# Simple TTL cache for expensive aggregate endpoints
-_vendor_cache: Dict[str, Dict[str, Any]] = {}
-_vendor_cache_lock = threading.Lock()
-_VENDOR_CACHE_TTL = 3600  # 1 hour
+# Cache for expensive aggregate endpoints, valid until the data epoch changes
+_vendor_cache = SimpleCache(namespace="vendors", maxsize=2048)
+
+# Vendors whose profile pages are materialized: 29277 (Grupo Farmacos) and 4325
+# (Vitalmex) are linked from the homepage hero and the curated story tour.
+_MATERIALIZED_VENDOR_IDS = [29277, 4325]
 
 
 def _get_vendor_cache(key: str) -> Any:
-    with _vendor_cache_lock:
-        entry = _vendor_cache.get(key)
-        if entry and datetime.now() < entry["expires_at"]:
-            return entry["value"]
-        return None
+    return _vendor_cache.get(key)
 
 
 def _set_vendor_cache(key: str, value: Any) -> None:
-    with _vendor_cache_lock:
-        _vendor_cache[key] = {"value": value, "expires_at": datetime.now() + timedelta(seconds=_VENDOR_CACHE_TTL)}
+    _vendor_cache.set(key, value, ttl_seconds=None)
 
 
 class ExternalFlagsResponse(BaseModel):
@@ -161,6 +161,8 @@ def list_vendors(
     request: Request,
     page: int = Query(1, ge=1, description="Page number (1-indexed)"),
     per_page: int = Query(50, ge=1, le=100, description="Items per page (max 100)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset pagination; overrides page)"),
+    count: str = Query("cached", pattern="^(exact|cached|estimate)$", description="How the total is computed: exact, cached (by filters and data version) or estimate (pre-aggregates where possible)"),
     search: Optional[str] = Query(None, min_length=2, description="Search vendor name or RFC"),
     sector_id: Optional[int] = Query(None, ge=1, le=12, description="Filter by primary sector"),
     risk_level: Optional[str] = Query(None, description="Filter by risk level: critical, high, medium, low"),
@@ -188,19 +190,24 @@ def list_vendors(
             )
 
     with get_db() as conn:
-        result = vendor_service.list_vendors(
-            conn,
-            page=page,
-            per_page=per_page,
-            search=search,
-            sector_id=sector_id,
-            risk_level=risk_level,
-            min_contracts=min_contracts,
-            min_value=min_value,
-            has_rfc=has_rfc,
-            sort_by=sort_by,
-            sort_order=sort_order,
-        )
+        try:
+            result = vendor_service.list_vendors(
+                conn,
+                cursor=cursor,
+                count_mode=count,
+                page=page,
+                per_page=per_page,
+                search=search,
+                sector_id=sector_id,
+                risk_level=risk_level,
+                min_contracts=min_contracts,
+                min_value=min_value,
+                has_rfc=has_rfc,
+                sort_by=sort_by,
+                sort_order=sort_order,
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         vendors = [VendorListItem(**row) for row in result.data]
 
@@ -394,6 +401,7 @@ def get_top_vendors_all(
 
 
 @router.get("/top", response_model=VendorTopListResponse)
+@materialized("vendors_top", grid=grid(by=["value"], limit=[10], sector_id=SECTOR_IDS))
 def get_top_vendors(
     by: str = Query("value", description="Ranking metric: value, count, risk"),
     limit: int = Query(20, ge=1, le=100, description="Number of results"),
@@ -1160,17 +1168,9 @@ def get_vendor_percentile(
             )
 
         # Count vendors in sector with lower avg_risk_score (vendors this one beats)
-        cursor.execute("""
-            SELECT
-                COUNT(*) as total_vendors,
-                SUM(CASE WHEN v2.avg_risk_score < ? THEN 1 ELSE 0 END) as vendors_below
-            FROM vendors v2
-            JOIN vendor_stats vs2 ON v2.id = vs2.vendor_id
-            WHERE vs2.primary_sector_id = ? AND v2.avg_risk_score IS NOT NULL
-        """, (avg_risk_score, sector_id))
-        stats = cursor.fetchone()
-        total = stats["total_vendors"] or 0
-        vendors_below = stats["vendors_below"] or 0
+        peers = percentile_index(conn).distribution(sector_id, "vendor_avg_risk_score")
+        total = len(peers.values)
+        vendors_below = peers.count_lt(avg_risk_score)
         vendors_above = total - vendors_below - 1  # exclude self
         vendors_above = max(0, vendors_above)
         percentile = int(vendors_below / total * 100) if total > 0 else 0
@@ -1297,6 +1297,7 @@ def get_vendor_contracts(
 
 
 @router.get("/{vendor_id:int}/institutions", response_model=VendorInstitutionListResponse)
+@materialized("vendor_institutions", grid=grid(vendor_id=_MATERIALIZED_VENDOR_IDS, per_page=[50]))
 def get_vendor_institutions(
     vendor_id: int = Path(..., description="Vendor ID"),
     page: int = Query(1, ge=1, description="Page number"),
@@ -1365,6 +1366,7 @@ def get_vendor_institutions(
 
 
 @router.get("/{vendor_id:int}/risk-profile", response_model=VendorRiskProfile)
+@materialized("vendor_risk_profile", grid=grid(vendor_id=_MATERIALIZED_VENDOR_IDS))
 def get_vendor_risk_profile(
     vendor_id: int = Path(..., description="Vendor ID"),
 ):
@@ -1916,6 +1918,7 @@ def _build_waterfall(conn, filter_col: str, filter_id: int) -> tuple:
 
 
 @router.get("/{vendor_id:int}/risk-waterfall", response_model=RiskWaterfallResponse)
+@materialized("vendor_risk_waterfall", grid=grid(vendor_id=_MATERIALIZED_VENDOR_IDS))
 def get_vendor_risk_waterfall(
     vendor_id: int = Path(..., description="Vendor ID"),
 ):
@@ -1955,6 +1958,7 @@ class PeerComparisonResponse(BaseModel):
 
 
 @router.get("/{vendor_id:int}/peer-comparison", response_model=PeerComparisonResponse)
+@materialized("vendor_peer_comparison", grid=grid(vendor_id=_MATERIALIZED_VENDOR_IDS))
 def get_vendor_peer_comparison(
     vendor_id: int = Path(..., description="Vendor ID"),
 ):
@@ -1985,75 +1989,43 @@ def get_vendor_peer_comparison(
             ("single_bid_pct", "single_bid_pct", "Single Bid Rate"),
         ]
 
+        # Sector peers (all vendors when the primary sector is unknown), served
+        # from the per-worker sorted arrays: percentile = share of peers with a
+        # value <= this vendor's, median = value at offset n/2.
+        peers = percentile_index(conn)
+        peer_sector = sector_id if sector_id else ALL_SECTORS
+
         metrics = []
         for col, _, label in metric_defs:
             vendor_val = vs[col]
-
-            # Get percentile within sector
-            if sector_id:
-                pct_row = cursor.execute(f"""
-                    SELECT
-                        (SELECT COUNT(*) FROM vendor_stats WHERE primary_sector_id = ? AND {col} <= ?) * 100.0 /
-                        NULLIF((SELECT COUNT(*) FROM vendor_stats WHERE primary_sector_id = ?), 0) as pctile,
-                        (SELECT {col} FROM vendor_stats WHERE primary_sector_id = ?
-                         ORDER BY {col} LIMIT 1 OFFSET
-                         (SELECT COUNT(*) / 2 FROM vendor_stats WHERE primary_sector_id = ?)) as median_val
-                """, (sector_id, vendor_val or 0, sector_id, sector_id, sector_id)).fetchone()
-            else:
-                pct_row = cursor.execute(f"""
-                    SELECT
-                        (SELECT COUNT(*) FROM vendor_stats WHERE {col} <= ?) * 100.0 /
-                        NULLIF((SELECT COUNT(*) FROM vendor_stats), 0) as pctile,
-                        (SELECT {col} FROM vendor_stats
-                         ORDER BY {col} LIMIT 1 OFFSET
-                         (SELECT COUNT(*) / 2 FROM vendor_stats)) as median_val
-                """, (vendor_val or 0,)).fetchone()
+            dist = peers.distribution(peer_sector, col)
+            pctile = dist.count_le(vendor_val or 0) * 100.0 / dist.size if dist.size else None
+            median_val = dist.median()
 
             metrics.append(PeerComparisonMetric(
                 metric=col,
                 value=round(vendor_val, 4) if vendor_val is not None else None,
-                peer_median=round(pct_row["median_val"], 4) if pct_row and pct_row["median_val"] is not None else None,
-                percentile=round(pct_row["pctile"], 1) if pct_row and pct_row["pctile"] is not None else None,
+                peer_median=round(median_val, 4) if median_val is not None else None,
+                percentile=round(pctile, 1) if pctile is not None else None,
                 label_en=label,
             ))
 
         # price_per_contract — computed metric (total value / contract count) for
         # the Z3 deviation ledger. Appended separately so the 5 column metrics
-        # above keep their exact behavior. The expression is a constant string
-        # (no user input); vendor_id/sector_id remain parameterized. NULL rows
-        # (zero contracts) are excluded so they don't skew the median.
-        ppc_expr = "(total_value_mxn * 1.0 / NULLIF(total_contracts, 0))"
+        # above keep their exact behavior. NULL rows (zero contracts) are
+        # excluded from both the percentile base and the median.
         tv = vs["total_value_mxn"] or 0
         tc = vs["total_contracts"] or 0
         ppc_val = (tv / tc) if tc else None
-        if sector_id:
-            ppc_row = cursor.execute(f"""
-                SELECT
-                    (SELECT COUNT(*) FROM vendor_stats
-                     WHERE primary_sector_id = ? AND {ppc_expr} IS NOT NULL AND {ppc_expr} <= ?) * 100.0 /
-                    NULLIF((SELECT COUNT(*) FROM vendor_stats
-                            WHERE primary_sector_id = ? AND {ppc_expr} IS NOT NULL), 0) as pctile,
-                    (SELECT {ppc_expr} FROM vendor_stats
-                     WHERE primary_sector_id = ? AND {ppc_expr} IS NOT NULL
-                     ORDER BY {ppc_expr} LIMIT 1 OFFSET
-                     (SELECT COUNT(*) / 2 FROM vendor_stats
-                      WHERE primary_sector_id = ? AND {ppc_expr} IS NOT NULL)) as median_val
-            """, (sector_id, ppc_val or 0, sector_id, sector_id, sector_id)).fetchone()
-        else:
-            ppc_row = cursor.execute(f"""
-                SELECT
-                    (SELECT COUNT(*) FROM vendor_stats
-                     WHERE {ppc_expr} IS NOT NULL AND {ppc_expr} <= ?) * 100.0 /
-                    NULLIF((SELECT COUNT(*) FROM vendor_stats WHERE {ppc_expr} IS NOT NULL), 0) as pctile,
-                    (SELECT {ppc_expr} FROM vendor_stats WHERE {ppc_expr} IS NOT NULL
-                     ORDER BY {ppc_expr} LIMIT 1 OFFSET
-                     (SELECT COUNT(*) / 2 FROM vendor_stats WHERE {ppc_expr} IS NOT NULL)) as median_val
-            """, (ppc_val or 0,)).fetchone()
+        dist = peers.distribution(peer_sector, "price_per_contract")
+        n_ppc = len(dist.values)
+        ppc_pctile = dist.count_le(ppc_val or 0) * 100.0 / n_ppc if n_ppc else None
+        ppc_median = dist.median(include_nulls=False)
         metrics.append(PeerComparisonMetric(
             metric="price_per_contract",
             value=round(ppc_val, 2) if ppc_val is not None else None,
-            peer_median=round(ppc_row["median_val"], 2) if ppc_row and ppc_row["median_val"] is not None else None,
-            percentile=round(ppc_row["pctile"], 1) if ppc_row and ppc_row["pctile"] is not None else None,
+            peer_median=round(ppc_median, 2) if ppc_median is not None else None,
+            percentile=round(ppc_pctile, 1) if ppc_pctile is not None else None,
             label_en="Price per Contract (MXN)",
         ))
 
@@ -2182,6 +2154,7 @@ class LinkedScandalsResponse(BaseModel):
 
 
 @router.get("/{vendor_id:int}/linked-scandals", response_model=LinkedScandalsResponse)
+@materialized("vendor_linked_scandals", grid=grid(vendor_id=_MATERIALIZED_VENDOR_IDS))
 def get_vendor_linked_scandals(
     vendor_id: int = Path(..., description="Vendor ID"),
 ):
@@ -2235,6 +2208,7 @@ def get_vendor_linked_scandals(
 # =============================================================================
 
 @router.get("/{vendor_id:int}/risk-timeline", response_model=VendorRiskTimelineResponse)
+@materialized("vendor_risk_timeline", grid=grid(vendor_id=_MATERIALIZED_VENDOR_IDS))
 def get_vendor_risk_timeline(
     vendor_id: int = Path(..., description="Vendor ID"),
 ):
@@ -2284,6 +2258,7 @@ def get_vendor_risk_timeline(
 
 
 @router.get("/{vendor_id:int}/footprint")
+@materialized("vendor_footprint", grid=grid(vendor_id=_MATERIALIZED_VENDOR_IDS))
 def get_vendor_footprint(
     vendor_id: int = Path(..., description="Vendor ID"),
     limit: int = Query(30, ge=5, le=50),
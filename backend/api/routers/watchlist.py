@@ -12,7 +12,7 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
 from pydantic import BaseModel, Field
 
-from ..dependencies import get_db, require_user_or_write_key
+from ..dependencies import get_db_writer, require_user_or_write_key
 
 logger = logging.getLogger(__name__)
 
@@ -226,7 +226,7 @@ def list_watchlist_items(
     investigation_folder_items join table.
     """
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             ensure_watchlist_table(conn)
             cursor = conn.cursor()
 
@@ -342,7 +342,7 @@ def add_watchlist_item(item: WatchlistItemCreate, _: None = Depends(require_user
     The item type must be 'vendor', 'institution', or 'contract'.
     """
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             ensure_watchlist_table(conn)
             cursor = conn.cursor()
 
@@ -441,7 +441,7 @@ def get_watchlist_stats(_: None = Depends(require_user_or_write_key)):
         return _watchlist_stats_cache
 
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             ensure_watchlist_table(conn)
             cursor = conn.cursor()
 
@@ -489,7 +489,7 @@ def check_alerts(_: None = Depends(require_user_or_write_key)):
     their current risk score.
     """
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             ensure_watchlist_table(conn)
             rows = conn.execute("""
                 SELECT * FROM watchlist_items
@@ -537,7 +537,7 @@ def check_alerts(_: None = Depends(require_user_or_write_key)):
 def get_watchlist_item(watchlist_id: int = Path(..., description="Watchlist item ID"), _: None = Depends(require_user_or_write_key)):
     """Get a specific watchlist item."""
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             ensure_watchlist_table(conn)
             cursor = conn.cursor()
 
@@ -581,7 +581,7 @@ def get_watchlist_changes(watchlist_id: int = Path(..., description="Watchlist i
     since they were added to the watchlist.
     """
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             ensure_watchlist_table(conn)
 
             item = conn.execute(
@@ -644,7 +644,7 @@ def update_watchlist_item(
 ):
     """Update a watchlist item."""
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             ensure_watchlist_table(conn)
             cursor = conn.cursor()
 
@@ -728,7 +728,7 @@ def update_watchlist_item(
 def delete_watchlist_item(watchlist_id: int = Path(..., description="Watchlist item ID"), _: None = Depends(require_user_or_write_key)):
     """Remove an item from the watchlist."""
     try:
-        with get_db() as conn:
+        with get_db_writer() as conn:
             ensure_watchlist_table(conn)
             cursor = conn.cursor()
 
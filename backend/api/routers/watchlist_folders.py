@@ -12,7 +12,7 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Path
 from pydantic import BaseModel, Field
 
-from ..dependencies import get_db, require_user_or_write_key
+from ..dependencies import get_db_writer, require_user_or_write_key
 
 logger = logging.getLogger(__name__)
 
@@ -134,7 +134,7 @@ def _ensure_tables(conn: sqlite3.Connection):
 @router.get("", response_model=List[FolderResponse])
 def list_folders(_: None = Depends(require_user_or_write_key)):
     """List all investigation folders."""
-    with get_db() as conn:
+    with get_db_writer() as conn:
         _ensure_tables(conn)
         rows = conn.execute("""
             SELECT f.*,
@@ -160,7 +160,7 @@ def list_folders(_: None = Depends(require_user_or_write_key)):
 @router.post("", response_model=FolderResponse, status_code=201)
 def create_folder(body: FolderCreate, _: None = Depends(require_user_or_write_key)):
     """Create a new investigation folder."""
-    with get_db() as conn:
+    with get_db_writer() as conn:
         _ensure_tables(conn)
         now = datetime.utcnow().isoformat()
         cursor = conn.execute(
@@ -186,7 +186,7 @@ def update_folder(
     _: None = Depends(require_user_or_write_key),
 ):
     """Update an investigation folder."""
-    with get_db() as conn:
+    with get_db_writer() as conn:
         _ensure_tables(conn)
         row = conn.execute("SELECT * FROM investigation_folders WHERE id = ?", (folder_id,)).fetchone()
         if not row:
@@ -231,7 +231,7 @@ def update_folder(
 @router.delete("/{folder_id}")
 def delete_folder(folder_id: int = Path(..., description="Folder ID"), _: None = Depends(require_user_or_write_key)):
     """Delete an investigation folder (items are unlinked, not deleted)."""
-    with get_db() as conn:
+    with get_db_writer() as conn:
         _ensure_tables(conn)
         row = conn.execute("SELECT id FROM investigation_folders WHERE id = ?", (folder_id,)).fetchone()
         if not row:
@@ -246,7 +246,7 @@ def delete_folder(folder_id: int = Path(..., description="Folder ID"), _: None =
 @router.get("/export/{folder_id}", response_model=FolderExportResponse)
 def export_folder(folder_id: int = Path(..., description="Folder ID"), _: None = Depends(require_user_or_write_key)):
     """Export folder watchlist items as a JSON dossier."""
-    with get_db() as conn:
+    with get_db_writer() as conn:
         _ensure_tables(conn)
 
         folder_row = conn.execute("""
@@ -5,7 +5,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
-from ..dependencies import get_db
+from ..dependencies import get_db_writer
 from ..middleware.auth_jwt import get_current_user
 
 router = APIRouter(prefix="/workspace/dossiers", tags=["dossiers"])
@@ -55,7 +55,7 @@ def list_dossiers(
     current_user: dict = Depends(get_current_user),
 ):
     user_id = int(current_user["sub"])
-    with get_db() as conn:
+    with get_db_writer() as conn:
         if status:
             rows = conn.execute("""
                 SELECT d.*, COUNT(di.id) as item_count
@@ -127,7 +127,7 @@ def create_dossier(body: DossierIn, current_user: dict = Depends(get_current_use
     if body.status not in valid_statuses:
         raise HTTPException(400, f"status must be one of {valid_statuses}")
     user_id = int(current_user["sub"])
-    with get_db() as conn:
+    with get_db_writer() as conn:
         cur = conn.execute(
             "INSERT INTO investigation_dossiers (name, description, status, color, user_id) VALUES (?,?,?,?,?)",
             (body.name, body.description, body.status, body.color, user_id)
@@ -142,7 +142,7 @@ def create_dossier(body: DossierIn, current_user: dict = Depends(get_current_use
 @router.get("/{dossier_id}", response_model=DossierOut)
 def get_dossier(dossier_id: int, current_user: dict = Depends(get_current_user)):
     user_id = int(current_user["sub"])
-    with get_db() as conn:
+    with get_db_writer() as conn:
         row = conn.execute("""
             SELECT d.*, COUNT(di.id) as item_count
             FROM investigation_dossiers d
@@ -159,7 +159,7 @@ def update_dossier(
     dossier_id: int, body: DossierIn, current_user: dict = Depends(get_current_user)
 ):
     user_id = int(current_user["sub"])
-    with get_db() as conn:
+    with get_db_writer() as conn:
         existing = conn.execute(
             "SELECT id FROM investigation_dossiers WHERE id=? AND user_id=?",
             (dossier_id, user_id)
@@ -183,7 +183,7 @@ def update_dossier(
 @router.delete("/{dossier_id}", status_code=204)
 def delete_dossier(dossier_id: int, current_user: dict = Depends(get_current_user)):
     user_id = int(current_user["sub"])
-    with get_db() as conn:
+    with get_db_writer() as conn:
         existing = conn.execute(
             "SELECT id FROM investigation_dossiers WHERE id=? AND user_id=?",
             (dossier_id, user_id)
@@ -198,7 +198,7 @@ def delete_dossier(dossier_id: int, current_user: dict = Depends(get_current_use
 @router.get("/{dossier_id}/items", response_model=List[DossierItemOut])
 def list_items(dossier_id: int, current_user: dict = Depends(get_current_user)):
     user_id = int(current_user["sub"])
-    with get_db() as conn:
+    with get_db_writer() as conn:
         # Verify ownership first
         dossier = conn.execute(
             "SELECT id FROM investigation_dossiers WHERE id=? AND user_id=?",
@@ -220,7 +220,7 @@ def add_item(
     if body.item_type not in valid_types:
         raise HTTPException(400, f"item_type must be one of {valid_types}")
     user_id = int(current_user["sub"])
-    with get_db() as conn:
+    with get_db_writer() as conn:
         dossier = conn.execute(
             "SELECT id FROM investigation_dossiers WHERE id=? AND user_id=?",
             (dossier_id, user_id)
@@ -244,7 +244,7 @@ def remove_item(
     dossier_id: int, item_id: int, current_user: dict = Depends(get_current_user)
 ):
     user_id = int(current_user["sub"])
-    with get_db() as conn:
+    with get_db_writer() as conn:
         dossier = conn.execute(
             "SELECT id FROM investigation_dossiers WHERE id=? AND user_id=?",
             (dossier_id, user_id)
@@ -262,7 +262,7 @@ def remove_item(
 def export_dossier(dossier_id: int, current_user: dict = Depends(get_current_user)):
     """Export dossier with all items as a JSON file download."""
     user_id = int(current_user["sub"])
-    with get_db() as conn:
+    with get_db_writer() as conn:
         dossier = conn.execute(
             "SELECT * FROM investigation_dossiers WHERE id = ? AND user_id = ?",
             (dossier_id, user_id)
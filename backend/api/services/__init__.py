@@ -5,7 +5,7 @@ Domain services encapsulate business logic, query construction,
 and data mapping. Routers become thin: parse request → call service → return response.
 """
 from .query_builder import QueryBuilder
-from .pagination import paginate_query, PaginatedResult
+from .pagination import InvalidCursorError, paginate_query, PaginatedResult
 from .vendor_service import vendor_service
 from .contract_service import contract_service
 from .institution_service import institution_service
@@ -16,6 +16,7 @@ from .network_service import network_service
 __all__ = [
     "QueryBuilder",
     "paginate_query",
+    "InvalidCursorError",
     "PaginatedResult",
     "vendor_service",
     "contract_service",
@@ -12,7 +12,9 @@ from typing import Any
 
 import structlog
 
+from ..columnar import contract_columns, row_mask, top_pairs, yearly_stats
 from .base_service import BaseService
+from .query_builder import AggregateQuery
 
 logger = structlog.get_logger("rubli.services.analysis")
 
@@ -29,6 +31,10 @@ def _table_exists(cursor: sqlite3.Cursor, table_name: str) -> bool:
 class AnalysisService(BaseService):
     """Business logic for analysis queries."""
 
+    def aggregate(self, conn: sqlite3.Connection, query: AggregateQuery) -> list[sqlite3.Row]:
+        """Sums/counts over contracts, read from contracts_cube when it can answer them."""
+        return self._aggregate(conn, query)
+
     def get_year_over_year(
         self,
         conn: sqlite3.Connection,
@@ -41,7 +47,45 @@ class AnalysisService(BaseService):
         Get year-over-year trend data.
 
         Returns yearly aggregates of contracts, value, risk, and entity counts.
+        Served from the columnar sidecar when it is current, else from SQL.
         """
+        cols = contract_columns()
+        if cols is not None:
+            rows = yearly_stats(cols, row_mask(
+                cols, sector_id=sector_id, start_year=start_year, end_year=end_year,
+            ))
+        else:
+            rows = self._yearly_rows_sql(conn, sector_id, start_year, end_year)
+
+        data = []
+        for row in rows:
+            data.append({
+                "year": row["year"],
+                "contracts": row["contracts"],
+                "total_value": row["total_value"],
+                "avg_risk": round(row["avg_risk"], 4) if row["avg_risk"] else 0,
+                "direct_award_pct": round(row["direct_award_pct"], 1) if row["direct_award_pct"] else 0,
+                "single_bid_pct": round(row["single_bid_pct"], 1) if row["single_bid_pct"] else 0,
+                "high_risk_pct": round(row["high_risk_pct"], 2) if row["high_risk_pct"] else 0,
+                "vendor_count": row["vendor_count"],
+                "institution_count": row["institution_count"],
+            })
+
+        years = [d["year"] for d in data]
+        return {
+            "data": data,
+            "total_years": len(data),
+            "min_year": min(years) if years else 2002,
+            "max_year": max(years) if years else 2025,
+        }
+
+    def _yearly_rows_sql(
+        self,
+        conn: sqlite3.Connection,
+        sector_id: int | None,
+        start_year: int | None,
+        end_year: int | None,
+    ) -> list:
         conditions = ["contract_year IS NOT NULL"]
         params: list[Any] = []
 
@@ -57,7 +101,7 @@ class AnalysisService(BaseService):
 
         where_clause = " AND ".join(conditions)
 
-        rows = self._execute_many(
+        return self._execute_many(
             conn,
             f"""
             SELECT
@@ -79,28 +123,6 @@ class AnalysisService(BaseService):
             params,
         )
 
-        data = []
-        for row in rows:
-            data.append({
-                "year": row["year"],
-                "contracts": row["contracts"],
-                "total_value": row["total_value"],
-                "avg_risk": round(row["avg_risk"], 4) if row["avg_risk"] else 0,
-                "direct_award_pct": round(row["direct_award_pct"], 1) if row["direct_award_pct"] else 0,
-                "single_bid_pct": round(row["single_bid_pct"], 1) if row["single_bid_pct"] else 0,
-                "high_risk_pct": round(row["high_risk_pct"], 2) if row["high_risk_pct"] else 0,
-                "vendor_count": row["vendor_count"],
-                "institution_count": row["institution_count"],
-            })
-
-        years = [d["year"] for d in data]
-        return {
-            "data": data,
-            "total_years": len(data),
-            "min_year": min(years) if years else 2002,
-            "max_year": max(years) if years else 2025,
-        }
-
     def get_pattern_counts(
         self,
         conn: sqlite3.Connection,
@@ -137,9 +159,9 @@ class AnalysisService(BaseService):
             # Not found — fall back to 0
             counts[count_key] = 0
 
-        # Critical-risk contracts (always fast — uses indexed risk_level)
-        cursor.execute("SELECT COUNT(*) FROM contracts WHERE risk_level = 'critical'")
-        counts["critical"] = cursor.fetchone()[0]
+        # Critical-risk contracts (cube or indexed risk_level)
+        rows = self._aggregate(conn, AggregateQuery("contracts").filter("risk_level", "=", "critical"))
+        counts["critical"] = rows[0][0] or 0
 
         return {"counts": counts}
 
@@ -157,15 +179,24 @@ class AnalysisService(BaseService):
         Top institution->vendor flows.
 
         Fast path (no filters): uses precomputed institution_top_vendors table.
-        Filtered path (year or direct_award_only): queries contracts directly with
-        proper indexes (idx_contracts_institution_year, idx_contracts_year).
+        Filtered path (year or direct_award_only): grouped reduction over the
+        columnar sidecar when it is current; otherwise queries contracts
+        directly with proper indexes (idx_contracts_institution_year,
+        idx_contracts_year).
         """
         cursor = conn.cursor()
         flows: list[dict] = []
         total_value = 0.0
         total_contracts = 0
 
-        if year is not None or direct_award_only:
+        cols = contract_columns() if year is not None or direct_award_only else None
+        if cols is not None:
+            # ── Filtered path, columnar sidecar: grouped bincount ──────────
+            rows = self._top_flows_columnar(
+                conn, cols, sector_id=sector_id, year=year, limit=limit,
+                direct_award_only=direct_award_only, sort_by=sort_by,
+            )
+        elif year is not None or direct_award_only:
             # ── Filtered path: query contracts directly ─────────────────────
             where_parts = [
                 "c.amount_mxn > 0",
@@ -205,6 +236,7 @@ class AnalysisService(BaseService):
                 """,
                 params + [limit],
             )
+            rows = cursor.fetchall()
         else:
             # ── Fast path: precomputed table ────────────────────────────────
             # sector_id is denormalized onto itv (idx_itv_sector_value) to avoid
@@ -235,8 +267,9 @@ class AnalysisService(BaseService):
                 """,
                 params2 + [limit],
             )
+            rows = cursor.fetchall()
 
-        for row in cursor.fetchall():
+        for row in rows:
             avg_risk = row["avg_risk"]
             flows.append({
                 "source_type": "institution",
@@ -259,11 +292,53 @@ class AnalysisService(BaseService):
             "total_contracts": total_contracts,
         }
 
+    def _top_flows_columnar(
+        self,
+        conn: sqlite3.Connection,
+        cols,
+        *,
+        sector_id: int | None,
+        year: int | None,
+        limit: int,
+        direct_award_only: bool,
+        sort_by: str,
+    ) -> list[dict]:
+        """Filtered money-flow rows from the sidecar, named from SQL (top pairs only)."""
+        mask = row_mask(
+            cols, sector_id=sector_id, year=year, direct_award_only=direct_award_only,
+            amount_between=(0, 100_000_000_000),
+        )
+        # A little headroom: pairs whose institution/vendor row is missing are
+        # dropped, as the SQL path's inner JOINs would.
+        pairs = top_pairs(cols, mask, limit + 20, sort_by=sort_by)
+        institution_names = self._names(conn, "institutions", {p["institution_id"] for p in pairs})
+        vendor_names = self._names(conn, "vendors", {p["vendor_id"] for p in pairs})
+        rows = []
+        for pair in pairs:
+            if pair["institution_id"] in institution_names and pair["vendor_id"] in vendor_names:
+                pair["institution_name"] = institution_names[pair["institution_id"]]
+                pair["vendor_name"] = vendor_names[pair["vendor_id"]]
+                rows.append(pair)
+                if len(rows) >= limit:
+                    break
+        return rows
+
+    @staticmethod
+    def _names(conn: sqlite3.Connection, table: str, ids: set[int]) -> dict[int, str]:
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        return {
+            row[0]: row[1]
+            for row in conn.execute(f"SELECT id, name FROM {table} WHERE id IN ({placeholders})", list(ids))
+        }
+
 
     def get_structural_breaks(self, conn: sqlite3.Connection) -> dict:
         """
         Detect statistically significant change points in 23-year procurement trends.
-        Uses PELT algorithm from ruptures library.
+        Uses PELT algorithm from ruptures library; the yearly series come from
+        the columnar sidecar when it is current.
         Returns breakpoints per metric with the year and delta magnitude.
         """
         import numpy as np
@@ -272,21 +347,28 @@ class AnalysisService(BaseService):
         except ImportError:
             return {"breakpoints": [], "error": "ruptures library not installed"}
 
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT contract_year as year,
-                   SUM(CASE WHEN is_direct_award = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as direct_award_pct,
-                   SUM(CASE WHEN is_single_bid = 1 THEN 1 ELSE 0 END) * 100.0 /
-                       NULLIF(SUM(CASE WHEN is_direct_award = 0 THEN 1 ELSE 0 END), 0) as single_bid_pct,
-                   SUM(CASE WHEN risk_level IN ('high', 'critical') THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as high_risk_pct
-            FROM contracts
-            WHERE contract_year IS NOT NULL AND contract_year BETWEEN 2002 AND 2025
-            GROUP BY contract_year
-            ORDER BY contract_year
-            """
-        )
-        rows = cursor.fetchall()
+        cols = contract_columns()
+        if cols is not None:
+            rows = [
+                (r["year"], r["direct_award_pct"], r["single_bid_pct"], r["high_risk_pct"])
+                for r in yearly_stats(cols, row_mask(cols, start_year=2002, end_year=2025))
+            ]
+        else:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT contract_year as year,
+                       SUM(CASE WHEN is_direct_award = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as direct_award_pct,
+                       SUM(CASE WHEN is_single_bid = 1 THEN 1 ELSE 0 END) * 100.0 /
+                           NULLIF(SUM(CASE WHEN is_direct_award = 0 THEN 1 ELSE 0 END), 0) as single_bid_pct,
+                       SUM(CASE WHEN risk_level IN ('high', 'critical') THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as high_risk_pct
+                FROM contracts
+                WHERE contract_year IS NOT NULL AND contract_year BETWEEN 2002 AND 2025
+                GROUP BY contract_year
+                ORDER BY contract_year
+                """
+            )
+            rows = cursor.fetchall()
         if len(rows) < 5:
             return {"breakpoints": []}
 
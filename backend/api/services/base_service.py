@@ -12,7 +12,8 @@ from typing import Any, Callable
 import structlog
 
 from ..dependencies import get_db
-from .query_builder import QueryBuilder
+from .contracts_cube import cube_is_current
+from .query_builder import AggregateQuery, QueryBuilder
 from .pagination import paginate_query, PaginatedResult
 
 logger = structlog.get_logger("rubli.services")
@@ -29,9 +30,15 @@ class BaseService:
         page: int,
         per_page: int,
         row_mapper: Callable[[sqlite3.Row], dict] | None = None,
+        cursor: str | None = None,
+        count_mode: str = "cached",
+        estimate: Callable[[], tuple[int, bool] | None] | None = None,
     ) -> PaginatedResult:
-        """Execute a paginated list query."""
-        return paginate_query(conn, qb, columns, page, per_page, row_mapper)
+        """Execute a paginated list query (page number or keyset ``cursor``)."""
+        return paginate_query(
+            conn, qb, columns, page, per_page, row_mapper,
+            cursor=cursor, count_mode=count_mode, estimate=estimate,
+        )
 
     def _execute_one(
         self,
@@ -54,3 +61,13 @@ class BaseService:
         cursor = conn.cursor()
         cursor.execute(sql, params)
         return cursor.fetchall()
+
+    def _aggregate(
+        self,
+        conn: sqlite3.Connection,
+        query: AggregateQuery,
+    ) -> list[sqlite3.Row]:
+        """Run an aggregate, from contracts_cube when it is current and can answer it."""
+        use_cube = query.cube_eligible and cube_is_current(conn)
+        sql, params = query.build(use_cube=use_cube)
+        return self._execute_many(conn, sql, params)
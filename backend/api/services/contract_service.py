@@ -9,13 +9,16 @@ from __future__ import annotations
 import json
 import math
 import sqlite3
-import time
 from typing import Any
 
 import structlog
 
+from ..deadlines import DeadlineExceeded, deadline
 from .base_service import BaseService
-from .query_builder import QueryBuilder
+from .contract_text_index import contract_text_condition
+from .contracts_cube import cube_is_current
+from .query_builder import AggregateQuery, QueryBuilder
+from .risk_factor_index import risk_factor_condition
 from .pagination import paginate_query, PaginatedResult
 
 logger = structlog.get_logger("rubli.services.contract")
@@ -28,8 +31,8 @@ CONTRACT_SORT_WHITELIST = {
     "contract_year": "c.contract_year",
     "id": "c.id",
     "title": "c.title",
-    "vendor_name": "vendor_name",
-    "institution_name": "institution_name",
+    "vendor_name": "v.name",
+    "institution_name": "i.name",
     "sector_id": "c.sector_id",
     "risk_level": "c.risk_level",
     "mahalanobis_distance": "c.mahalanobis_distance",
@@ -43,8 +46,9 @@ _RISK_FACTOR_COLUMN_MAP = {
     "direct_award": ("c.is_direct_award = ?", 1),
     "single_bid": ("c.is_single_bid = ?", 1),
     "year_end": ("c.is_year_end = ?", 1),
-    # "price_hyp" has no column — falls through to the LIKE path (token in
-    # the risk_factors TEXT). Mirrored in export.py.
+    # Every other factor (price_hyp, co_bid_*, split, network, ...) goes through
+    # the contract_risk_factors inverted index (risk_factor_condition). Mirrored
+    # in export.py.
 }
 
 # "Los Señalados" band — the top-risk pass only features genuinely flagged
@@ -128,6 +132,7 @@ class ContractService(BaseService):
         *,
         page: int = 1,
         per_page: int = 50,
+        cursor: str | None = None,
         sector_id: int | None = None,
         year: int | None = None,
         vendor_id: int | None = None,
@@ -142,13 +147,18 @@ class ContractService(BaseService):
         search: str | None = None,
         sort_by: str = "contract_date",
         sort_order: str = "desc",
+        count_mode: str = "estimate",
     ) -> PaginatedResult:
         """
         List contracts with pagination and filters.
 
-        Uses LEFT JOINs for sector/vendor/institution names.
+        Uses LEFT JOINs for sector/vendor/institution names. ``cursor`` (the
+        previous page's ``next_cursor``) pages by sort key instead of OFFSET.
+        ``count_mode`` picks how the total is obtained (see
+        ``_estimate_list_total`` for what "estimate" can answer).
         """
         qb = self._build_list_qb(
+            conn,
             sector_id=sector_id,
             year=year,
             vendor_id=vendor_id,
@@ -172,21 +182,80 @@ class ContractService(BaseService):
         # Tiebreaker: when sorting by risk_score descending, use Mahalanobis
         # distance as a secondary sort so the ~96K contracts capped at 1.0
         # are ranked by anomaly severity rather than arbitrary insertion order.
+        # (DESC already puts NULL distances last.)
         if sort_by == "risk_score" and sort_order.lower() == "desc":
-            qb.order_by(
-                "c.risk_score DESC, c.mahalanobis_distance DESC NULLS LAST"
-            )
+            qb.keyset("c.risk_score", "c.mahalanobis_distance", descending=True)
 
         # Warm the documented-case map so _map_contract_row can stamp the seal
         # via an O(1) dict lookup (no per-row SQL).
         self._documented_lookup(conn)
+        def estimate() -> tuple[int, bool] | None:
+            if risk_factor or category_id is not None or search or \
+                    min_amount is not None or max_amount is not None:
+                return None
+            return self._estimate_list_total(
+                conn, sector_id=sector_id, year=year, vendor_id=vendor_id,
+                institution_id=institution_id, risk_level=risk_level,
+                is_direct_award=is_direct_award, is_single_bid=is_single_bid,
+            )
+
         return self._paginated_list(
             conn, qb, _LIST_COLUMNS, page, per_page,
             row_mapper=self._map_contract_row,
+            cursor=cursor,
+            count_mode=count_mode,
+            estimate=estimate,
         )
 
+    def _estimate_list_total(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        sector_id: int | None,
+        year: int | None,
+        vendor_id: int | None,
+        institution_id: int | None,
+        risk_level: str | None,
+        is_direct_award: bool | None,
+        is_single_bid: bool | None,
+    ) -> tuple[int, bool] | None:
+        """Total for the dimension-only list filters from a pre-aggregate.
+
+        - Cube dimensions only (sector, year, institution, risk level, flags):
+          contracts_cube, which at the current epoch holds the same rows the
+          COUNT would read, so the answer is exact.
+        - Vendor alone: vendor_stats.total_contracts, as of the last stats
+          refresh, so it is flagged as an estimate.
+
+        None (count for real) for anything else, or while the cube is stale.
+        """
+        if vendor_id is not None:
+            if any(v is not None for v in (sector_id, year, institution_id, risk_level,
+                                           is_direct_award, is_single_bid)):
+                return None
+            row = self._execute_one(
+                conn, "SELECT total_contracts FROM vendor_stats WHERE vendor_id = ?", (vendor_id,),
+            )
+            if row is None or row[0] is None:
+                return None
+            return int(row[0]), True
+        if not cube_is_current(conn):
+            return None
+        query = (
+            AggregateQuery("contracts")
+            .filter("sector_id", "=", sector_id)
+            .filter("contract_year", "=", year)
+            .filter("institution_id", "=", institution_id)
+            .filter("risk_level", "=", risk_level.lower() if risk_level else None)
+            .filter("is_direct_award", "=", None if is_direct_award is None else int(is_direct_award))
+            .filter("is_single_bid", "=", None if is_single_bid is None else int(is_single_bid))
+        )
+        rows = self._aggregate(conn, query)
+        return (rows[0][0] or 0), False
+
     def _build_list_qb(
         self,
+        conn: sqlite3.Connection | None = None,
         *,
         sector_id: int | None = None,
         year: int | None = None,
@@ -228,7 +297,11 @@ class ContractService(BaseService):
         if category_id is not None:
             qb.where("c.category_id = ?", category_id)
         if search:
-            qb.filter_search(search, ["c.title", "c.description"])
+            qb.filter_search(
+                search,
+                ["c.title", "c.description"],
+                indexed=contract_text_condition(conn, search),
+            )
         if risk_factor:
             mapped = _RISK_FACTOR_COLUMN_MAP.get(risk_factor)
             if mapped:
@@ -238,9 +311,10 @@ class ContractService(BaseService):
                 else:
                     qb.where(clause)
             else:
-                # Fallback to LIKE for other factors (co_bid, network, split, etc.)
-                # Leading wildcard prevents index use; pagination limits blast radius
-                qb.where("c.risk_factors LIKE ?", f"%{risk_factor}%")
+                # Other factors (co_bid, network, split, etc.): indexed lookup in
+                # contract_risk_factors, or a LIKE scan until it is built.
+                clause, params = risk_factor_condition(conn, risk_factor)
+                qb.where(clause, *params)
 
         return qb
 
@@ -308,7 +382,7 @@ class ContractService(BaseService):
         # filter (e.g. is_direct_award alone) degrades to the documented pass
         # rather than hanging the async band. Empty = honest "no standout flags".
         qb_top = self._build_list_qb(
-            sector_id=sector_id, year=year, vendor_id=vendor_id,
+            conn, sector_id=sector_id, year=year, vendor_id=vendor_id,
             institution_id=institution_id, risk_level=risk_level,
             is_direct_award=is_direct_award, is_single_bid=is_single_bid,
             risk_factor=risk_factor, category_id=category_id,
@@ -318,14 +392,11 @@ class ContractService(BaseService):
         qb_top.order_by("c.risk_score DESC")  # no maha secondary (forces a filesort)
         sql, params = qb_top.build_select(_LIST_COLUMNS)
         sql += f" LIMIT {limit}"
-        deadline = time.monotonic() + _BAND_TOP_BUDGET_S
-        conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 20_000)
         try:
-            top_rows = self._execute_many(conn, sql, params)
-        except sqlite3.OperationalError:
+            with deadline(_BAND_TOP_BUDGET_S, label="contracts-highlights", conn=conn):
+                top_rows = self._execute_many(conn, sql, params)
+        except DeadlineExceeded:
             top_rows = []  # budget exceeded → degrade to the documented pass
-        finally:
-            conn.set_progress_handler(None, 0)
 
         # Merge: documented first (already mapped), then top-risk fill, dedup by id.
         seen: set[int] = set()
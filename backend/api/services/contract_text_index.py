@@ -0,0 +1,175 @@
+"""
+Contract text index — FTS5 over contracts.title and contracts.description.
+
+List, export and MCP text search filtered with ``title LIKE '%q%' OR
+description LIKE '%q%'``: a full scan of 3.1M rows that can run into the
+30s DB timeout. ``contracts_fts`` is an external-content FTS5 table
+(rowid = contracts.id) over both columns, kept current by triggers on
+contracts, so the same filter becomes an index lookup:
+
+    c.id IN (SELECT rowid FROM contracts_fts WHERE contracts_fts MATCH ?)
+
+Matching is by word prefix, accent-insensitive: every word of the search
+must start a word in the title or description (``constru`` finds
+"CONSTRUCCIÓN"). That differs from LIKE for fragments inside a word, which
+is the trade for using an index at all.
+
+``build_contracts_fts`` stamps ``precomputed_stats['contracts_fts']`` with
+the indexed columns. A title-only table from the original migration carries
+no stamp, so callers keep the LIKE until the index has been rebuilt.
+"""
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import structlog
+
+from ..data_epoch import current_data_epoch
+
+logger = structlog.get_logger("rubli.services.contract_text_index")
+
+FTS_TABLE = "contracts_fts"
+FTS_COLUMNS: tuple[str, ...] = ("title", "description")
+STAT_KEY = "contracts_fts"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Insert/delete/update keep the external-content index in step with
+# contracts. The 'delete' command must see the values that were indexed.
+_TRIGGERS = {
+    f"{FTS_TABLE}_ai": f"""
+        AFTER INSERT ON contracts BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END""",
+    f"{FTS_TABLE}_ad": f"""
+        AFTER DELETE ON contracts BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END""",
+    f"{FTS_TABLE}_au": f"""
+        AFTER UPDATE OF title, description ON contracts BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO {FTS_TABLE} (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END""",
+}
+
+
+def fts_match_query(term: str | None) -> str | None:
+    """FTS5 query requiring every word of ``term`` as a word prefix, or None if no words."""
+    words = _WORD.findall(term or "")
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+# =============================================================================
+# Build (script side)
+# =============================================================================
+
+def build_contracts_fts(conn: sqlite3.Connection) -> dict:
+    """(Re)build contracts_fts over title and description, install sync triggers. Commits.
+
+    Replaces a title-only table from the original migration. Population,
+    swap and trigger creation share one write transaction, so readers keep
+    the old index until commit and no contract write is missed.
+    """
+    started = time.time()
+    staging = f"{FTS_TABLE}_build"
+    conn.execute(f"DROP TABLE IF EXISTS {staging}")
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE {staging} USING fts5(
+            {', '.join(FTS_COLUMNS)},
+            content='contracts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute(f"INSERT INTO {staging} ({staging}) VALUES ('rebuild')")
+    conn.execute(f"INSERT INTO {staging} ({staging}) VALUES ('optimize')")
+    for name in _TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    conn.execute(f"ALTER TABLE {staging} RENAME TO {FTS_TABLE}")
+    for name, body in _TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+    rows = conn.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}_docsize").fetchone()[0]
+    stamp = {
+        "columns": list(FTS_COLUMNS),
+        "rows": rows,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    conn.execute(
+        "INSERT OR REPLACE INTO precomputed_stats (stat_key, stat_value, updated_at) VALUES (?, ?, ?)",
+        (STAT_KEY, json.dumps(stamp), stamp["built_at"]),
+    )
+    conn.commit()
+    with _ready_lock:
+        _ready.clear()
+    logger.info("contracts_fts_built", rows=rows, seconds=round(time.time() - started, 1))
+    return stamp
+
+
+# =============================================================================
+# Readiness (API side)
+# =============================================================================
+
+# A "not built" answer is re-checked after this long; the build script does
+# not bump the data epoch.
+_RECHECK_S = 30.0
+
+_ready_lock = threading.Lock()
+_ready: dict[int, tuple[bool, float]] = {}
+
+
+def contracts_fts_ready(conn: sqlite3.Connection) -> bool:
+    """True when contracts_fts covers FTS_COLUMNS and has its triggers (memoized)."""
+    epoch = current_data_epoch()
+    cached = _ready.get(epoch)
+    if cached is not None and (cached[0] or time.monotonic() - cached[1] < _RECHECK_S):
+        return cached[0]
+    try:
+        row = conn.execute(
+            "SELECT stat_value FROM precomputed_stats WHERE stat_key = ?", (STAT_KEY,)
+        ).fetchone()
+        triggers = {
+            r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'contracts'"
+            )
+        }
+        ready = (
+            bool(row)
+            and json.loads(row[0]).get("columns") == list(FTS_COLUMNS)
+            and triggers.issuperset(_TRIGGERS)
+        )
+    except (sqlite3.Error, ValueError):
+        ready = False
+    with _ready_lock:
+        _ready.clear()
+        _ready[epoch] = (ready, time.monotonic())
+    return ready
+
+
+# =============================================================================
+# Query helpers
+# =============================================================================
+
+def contract_text_condition(
+    conn: sqlite3.Connection | None,
+    term: str | None,
+    alias: str = "c",
+) -> tuple[str, list] | None:
+    """``alias.id IN (<FTS matches>)`` condition for ``term``, or None to keep the LIKE."""
+    query = fts_match_query(term)
+    if query is None or conn is None or not contracts_fts_ready(conn):
+        return None
+    return (
+        f"{alias}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?)",
+        [query],
+    )
@@ -0,0 +1,101 @@
+"""
+contracts_cube — pre-aggregated fact table for dashboard sums and counts.
+
+One row per (sector, year, month, institution, risk_level, direct-award flag,
+single-bid flag, normalized procedure type) with the contract count, amount
+sum, risk-score sum/count and high-risk count. A GROUP BY over any subset of
+those dimensions, filtered on any of them, gives the same answer from the
+cube as from ``contracts`` while reading a small fraction of the rows.
+
+``precompute_stats`` and every stage that rewrites ``contracts`` (the scoring
+scripts) rebuild it and stamp ``precomputed_stats['contracts_cube']`` with the
+contracts version (api/data_epoch.py). Queries built with ``AggregateQuery``
+(query_builder.py) are routed to the cube by ``BaseService._aggregate`` only
+while the stamp matches the current contracts version: a re-score retires it
+until the scorer's own rebuild, while stages that leave ``contracts`` alone
+(ARIA, precompute_stats) keep it in use.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import structlog
+
+from ..data_epoch import current_contracts_version, read_contracts_version
+from .query_builder import CUBE_DIMENSIONS, CUBE_TABLE
+
+logger = structlog.get_logger("rubli.services.contracts_cube")
+
+STAT_KEY = "contracts_cube"
+
+_INDEXES = (
+    ("sector_year", "sector_id, contract_year"),
+    ("institution_year", "institution_id, contract_year"),
+    ("year_month", "contract_year, contract_month"),
+    ("risk_level", "risk_level"),
+)
+
+
+def build_contracts_cube(conn: sqlite3.Connection) -> dict:
+    """(Re)build contracts_cube from contracts, swap it in and stamp it. Commits."""
+    started = time.time()
+    version = read_contracts_version(conn)
+    dims = ", ".join(f"{column} AS {dim}" for dim, column in CUBE_DIMENSIONS.items())
+    staging = f"{CUBE_TABLE}_build"
+    conn.execute(f"DROP TABLE IF EXISTS {staging}")
+    conn.execute(f"""
+        CREATE TABLE {staging} AS
+        SELECT {dims},
+               COUNT(*) AS n_contracts,
+               SUM(amount_mxn) AS sum_amount,
+               SUM(risk_score) AS sum_risk,
+               COUNT(risk_score) AS n_risk,
+               SUM(CASE WHEN risk_level IN ('high', 'critical') THEN 1 ELSE 0 END) AS n_high_risk
+        FROM contracts
+        GROUP BY {", ".join(CUBE_DIMENSIONS.values())}
+    """)
+    rows = conn.execute(f"SELECT COUNT(*) FROM {staging}").fetchone()[0]
+    conn.execute(f"DROP TABLE IF EXISTS {CUBE_TABLE}")
+    conn.execute(f"ALTER TABLE {staging} RENAME TO {CUBE_TABLE}")
+    for name, columns in _INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_cube_{name} ON {CUBE_TABLE} ({columns})")
+    conn.execute(f"ANALYZE {CUBE_TABLE}")
+    stamp = {"contracts_version": version, "rows": rows, "built_at": datetime.now().isoformat(timespec="seconds")}
+    conn.execute(
+        "INSERT OR REPLACE INTO precomputed_stats (stat_key, stat_value, updated_at) VALUES (?, ?, ?)",
+        (STAT_KEY, json.dumps(stamp), stamp["built_at"]),
+    )
+    conn.commit()
+    logger.info("contracts_cube_built", rows=rows, contracts_version=version, seconds=round(time.time() - started, 1))
+    return stamp
+
+
+# A "not built yet" answer is re-checked after this long: a scoring stage bumps
+# the contracts version before it rebuilds the cube.
+_RECHECK_S = 30.0
+
+_ready_lock = threading.Lock()
+_ready: dict[int, tuple[bool, float]] = {}
+
+
+def cube_is_current(conn: sqlite3.Connection) -> bool:
+    """True when contracts_cube was built at the current contracts version (memoized per version)."""
+    version = current_contracts_version()
+    cached = _ready.get(version)
+    if cached is not None and (cached[0] or time.monotonic() - cached[1] < _RECHECK_S):
+        return cached[0]
+    try:
+        row = conn.execute(
+            "SELECT stat_value FROM precomputed_stats WHERE stat_key = ?", (STAT_KEY,)
+        ).fetchone()
+        ready = bool(row) and json.loads(row[0]).get("contracts_version") == version
+    except (sqlite3.Error, ValueError):
+        ready = False
+    with _ready_lock:
+        _ready.clear()
+        _ready[version] = (ready, time.monotonic())
+    return ready
@@ -13,6 +13,7 @@ import structlog
 
 from .base_service import BaseService
 from .query_builder import QueryBuilder
+from .name_search_index import INSTITUTION_FTS, name_match_condition
 from .pagination import paginate_query, PaginatedResult
 
 logger = structlog.get_logger("rubli.services.institution")
@@ -40,6 +41,7 @@ class InstitutionService(BaseService):
         *,
         page: int = 1,
         per_page: int = 50,
+        cursor: str | None = None,
         institution_type: str | None = None,
         size_tier: str | None = None,
         autonomy_level: str | None = None,
@@ -51,6 +53,7 @@ class InstitutionService(BaseService):
         risk_level: str | None = None,
         sort_by: str = "total_contracts",
         sort_order: str = "desc",
+        count_mode: str = "cached",
     ) -> PaginatedResult:
         """
         List institutions with pagination and filters.
@@ -71,7 +74,11 @@ class InstitutionService(BaseService):
         if state_code:
             qb.where("i.state_code = ?", state_code.upper())
         if search:
-            qb.filter_search(search, ["i.name", "i.name_normalized", "i.siglas"])
+            qb.filter_search(
+                search,
+                ["i.name", "i.name_normalized", "i.siglas"],
+                indexed=name_match_condition(conn, INSTITUTION_FTS, search, "i.id"),
+            )
         if min_contracts is not None:
             qb.where("COALESCE(s.total_contracts, i.total_contracts, 0) >= ?", min_contracts)
         if is_legally_decentralized is not None:
@@ -120,6 +127,8 @@ class InstitutionService(BaseService):
         return self._paginated_list(
             conn, qb, columns, page, per_page,
             row_mapper=self._map_institution_row,
+            cursor=cursor,
+            count_mode=count_mode,
         )
 
     @staticmethod
@@ -0,0 +1,219 @@
+"""
+Name search index — FTS5 trigram tables over vendor and institution names.
+
+Typeahead and list search matched names with ``LIKE '%q%'``, which cannot use
+a B-tree index: every keystroke scanned all ~320K vendors (name,
+name_normalized, RFC) and ~4.5K institutions (name, name_normalized,
+siglas). The trigram tokenizer indexes every 3-character window, so a
+quoted MATCH phrase finds the same substrings (case-insensitively) from the
+index instead:
+
+    vendor_name_fts         entity_id UNINDEXED, name, name_normalized, rfc
+    institution_name_fts    entity_id UNINDEXED, name, name_normalized, siglas
+
+Rows are inserted with ``rowid`` = rank by contract volume (1 = most
+contracts). FTS5 returns matches in rowid order, so "top k by volume" is
+``... MATCH ? ORDER BY rowid LIMIT k`` and stops after k hits instead of
+collecting and sorting every match.
+
+The ETL and dedup scripts rebuild both tables after they change vendors or
+institutions and stamp ``precomputed_stats['name_search_index']``. Until the
+stamp exists (or on SQLite builds without the trigram tokenizer), and for
+terms shorter than three characters, callers keep the LIKE scan. Entities
+created after the last rebuild are not found through the index; deleted
+ones are dropped by the callers' join back to the base table.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import structlog
+
+from ..data_epoch import current_data_epoch
+
+logger = structlog.get_logger("rubli.services.name_search_index")
+
+VENDOR_FTS = "vendor_name_fts"
+INSTITUTION_FTS = "institution_name_fts"
+STAT_KEY = "name_search_index"
+
+# Trigram tokens are three characters; shorter terms cannot be matched.
+MIN_TERM_LENGTH = 3
+
+# fts table -> (base table, stats table, stats key, indexed columns)
+_SOURCES: dict[str, tuple[str, str, str, tuple[str, ...]]] = {
+    VENDOR_FTS: ("vendors", "vendor_stats", "vendor_id", ("name", "name_normalized", "rfc")),
+    INSTITUTION_FTS: ("institutions", "institution_stats", "institution_id", ("name", "name_normalized", "siglas")),
+}
+
+
+def fts_phrase(term: str | None) -> str | None:
+    """Quoted FTS5 phrase for a substring search, or None if too short to index."""
+    term = (term or "").strip()
+    if len(term) < MIN_TERM_LENGTH:
+        return None
+    return '"' + term.replace('"', '""') + '"'
+
+
+def trigram_supported(conn: sqlite3.Connection) -> bool:
+    """True when this SQLite build has FTS5 with the trigram tokenizer (3.34+)."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._trigram_probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp._trigram_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+# =============================================================================
+# Build (ETL / dedup script side)
+# =============================================================================
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def _build_table(conn: sqlite3.Connection, fts_table: str) -> int:
+    base, stats, stats_key, columns = _SOURCES[fts_table]
+    present = {row[1] for row in conn.execute(f"PRAGMA table_info({base})")}
+    volume = ["s.total_contracts"] if _table_exists(conn, stats) else []
+    if "total_contracts" in present:
+        volume.append("b.total_contracts")
+    volume_expr = f"COALESCE({', '.join(volume + ['0'])})"
+    join = f"LEFT JOIN {stats} s ON s.{stats_key} = b.id" if _table_exists(conn, stats) else ""
+    values = ", ".join(f"b.{col}" if col in present else "NULL" for col in columns)
+
+    staging = f"{fts_table}_build"
+    conn.execute(f"DROP TABLE IF EXISTS {staging}")
+    conn.execute(
+        f"CREATE VIRTUAL TABLE {staging} USING fts5("
+        f"entity_id UNINDEXED, {', '.join(columns)}, tokenize='trigram')"
+    )
+    conn.execute(f"""
+        INSERT INTO {staging} (rowid, entity_id, {', '.join(columns)})
+        SELECT ROW_NUMBER() OVER (ORDER BY {volume_expr} DESC, b.id), b.id, {values}
+        FROM {base} b {join}
+    """)
+    conn.execute(f"INSERT INTO {staging} ({staging}) VALUES ('optimize')")
+    rows = conn.execute(f"SELECT COUNT(*) FROM {staging}").fetchone()[0]
+    conn.execute(f"DROP TABLE IF EXISTS {fts_table}")
+    conn.execute(f"ALTER TABLE {staging} RENAME TO {fts_table}")
+    return rows
+
+
+def build_name_search_index(conn: sqlite3.Connection) -> dict | None:
+    """(Re)build both name indexes from vendors and institutions and stamp them. Commits.
+
+    Returns the stamp, or None (leaving any previous index untouched) when
+    SQLite lacks the trigram tokenizer. Safe to re-run; each table is built
+    under a staging name and swapped in.
+    """
+    if not trigram_supported(conn):
+        logger.warning("name_search_index_skipped", reason="fts5 trigram tokenizer unavailable",
+                       sqlite=sqlite3.sqlite_version)
+        return None
+    started = time.time()
+    stamp = {
+        "vendors": _build_table(conn, VENDOR_FTS),
+        "institutions": _build_table(conn, INSTITUTION_FTS),
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS precomputed_stats (
+            stat_key TEXT PRIMARY KEY,
+            stat_value TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute(
+        "INSERT OR REPLACE INTO precomputed_stats (stat_key, stat_value, updated_at) VALUES (?, ?, ?)",
+        (STAT_KEY, json.dumps(stamp), stamp["built_at"]),
+    )
+    conn.commit()
+    with _ready_lock:
+        _ready.clear()
+    logger.info("name_search_index_built", vendors=stamp["vendors"],
+                institutions=stamp["institutions"], seconds=round(time.time() - started, 1))
+    return stamp
+
+
+# =============================================================================
+# Readiness (API side)
+# =============================================================================
+
+# A "not built" answer is re-checked after this long: the scripts that build
+# the index do not necessarily bump the data epoch.
+_RECHECK_S = 30.0
+
+_ready_lock = threading.Lock()
+_ready: dict[int, tuple[bool, float]] = {}
+
+
+def name_search_ready(conn: sqlite3.Connection) -> bool:
+    """True when build_name_search_index has stamped the index (memoized)."""
+    epoch = current_data_epoch()
+    cached = _ready.get(epoch)
+    if cached is not None and (cached[0] or time.monotonic() - cached[1] < _RECHECK_S):
+        return cached[0]
+    try:
+        row = conn.execute(
+            "SELECT stat_value FROM precomputed_stats WHERE stat_key = ?", (STAT_KEY,)
+        ).fetchone()
+        ready = bool(row) and bool(json.loads(row[0]).get("built_at")) and _table_exists(conn, VENDOR_FTS)
+    except (sqlite3.Error, ValueError):
+        ready = False
+    with _ready_lock:
+        _ready.clear()
+        _ready[epoch] = (ready, time.monotonic())
+    return ready
+
+
+# =============================================================================
+# Query helpers
+# =============================================================================
+
+def name_match_condition(
+    conn: sqlite3.Connection | None,
+    fts_table: str,
+    term: str | None,
+    id_column: str,
+) -> tuple[str, list] | None:
+    """``id_column IN (<index matches>)`` condition for ``term``, or None to keep LIKE."""
+    phrase = fts_phrase(term)
+    if phrase is None or conn is None or not name_search_ready(conn):
+        return None
+    return (
+        f"{id_column} IN (SELECT entity_id FROM {fts_table} WHERE {fts_table} MATCH ?)",
+        [phrase],
+    )
+
+
+def ranked_matches(
+    conn: sqlite3.Connection,
+    fts_table: str,
+    term: str | None,
+    limit: int,
+) -> list[int] | None:
+    """Ids of the ``limit`` highest-volume entities matching ``term``, best first.
+
+    None means the index cannot answer (term too short, index not built) and
+    the caller should fall back to its LIKE query.
+    """
+    phrase = fts_phrase(term)
+    if phrase is None or not name_search_ready(conn):
+        return None
+    try:
+        rows = conn.execute(
+            f"SELECT entity_id FROM {fts_table} WHERE {fts_table} MATCH ? ORDER BY rowid LIMIT ?",
+            (phrase, limit),
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        logger.warning("name_search_index_query_failed", table=fts_table, error=str(e))
+        return None
+    return [row[0] for row in rows]
@@ -5,12 +5,26 @@ Standardizes the paginated response format across all endpoints.
 """
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
 import math
 import sqlite3
 from dataclasses import dataclass, field
 from typing import Any, Callable
 
-from .query_builder import QueryBuilder
+from ..cache import app_cache
+from .query_builder import QueryBuilder, clamp_page
+
+# How paginate_query obtains ``total``:
+#   exact    — COUNT(*) with every filter, on every request
+#   cached   — the same COUNT(*), cached by filter signature and data epoch
+#   estimate — the caller's ``estimate`` (e.g. from a pre-aggregate) when it
+#              can answer for these filters, otherwise as ``cached``
+COUNT_MODES = ("exact", "cached", "estimate")
+
+_COUNT_CACHE = "list_counts"
+_COUNT_CACHE_SIZE = 4096
 
 
 @dataclass
@@ -20,6 +34,72 @@ class PaginatedResult:
     pagination: dict = field(default_factory=dict)
 
 
+class InvalidCursorError(ValueError):
+    """A pagination cursor that is malformed or was issued for another sort order."""
+
+
+def _ordering_signature(keys: list[str], descending: bool) -> str:
+    raw = "|".join(keys) + (" DESC" if descending else " ASC")
+    return hashlib.sha1(raw.encode()).hexdigest()[:10]
+
+
+def encode_cursor(values: list[Any], page: int, keys: list[str], descending: bool) -> str:
+    """Opaque token for "the rows after ``values``" (sort key(s) + id), landing on ``page``."""
+    payload = {"v": values, "p": page, "s": _ordering_signature(keys, descending)}
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str, keys: list[str], descending: bool) -> tuple[list[Any], int]:
+    """(key values, page number) from ``encode_cursor``; InvalidCursorError if unusable."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values, page, signature = payload["v"], int(payload["p"]), payload["s"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError("Malformed pagination cursor") from e
+    if signature != _ordering_signature(keys, descending) or len(values) != len(keys):
+        raise InvalidCursorError("Pagination cursor does not match the requested sort order")
+    return values, max(1, page)
+
+
+def count_total(
+    conn: sqlite3.Connection,
+    qb: QueryBuilder,
+    mode: str = "cached",
+    estimate: Callable[[], tuple[int, bool] | None] | None = None,
+) -> tuple[int, bool]:
+    """(total rows matching ``qb``, whether it is an estimate) under ``mode``.
+
+    ``estimate`` returns ``(total, is_estimate)`` or None when it cannot
+    answer for the current filters. Cached counts are keyed on the COUNT
+    statement and its parameters and expire with the data epoch.
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f"Unknown count mode '{mode}'. Must be one of: {COUNT_MODES}")
+    if mode == "estimate" and estimate is not None:
+        answer = estimate()
+        if answer is not None:
+            return answer
+
+    count_sql, count_params = qb.build_count()
+    key = None
+    if mode != "exact":
+        signature = json.dumps([count_sql, count_params], default=str)
+        key = hashlib.sha1(signature.encode()).hexdigest()
+        cached = app_cache.get(_COUNT_CACHE, key)
+        if cached is not None:
+            return cached, False
+    total = conn.execute(count_sql, count_params).fetchone()[0]
+    if key is not None:
+        app_cache.set(_COUNT_CACHE, key, total, maxsize=_COUNT_CACHE_SIZE, ttl=None)
+    return total, False
+
+
+def _strip_seek(row: sqlite3.Row) -> dict:
+    return {k: row[k] for k in row.keys() if not k.startswith("_seek_")}
+
+
 def paginate_query(
     conn: sqlite3.Connection,
     qb: QueryBuilder,
@@ -27,39 +107,88 @@ def paginate_query(
     page: int,
     per_page: int,
     row_mapper: Callable[[sqlite3.Row], dict] | None = None,
+    cursor: str | None = None,
+    count_mode: str = "cached",
+    estimate: Callable[[], tuple[int, bool] | None] | None = None,
 ) -> PaginatedResult:
     """
     Execute count + data query and return a PaginatedResult.
 
+    Page numbers use LIMIT/OFFSET (capped at page 1000, 100 rows per page). When the query is
+    sorted by a single whitelisted key (``QueryBuilder.sort``/``keyset``),
+    every page also carries ``next_cursor``: an opaque token encoding the
+    last row's sort key and id. Passing it back as ``cursor`` fetches the
+    following page by key (``QueryBuilder.seek``), so page N costs the same
+    as page 1 and the whole result set can be walked.
+
     Args:
         conn: SQLite connection
         qb: QueryBuilder with filters applied (will have pagination added)
         columns: SELECT columns string
-        page: Page number (1-indexed)
+        page: Page number (1-indexed); ignored when ``cursor`` is given
         per_page: Results per page
         row_mapper: Optional function to transform each Row to a dict.
                     If None, uses dict(row).
+        cursor: ``next_cursor`` from a previous page of the same query
+        count_mode: How ``total`` is obtained (COUNT_MODES, see count_total)
+        estimate: Pre-aggregate answer for ``count_mode="estimate"``
 
     Returns:
         PaginatedResult with data and pagination metadata
+
+    Raises:
+        ValueError: unknown ``count_mode``.
+        InvalidCursorError: ``cursor`` is malformed, from another sort order,
+            or the query's ordering cannot be paginated by key.
     """
-    cursor = conn.cursor()
+    db_cursor = conn.cursor()
 
     # Count total results (without pagination)
-    count_sql, count_params = qb.build_count()
-    cursor.execute(count_sql, count_params)
-    total = cursor.fetchone()[0]
+    total, total_is_estimate = count_total(conn, qb, count_mode, estimate)
 
-    # Apply pagination and fetch data
-    page = max(1, page)
-    per_page = max(1, min(per_page, 500))
-    qb.paginate(page, per_page)
+    page, per_page = clamp_page(page, per_page)
+    seek_keys = qb.seek_keys
+    mapper = row_mapper or _strip_seek
+    next_cursor = None
 
-    data_sql, data_params = qb.build_select(columns)
-    cursor.execute(data_sql, data_params)
+    if seek_keys is None:
+        if cursor:
+            raise InvalidCursorError("This listing's sort order does not support cursors")
+        qb.paginate(page, per_page)
+        data_sql, data_params = qb.build_select(columns)
+        db_cursor.execute(data_sql, data_params)
+        rows = db_cursor.fetchall()
+    else:
+        keys, descending = seek_keys
+        if cursor:
+            after, page = decode_cursor(cursor, keys, descending)
+            rows = []
+            # One query per NULL/non-NULL segment of the leading key, until full.
+            for condition in qb.seek(after, per_page + 1):
+                qb.limit(per_page + 1 - len(rows))
+                data_sql, data_params = qb.build_seek_select(columns, condition)
+                db_cursor.execute(data_sql, data_params)
+                rows.extend(db_cursor.fetchall())
+                if len(rows) > per_page:
+                    break
+            has_more = len(rows) > per_page
+            rows = rows[:per_page]
+        else:
+            # One extra row decides has_more; ``total`` may be an estimate.
+            qb.keyset(*keys, descending=descending)
+            qb.paginate(page, per_page).limit(per_page + 1)
+            data_sql, data_params = qb.build_seek_select(columns)
+            db_cursor.execute(data_sql, data_params)
+            rows = db_cursor.fetchall()
+            has_more = len(rows) > per_page
+            rows = rows[:per_page]
+        if rows and has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor(
+                [last[f"_seek_{i}"] for i in range(len(keys))], page + 1, keys, descending,
+            )
 
-    mapper = row_mapper or (lambda row: dict(row))
-    data = [mapper(row) for row in cursor.fetchall()]
+    data = [mapper(row) for row in rows]
 
     total_pages = math.ceil(total / per_page) if per_page > 0 else 0
 
@@ -70,5 +199,7 @@ def paginate_query(
             "per_page": per_page,
             "total": total,
             "total_pages": total_pages,
+            "total_is_estimate": total_is_estimate,
+            "next_cursor": next_cursor,
         },
     )
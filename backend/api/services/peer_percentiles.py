@@ -0,0 +1,141 @@
+"""
+Peer percentile index — sorted per-sector metric arrays over vendor_stats.
+
+Vendor peer comparison asked SQLite, per metric, for ``COUNT(*) ... <= ?``
+plus an ``ORDER BY metric LIMIT 1 OFFSET COUNT/2`` median: about a dozen
+sorts of up to 320K rows per request. Each worker instead loads the metric
+columns once per data epoch and keeps, for every (primary_sector_id, metric)
+and for the whole population, the sorted non-NULL values and the NULL count.
+A percentile is then a ``searchsorted`` and a median an array lookup.
+
+NULL handling mirrors the SQL it replaces: ``median(include_nulls=True)``
+is the value at offset ``size // 2`` with NULLs sorted first (SQLite's
+ascending order), and ``size`` counts NULL rows.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import structlog
+
+from ..data_epoch import current_data_epoch
+
+logger = structlog.get_logger("rubli.services.peer_percentiles")
+
+# metric -> SQL expression over vendor_stats vs LEFT JOIN vendors v
+METRICS: dict[str, str] = {
+    "avg_risk_score": "vs.avg_risk_score",
+    "total_contracts": "vs.total_contracts",
+    "total_value_mxn": "vs.total_value_mxn",
+    "direct_award_pct": "vs.direct_award_pct",
+    "single_bid_pct": "vs.single_bid_pct",
+    "price_per_contract": "(vs.total_value_mxn * 1.0 / NULLIF(vs.total_contracts, 0))",
+    # /vendors/{id}/percentile ranks the vendors-table score, not vendor_stats'.
+    "vendor_avg_risk_score": "v.avg_risk_score",
+}
+
+ALL_SECTORS = None
+
+# Without a data epoch (dev databases) nothing signals a reload, so the
+# index is rebuilt after this long instead.
+_UNVERSIONED_TTL_S = 60.0
+
+
+@dataclass(frozen=True)
+class PeerDistribution:
+    """Sorted non-NULL values of one metric for one peer group, plus its NULL count."""
+
+    values: np.ndarray
+    nulls: int
+
+    @property
+    def size(self) -> int:
+        return len(self.values) + self.nulls
+
+    def count_le(self, value: float) -> int:
+        return int(np.searchsorted(self.values, value, side="right"))
+
+    def count_lt(self, value: float) -> int:
+        return int(np.searchsorted(self.values, value, side="left"))
+
+    def median(self, include_nulls: bool = True) -> float | None:
+        """Value at offset n // 2 in ascending order (NULLs first when included)."""
+        if include_nulls:
+            offset = self.size // 2 - self.nulls
+            if offset < 0 or not len(self.values):
+                return None
+        else:
+            if not len(self.values):
+                return None
+            offset = len(self.values) // 2
+        return float(self.values[offset])
+
+
+class PercentileIndex:
+    """Per-sector peer distributions for every metric in METRICS."""
+
+    def __init__(self, epoch: int, distributions: dict[tuple[int | None, str], PeerDistribution]):
+        self.epoch = epoch
+        self.built_at = time.monotonic()
+        self._distributions = distributions
+
+    def distribution(self, sector_id: int | None, metric: str) -> PeerDistribution:
+        """Peers in ``sector_id`` (ALL_SECTORS for every vendor); empty if unknown."""
+        found = self._distributions.get((sector_id, metric))
+        if found is None:
+            return PeerDistribution(np.empty(0), 0)
+        return found
+
+
+def build_percentile_index(conn: sqlite3.Connection, epoch: int = 0) -> PercentileIndex:
+    """Read vendor_stats once and sort every metric per primary sector."""
+    started = time.time()
+    exprs = ", ".join(METRICS.values())
+    rows = conn.execute(f"""
+        SELECT vs.primary_sector_id, {exprs}
+        FROM vendor_stats vs
+        LEFT JOIN vendors v ON v.id = vs.vendor_id
+    """).fetchall()
+    data = np.array([tuple(r) for r in rows], dtype=np.float64).reshape(len(rows), len(METRICS) + 1)
+    sectors = data[:, 0]
+    groups: dict[int | None, np.ndarray] = {ALL_SECTORS: np.ones(len(rows), dtype=bool)}
+    for sector in np.unique(sectors[~np.isnan(sectors)]):
+        groups[int(sector)] = sectors == sector
+
+    distributions: dict[tuple[int | None, str], PeerDistribution] = {}
+    for i, metric in enumerate(METRICS, start=1):
+        column = data[:, i]
+        for sector, mask in groups.items():
+            values = column[mask]
+            present = values[~np.isnan(values)]
+            present.sort()
+            distributions[(sector, metric)] = PeerDistribution(present, int(len(values) - len(present)))
+    logger.info("percentile_index_built", vendors=len(rows), sectors=len(groups) - 1,
+                epoch=epoch, seconds=round(time.time() - started, 2))
+    return PercentileIndex(epoch, distributions)
+
+
+_lock = threading.Lock()
+_index: PercentileIndex | None = None
+
+
+def percentile_index(conn: sqlite3.Connection) -> PercentileIndex:
+    """This worker's index for the current data epoch, built on first use."""
+    global _index
+    epoch = current_data_epoch()
+    current = _index
+    if current is not None and current.epoch == epoch and (
+        epoch > 0 or time.monotonic() - current.built_at < _UNVERSIONED_TTL_S
+    ):
+        return current
+    with _lock:
+        current = _index
+        if current is None or current.epoch != epoch or (
+            epoch <= 0 and time.monotonic() - current.built_at >= _UNVERSIONED_TTL_S
+        ):
+            current = _index = build_percentile_index(conn, epoch)
+    return current
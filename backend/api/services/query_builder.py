@@ -10,6 +10,16 @@ import math
 from typing import Any
 
 
+# LIMIT/OFFSET bounds applied by QueryBuilder.paginate.
+MAX_PER_PAGE = 100
+MAX_PAGE = 1000
+
+
+def clamp_page(page: int, per_page: int) -> tuple[int, int]:
+    """(page, per_page) as QueryBuilder.paginate will apply them."""
+    return min(max(1, page), MAX_PAGE), max(1, min(per_page, MAX_PER_PAGE))
+
+
 class QueryBuilder:
     """Fluent SQL query builder with safe parameterization."""
 
@@ -27,6 +37,8 @@ class QueryBuilder:
         self._offset: int | None = None
         self._group_by: str | None = None
         self._having: str | None = None
+        # Sort keys for keyset pagination: (expressions, descending), see keyset().
+        self._keyset: tuple[list[str], bool] | None = None
 
     # --- Join methods ---
 
@@ -79,6 +91,7 @@ class QueryBuilder:
         search: str | None,
         columns: list[str],
         extra_subquery: str | None = None,
+        indexed: tuple[str, list] | None = None,
     ) -> QueryBuilder:
         """Add LIKE search across multiple columns (OR). Returns self.
 
@@ -88,13 +101,19 @@ class QueryBuilder:
             extra_subquery: Optional additional OR clause (e.g. subquery into
                 related table). The caller must include exactly one ? placeholder
                 for the LIKE pattern if needed.
+            indexed: Optional (condition, params) answering the same match for
+                ``columns`` from an index (e.g. name_search_index); replaces
+                the column LIKEs when given.
         """
         if search and columns:
             search_escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
             pattern = f"%{search_escaped}%"
-            like_clauses = [f"{col} LIKE ? ESCAPE '\\'" for col in columns]
-            all_clauses = like_clauses[:]
-            all_params = [pattern] * len(columns)
+            if indexed is not None:
+                all_clauses = [indexed[0]]
+                all_params = list(indexed[1])
+            else:
+                all_clauses = [f"{col} LIKE ? ESCAPE '\\'" for col in columns]
+                all_params = [pattern] * len(columns)
             if extra_subquery:
                 all_clauses.append(extra_subquery)
                 all_params.append(pattern)
@@ -160,32 +179,104 @@ class QueryBuilder:
 
         if field and whitelist and field in whitelist:
             self._order_by = f"{whitelist[field]} {safe_order}"
+            self._keyset = ([whitelist[field]], safe_order == "DESC")
         elif default:
             self._order_by = default
+            self._keyset = _single_sort_term(default)
         return self
 
     def order_by(self, clause: str) -> QueryBuilder:
         """Set ORDER BY directly (use only with trusted input)."""
         self._order_by = clause
+        self._keyset = None
+        return self
+
+    def keyset(self, *keys: str, descending: bool = True) -> QueryBuilder:
+        """Order by ``keys`` (one direction, SQLite NULL ordering) for keyset pagination.
+
+        The id column of the base table is appended as the final tiebreaker
+        when the query is paginated (see ``seek``).
+        """
+        self._keyset = (list(keys), descending)
+        direction = "DESC" if descending else "ASC"
+        self._order_by = ", ".join(f"{key} {direction}" for key in keys)
         return self
 
+    @property
+    def id_column(self) -> str:
+        """Primary key of the base table, qualified by its alias."""
+        parts = self.base_table.split()
+        return f"{parts[-1]}.id"
+
+    @property
+    def seek_keys(self) -> tuple[list[str], bool] | None:
+        """(sort expressions + id tiebreaker, descending), or None when the
+        current ordering cannot be paginated by key."""
+        if self._keyset is None or self._group_by:
+            return None
+        keys, descending = self._keyset
+        if keys[-1] != self.id_column:
+            keys = keys + [self.id_column]
+        return keys, descending
+
     # --- Pagination ---
 
     def paginate(self, page: int, per_page: int) -> QueryBuilder:
-        """Set LIMIT/OFFSET for pagination."""
+        """Set LIMIT/OFFSET for pagination.
+
+        OFFSET steps through every skipped row, so pages are capped at 1000;
+        ``seek`` (cursor pagination) has no such limit.
+        """
         import logging as _logging
-        page = max(1, page)
-        per_page = max(1, min(per_page, 100))
-        if page > 1000:
+        if page > MAX_PAGE:
             _logging.getLogger(__name__).warning(
-                f"Requested page {page} exceeds max allowed page 1000; clamping to 1000."
+                f"Requested page {page} exceeds max allowed page {MAX_PAGE}; clamping to {MAX_PAGE}. "
+                "Use cursor pagination for deeper pages."
             )
-        page = min(page, 1000)
+        page, per_page = clamp_page(page, per_page)
         self._limit = per_page
-        # TODO: migrate to cursor-based pagination (WHERE id > last_id) for pages > 1000
         self._offset = (page - 1) * per_page
         return self
 
+    def seek(self, after: list[Any] | None, limit: int) -> list[tuple[str, list[Any]]]:
+        """Conditions (and params) that select the rows strictly after ``after``.
+
+        ``after`` holds the values of ``seek_keys`` for the last row already
+        returned (None = first page). Also sets ORDER BY (keys + id) and LIMIT.
+
+        SQLite sorts NULL lowest, so the rows of the leading key split into a
+        NULL and a non-NULL segment. Each returned condition covers one
+        segment, in result order; a page that runs off the end of the first
+        segment continues with the next. Inside the non-NULL segment the
+        leading key gets a plain range bound (``key <= ?`` / ``key >= ?``) so
+        SQLite seeks into its index instead of stepping over skipped rows.
+        """
+        keys, descending = self.seek_keys
+        direction = "DESC" if descending else "ASC"
+        self._order_by = ", ".join(f"{key} {direction}" for key in keys)
+        self._limit = limit
+        self._offset = None
+
+        lead = keys[0]
+        non_null = (f"{lead} IS NOT NULL", [])
+        null = (f"{lead} IS NULL", [])
+        segments = [non_null, null] if descending else [null, non_null]
+        if after is None:
+            return segments
+
+        rest_sql, rest_params = _after(keys[1:], after[1:], descending)
+        value = after[0]
+        if value is None:
+            current = (f"{lead} IS NULL AND {rest_sql}", rest_params)
+            return [current] if descending else [current, non_null]
+        bound = "<=" if descending else ">="
+        strict = "<" if descending else ">"
+        current = (
+            f"{lead} {bound} ? AND ({lead} {strict} ? OR {rest_sql})",
+            [value, value] + rest_params,
+        )
+        return [current, null] if descending else [current]
+
     def limit(self, n: int) -> QueryBuilder:
         """Set LIMIT directly."""
         self._limit = n
@@ -281,3 +372,199 @@ class QueryBuilder:
         ]
         sql = " ".join(p for p in parts if p)
         return sql, list(self._params)
+
+    def build_seek_select(
+        self,
+        columns: str,
+        condition: tuple[str, list[Any]] | None = None,
+    ) -> tuple[str, list[Any]]:
+        """SELECT (plus an optional ``seek`` condition), tagging each row with
+        its key values as ``_seek_0``, ``_seek_1``, ..."""
+        keys, _ = self.seek_keys
+        tags = ", ".join(f"{key} AS _seek_{i}" for i, key in enumerate(keys))
+        extra_sql, extra_params = condition or ("", [])
+        where = self._build_where()
+        if extra_sql:
+            where = f"{where} AND ({extra_sql})" if where else f"WHERE {extra_sql}"
+        parts = [
+            f"SELECT {columns}, {tags}",
+            self._build_from(),
+            where,
+            self._build_having(),
+            self._build_tail(),
+        ]
+        return " ".join(p for p in parts if p), list(self._params) + list(extra_params)
+
+
+def _single_sort_term(clause: str) -> tuple[list[str], bool] | None:
+    """``"expr DESC"`` -> (["expr"], True); None for multi-term ORDER BY clauses."""
+    expr, _, direction = clause.strip().rpartition(" ")
+    if not expr or direction.upper() not in ("ASC", "DESC"):
+        return None
+    depth = 0
+    for ch in expr:
+        depth += ch == "("
+        depth -= ch == ")"
+        if ch == "," and depth == 0:
+            return None
+    return [expr], direction.upper() == "DESC"
+
+
+def _after(keys: list[str], values: list[Any], descending: bool) -> tuple[str, list[Any]]:
+    """NULL-aware "(keys) strictly after (values)" in the given direction.
+
+    The last key is the id tiebreaker (never NULL, unique).
+    """
+    key, value = keys[0], values[0]
+    if len(keys) == 1:
+        return (f"{key} < ?" if descending else f"{key} > ?"), [value]
+    rest_sql, rest_params = _after(keys[1:], values[1:], descending)
+    if value is None:
+        # NULL sorts lowest: last in DESC, first in ASC.
+        if descending:
+            return f"({key} IS NULL AND {rest_sql})", rest_params
+        return f"({key} IS NOT NULL OR ({key} IS NULL AND {rest_sql}))", rest_params
+    if descending:
+        beyond = f"({key} < ? OR {key} IS NULL)"
+    else:
+        beyond = f"{key} > ?"
+    return f"({beyond} OR ({key} = ? AND {rest_sql}))", [value, value] + rest_params
+
+
+# =============================================================================
+# Aggregates routed to the contracts_cube pre-aggregate
+# =============================================================================
+
+CUBE_TABLE = "contracts_cube"
+
+# Cube dimension -> contracts column it is grouped from.
+CUBE_DIMENSIONS: dict[str, str] = {
+    "sector_id": "sector_id",
+    "contract_year": "contract_year",
+    "contract_month": "contract_month",
+    "institution_id": "institution_id",
+    "risk_level": "risk_level",
+    "is_direct_award": "is_direct_award",
+    "is_single_bid": "is_single_bid",
+    "procedure_type": "procedure_type_normalized",
+}
+
+# Measure -> (expression over contracts, same measure re-aggregated over the cube).
+CUBE_MEASURES: dict[str, tuple[str, str]] = {
+    "contracts": ("COUNT(*)", "SUM(n_contracts)"),
+    "total_value": ("SUM(amount_mxn)", "SUM(sum_amount)"),
+    "avg_risk": ("AVG(risk_score)", "SUM(sum_risk) / NULLIF(SUM(n_risk), 0)"),
+    "high_risk": (
+        "SUM(CASE WHEN risk_level IN ('high', 'critical') THEN 1 ELSE 0 END)",
+        "SUM(n_high_risk)",
+    ),
+    "direct_awards": (
+        "SUM(CASE WHEN is_direct_award = 1 THEN 1 ELSE 0 END)",
+        "SUM(CASE WHEN is_direct_award = 1 THEN n_contracts ELSE 0 END)",
+    ),
+    "competitive": (
+        "SUM(CASE WHEN is_direct_award = 0 THEN 1 ELSE 0 END)",
+        "SUM(CASE WHEN is_direct_award = 0 THEN n_contracts ELSE 0 END)",
+    ),
+    "single_bids": (
+        "SUM(CASE WHEN is_single_bid = 1 THEN 1 ELSE 0 END)",
+        "SUM(CASE WHEN is_single_bid = 1 THEN n_contracts ELSE 0 END)",
+    ),
+    "institutions": ("COUNT(DISTINCT institution_id)", "COUNT(DISTINCT institution_id)"),
+}
+
+_CUBE_OPERATORS = ("=", "!=", ">=", "<=", ">", "<")
+
+
+class AggregateQuery:
+    """GROUP BY over ``contracts``, answerable from ``contracts_cube`` when possible.
+
+    Filters and groups name cube dimensions (CUBE_DIMENSIONS) and the select
+    list names measures (CUBE_MEASURES); each measure is returned under its
+    own name and each group under its dimension name. ``where_raw`` accepts
+    any other condition but makes the query ineligible for the cube.
+
+        q = AggregateQuery("contracts", "total_value").filter("sector_id", "=", 3)
+        sql, params = q.group_by("risk_level").build(use_cube=q.cube_eligible)
+    """
+
+    def __init__(self, *measures: str):
+        unknown = [m for m in measures if m not in CUBE_MEASURES]
+        if unknown:
+            raise ValueError(f"Unknown aggregate measure(s): {unknown}")
+        self.measures = measures
+        self._filters: list[tuple[str, str, Any]] = []
+        self._raw: list[tuple[str, tuple[Any, ...]]] = []
+        self._group_by: list[str] = []
+        self._order_by: str | None = None
+
+    def filter(self, dimension: str, op: str, value: Any) -> AggregateQuery:
+        """Compare a dimension with a value; ``None`` values add nothing.
+
+        ``op`` is a comparison, ``IN`` (value is a sequence) or ``IS NOT NULL``.
+        """
+        if dimension not in CUBE_DIMENSIONS:
+            raise ValueError(f"Unknown cube dimension '{dimension}'")
+        if op not in _CUBE_OPERATORS + ("IN", "IS NOT NULL"):
+            raise ValueError(f"Unsupported operator '{op}'")
+        if value is None and op != "IS NOT NULL":
+            return self
+        self._filters.append((dimension, op, value))
+        return self
+
+    def where_raw(self, condition: str, *params: Any) -> AggregateQuery:
+        """Any other condition on ``contracts`` (disables the cube)."""
+        self._raw.append((condition, params))
+        return self
+
+    def group_by(self, *dimensions: str) -> AggregateQuery:
+        for dimension in dimensions:
+            if dimension not in CUBE_DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension '{dimension}'")
+        self._group_by.extend(dimensions)
+        return self
+
+    def order_by(self, clause: str) -> AggregateQuery:
+        """ORDER BY over output names (trusted input only)."""
+        self._order_by = clause
+        return self
+
+    @property
+    def cube_eligible(self) -> bool:
+        return not self._raw
+
+    def build(self, use_cube: bool = False) -> tuple[str, list[Any]]:
+        if use_cube and not self.cube_eligible:
+            raise ValueError("Query has conditions outside the cube's dimensions")
+        measure_index = 1 if use_cube else 0
+
+        def column(dimension: str) -> str:
+            return dimension if use_cube else CUBE_DIMENSIONS[dimension]
+
+        select = [f"{column(d)} AS {d}" for d in self._group_by]
+        select += [f"{CUBE_MEASURES[m][measure_index]} AS {m}" for m in self.measures]
+
+        conditions: list[str] = []
+        params: list[Any] = []
+        for dimension, op, value in self._filters:
+            if op == "IS NOT NULL":
+                conditions.append(f"{column(dimension)} IS NOT NULL")
+            elif op == "IN":
+                values = list(value)
+                conditions.append(f"{column(dimension)} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                conditions.append(f"{column(dimension)} {op} ?")
+                params.append(value)
+        for condition, raw_params in self._raw:
+            conditions.append(condition)
+            params.extend(raw_params)
+
+        parts = [f"SELECT {', '.join(select)}", f"FROM {CUBE_TABLE if use_cube else 'contracts'}"]
+        if conditions:
+            parts.append("WHERE " + " AND ".join(conditions))
+        if self._group_by:
+            parts.append("GROUP BY " + ", ".join(column(d) for d in self._group_by))
+        if self._order_by:
+            parts.append(f"ORDER BY {self._order_by}")
+        return " ".join(parts), params
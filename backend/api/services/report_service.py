@@ -13,6 +13,7 @@ from typing import Any
 import structlog
 
 from .base_service import BaseService
+from .risk_factor_index import risk_factor_counts
 
 logger = structlog.get_logger("rubli.services.report")
 
@@ -154,25 +155,16 @@ class ReportService(BaseService):
             (vendor_id,),
         )
 
-        # Risk factors breakdown
-        factor_rows = self._execute_many(
-            conn,
-            """
-            SELECT risk_factors, COUNT(*) as cnt
-            FROM contracts
-            WHERE vendor_id = ? AND risk_factors IS NOT NULL AND risk_factors != ''
-            GROUP BY risk_factors ORDER BY cnt DESC LIMIT 10
-            """,
-            (vendor_id,),
-        )
-        total_with_factors = sum(r["cnt"] for r in factor_rows)
+        # Risk factors breakdown: contracts carrying each factor, as a share of
+        # the vendor's contracts with any factor (bitwise aggregate).
+        total_with_factors, factor_rows = risk_factor_counts(conn, "vendor_id = ?", (vendor_id,))
         factors_breakdown = [
             {
-                "factor": r["risk_factors"],
-                "count": r["cnt"],
-                "percentage": 100.0 * r["cnt"] / total_with_factors if total_with_factors > 0 else 0,
+                "factor": factor,
+                "count": cnt,
+                "percentage": 100.0 * cnt / total_with_factors if total_with_factors > 0 else 0,
             }
-            for r in factor_rows
+            for factor, cnt in factor_rows[:10]
         ]
 
         total = risk_stats["total"] or 1
@@ -450,25 +442,15 @@ class ReportService(BaseService):
             )
         ]
 
-        # Risk factor distribution
-        factor_rows = self._execute_many(
-            conn,
-            """
-            SELECT risk_factors, COUNT(*) as cnt
-            FROM contracts
-            WHERE sector_id = ? AND risk_factors IS NOT NULL AND risk_factors != ''
-            GROUP BY risk_factors ORDER BY cnt DESC LIMIT 15
-            """,
-            (sector_id,),
-        )
-        total_with_factors = sum(r["cnt"] for r in factor_rows)
+        # Risk factor distribution (per factor, bitwise aggregate)
+        total_with_factors, factor_rows = risk_factor_counts(conn, "sector_id = ?", (sector_id,))
         risk_factors = [
             {
-                "factor": r["risk_factors"],
-                "count": r["cnt"],
-                "percentage": 100.0 * r["cnt"] / total_with_factors if total_with_factors > 0 else 0,
+                "factor": factor,
+                "count": cnt,
+                "percentage": 100.0 * cnt / total_with_factors if total_with_factors > 0 else 0,
             }
-            for r in factor_rows
+            for factor, cnt in factor_rows[:15]
         ]
 
         # Price hypotheses
@@ -0,0 +1,302 @@
+"""
+Risk-factor index — bitmask column and inverted table over ``risk_factors``.
+
+``contracts.risk_factors`` is comma-separated TEXT (``"single_bid,split_3,
+price_hyp:outlier:0.82"``), so a factor filter is a leading-wildcard LIKE
+scan and a per-factor count is a ``GROUP BY risk_factors`` over every
+distinct combination followed by string splitting in Python. The scoring
+scripts derive two structures from it instead:
+
+    contracts.risk_factor_mask      INTEGER, bit ``i`` set when the contract
+                                    carries RISK_FACTORS[i]
+    contract_risk_factors           (factor_id, contract_id) WITHOUT ROWID,
+                                    one row per contract and factor
+
+A factor filter becomes an index range on ``contract_risk_factors`` and a
+per-factor count a bitwise ``SUM`` over rows the caller already narrowed by
+an indexed column. ``build_risk_factor_index`` runs where risk_factors is
+written (scripts/archive/calculate_risk_scores.py) and as a backfill
+(scripts/_build_risk_factor_index.py); both structures are used only once it
+has stamped ``precomputed_stats['risk_factor_index']`` with the current
+factor registry. Until then callers fall back to the TEXT column.
+
+Factor ids are bit positions, so RISK_FACTORS is append-only.
+"""
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import structlog
+
+from ..data_epoch import current_data_epoch
+
+logger = structlog.get_logger("rubli.services.risk_factor_index")
+
+INDEX_TABLE = "contract_risk_factors"
+MASK_COLUMN = "risk_factor_mask"
+STAT_KEY = "risk_factor_index"
+
+# Base names produced by the scoring pipeline, in bit order. A token's base
+# name is the text before its first ":" with any "_<count>" suffix removed
+# (``split_3`` -> ``split``, ``co_bid_high:40%:3p`` -> ``co_bid_high``).
+RISK_FACTORS: tuple[str, ...] = (
+    "single_bid",
+    "direct_award",
+    "restricted_procedure",
+    "data_error",
+    "data_flag",
+    "price_anomaly",
+    "vendor_concentration_high",
+    "vendor_concentration_med",
+    "vendor_concentration_low",
+    "short_ad_<5d",
+    "short_ad_<15d",
+    "short_ad_<30d",
+    "year_end",
+    "split",
+    "network",
+    "interaction",
+    "industry_mismatch",
+    "inst_risk",
+    "price_hyp",
+    "co_bid_high",
+    "co_bid_med",
+)
+FACTOR_IDS: dict[str, int] = {name: i for i, name in enumerate(RISK_FACTORS)}
+
+_COUNT_SUFFIX = re.compile(r"_\d+$")
+_BUILD_BATCH = 50_000
+_MASK_STAGING = "_risk_factor_mask"
+
+# UPDATE ... FROM arrived in SQLite 3.33; older builds use row-value subqueries.
+_HAS_UPDATE_FROM = sqlite3.sqlite_version_info >= (3, 33, 0)
+
+
+def factor_name(token: str) -> str:
+    """Base factor name of one ``risk_factors`` token."""
+    return _COUNT_SUFFIX.sub("", token.strip().split(":")[0])
+
+
+def factor_mask(risk_factors: str | None) -> int:
+    """Bitmask of the registered factors in a ``risk_factors`` string."""
+    mask = 0
+    for token in (risk_factors or "").split(","):
+        factor_id = FACTOR_IDS.get(factor_name(token))
+        if factor_id is not None:
+            mask |= 1 << factor_id
+    return mask
+
+
+def matching_factor_ids(term: str) -> list[int]:
+    """Ids of the factors whose name contains ``term`` (the old LIKE semantics)."""
+    term = term.strip().lower()
+    if not term:
+        return []
+    return [i for i, name in enumerate(RISK_FACTORS) if term in name]
+
+
+# =============================================================================
+# Build (scoring-script side)
+# =============================================================================
+
+def build_risk_factor_index(conn: sqlite3.Connection) -> dict:
+    """(Re)derive risk_factor_mask and contract_risk_factors from risk_factors. Commits.
+
+    Non-zero masks are staged in a TEMP table keyed by contract id and
+    written with one set-based UPDATE ... FROM, as in
+    scripts/score_writeback.py; the inverted table is filled from the same
+    staging table one factor at a time, so rows arrive in key order. Safe to
+    re-run: the inverted table is built under a staging name and swapped in,
+    so readers see either the old or the new index.
+    """
+    started = time.time()
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(contracts)")}
+    if MASK_COLUMN not in columns:
+        conn.execute(f"ALTER TABLE contracts ADD COLUMN {MASK_COLUMN} INTEGER NOT NULL DEFAULT 0")
+        conn.commit()
+
+    conn.execute(f"DROP TABLE IF EXISTS temp.{_MASK_STAGING}")
+    conn.execute(f"CREATE TEMP TABLE {_MASK_STAGING} (id INTEGER PRIMARY KEY, mask INTEGER NOT NULL)")
+    cursor = conn.execute(
+        "SELECT id, risk_factors FROM contracts "
+        "WHERE risk_factors IS NOT NULL AND risk_factors != '' ORDER BY id"
+    )
+    while True:
+        chunk = cursor.fetchmany(_BUILD_BATCH)
+        if not chunk:
+            break
+        masks = [(contract_id, factor_mask(text)) for contract_id, text in chunk]
+        conn.executemany(
+            f"INSERT INTO temp.{_MASK_STAGING} VALUES (?, ?)", [m for m in masks if m[1]]
+        )
+
+    if _HAS_UPDATE_FROM:
+        write_masks = f"""
+            UPDATE contracts SET {MASK_COLUMN} = w.mask
+            FROM temp.{_MASK_STAGING} AS w
+            WHERE contracts.id = w.id AND contracts.{MASK_COLUMN} != w.mask
+        """
+    else:
+        write_masks = f"""
+            UPDATE contracts
+            SET {MASK_COLUMN} = (SELECT w.mask FROM temp.{_MASK_STAGING} AS w WHERE w.id = contracts.id)
+            WHERE id IN (SELECT id FROM temp.{_MASK_STAGING})
+        """
+    staging = f"{INDEX_TABLE}_build"
+    if conn.in_transaction:
+        conn.commit()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            f"UPDATE contracts SET {MASK_COLUMN} = 0 WHERE {MASK_COLUMN} != 0 "
+            f"AND id NOT IN (SELECT id FROM temp.{_MASK_STAGING})"
+        )
+        conn.execute(write_masks)
+        conn.execute(f"DROP TABLE IF EXISTS {staging}")
+        conn.execute(f"""
+            CREATE TABLE {staging} (
+                factor_id INTEGER NOT NULL,
+                contract_id INTEGER NOT NULL,
+                PRIMARY KEY (factor_id, contract_id)
+            ) WITHOUT ROWID
+        """)
+        for factor_id in range(len(RISK_FACTORS)):
+            conn.execute(
+                f"INSERT INTO {staging} SELECT ?, id FROM temp.{_MASK_STAGING} "
+                f"WHERE (mask >> ?) & 1 ORDER BY id",
+                (factor_id, factor_id),
+            )
+        contracts = conn.execute(f"SELECT COUNT(*) FROM temp.{_MASK_STAGING}").fetchone()[0]
+        pairs = conn.execute(f"SELECT COUNT(*) FROM {staging}").fetchone()[0]
+        conn.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+        conn.execute(f"ALTER TABLE {staging} RENAME TO {INDEX_TABLE}")
+        conn.execute(f"ANALYZE {INDEX_TABLE}")
+        stamp = {
+            "factors": list(RISK_FACTORS),
+            "contracts": contracts,
+            "rows": pairs,
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        conn.execute(
+            "INSERT OR REPLACE INTO precomputed_stats (stat_key, stat_value, updated_at) VALUES (?, ?, ?)",
+            (STAT_KEY, json.dumps(stamp), stamp["built_at"]),
+        )
+        conn.execute(f"DROP TABLE temp.{_MASK_STAGING}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    with _ready_lock:
+        _ready.clear()
+    logger.info("risk_factor_index_built", contracts=contracts, rows=pairs,
+                seconds=round(time.time() - started, 1))
+    return stamp
+
+
+# =============================================================================
+# Readiness (API side)
+# =============================================================================
+
+# A "not built" answer is re-checked after this long, and whenever the data
+# epoch moves (the scoring scripts build the index right after bumping it).
+_RECHECK_S = 30.0
+
+_ready_lock = threading.Lock()
+_ready: dict[int, tuple[bool, float]] = {}
+
+
+def risk_factor_index_ready(conn: sqlite3.Connection) -> bool:
+    """True when the index was built with the current factor registry (memoized)."""
+    epoch = current_data_epoch()
+    cached = _ready.get(epoch)
+    if cached is not None and (cached[0] or time.monotonic() - cached[1] < _RECHECK_S):
+        return cached[0]
+    try:
+        row = conn.execute(
+            "SELECT stat_value FROM precomputed_stats WHERE stat_key = ?", (STAT_KEY,)
+        ).fetchone()
+        ready = bool(row) and json.loads(row[0]).get("factors") == list(RISK_FACTORS)
+    except (sqlite3.Error, ValueError):
+        ready = False
+    with _ready_lock:
+        _ready.clear()
+        _ready[epoch] = (ready, time.monotonic())
+    return ready
+
+
+# =============================================================================
+# Query helpers
+# =============================================================================
+
+def risk_factor_condition(
+    conn: sqlite3.Connection | None,
+    term: str,
+    alias: str = "c",
+) -> tuple[str, list]:
+    """WHERE condition (and params) for "contract carries a factor matching ``term``".
+
+    Matches the same contracts as ``risk_factors LIKE '%term%'`` for registered
+    factor names, served from contract_risk_factors' (factor_id, contract_id)
+    key. (``interaction:a+b`` details are not searched; the pipeline only
+    emits them alongside ``a`` and ``b``.) Terms matching no registered
+    factor, or a missing index, keep the LIKE.
+    """
+    factor_ids = matching_factor_ids(term)
+    if factor_ids and conn is not None and risk_factor_index_ready(conn):
+        ids = ", ".join(str(i) for i in factor_ids)
+        return (
+            f"{alias}.id IN (SELECT contract_id FROM {INDEX_TABLE} WHERE factor_id IN ({ids}))",
+            [],
+        )
+    return f"{alias}.risk_factors LIKE ?", [f"%{term}%"]
+
+
+def risk_factor_counts(
+    conn: sqlite3.Connection,
+    where: str,
+    params: tuple | list = (),
+) -> tuple[int, list[tuple[str, int]]]:
+    """(contracts with any factor, [(factor, contracts carrying it), ...] by count desc).
+
+    ``where`` narrows ``contracts`` (unaliased) and should ride an index, e.g.
+    ``"vendor_id = ?"``. With the index built this is one bitwise aggregate
+    over those rows; otherwise the distinct risk_factors strings are grouped
+    and split in Python. Either way only RISK_FACTORS are counted, so the
+    answer does not depend on whether the index exists.
+    """
+    if risk_factor_index_ready(conn):
+        sums = ", ".join(
+            f"SUM(({MASK_COLUMN} >> {i}) & 1) AS f{i}" for i in range(len(RISK_FACTORS))
+        )
+        row = conn.execute(
+            f"SELECT COUNT(*) AS total, {sums} FROM contracts "
+            f"WHERE {where} AND {MASK_COLUMN} != 0",
+            tuple(params),
+        ).fetchone()
+        counts = Counter({
+            name: row[i + 1] for i, name in enumerate(RISK_FACTORS) if row[i + 1]
+        })
+        return row[0] or 0, counts.most_common()
+
+    counts = Counter()
+    total = 0
+    rows = conn.execute(
+        f"SELECT risk_factors, COUNT(*) AS cnt FROM contracts "
+        f"WHERE {where} AND risk_factors IS NOT NULL AND risk_factors != '' "
+        f"GROUP BY risk_factors",
+        tuple(params),
+    ).fetchall()
+    for text, cnt in rows:
+        names = {factor_name(token) for token in text.split(",")} & FACTOR_IDS.keys()
+        if not names:
+            continue
+        for name in names:
+            counts[name] += cnt
+        total += cnt
+    return total, counts.most_common()
@@ -14,6 +14,7 @@ import structlog
 
 from .base_service import BaseService
 from .query_builder import QueryBuilder
+from .name_search_index import VENDOR_FTS, name_match_condition
 from .pagination import paginate_query, PaginatedResult
 from ..config.constants import RISK_THRESHOLDS_V4 as THRESHOLDS
 
@@ -43,6 +44,7 @@ class VendorService(BaseService):
         *,
         page: int = 1,
         per_page: int = 50,
+        cursor: str | None = None,
         search: str | None = None,
         sector_id: int | None = None,
         risk_level: str | None = None,
@@ -51,6 +53,7 @@ class VendorService(BaseService):
         has_rfc: bool | None = None,
         sort_by: str = "total_contracts",
         sort_order: str = "desc",
+        count_mode: str = "cached",
     ) -> PaginatedResult:
         """
         List vendors with pagination and filters.
@@ -70,6 +73,7 @@ class VendorService(BaseService):
                     "v.id IN (SELECT vendor_id FROM vendor_name_variants "
                     "WHERE variant_name LIKE ? AND source NOT IN ('qqw_miss', 'qqw_empty'))"
                 ),
+                indexed=name_match_condition(conn, VENDOR_FTS, search, "v.id"),
             )
         if has_rfc is True:
             qb.where("v.rfc IS NOT NULL AND v.rfc != ''")
@@ -143,6 +147,8 @@ class VendorService(BaseService):
         return self._paginated_list(
             conn, qb, columns, page, per_page,
             row_mapper=self._map_vendor_row,
+            cursor=cursor,
+            count_mode=count_mode,
         )
 
     @staticmethod
@@ -0,0 +1,333 @@
+"""
+Single-flight request coalescing for expensive computations.
+
+A burst of identical cold requests should run the underlying scan once:
+the first caller (the leader) computes, everyone else waits for its result.
+Coalescing happens at two levels:
+
+- in-process: followers block on the leader's ``threading.Event``;
+- across gunicorn workers: the leader holds a lease row in the shared cache
+  file (``SharedCacheStore``); leaders in other workers see the lease and
+  poll the shared tier for the published result instead of recomputing.
+
+Results are published through ``app_cache`` under the caller's namespace, so
+a flight doubles as the cache fill. Errors propagate to every waiter: the
+same exception object in-process, a re-raised copy in other workers.
+
+    @router.get("/expensive")
+    @single_flight("analysis_expensive", ttl=None, timeout=180)
+    def get_expensive(year: int = Query(...)):
+        ...
+
+Use ``flights.do()`` when the key is not simply the arguments,
+``flights.start()`` to warm a key from a background thread, and
+``flights.get_or_start()`` for endpoints that must never block (they answer
+503 until the first computation lands).
+
+``stale_ttl`` turns on stale-while-revalidate: once a result expires — or a
+pipeline bumps the data epoch — callers keep getting it immediately while a
+single background refresh recomputes it, so no request waits on a scheduled
+recomputation. Under ``fresh_only()`` (api/cache.py) stale values are not
+served and ``get_or_start`` blocks like ``do``: the caller needs a result
+computed at the current data epoch.
+
+A result is only published if the data epoch did not move while it was being
+computed; otherwise it reflects the old data and would be cached as current.
+"""
+import functools
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .cache import AppCache, app_cache, fresh_required
+from .deadlines import detached
+
+logger = logging.getLogger("rubli.api.single_flight")
+
+# How long a waiter blocks before giving up. Should exceed the computation's
+# expected cold time; it is also the lease lifetime, so a crashed leader only
+# blocks other workers for this long.
+DEFAULT_TIMEOUT_S = 120.0
+
+# Cross-worker waiters poll the shared tier with exponential backoff.
+_POLL_MIN_S = 0.1
+_POLL_MAX_S = 1.0
+
+# Arguments that never take part in the default key.
+_UNKEYED_TYPES = (sqlite3.Connection, Request, Response)
+
+
+class SingleFlightTimeout(TimeoutError):
+    """A waiter gave up before the leader published its result."""
+
+    def __init__(self, namespace: str, key: str, timeout: float):
+        self.namespace = namespace
+        self.key = key
+        self.timeout = timeout
+        super().__init__(f"{namespace}/{key} still computing after {timeout:.0f}s")
+
+
+class SingleFlightError(RuntimeError):
+    """Stand-in for a leader exception that could not be shipped across workers."""
+
+
+def _dump_error(exc: BaseException) -> bytes:
+    """Serialize ``exc`` for waiters in other processes."""
+    try:
+        blob = pickle.dumps(exc)
+        pickle.loads(blob)
+        return blob
+    except Exception:
+        pass
+    if isinstance(exc, HTTPException):
+        # Starlette's HTTPException does not survive a pickle round trip.
+        try:
+            return pickle.dumps(("http", exc.status_code, exc.detail, exc.headers))
+        except Exception:
+            pass
+    return pickle.dumps(SingleFlightError(f"{type(exc).__name__}: {exc}"))
+
+
+def _load_error(blob: bytes) -> BaseException:
+    try:
+        obj = pickle.loads(blob)
+    except Exception:
+        return SingleFlightError("computation failed in another worker")
+    if isinstance(obj, tuple) and obj[:1] == ("http",):
+        return HTTPException(status_code=obj[1], detail=obj[2], headers=obj[3])
+    if isinstance(obj, BaseException):
+        return obj
+    return SingleFlightError("computation failed in another worker")
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class FlightGroup:
+    """Registry of in-progress computations, keyed by (namespace, key).
+
+    Options accepted by :meth:`do`, :meth:`start` and :meth:`get_or_start`:
+
+    - ``ttl`` / ``maxsize``: passed to ``app_cache.set`` (``ttl=None``: until
+      the data epoch changes);
+    - ``stale_ttl``: stale-while-revalidate window. Past ``ttl`` (or after an
+      epoch bump) the old value is still served for this many seconds while
+      one background refresh recomputes it;
+    - ``timeout``: how long a waiter blocks for the leader;
+    - ``cache_if``: veto publishing a result (e.g. a partial one). It is still
+      returned to this process's waiters. ``None`` results are never cached.
+    """
+
+    def __init__(self, cache: AppCache):
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._flights: dict[tuple[str, str], _Flight] = {}
+
+    def do(
+        self,
+        namespace: str,
+        key: str,
+        compute: Callable[[], Any],
+        *,
+        ttl: int | None = 600,
+        maxsize: int = 128,
+        timeout: float = DEFAULT_TIMEOUT_S,
+        cache_if: Callable[[Any], bool] | None = None,
+        stale_ttl: int = 0,
+    ) -> Any:
+        """Return the cached value for ``key`` or compute it exactly once.
+
+        With ``stale_ttl`` a stale value is returned immediately (and a
+        background refresh started); only a true miss blocks. Raises
+        ``SingleFlightTimeout`` if the leader takes longer than ``timeout``.
+        """
+        options = dict(ttl=ttl, maxsize=maxsize, timeout=timeout,
+                       cache_if=cache_if, stale_ttl=stale_ttl)
+        if stale_ttl:
+            hit = self._cache.lookup(namespace, key)
+            if hit is not None:
+                value, fresh = hit
+                if not fresh:
+                    self.start(namespace, key, compute, **options)
+                return value
+        else:
+            cached = self._cache.get(namespace, key)
+            if cached is not None:
+                return cached
+        return self._join(namespace, key, compute, options)
+
+    def get_or_start(self, namespace: str, key: str, compute: Callable[[], Any],
+                     **options) -> Any:
+        """Never block: return the cached value (fresh or stale) or None,
+        starting a background (re)computation when missing or stale.
+        Under ``fresh_only()`` this is ``do()``."""
+        if fresh_required():
+            return self.do(namespace, key, compute, **options)
+        hit = self._cache.lookup(namespace, key)
+        if hit is None:
+            self.start(namespace, key, compute, **options)
+            return None
+        value, fresh = hit
+        if not fresh:
+            self.start(namespace, key, compute, **options)
+        return value
+
+    def start(self, namespace: str, key: str, compute: Callable[[], Any], **options) -> bool:
+        """Recompute ``key`` in a daemon thread unless some worker is already
+        computing it. Returns True if a thread was started."""
+        if self.in_flight(namespace, key):
+            return False
+        options.setdefault("timeout", DEFAULT_TIMEOUT_S)
+
+        def _run():
+            try:
+                self._join(namespace, key, compute, options)
+            except Exception as e:
+                logger.warning("Background computation %s/%s failed: %s", namespace, key, e)
+
+        threading.Thread(target=_run, daemon=True, name=f"flight-{namespace}").start()
+        return True
+
+    def in_flight(self, namespace: str, key: str) -> bool:
+        """True while any worker is computing ``key``."""
+        with self._lock:
+            if (namespace, key) in self._flights:
+                return True
+        store = self._cache.store
+        if store is None:
+            return False
+        state = store.lease_state(f"{namespace}\x1f{key}")
+        return state is not None and state[0]
+
+    def _join(self, namespace: str, key: str, compute: Callable[[], Any], options: dict) -> Any:
+        """Wait on this process's flight for ``key``, or become its leader."""
+        timeout = options["timeout"]
+        with self._lock:
+            flight = self._flights.get((namespace, key))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(namespace, key)] = _Flight()
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                raise SingleFlightTimeout(namespace, key, timeout)
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._lead(namespace, key, compute, options)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop((namespace, key), None)
+            flight.done.set()
+
+    def _lead(self, namespace: str, key: str, compute: Callable[[], Any], options: dict) -> Any:
+        """Compute under the cross-worker lease, or wait for the worker holding it."""
+        timeout = options["timeout"]
+        cache_if = options.get("cache_if")
+        store = self._cache.store
+        lease = f"{namespace}\x1f{key}"
+        deadline = time.monotonic() + timeout
+        delay = _POLL_MIN_S
+        while True:
+            acquired = store.acquire_lease(lease, timeout) if store is not None else None
+            if acquired is not False:
+                try:
+                    # Another worker may have published between our miss and the lease.
+                    value = self._cache.get(namespace, key) if acquired else None
+                    if value is None:
+                        epoch = self._cache.epoch
+                        # The result is shared and cached: one caller's request
+                        # deadline must not cancel it for everyone else.
+                        with detached():
+                            value = compute()
+                        if (value is not None and (cache_if is None or cache_if(value))
+                                and self._cache.epoch == epoch):
+                            self._cache.set(
+                                namespace, key, value,
+                                maxsize=options.get("maxsize", 128),
+                                ttl=options.get("ttl", 600),
+                                stale_ttl=options.get("stale_ttl", 0),
+                            )
+                except BaseException as e:
+                    if acquired:
+                        store.release_lease(lease, error=_dump_error(e))
+                    raise
+                if acquired:
+                    store.release_lease(lease)
+                return value
+
+            # Another worker is computing: wait for its result in the shared tier.
+            if time.monotonic() >= deadline:
+                raise SingleFlightTimeout(namespace, key, timeout)
+            time.sleep(delay)
+            delay = min(delay * 2, _POLL_MAX_S)
+            value = self._cache.get(namespace, key)
+            if value is not None:
+                return value
+            state = store.lease_state(lease)
+            if state is not None and not state[0]:
+                raise _load_error(state[1])
+            # Still held: keep waiting. Released without a result: try to lead.
+
+
+flights = FlightGroup(app_cache)
+
+
+def _default_key(func: Callable, args: tuple, kwargs: dict) -> str:
+    parts = [repr(a) for a in args if not isinstance(a, _UNKEYED_TYPES)]
+    parts += [
+        f"{k}={v!r}" for k, v in sorted(kwargs.items())
+        if not isinstance(v, _UNKEYED_TYPES)
+    ]
+    return f"{func.__qualname__}:{','.join(parts)}"
+
+
+def single_flight(
+    namespace: str,
+    *,
+    ttl: int | None = 600,
+    maxsize: int = 128,
+    timeout: float = DEFAULT_TIMEOUT_S,
+    key: Callable[..., str] | None = None,
+    cache_if: Callable[[Any], bool] | None = None,
+    stale_ttl: int = 0,
+):
+    """Decorator: cache a sync function's result in ``namespace`` and coalesce
+    concurrent identical calls into one computation. With ``stale_ttl``
+    callers get the previous result while it is refreshed in the background.
+
+    The default key is the function name plus the ``repr`` of its arguments
+    (DB connections and request/response objects excluded); pass ``key`` to
+    build it from the same arguments instead. Place it under ``@router.get``
+    — the wrapper keeps the signature FastAPI inspects.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            flight_key = key(*args, **kwargs) if key else _default_key(func, args, kwargs)
+            return flights.do(
+                namespace, flight_key, lambda: func(*args, **kwargs),
+                ttl=ttl, maxsize=maxsize, timeout=timeout, cache_if=cache_if,
+                stale_ttl=stale_ttl,
+            )
+        return wrapper
+    return decorator
@@ -34,6 +34,8 @@ except ImportError:
     print("Error: MCP SDK not installed. Run: pip install mcp", file=sys.stderr)
     sys.exit(1)
 
+from api.services.contract_text_index import contract_text_condition
+
 # Database path
 DB_PATH = Path(__file__).parent / "RUBLI_NORMALIZED.db"
 
@@ -84,6 +86,7 @@ Supports filtering by:
 - sector_id: 1-12 (salud, educacion, infraestructura, energia, defensa, tecnologia, hacienda, gobernacion, agricultura, ambiente, trabajo, otros)
 - year: 2002-2025
 - risk_level: low, medium, high, critical
+- search: words in the contract title or description (word-prefix match)
 - vendor_name: partial name match
 - institution_name: partial name match
 - min_amount/max_amount: contract value range in MXN
@@ -97,6 +100,7 @@ Returns up to 20 contracts with risk scores and key details.""",
                     "sector_id": {"type": "integer", "minimum": 1, "maximum": 12, "description": "Sector ID (1-12)"},
                     "year": {"type": "integer", "minimum": 2002, "maximum": 2026, "description": "Contract year"},
                     "risk_level": {"type": "string", "enum": ["low", "medium", "high", "critical"], "description": "Risk level filter"},
+                    "search": {"type": "string", "description": "Text search in contract title and description"},
                     "vendor_name": {"type": "string", "description": "Partial vendor name search"},
                     "institution_name": {"type": "string", "description": "Partial institution name search"},
                     "min_amount": {"type": "number", "description": "Minimum contract value in MXN"},
@@ -346,6 +350,15 @@ async def search_contracts(args: dict) -> str:
             conditions.append("c.risk_level = ?")
             params.append(args["risk_level"].lower())
 
+        if args.get("search"):
+            indexed = contract_text_condition(conn, args["search"])
+            if indexed is not None:
+                conditions.append(indexed[0])
+                params.extend(indexed[1])
+            else:
+                conditions.append("(c.title LIKE ? OR c.description LIKE ?)")
+                params.extend([f"%{args['search']}%"] * 2)
+
         if args.get("vendor_name"):
             conditions.append("v.name LIKE ?")
             params.append(f"%{args['vendor_name']}%")
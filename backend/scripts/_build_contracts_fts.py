@@ -1,6 +1,9 @@
-"""One-shot migration: build FTS5 full-text search index on contract titles.
+"""One-shot migration: build the FTS5 full-text index on contract title and description.
 
-Reduces search from ~24s LIKE scan → <200ms. Safe to re-run (idempotent).
+Reduces text search from a ~24s LIKE scan to an index lookup. Replaces the
+original title-only contracts_fts and installs the triggers that keep it in
+sync with inserts, updates and deletes on contracts, so it only needs to be
+run once per database. Safe to re-run (rebuilds from scratch).
 
 Usage:
     cd backend
@@ -8,9 +11,13 @@ Usage:
 """
 import os
 import sqlite3
+import sys
 import time
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from api.services.contract_text_index import build_contracts_fts
+
 DB_PATH = Path(os.environ.get("DATABASE_PATH", Path(__file__).parent.parent / "RUBLI_NORMALIZED.db"))
 
 
@@ -20,36 +27,12 @@ def build_fts(db_path: Path) -> None:
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA synchronous=NORMAL")
 
-    existing = conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name='contracts_fts'"
-    ).fetchone()
-    if existing:
-        print("[fts] contracts_fts already exists — skipping build")
-        conn.close()
-        return
-
-    print("[fts] Creating FTS5 virtual table...")
-    conn.execute("""
-        CREATE VIRTUAL TABLE contracts_fts
-        USING fts5(title, content='contracts', content_rowid='id', tokenize='unicode61')
-    """)
-
-    print("[fts] Populating from contracts.title (3.1M rows, may take a few minutes)...")
+    print("[fts] Indexing contracts.title + description (3.1M rows, may take several minutes)...")
     t0 = time.time()
-    conn.execute("""
-        INSERT INTO contracts_fts(rowid, title)
-        SELECT id, COALESCE(title, '') FROM contracts
-    """)
-    conn.commit()
-    elapsed = time.time() - t0
-    count = conn.execute("SELECT COUNT(*) FROM contracts_fts").fetchone()[0]
-    print(f"[fts] Done — {count:,} rows indexed in {elapsed:.1f}s")
-
-    print("[fts] Optimizing FTS index...")
-    conn.execute("INSERT INTO contracts_fts(contracts_fts) VALUES('optimize')")
-    conn.commit()
+    stamp = build_contracts_fts(conn)
     conn.close()
-    print("[fts] FTS5 index ready. Search will now use fast MATCH instead of LIKE.")
+    print(f"[fts] Done — {stamp['rows']:,} rows indexed in {time.time() - t0:.1f}s")
+    print("[fts] Sync triggers installed. List, export and search now use MATCH instead of LIKE.")
 
 
 if __name__ == "__main__":
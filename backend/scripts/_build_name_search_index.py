@@ -0,0 +1,37 @@
+"""One-shot migration: build the trigram name-search index.
+
+Creates vendor_name_fts (name, name_normalized, RFC) and institution_name_fts
+(name, name_normalized, siglas) as FTS5 trigram tables ranked by contract
+volume, so typeahead and list search stop scanning with LIKE '%q%'. The ETL
+and dedup scripts rebuild it after they change vendors or institutions; use
+this to backfill an existing database. Safe to re-run.
+
+Usage:
+    cd backend
+    python scripts/_build_name_search_index.py
+"""
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from api.services.name_search_index import build_name_search_index
+
+DB_PATH = Path(os.environ.get("DATABASE_PATH", Path(__file__).parent.parent / "RUBLI_NORMALIZED.db"))
+
+
+if __name__ == "__main__":
+    print(f"[name-search] Connecting to {DB_PATH}")
+    conn = sqlite3.connect(str(DB_PATH), timeout=300)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    t0 = time.time()
+    stamp = build_name_search_index(conn)
+    conn.close()
+    if stamp is None:
+        print(f"[name-search] SQLite {sqlite3.sqlite_version} has no FTS5 trigram tokenizer (needs 3.34+)")
+        sys.exit(1)
+    print(f"[name-search] Done — {stamp['vendors']:,} vendors, "
+          f"{stamp['institutions']:,} institutions in {time.time() - t0:.1f}s")
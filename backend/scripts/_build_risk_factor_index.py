@@ -0,0 +1,34 @@
+"""One-shot migration: build the risk-factor bitmask and inverted index.
+
+Derives contracts.risk_factor_mask and contract_risk_factors(factor_id,
+contract_id) from the risk_factors TEXT column, so factor filters and
+per-factor counts stop scanning it with LIKE. The scorer that writes
+risk_factors (scripts/archive/calculate_risk_scores.py) rebuilds it after
+every run; use this to backfill an existing database. Safe to re-run.
+
+Usage:
+    cd backend
+    python scripts/_build_risk_factor_index.py
+"""
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from api.services.risk_factor_index import build_risk_factor_index
+
+DB_PATH = Path(os.environ.get("DATABASE_PATH", Path(__file__).parent.parent / "RUBLI_NORMALIZED.db"))
+
+
+if __name__ == "__main__":
+    print(f"[risk-factors] Connecting to {DB_PATH}")
+    conn = sqlite3.connect(str(DB_PATH), timeout=300)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    t0 = time.time()
+    stamp = build_risk_factor_index(conn)
+    conn.close()
+    print(f"[risk-factors] Done — {stamp['contracts']:,} contracts, "
+          f"{stamp['rows']:,} factor rows in {time.time() - t0:.1f}s")
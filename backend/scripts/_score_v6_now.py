@@ -13,11 +13,22 @@ Fixes applied (Mar 2026):
      model_calibration use the global model instead of an unreliable per-sector fit.
   3. Ghost companion integration: blend new_vendor_risk_score from vendor_stats
      into the final risk_score as an additive boost for new/suspicious vendors.
+
+Scores are staged per batch and written back with one set-based UPDATE every
+CHECKPOINT_BATCHES batches (scripts/score_writeback.py); each checkpoint prints
+the --start-id to resume from if the run is cut short.
 """
 import argparse
 import sqlite3, json, sys, time
+from pathlib import Path
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from api.data_epoch import bump_data_epoch
+from scripts.refresh_contract_aggregates import refresh_contract_aggregates
+from scripts.refresh_materialized import refresh_materialized
+from scripts.score_writeback import CHECKPOINT_BATCHES, ScoreWriteBack, level_counts, risk_levels
+
 DB = r"D:\Python\yangwenli\backend\RUBLI_NORMALIZED.db"
 
 Z_COLS = [
@@ -76,17 +87,16 @@ def get_ghost_boost_weight(ghost_score: float) -> float:
 THRESHOLD_CRITICAL = 0.60
 THRESHOLD_HIGH     = 0.40
 THRESHOLD_MEDIUM   = 0.25  # was 0.15
+RISK_THRESHOLDS = {
+    'critical': THRESHOLD_CRITICAL,
+    'high': THRESHOLD_HIGH,
+    'medium': THRESHOLD_MEDIUM,
+}
 
 
 def sigmoid(x):
     return np.where(x >= 0, 1.0/(1.0+np.exp(-x)), np.exp(x)/(1.0+np.exp(x)))
 
-def get_risk_level(score):
-    if score >= THRESHOLD_CRITICAL: return 'critical'
-    if score >= THRESHOLD_HIGH:     return 'high'
-    if score >= THRESHOLD_MEDIUM:   return 'medium'
-    return 'low'
-
 
 def load_all_calibrations(conn):
     """Load global + per-sector calibrations dynamically (most recent run by created_at DESC).
@@ -176,11 +186,13 @@ def load_ghost_scores(conn):
 def main():
     parser = argparse.ArgumentParser(description='v6.x risk scoring with per-sector models')
     parser.add_argument('--start-id', type=int, default=0,
-                        help='Resume scoring from this contract ID')
+                        help='Resume after this contract ID (printed at each checkpoint)')
     parser.add_argument('--skip-ghost-blend', action='store_true',
                         help='Disable ghost companion score blending (Fix 3)')
     parser.add_argument('--yes', action='store_true',
                         help='Skip interactive confirmation and proceed immediately')
+    parser.add_argument('--skip-materialized', action='store_true',
+                        help='Do not re-render materialized API payloads after writing')
     args = parser.parse_args()
 
     # M2: Confirmation gate — require --yes or non-TTY before rescoring 3M+ contracts.
@@ -246,11 +258,16 @@ def main():
     last_id = args.start_id
     total = 3094454
     processed = 0
+    batches = 0
+    updated = 0
     print(f'Scoring ~{total:,} contracts (start_id={last_id})...', flush=True)
     dist = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
     ghost_boosts_applied = 0
     global_fallback_count = 0
     t0 = time.time()
+    writer = ScoreWriteBack(conn, [
+        'risk_score', 'risk_level', 'risk_confidence_lower', 'risk_confidence_upper',
+    ])
 
     while True:
         print(f'  Reading batch from id>{last_id}...', end='', flush=True)
@@ -329,28 +346,14 @@ def main():
                         batch_ghost_count += 1
             ghost_boosts_applied += batch_ghost_count
 
-        updates = []
-        for i in range(len(ids)):
-            s = float(np.round(scores[i], 6))
-            lvl = get_risk_level(s)
-            dist[lvl] += 1
-            updates.append((
-                s, lvl,
-                float(np.round(cl_arr[i], 6)),
-                float(np.round(cu_arr[i], 6)),
-                version_tag,
-                int(ids[i]),
-            ))
-
-        conn.executemany('''
-            UPDATE contracts SET risk_score=?, risk_level=?,
-                risk_confidence_lower=?, risk_confidence_upper=?,
-                risk_model_version=?
-            WHERE id=?
-        ''', updates)
-        conn.commit()
+        scores_r = np.round(scores, 6)
+        levels = risk_levels(scores_r, RISK_THRESHOLDS)
+        for lvl, count in level_counts(levels).items():
+            dist[lvl] += count
+        writer.stage(ids, scores_r, levels, np.round(cl_arr, 6), np.round(cu_arr, 6))
 
         processed += len(rows)
+        batches += 1
         last_id = int(ids[-1])
         elapsed = time.time() - t0
         rate = processed / elapsed if elapsed > 0 else 0
@@ -359,6 +362,16 @@ def main():
             f'  {processed:,}/{total:,} ({pct:.1f}%) - {rate:.0f}/sec',
             flush=True,
         )
+        if batches % CHECKPOINT_BATCHES == 0:
+            updated += writer.apply(risk_model_version=version_tag)
+            print(f'  Checkpoint: written through id {last_id} (resume with --start-id {last_id})', flush=True)
+
+    print(f'Writing {writer.staged:,} scores...', flush=True)
+    updated += writer.apply(risk_model_version=version_tag)
+    print(f'  Updated {updated:,} contracts', flush=True)
+    epoch = bump_data_epoch(conn, '_score_v6_now', contracts_changed=True)
+    print(f'  Data epoch bumped to {epoch}', flush=True)
+    refresh_contract_aggregates(conn)
 
     elapsed = time.time() - t0
     t = sum(dist.values())
@@ -374,6 +387,10 @@ def main():
     print(f'Global fallback contracts: {global_fallback_count:,} (sectors: {fallback_sectors})')
     print(f'Ghost companion boosts: {ghost_boosts_applied:,}')
     conn.close()
+
+    if not args.skip_materialized:
+        print('\nRe-rendering materialized API payloads...', flush=True)
+        refresh_materialized(DB)
     return 0
 
 if __name__ == '__main__':
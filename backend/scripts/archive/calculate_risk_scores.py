@@ -50,6 +50,9 @@ from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from api.services.risk_factor_index import build_risk_factor_index
+
 # Database path
 DB_PATH = Path(__file__).parent.parent / "RUBLI_NORMALIZED.db"
 
@@ -871,6 +874,11 @@ def main():
             rate = processed / elapsed if elapsed > 0 else 0
             print(f"  Processed {processed:,} / {total:,} ({100*processed/total:.1f}%) - {rate:.0f} contracts/sec")
 
+        # risk_factors changed: re-derive the factor bitmask and inverted index
+        stamp = build_risk_factor_index(conn)
+        print(f"\nRisk-factor index rebuilt ({stamp['contracts']:,} contracts, "
+              f"{stamp['rows']:,} factor rows)")
+
         # Summary statistics
         print("\n" + "=" * 60)
         print("Risk Scoring Summary:")
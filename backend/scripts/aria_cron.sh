@@ -29,4 +29,8 @@ python -m scripts.aria_generate_memos --tier 1 --limit 20 2>&1 || true
 # Phase 3: Generate memos for Tier 2
 python -m scripts.aria_generate_memos --tier 2 --limit 30 2>&1 || true
 
+# Phase 4: Re-render materialized API payloads retired by the pipeline's epoch
+# bump (normally already done by the pipeline itself; renders only what is missing)
+python -m api.materialized --missing 2>&1 || true
+
 echo "$(date -u '+%Y-%m-%d %H:%M:%S UTC') — ARIA daily run complete"
@@ -3,21 +3,31 @@ ARIA Phase 1 Pipeline — Investigation Priority Score + Pattern Classifier
 + Intermediary Detection + External Cross-Reference + False Positive Screening.
 
 Run from backend/ directory:
-    python -m scripts.aria_pipeline [--dry-run] [--limit 1000]
+    python -m scripts.aria_pipeline [--dry-run] [--limit 1000] [--workers 8]
 """
 
 import argparse
 import json
 import logging
 import math
+import multiprocessing as mp
 import sqlite3
 import statistics
+import sys
 import uuid
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 import os
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from api.data_epoch import bump_data_epoch
+from scripts.refresh_materialized import refresh_materialized
+
 DB_PATH = Path(os.environ.get("DATABASE_PATH", str(Path(__file__).parent.parent / "RUBLI_NORMALIZED.db")))
 ARIA_VERSION = "1.0"
 
@@ -51,6 +61,9 @@ TIER1_THRESHOLD = float(os.environ.get("ARIA_TIER1_THRESHOLD", "0.80"))
 TIER2_THRESHOLD = float(os.environ.get("ARIA_TIER2_THRESHOLD", "0.60"))
 TIER3_THRESHOLD = float(os.environ.get("ARIA_TIER3_THRESHOLD", "0.40"))
 
+# Worker processes for per-vendor scoring (1 = score in-process)
+ARIA_WORKERS = int(os.environ.get("ARIA_WORKERS", str(os.cpu_count() or 1)))
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -308,7 +321,15 @@ def compute_burst_score(vendor_id: int, conn: sqlite3.Connection) -> tuple:
         """,
         (vendor_id,),
     ).fetchall()
+    return _burst_score_from_rows(rows)
 
+
+def _burst_score_from_rows(rows: list) -> tuple:
+    """Burst score and detail from one vendor's (contract_year, amount_mxn) rows.
+
+    Rows are the vendor's valid-amount contracts ordered by contract_year;
+    shared by compute_burst_score and load_vendor_contract_profiles.
+    """
     if len(rows) < 2:
         return 0.0, {}
 
@@ -661,15 +682,20 @@ def screen_false_positives(
 # Module 4 support: Institution capture features
 # ---------------------------------------------------------------------------
 
+def _stage_vendor_ids(conn: sqlite3.Connection, vendor_ids: list) -> None:
+    """Fill the _aria_vids temp table that the per-vendor loaders join against."""
+    # Use a temp table to avoid SQLite's SQL variable limit (~32766)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _aria_vids (vendor_id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM _aria_vids")
+    conn.executemany("INSERT OR IGNORE INTO _aria_vids VALUES (?)", [(v,) for v in vendor_ids])
+
+
 def load_vendor_institution_features(conn: sqlite3.Connection, vendor_ids: list) -> dict:
     """Returns {vendor_id: {top_institution_ratio, institution_count}}."""
     if not vendor_ids:
         return {}
 
-    # Use a temp table to avoid SQLite's SQL variable limit (~32766)
-    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _aria_vids (vendor_id INTEGER PRIMARY KEY)")
-    conn.execute("DELETE FROM _aria_vids")
-    conn.executemany("INSERT OR IGNORE INTO _aria_vids VALUES (?)", [(v,) for v in vendor_ids])
+    _stage_vendor_ids(conn, vendor_ids)
 
     rows = conn.execute("""
         SELECT
@@ -794,6 +820,77 @@ def get_primary_sector(vendor_id: int, conn: sqlite3.Connection) -> tuple:
     return None, None
 
 
+# ---------------------------------------------------------------------------
+# Modules 3 + helper, set-based: one grouped pass over contracts
+# ---------------------------------------------------------------------------
+
+_NULL = np.iinfo(np.int64).min
+
+
+def load_vendor_contract_profiles(conn: sqlite3.Connection, vendor_ids: list) -> tuple:
+    """Burst scores and primary sectors for all vendor_ids from one scan of contracts.
+
+    Returns (burst, primary_sector):
+        burst           {vendor_id: (burst_score, detail)} as compute_burst_score
+        primary_sector  {vendor_id: (sector_id, sector_name)} as get_primary_sector
+
+    Contract counts, value per contract and activity span are aggregated
+    per vendor with NumPy; only vendors that pass the intermediary profile
+    gates (<= 100 contracts, <= 5 years, >= 10M MXN per contract) get the
+    interval / peak-year detail. Vendors without contracts are absent.
+    Sector ties go to the lowest sector_id.
+    """
+    if not vendor_ids:
+        return {}, {}
+    _stage_vendor_ids(conn, vendor_ids)
+    cur = conn.execute("""
+        SELECT c.vendor_id, c.sector_id, c.contract_year, c.amount_mxn
+        FROM contracts c
+        INNER JOIN _aria_vids t ON c.vendor_id = t.vendor_id
+    """)
+    chunks = []
+    while True:
+        batch = cur.fetchmany(200_000)
+        if not batch:
+            break
+        chunks.append(np.array(batch, dtype=np.float64).reshape(len(batch), 4))  # NULL -> NaN
+    if not chunks:
+        return {}, {}
+    data = np.concatenate(chunks)
+    vendor = data[:, 0].astype(np.int64)
+    sector = np.where(np.isnan(data[:, 1]), _NULL, np.nan_to_num(data[:, 1])).astype(np.int64)
+    year, amount = data[:, 2], data[:, 3]
+
+    # Primary sector: most contracts (all amounts), NULL sector is a group too
+    pairs, counts = np.unique(np.stack([vendor, sector], axis=1), axis=0, return_counts=True)
+    order = np.lexsort((pairs[:, 1], -counts, pairs[:, 0]))
+    pairs = pairs[order]
+    first = np.flatnonzero(np.r_[True, pairs[1:, 0] != pairs[:-1, 0]])
+    primary_sector = {}
+    for vid, sid in pairs[first].tolist():
+        sid = None if sid == _NULL else sid
+        primary_sector[vid] = (sid, SECTOR_MAP.get(sid, "otros"))
+
+    # Burst score: valid-amount contracts, gated per vendor before any detail
+    valid = (amount > 0) & (amount < 100000000000)
+    order = np.lexsort((year[valid], vendor[valid]))
+    vendor, year, amount = vendor[valid][order], year[valid][order], amount[valid][order]
+    vids, starts, n = np.unique(vendor, return_index=True, return_counts=True)
+    burst = {vid: (0.0, {}) for vid in primary_sector}
+    if not len(vids):
+        return burst, primary_sector
+    with np.errstate(invalid="ignore"):
+        span = np.fmax.reduceat(year, starts) - np.fmin.reduceat(year, starts) + 1
+        per_contract = np.add.reduceat(amount, starts) / n
+        # slack on the value gate: the exact check is redone per candidate
+        candidate = (n >= 2) & (span <= 5) & (n <= 100) & (per_contract >= 10_000_000 * (1 - 1e-9))
+    for i in np.flatnonzero(candidate):
+        lo, hi = starts[i], starts[i] + n[i]
+        rows = [(None if math.isnan(y) else int(y), a) for y, a in zip(year[lo:hi].tolist(), amount[lo:hi].tolist())]
+        burst[int(vids[i])] = _burst_score_from_rows(rows)
+    return burst, primary_sector
+
+
 # ---------------------------------------------------------------------------
 # Module 8: Ground Truth Auto-Update
 # ---------------------------------------------------------------------------
@@ -930,9 +1027,182 @@ def check_centinela_freshness(conn: sqlite3.Connection) -> None:
         logger.debug("CENTINELA freshness check skipped: %s", e)
 
 
-def run_pipeline(dry_run: bool = False, limit: int = None) -> tuple:
+# ---------------------------------------------------------------------------
+# Per-vendor scoring, sharded across worker processes
+# ---------------------------------------------------------------------------
+
+# Shards per worker: smaller shards even out partitions that score slowly.
+SHARDS_PER_WORKER = 4
+# Below this many vendors a process pool costs more than it saves.
+MIN_PARALLEL_VENDORS = 5_000
+
+_LOOKUPS: dict = {}
+
+
+def _init_worker(lookups: dict) -> None:
+    """Pool initializer: install the read-only lookup tables in this process."""
+    global _LOOKUPS
+    _LOOKUPS = lookups
+
+
+def _score_shard(run_id: str, vendors: list) -> list:
+    return [score_vendor(v, run_id, _LOOKUPS) for v in vendors]
+
+
+def score_vendor(v: dict, run_id: str, lk: dict) -> dict:
+    """Score one vendor_stats row into an aria_queue row (IPS, patterns, FP screening).
+
+    ``lk`` holds the per-vendor lookup tables built by run_pipeline
+    (ext_data, maha_map, ensemble_map, ...); no database access.
+    """
+    vid = v["id"]
+    vname = v["name"]
+
+    # Burst / intermediary score
+    burst_score, burst_detail = lk["burst_profiles"].get(vid, (0.0, {}))
+
+    # External flags
+    ext = lk["ext_data"].get(vid, {})
+    is_efos = ext.get("is_efos", 0)
+    is_sfp  = ext.get("is_sfp", 0)
+    in_gt   = ext.get("in_gt", 0)
+
+    # Normalise signals
+    avg_risk   = v["avg_risk_score"] or 0.0
+    max_maha   = lk["maha_map"].get(vid, 0) or 0.0
+    ensemble   = lk["ensemble_map"].get(vid, 0) or 0.0
+    total_val  = v["total_value"] or 0.0
+    total_contracts = v["total_contracts"] or 0
+
+    risk_norm     = normalize_risk_score(avg_risk)
+    maha_norm     = normalize_mahalanobis(max_maha)
+    ensemble_norm = min(1.0, ensemble)
+    financial_norm = normalize_financial(total_val)
+    shell_score   = ext.get("shell_score", 0)
+    ext_score     = compute_external_flags_score(is_efos, is_sfp, in_gt, shell_score)
+
+    ips_raw = compute_ips(risk_norm, maha_norm, ensemble_norm, financial_norm, ext_score)
+
+    # Years active
+    first_yr = v["first_contract_year"] or 2025
+    last_yr  = v["last_contract_year"] or 2025
+    years_active = max(1, (last_yr - first_yr) + 1)
+
+    # Average contract value for FP screening
+    avg_contract_amt = total_val / max(total_contracts, 1)
+
+    # Pattern classification
+    # Institution and z-score features for this vendor
+    inst_feat = lk["institution_features"].get(vid, {})
+    zf = lk["z_features"].get(vid, {})
+
+    vendor_data_dict = {
+        "vendor_concentration": lk["concentration_map"].get(vid, 0.0),
+        "total_contracts":      total_contracts,
+        "direct_award_rate":    (v["direct_award_rate"] or 0) / 100.0,
+        "single_bid_rate":      (v["single_bid_rate"] or 0) / 100.0,
+        "years_active":         years_active,
+        "rfc":                  v["rfc"],
+        "burst_score":          burst_score,
+        "is_efos_definitivo":   is_efos,
+        "in_ground_truth":      in_gt,
+        "avg_z_price_ratio":    zf.get("avg_z_price_ratio", 0),
+        "max_z_price_ratio":    zf.get("max_z_price_ratio", 0),
+        "industry_mismatch_rate": max(0, zf.get("avg_z_industry_mismatch", 0)),
+        "price_hypothesis_count": zf.get("price_outlier_count", 0),
+        "top_institution_ratio":  inst_feat.get("top_institution_ratio", 0),
+        "sector_vendor_count":  lk["sector_counts"].get(v["sector_id"], 999),
+        "max_contract_amount":  v["max_risk_score"] or 0.0,
+        "avg_contract_amount":  avg_contract_amt,
+        "total_value_mxn":      total_val,
+        "co_bid_rate":          lk["co_bid_rates"].get(vid, 0.0),
+    }
+
+    patterns = classify_patterns(vendor_data_dict)
+    # Primary = highest-confidence pattern >= 0.30
+    qualifying = {p: s for p, s in patterns.items() if s >= 0.30}
+    primary = max(qualifying, key=qualifying.get) if qualifying else None
+    primary_conf = patterns.get(primary, 0.0) if primary else 0.0
+
+    # False positive screening
+    fp = screen_false_positives(vname, vendor_data_dict, None)
+    primary_sector_id, primary_sector_name = lk["primary_sectors"].get(vid, (None, None))
+    ips_final = round(max(0.0, ips_raw - fp["penalty"]), 6)
+    tier = assign_tier(ips_final)
+    # EFOS definitivo vendors are SAT-confirmed ghost companies — guarantee T2 minimum
+    if is_efos and tier > 2:
+        tier = 2
+
+    return {
+        "vendor_id":              vid,
+        "vendor_name":            vname,
+        "aria_run_id":            run_id,
+        "risk_score_norm":        risk_norm,
+        "mahalanobis_norm":       maha_norm,
+        "ensemble_norm":          ensemble_norm,
+        "financial_scale_norm":   financial_norm,
+        "external_flags_score":   ext_score,
+        "ips_raw":                ips_raw,
+        "ips_final":              ips_final,
+        "ips_tier":               tier,
+        "primary_pattern":        primary,
+        "pattern_confidence":     primary_conf,
+        "pattern_confidences":    json.dumps(patterns),
+        "burst_score":            burst_score,
+        "activity_span_days":     burst_detail.get("activity_span_years", 0) * 365,
+        "value_per_contract":     burst_detail.get("value_per_contract", 0),
+        "is_disappeared":         burst_detail.get("is_disappeared", 0),
+        "is_efos_definitivo":     is_efos,
+        "is_sfp_sanctioned":      is_sfp,
+        "in_ground_truth":        in_gt,
+        "efos_rfc":               ext.get("efos_rfc"),
+        "sfp_sanction_type":      ext.get("sfp_type"),
+        "fp_patent_exception":    int(fp["fp_patent"]),
+        "fp_data_error":          int(fp["fp_data_error"]),
+        "fp_structural_monopoly": int(fp["fp_structural"]),
+        "fp_penalty":             fp["penalty"],
+        "total_contracts":        total_contracts,
+        "total_value_mxn":        total_val,
+        "avg_risk_score":         avg_risk,
+        "max_risk_score":         v["max_risk_score"] or 0.0,
+        "primary_sector_id":      primary_sector_id,
+        "primary_sector_name":    primary_sector_name,
+        "years_active":           years_active,
+        "direct_award_rate":      (v["direct_award_rate"] or 0) / 100.0,
+        "single_bid_rate":        (v["single_bid_rate"] or 0) / 100.0,
+        "top_institution_ratio":  inst_feat.get("top_institution_ratio", 0),
+    }
+
+
+def score_vendors(vendors: list, run_id: str, lookups: dict, workers: int = 1) -> list:
+    """Score vendors in order, split into contiguous shards over a process pool.
+
+    The lookup tables are handed to each worker once by the pool
+    initializer; with the fork start method they are shared copy-on-write
+    rather than pickled. Results come back in input order.
+    """
+    if workers <= 1 or len(vendors) < MIN_PARALLEL_VENDORS:
+        return [score_vendor(v, run_id, lookups) for v in vendors]
+
+    size = -(-len(vendors) // (workers * SHARDS_PER_WORKER))
+    shards = [vendors[i:i + size] for i in range(0, len(vendors), size)]
+    ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+    logger.info("  Scoring %d shards on %d workers...", len(shards), workers)
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(lookups,),
+    ) as pool:
+        for part in pool.map(_score_shard, [run_id] * len(shards), shards):
+            results.extend(part)
+    return results
+
+
+def run_pipeline(
+    dry_run: bool = False, limit: int = None, workers: int = None, rematerialize: bool = True,
+) -> tuple:
+    workers = ARIA_WORKERS if workers is None else workers
     run_id = str(uuid.uuid4())[:8]
-    logger.info("ARIA run %s starting (dry_run=%s, limit=%s)...", run_id, dry_run, limit)
+    logger.info("ARIA run %s starting (dry_run=%s, limit=%s, workers=%d)...", run_id, dry_run, limit, workers)
 
     conn = sqlite3.connect(str(DB_PATH), timeout=300)
     conn.row_factory = sqlite3.Row
@@ -1025,128 +1295,28 @@ def run_pipeline(dry_run: bool = False, limit: int = None) -> tuple:
         co_bid_rates = load_vendor_co_bid_rates(conn, vendor_ids)
         logger.info("  Co-bid rates loaded for %d vendors", len(co_bid_rates))
 
-        results = []
+        # -- Burst scores and primary sectors: one grouped contracts pass -----
+        logger.info("  Loading per-vendor contract profiles...")
+        burst_profiles, primary_sectors = load_vendor_contract_profiles(conn, vendor_ids)
+        logger.info("  Contract profiles: %d vendors", len(primary_sectors))
+
+        vendor_rows = [dict(v) for v in vendors]
+        lookups = {
+            "ext_data":             ext_data,
+            "maha_map":             maha_map,
+            "ensemble_map":         ensemble_map,
+            "sector_counts":        sector_counts,
+            "concentration_map":    concentration_map,
+            "institution_features": institution_features,
+            "z_features":           z_features,
+            "co_bid_rates":         co_bid_rates,
+            "burst_profiles":       burst_profiles,
+            "primary_sectors":      primary_sectors,
+        }
+        results = score_vendors(vendor_rows, run_id, lookups, workers)
         tier_counts = [0, 0, 0, 0]
-
-        for v in vendors:
-            vid = v["id"]
-            vname = v["name"]
-
-            # Burst / intermediary score
-            burst_score, burst_detail = compute_burst_score(vid, conn)
-
-            # External flags
-            ext = ext_data.get(vid, {})
-            is_efos = ext.get("is_efos", 0)
-            is_sfp  = ext.get("is_sfp", 0)
-            in_gt   = ext.get("in_gt", 0)
-
-            # Normalise signals
-            avg_risk   = v["avg_risk_score"] or 0.0
-            max_maha   = maha_map.get(vid, 0) or 0.0
-            ensemble   = ensemble_map.get(vid, 0) or 0.0
-            total_val  = v["total_value"] or 0.0
-            total_contracts = v["total_contracts"] or 0
-
-            risk_norm     = normalize_risk_score(avg_risk)
-            maha_norm     = normalize_mahalanobis(max_maha)
-            ensemble_norm = min(1.0, ensemble)
-            financial_norm = normalize_financial(total_val)
-            shell_score   = ext.get("shell_score", 0)
-            ext_score     = compute_external_flags_score(is_efos, is_sfp, in_gt, shell_score)
-
-            ips_raw = compute_ips(risk_norm, maha_norm, ensemble_norm, financial_norm, ext_score)
-
-            # Years active
-            first_yr = v["first_contract_year"] or 2025
-            last_yr  = v["last_contract_year"] or 2025
-            years_active = max(1, (last_yr - first_yr) + 1)
-
-            # Average contract value for FP screening
-            avg_contract_amt = total_val / max(total_contracts, 1)
-
-            # Pattern classification
-            # Institution and z-score features for this vendor
-            inst_feat = institution_features.get(vid, {})
-            zf = z_features.get(vid, {})
-
-            vendor_data_dict = {
-                "vendor_concentration": concentration_map.get(vid, 0.0),
-                "total_contracts":      total_contracts,
-                "direct_award_rate":    (v["direct_award_rate"] or 0) / 100.0,
-                "single_bid_rate":      (v["single_bid_rate"] or 0) / 100.0,
-                "years_active":         years_active,
-                "rfc":                  v["rfc"],
-                "burst_score":          burst_score,
-                "is_efos_definitivo":   is_efos,
-                "in_ground_truth":      in_gt,
-                "avg_z_price_ratio":    zf.get("avg_z_price_ratio", 0),
-                "max_z_price_ratio":    zf.get("max_z_price_ratio", 0),
-                "industry_mismatch_rate": max(0, zf.get("avg_z_industry_mismatch", 0)),
-                "price_hypothesis_count": zf.get("price_outlier_count", 0),
-                "top_institution_ratio":  inst_feat.get("top_institution_ratio", 0),
-                "sector_vendor_count":  sector_counts.get(v["sector_id"], 999),
-                "max_contract_amount":  v["max_risk_score"] or 0.0,
-                "avg_contract_amount":  avg_contract_amt,
-                "total_value_mxn":      total_val,
-                "co_bid_rate":          co_bid_rates.get(vid, 0.0),
-            }
-
-            patterns = classify_patterns(vendor_data_dict)
-            # Primary = highest-confidence pattern >= 0.30
-            qualifying = {p: s for p, s in patterns.items() if s >= 0.30}
-            primary = max(qualifying, key=qualifying.get) if qualifying else None
-            primary_conf = patterns.get(primary, 0.0) if primary else 0.0
-
-            # False positive screening
-            fp = screen_false_positives(vname, vendor_data_dict, conn)
-            primary_sector_id, primary_sector_name = get_primary_sector(vid, conn)
-            ips_final = round(max(0.0, ips_raw - fp["penalty"]), 6)
-            tier = assign_tier(ips_final)
-            # EFOS definitivo vendors are SAT-confirmed ghost companies — guarantee T2 minimum
-            if is_efos and tier > 2:
-                tier = 2
-            tier_counts[tier - 1] += 1
-
-            results.append({
-                "vendor_id":              vid,
-                "vendor_name":            vname,
-                "aria_run_id":            run_id,
-                "risk_score_norm":        risk_norm,
-                "mahalanobis_norm":       maha_norm,
-                "ensemble_norm":          ensemble_norm,
-                "financial_scale_norm":   financial_norm,
-                "external_flags_score":   ext_score,
-                "ips_raw":                ips_raw,
-                "ips_final":              ips_final,
-                "ips_tier":               tier,
-                "primary_pattern":        primary,
-                "pattern_confidence":     primary_conf,
-                "pattern_confidences":    json.dumps(patterns),
-                "burst_score":            burst_score,
-                "activity_span_days":     burst_detail.get("activity_span_years", 0) * 365,
-                "value_per_contract":     burst_detail.get("value_per_contract", 0),
-                "is_disappeared":         burst_detail.get("is_disappeared", 0),
-                "is_efos_definitivo":     is_efos,
-                "is_sfp_sanctioned":      is_sfp,
-                "in_ground_truth":        in_gt,
-                "efos_rfc":               ext.get("efos_rfc"),
-                "sfp_sanction_type":      ext.get("sfp_type"),
-                "fp_patent_exception":    int(fp["fp_patent"]),
-                "fp_data_error":          int(fp["fp_data_error"]),
-                "fp_structural_monopoly": int(fp["fp_structural"]),
-                "fp_penalty":             fp["penalty"],
-                "total_contracts":        total_contracts,
-                "total_value_mxn":        total_val,
-                "avg_risk_score":         avg_risk,
-                "max_risk_score":         v["max_risk_score"] or 0.0,
-                "primary_sector_id":      primary_sector_id,
-                "primary_sector_name":    primary_sector_name,
-                "years_active":           years_active,
-                "direct_award_rate":      (v["direct_award_rate"] or 0) / 100.0,
-                "single_bid_rate":        (v["single_bid_rate"] or 0) / 100.0,
-                "top_institution_ratio":  inst_feat.get("top_institution_ratio", 0),
-            })
+        for r in results:
+            tier_counts[r["ips_tier"] - 1] += 1
 
         logger.info(
             "  Tiers: T1=%d, T2=%d, T3=%d, T4=%d",
@@ -1159,6 +1329,11 @@ def run_pipeline(dry_run: bool = False, limit: int = None) -> tuple:
 
         # -- Persist results -------------------------------------------------
         if not dry_run:
+            # Merge all shards' rows into aria_queue in one write transaction
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+
             # Preserve manual memos and review status before wiping
             preserved = {}
             for row in conn.execute(
@@ -1176,12 +1351,12 @@ def run_pipeline(dry_run: bool = False, limit: int = None) -> tuple:
             )
             conn.execute("DELETE FROM aria_queue")
 
-            for r in results:
-                cols = ", ".join(r.keys())
-                placeholders = ", ".join("?" * len(r))
-                conn.execute(
-                    f"INSERT OR REPLACE INTO aria_queue ({cols}) VALUES ({placeholders})",
-                    list(r.values()),
+            if results:
+                cols = list(results[0])
+                placeholders = ", ".join("?" * len(cols))
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO aria_queue ({', '.join(cols)}) VALUES ({placeholders})",
+                    ([r[c] for c in cols] for r in results),
                 )
 
             # Restore preserved memos
@@ -1223,6 +1398,13 @@ def run_pipeline(dry_run: bool = False, limit: int = None) -> tuple:
             )
             conn.commit()
             logger.info("  Saved %d rows to aria_queue.", len(results))
+            epoch = bump_data_epoch(conn, "aria_pipeline")
+            logger.info("  Data epoch bumped to %d.", epoch)
+            if rematerialize:
+                # the bump retired every mv:* payload; render them for the new epoch
+                rc = refresh_materialized(DB_PATH)
+                if rc:
+                    logger.warning("  Materialized refresh exited with %d.", rc)
         else:
             logger.info("  DRY RUN — %d rows computed, not saved.", len(results))
 
@@ -1248,6 +1430,7 @@ def run_pipeline(dry_run: bool = False, limit: int = None) -> tuple:
     except Exception:
         if not dry_run:
             try:
+                conn.rollback()
                 conn.execute(
                     "UPDATE aria_runs SET status='failed', error_message=? WHERE id=?",
                     ("See logs", run_id),
@@ -1275,6 +1458,14 @@ if __name__ == "__main__":
         "--db", type=str, default=None,
         help="Path to SQLite database (overrides DATABASE_PATH env var)"
     )
+    parser.add_argument(
+        "--skip-materialized", action="store_true",
+        help="Do not re-render materialized API payloads after saving"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Worker processes for vendor scoring (default: ARIA_WORKERS or CPU count)"
+    )
     args = parser.parse_args()
 
     if args.db:
@@ -1285,7 +1476,10 @@ if __name__ == "__main__":
         format="%(asctime)s %(levelname)s %(message)s",
     )
 
-    run_id, tiers = run_pipeline(dry_run=args.dry_run, limit=args.limit)
+    run_id, tiers = run_pipeline(
+        dry_run=args.dry_run, limit=args.limit, workers=args.workers,
+        rematerialize=not args.skip_materialized,
+    )
     print(
         f"\nRun {run_id} complete. "
         f"Tier distribution: T1={tiers[0]}, T2={tiers[1]}, T3={tiers[2]}, T4={tiers[3]}"
@@ -5,6 +5,9 @@ Uses the v6.0 global model (vendor-stratified, time-windowed) to score all contr
 No per-sector sub-models — single global ElasticNet logistic regression.
 
 Preserves v5.1 scores in risk_score_v5 before overwriting risk_score.
+Scored batches are staged and written back with one set-based UPDATE per
+checkpoint (every --checkpoint-batches batches; scripts/score_writeback.py).
+Each checkpoint prints the --start-id to resume from if the run is cut short.
 
 Usage:
     python -m scripts.calculate_risk_scores_v6 [--batch-size 50000] [--dry-run]
@@ -25,7 +28,11 @@ logger = logging.getLogger(__name__)
 DB_PATH = Path(__file__).parent.parent / "RUBLI_NORMALIZED.db"
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from api.config.constants import get_risk_level
+from api.config.constants import RISK_THRESHOLDS_V4
+from api.data_epoch import bump_data_epoch
+from scripts.refresh_contract_aggregates import refresh_contract_aggregates
+from scripts.refresh_materialized import refresh_materialized
+from scripts.score_writeback import CHECKPOINT_BATCHES, ScoreWriteBack, level_counts, risk_levels
 
 Z_COLS = [
     'z_single_bid', 'z_direct_award', 'z_price_ratio',
@@ -125,7 +132,12 @@ def main():
     parser = argparse.ArgumentParser(description='Risk Scoring v6.0')
     parser.add_argument('--batch-size', type=int, default=50000)
     parser.add_argument('--dry-run', action='store_true')
-    parser.add_argument('--start-id', type=int, default=0)
+    parser.add_argument('--start-id', type=int, default=0,
+                        help='Resume after this contract ID (printed at each checkpoint)')
+    parser.add_argument('--checkpoint-batches', type=int, default=CHECKPOINT_BATCHES,
+                        help='Write staged scores every N batches')
+    parser.add_argument('--skip-materialized', action='store_true',
+                        help='Do not re-render materialized API payloads after writing')
     args = parser.parse_args()
 
     print("=" * 60)
@@ -168,10 +180,16 @@ def main():
         print(f"\nScoring {total:,} contracts...")
 
         processed = 0
+        batches = 0
+        updated = 0
         last_id = args.start_id
         score_dist = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
 
         z_select = ', '.join(f'zf.{c}' for c in Z_COLS)
+        writer = None if args.dry_run else ScoreWriteBack(conn, [
+            'risk_score', 'risk_level', 'risk_confidence_lower',
+            'risk_confidence_upper', 'mahalanobis_distance',
+        ])
 
         while True:
             cursor.execute(f"""
@@ -204,40 +222,36 @@ def main():
             ci_hi_r = np.round(ci_upper, 6)
             mah_r = np.round(mah, 4)
 
-            updates = []
-            for i in range(len(contract_ids)):
-                score = float(scores_r[i])
-                level = get_risk_level(score, 'v4.0')  # same thresholds
-                score_dist[level] += 1
-                updates.append((
-                    score, level,
-                    float(ci_lo_r[i]),
-                    float(ci_hi_r[i]),
-                    float(mah_r[i]) if mah[i] > 0 else None,
-                    'v6.0',
-                    int(contract_ids[i]),
-                ))
-
-            if not args.dry_run:
-                cursor.executemany("""
-                    UPDATE contracts
-                    SET risk_score = ?,
-                        risk_level = ?,
-                        risk_confidence_lower = ?,
-                        risk_confidence_upper = ?,
-                        mahalanobis_distance = ?,
-                        risk_model_version = ?
-                    WHERE id = ?
-                """, updates)
-                conn.commit()
+            levels = risk_levels(scores_r, RISK_THRESHOLDS_V4)  # v4.0 thresholds
+            for level, count in level_counts(levels).items():
+                score_dist[level] += count
+
+            if writer is not None:
+                writer.stage(
+                    contract_ids, scores_r, levels, ci_lo_r, ci_hi_r,
+                    np.where(mah > 0, mah_r, np.nan),  # NaN -> NULL
+                )
 
             processed += len(rows)
+            batches += 1
             last_id = int(contract_ids[-1])
             elapsed = (datetime.now() - start).total_seconds()
             rate = processed / elapsed if elapsed > 0 else 0
             print(f"  {processed:,}/{total:,} ({100 * processed / total:.1f}%) "
                   f"- {rate:.0f}/sec")
 
+            if writer is not None and batches % args.checkpoint_batches == 0:
+                updated += writer.apply(risk_model_version=MODEL_VERSION)
+                print(f"  Checkpoint: written through id {last_id} (resume with --start-id {last_id})")
+
+        if writer is not None:
+            print(f"\nWriting {writer.staged:,} scores...")
+            updated += writer.apply(risk_model_version=MODEL_VERSION)
+            print(f"  Updated {updated:,} contracts")
+            epoch = bump_data_epoch(conn, "calculate_risk_scores_v6", contracts_changed=True)
+            print(f"\nData epoch bumped to {epoch}")
+            refresh_contract_aggregates(conn)
+
         # Summary
         elapsed = (datetime.now() - start).total_seconds()
         total_scored = sum(score_dist.values())
@@ -265,6 +279,9 @@ def main():
     finally:
         conn.close()
 
+    if not args.dry_run and not args.skip_materialized:
+        print("\nRe-rendering materialized API payloads...")
+        refresh_materialized(DB_PATH)
     return 0
 
 
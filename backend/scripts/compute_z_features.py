@@ -10,6 +10,13 @@ Binary:      z_i = (x_i - p(s,t)) / √(p(s,t)(1-p(s,t)))  (Bernoulli z-score)
 Creates table: contract_z_features
   3.1M rows × 16 z-columns + mahalanobis_distance (filled later)
 
+Contracts are read once into NumPy columns and features are computed a
+column at a time: auxiliary lookups (rolling stats, vendor groups, co-bid
+rates, institution HHI, ...) are joined through sorted integer keys, and
+baseline mean/stddev is resolved once per (sector, year) cell and broadcast.
+compute_raw_features() / compute_z_score() are the row-wise reference the
+engine must match exactly.
+
 Usage:
     python -m scripts.compute_z_features [--batch-size 50000]
     python -m scripts.compute_z_features --orth-only  # Only compute orthogonalized features
@@ -23,6 +30,8 @@ from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 
+import numpy as np
+
 DB_PATH = Path(__file__).parent.parent / "RUBLI_NORMALIZED.db"
 
 EPSILON = 0.1    # Minimum stddev to avoid pathological z-scores from thin cells
@@ -598,6 +607,377 @@ def compute_z_score(raw_value, mean, stddev, is_binary=False):
 
 
 
+# =============================================================================
+# Column-at-a-time engine
+# =============================================================================
+
+# Stand-in for SQL NULL in integer columns; falsy like None in the reference.
+NULL_ID = np.iinfo(np.int64).min
+
+BINARY_FACTORS = {'single_bid', 'direct_award', 'year_end', 'industry_mismatch'}
+
+
+def _int_column(values) -> np.ndarray:
+    """Integer column with NULL as NULL_ID."""
+    arr = np.array(values, dtype=np.float64)
+    out = np.full(len(arr), NULL_ID, dtype=np.int64)
+    present = ~np.isnan(arr)
+    out[present] = arr[present]
+    return out
+
+
+def _float_column(values) -> np.ndarray:
+    """Float column with NULL as NaN."""
+    return np.array(values, dtype=np.float64)
+
+
+def _truthy(ids: np.ndarray) -> np.ndarray:
+    """Python truthiness of an integer column (None and 0 are false)."""
+    return (ids != 0) & (ids != NULL_ID)
+
+
+def _decode(value: int):
+    return None if value == NULL_ID else int(value)
+
+
+class KeyIndex:
+    """Sorted (possibly composite) integer keys for vectorized dict lookups.
+
+    ``find`` returns, per query row, the position of the matching key in the
+    columns the index was built from, or -1. Rows with a NULL key component
+    are not indexed (the reference never looks them up).
+    """
+
+    def __init__(self, *columns):
+        cols = [np.asarray(c, dtype=np.int64) for c in columns]
+        keep = np.ones(len(cols[0]), dtype=bool)
+        for c in cols:
+            keep &= c != NULL_ID
+        self._rows = np.flatnonzero(keep)
+        cols = [c[keep] for c in cols]
+        self._lo = [int(c.min()) if len(c) else 0 for c in cols]
+        self._span = [int(c.max()) - lo + 1 if len(c) else 1 for c, lo in zip(cols, self._lo)]
+        self._mult = []
+        mult = 1
+        for span in reversed(self._span):
+            self._mult.insert(0, mult)
+            mult *= span
+        if mult >= 2 ** 62:
+            raise ValueError("composite key range too wide to pack into int64")
+        keys = self._pack(cols)
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._rows = self._rows[order]
+
+    def _pack(self, cols) -> np.ndarray:
+        key = np.zeros(len(cols[0]), dtype=np.int64)
+        for c, lo, mult in zip(cols, self._lo, self._mult):
+            key += (c - lo) * mult
+        return key
+
+    def find(self, *columns) -> np.ndarray:
+        cols = [np.asarray(c, dtype=np.int64) for c in columns]
+        inside = np.ones(len(cols[0]), dtype=bool)
+        for c, lo, span in zip(cols, self._lo, self._span):
+            inside &= (c != NULL_ID) & (c >= lo) & (c < lo + span)
+        if not len(self._keys):
+            return np.full(len(inside), -1, dtype=np.int64)
+        key = self._pack([np.where(inside, c, lo) for c, lo in zip(cols, self._lo)])
+        pos = np.minimum(np.searchsorted(self._keys, key), len(self._keys) - 1)
+        found = inside & (self._keys[pos] == key)
+        return np.where(found, self._rows[pos], -1)
+
+
+def _dict_lookup(mapping: dict, *, columns: int = 1):
+    """(KeyIndex, values) for a dict keyed by ints or tuples of ints."""
+    keys = list(mapping.keys())
+    if columns == 1:
+        key_cols = [_int_column(keys)]
+    else:
+        key_cols = [_int_column([k[i] for k in keys]) for i in range(columns)] if keys else \
+            [np.empty(0, dtype=np.int64)] * columns
+    return KeyIndex(*key_cols), _float_column(list(mapping.values()))
+
+
+def _take(lookup, default: float, *query) -> np.ndarray:
+    """``mapping.get(key, default)`` for every query row."""
+    index, values = lookup
+    pos = index.find(*query)
+    return np.where(pos >= 0, values[np.maximum(pos, 0)] if len(values) else default, default)
+
+
+def _day_ordinal(value) -> float:
+    """Ordinal of a 'YYYY-MM-DD' string, NaN where the reference's strptime fails."""
+    try:
+        return float(datetime.strptime(value, '%Y-%m-%d').toordinal())
+    except (ValueError, TypeError):
+        return math.nan
+
+
+class ContractColumns:
+    """The contracts columns compute_raw_features() reads, as NumPy arrays.
+
+    Dates are coded: ``dates[code]`` is the raw value, so equal strings
+    share a code and ``day_ordinal[code]`` parses each distinct value once.
+    """
+
+    FIELDS = ('id', 'vendor_id', 'institution_id', 'sector_id', 'amount',
+              'is_direct_award', 'is_single_bid', 'is_year_end',
+              'publication_date', 'contract_date', 'year', 'price_hyp_confidence')
+
+    def __init__(self, columns: dict, date_codes: dict):
+        self.columns = columns
+        self.dates = list(date_codes)
+        self.date_codes = date_codes
+        self.day_ordinal = np.array([_day_ordinal(d) for d in self.dates], dtype=np.float64)
+        self.date_truthy = np.array([bool(d) for d in self.dates], dtype=bool)
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self.columns[name]
+
+    def slice(self, start: int, stop: int) -> 'ContractColumns':
+        part = ContractColumns.__new__(ContractColumns)
+        part.__dict__.update(self.__dict__)
+        part.columns = {k: v[start:stop] for k, v in self.columns.items()}
+        return part
+
+    @classmethod
+    def from_rows(cls, batches) -> 'ContractColumns':
+        """Build from row batches in compute_raw_features() tuple order."""
+        date_codes: dict = {}
+        parts = defaultdict(list)
+        for rows in batches:
+            cols = list(zip(*rows))
+            for name in ('id', 'vendor_id', 'institution_id', 'sector_id', 'year'):
+                parts[name].append(_int_column(cols[cls.FIELDS.index(name)]))
+            for name in ('amount', 'is_direct_award', 'is_single_bid', 'is_year_end',
+                         'price_hyp_confidence'):
+                parts[name].append(_float_column(cols[cls.FIELDS.index(name)]))
+            for name in ('publication_date', 'contract_date'):
+                codes = [date_codes.setdefault(d, len(date_codes)) for d in cols[cls.FIELDS.index(name)]]
+                parts[name].append(np.array(codes, dtype=np.int64))
+        columns = {
+            name: np.concatenate(parts[name]) if parts[name] else
+            np.empty(0, dtype=np.float64 if name in ('amount', 'price_hyp_confidence') else np.int64)
+            for name in cls.FIELDS
+        }
+        return cls(columns, date_codes)
+
+
+def load_contract_columns(conn: sqlite3.Connection, phc_col: str,
+                          batch_size: int = 50000) -> ContractColumns:
+    """Read contracts once, in id order, into NumPy columns."""
+    cursor = conn.execute(f"""
+        SELECT id, vendor_id, institution_id, sector_id,
+               amount_mxn, is_direct_award, is_single_bid,
+               is_year_end, publication_date, contract_date,
+               contract_year, {phc_col}
+        FROM contracts
+        ORDER BY id
+    """)
+
+    def batches():
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+    return ContractColumns.from_rows(batches())
+
+
+class AuxArrays:
+    """load_auxiliary_data() output re-keyed for vectorized lookups."""
+
+    def __init__(self, aux: dict, date_codes: dict):
+        self.has_rolling_stats = aux['has_rolling_stats']
+
+        rs = aux['rolling_stats']
+        keys = list(rs.keys())
+        self.rolling_index = KeyIndex(
+            *([_int_column([k[i] for k in keys]) for i in range(3)] if keys
+              else [np.empty(0, dtype=np.int64)] * 3)
+        )
+        self.rolling = {
+            field: _float_column([r[field] for r in rs.values()])
+            for field in ('total_value', 'total_count', 'sum_sq_amount',
+                          'comp_wins', 'comp_total', 'inst_hhi', 'n_sectors')
+        }
+        self.sector_year_totals = _dict_lookup(aux['sector_year_totals'], columns=2)
+        self.sector_medians = _dict_lookup(aux['sector_medians'])
+
+        self.vendor_sector_val = _dict_lookup(aux['vendor_sector_val'], columns=2)
+        self.sector_totals = _dict_lookup(aux['sector_totals'])
+        self.vendor_price_vol = _dict_lookup(aux['vendor_price_vol'], columns=2)
+        self.vendor_comp_wins = _dict_lookup(aux['vendor_comp_wins'], columns=2)
+        self.sector_comp_totals = _dict_lookup(aux['sector_comp_totals'])
+        self.vendor_inst_hhi = _dict_lookup(aux['vendor_inst_hhi'])
+        self.vendor_sector_count = _dict_lookup(aux['vendor_sector_count'])
+
+        group_sizes = aux['group_sizes']
+        self.network_member_count = _dict_lookup({
+            vid: float(group_sizes.get(gid, 1)) for vid, gid in aux['vendor_group'].items()
+        })
+        self.co_bid_rates = _dict_lookup(aux['co_bid_rates'])
+        self.inst_baselines = _dict_lookup(aux['inst_baselines'])
+        affinity = aux['vendor_affinity']
+        self.affinity_index = KeyIndex(_int_column(list(affinity.keys())))
+        self.affinity = _int_column(list(affinity.values()))
+
+        split = aux['splitting']
+        keys = list(split.keys())
+        self.splitting = (
+            KeyIndex(
+                _int_column([k[0] for k in keys]),
+                _int_column([k[1] for k in keys]),
+                np.array([date_codes.setdefault(k[2], len(date_codes)) for k in keys], dtype=np.int64),
+            ),
+            _float_column(list(split.values())),
+        )
+
+
+def compute_raw_feature_arrays(c: ContractColumns, ax: AuxArrays) -> dict:
+    """compute_raw_features() over every row of ``c`` at once: factor -> array."""
+    n = len(c)
+    vendor, inst, sector, year = c['vendor_id'], c['institution_id'], c['sector_id'], c['year']
+    has_vendor, has_sector, has_year = _truthy(vendor), _truthy(sector), _truthy(year)
+    f = {}
+
+    f['single_bid'] = _flag(c['is_single_bid'])
+    f['direct_award'] = _flag(c['is_direct_award'])
+    f['year_end'] = _flag(c['is_year_end'])
+
+    amount = np.nan_to_num(c['amount'], nan=0.0)
+    median_pos = ax.sector_medians[0].find(sector)
+    median = _take(ax.sector_medians, 1.0, sector)
+    price_ok = (amount > 0) & (amount < 100_000_000_000) & (median_pos >= 0) & (median > 0)
+    f['price_ratio'] = np.where(price_ok, amount / np.where(price_ok, median, 1.0), 0.0)
+
+    # --- Vendor-level features ---
+    rolling = has_vendor & has_sector & has_year if ax.has_rolling_stats else np.zeros(n, dtype=bool)
+
+    prev = np.where(rolling, year - 1, NULL_ID)
+    pos_prev = ax.rolling_index.find(vendor, sector, prev)
+    pos_curr = ax.rolling_index.find(vendor, sector, np.where(rolling, year, NULL_ID))
+    pos = np.where(pos_prev >= 0, pos_prev, pos_curr)
+    as_of = np.where(pos_prev >= 0, prev, year)
+    found = rolling & (pos >= 0)
+
+    def stat(field):
+        values = ax.rolling[field]
+        return values[np.maximum(pos, 0)] if len(values) else np.zeros(n)
+
+    total_value, total_count = stat('total_value'), stat('total_count')
+    sect_total = _take(ax.sector_year_totals, 1.0, sector, np.where(found, as_of, NULL_ID))
+    conc_ok = found & (total_value > 0)
+    conc_div = conc_ok & (sect_total > 0)
+    r_conc = np.where(conc_div, np.minimum(total_value / np.where(conc_div, sect_total, 1.0), 1.0), 0.0)
+
+    vol_ok = found & (total_count >= 3)
+    cnt = np.where(vol_ok & (total_count > 0), total_count, 1.0)
+    avg = np.where(vol_ok, total_value / cnt, 0.0)
+    avg_sq = np.where(vol_ok, stat('sum_sq_amount') / cnt, 0.0)
+    variance = np.maximum(avg_sq - avg * avg, 0)
+    stddev = np.where(variance > 0, np.sqrt(variance), 0.0)
+    vol_median = _take(ax.sector_medians, 1.0, sector)
+    vol_div = vol_ok & (vol_median > 0)
+    r_vol = np.where(vol_div, stddev / np.where(vol_div, vol_median, 1.0), 0.0)
+
+    comp_total = stat('comp_total')
+    win_ok = found & (comp_total > 0)
+    r_win = np.where(win_ok, stat('comp_wins') / np.where(win_ok, comp_total, 1.0), 0.0)
+
+    r_div = np.where(found, stat('inst_hhi'), 1.0)
+    r_spread = np.where(found, stat('n_sectors'), 1.0)
+
+    # All-time fallback (rows the rolling branch does not cover)
+    vs = has_vendor & has_sector
+    vs_val = _take(ax.vendor_sector_val, 0.0, vendor, sector)
+    st_val = _take(ax.sector_totals, 1.0, sector)
+    st_ok = vs & (st_val > 0)
+    a_conc = np.where(st_ok, vs_val / np.where(st_ok, st_val, 1.0), 0.0)
+    a_vol = np.where(vs, _take(ax.vendor_price_vol, 0.0, vendor, sector), 0.0)
+    comp_wins = _take(ax.vendor_comp_wins, 0.0, vendor, sector)
+    comp_totals = _take(ax.sector_comp_totals, 1.0, sector)
+    ct_ok = vs & (comp_totals > 0)
+    a_win = np.where(ct_ok, comp_wins / np.where(ct_ok, comp_totals, 1.0), 0.0)
+    a_div = np.where(has_vendor, _take(ax.vendor_inst_hhi, 1.0, vendor), 1.0)
+    a_spread = np.where(has_vendor, _take(ax.vendor_sector_count, 1.0, vendor), 1.0)
+
+    f['vendor_concentration'] = np.where(rolling, r_conc, a_conc)
+    f['price_volatility'] = np.where(rolling, r_vol, a_vol)
+    f['win_rate'] = np.where(rolling, r_win, a_win)
+    f['institution_diversity'] = np.where(rolling, r_div, a_div)
+    f['sector_spread'] = np.where(rolling, r_spread, a_spread)
+
+    # --- Non-vendor-level features ---
+    pub, con = c['publication_date'], c['contract_date']
+    days = c.day_ordinal[con] - c.day_ordinal[pub]
+    days_ok = c.date_truthy[pub] & c.date_truthy[con] & (days >= 0) & (days <= 365)
+    f['ad_period_days'] = np.where(days_ok, days, 0.0)
+
+    same_day = has_vendor & _truthy(inst) & c.date_truthy[con]
+    f['same_day_count'] = np.where(same_day, _take(ax.splitting, 1.0, vendor, inst, con), 1.0)
+
+    f['network_member_count'] = np.where(has_vendor, _take(ax.network_member_count, 1.0, vendor), 1.0)
+    f['co_bid_rate'] = np.where(has_vendor, _take(ax.co_bid_rates, 0.0, vendor), 0.0)
+    f['price_hyp_confidence'] = np.nan_to_num(c['price_hyp_confidence'], nan=0.0)
+
+    aff_pos = ax.affinity_index.find(vendor)
+    expected = ax.affinity[np.maximum(aff_pos, 0)] if len(ax.affinity) else np.zeros(n, dtype=np.int64)
+    f['industry_mismatch'] = np.where(has_vendor & (aff_pos >= 0) & (expected != sector), 1.0, 0.0)
+
+    f['institution_risk'] = np.where(_truthy(inst), _take(ax.inst_baselines, 0.25, inst), 0.25)
+    return f
+
+
+def _flag(values: np.ndarray) -> np.ndarray:
+    """1.0 where a nullable flag column is truthy, else 0.0."""
+    return np.where(~np.isnan(values) & (values != 0), 1.0, 0.0)
+
+
+def compute_z_matrix(c: ContractColumns, ax: AuxArrays, baselines) -> np.ndarray:
+    """Z-scores for every row of ``c``: shape (len(c), len(FACTOR_NAMES)), column order FACTOR_COLS.
+
+    Baselines are looked up once per distinct (sector, year) cell and
+    broadcast to its rows.
+    """
+    raw = compute_raw_feature_arrays(c, ax)
+    sector_u, sector_inv = np.unique(c['sector_id'], return_inverse=True)
+    year_u, year_inv = np.unique(c['year'], return_inverse=True)
+    cells, cell_inv = np.unique(sector_inv * len(year_u) + year_inv, return_inverse=True)
+
+    out = np.empty((len(c), len(FACTOR_NAMES)), dtype=np.float64)
+    for j, factor in enumerate(FACTOR_NAMES):
+        stats = np.array([
+            baselines.get(factor, _decode(sector_u[cell // len(year_u)]), _decode(year_u[cell % len(year_u)]))
+            for cell in cells
+        ], dtype=np.float64).reshape(len(cells), 2)
+        mean = stats[cell_inv, 0]
+        if factor in BINARY_FACTORS:
+            binomial = (mean > 0) & (mean < 1)
+            denom = np.where(binomial, np.sqrt(np.where(binomial, mean * (1 - mean), 1.0)), EPSILON)
+        else:
+            denom = np.maximum(stats[cell_inv, 1], EPSILON)
+        z = (raw[factor] - mean) / denom
+        # fmin/fmax pass NaN through as the cap, like the reference's min()/max()
+        out[:, j] = np.fmax(-Z_SCORE_CAP, np.fmin(Z_SCORE_CAP, z))
+    return out
+
+
+def z_feature_rows(c: ContractColumns, z: np.ndarray) -> list:
+    """contract_z_features insert tuples, mahalanobis columns left NULL."""
+    sectors = [_decode(v) for v in c['sector_id'].tolist()]
+    years = [_decode(v) for v in c['year'].tolist()]
+    return [
+        (cid, sid, yr) + tuple(zs) + (None, None)
+        for cid, sid, yr, zs in zip(c['id'].tolist(), sectors, years, z.tolist())
+    ]
+
+
 def ensure_orth_columns(conn: sqlite3.Connection):
     """Add orthogonalized z-score columns if they don't exist."""
     cursor = conn.cursor()
@@ -836,14 +1216,6 @@ def main():
         print("\nLoading auxiliary data...")
         aux = load_auxiliary_data(conn)
 
-        # Binary factors for z-score computation
-        binary_factors = {'single_bid', 'direct_award', 'year_end', 'industry_mismatch'}
-
-        # Process contracts in batches
-        cursor.execute("SELECT COUNT(*) FROM contracts")
-        total = cursor.fetchone()[0]
-        print(f"\nProcessing {total:,} contracts...")
-
         # Check if price_hypothesis_confidence column exists (may be absent in older DBs)
         cursor.execute("PRAGMA table_info(contracts)")
         col_names = {row[1] for row in cursor.fetchall()}
@@ -851,59 +1223,31 @@ def main():
         if "price_hypothesis_confidence" not in col_names:
             print("  NOTE: price_hypothesis_confidence column not found — using 0.0")
 
+        # Load contracts once as columns (one ordered scan, no OFFSET paging)
+        print("\nLoading contracts...")
+        contracts = load_contract_columns(conn, phc_col, args.batch_size)
+        total = len(contracts)
+        lookups = AuxArrays(aux, contracts.date_codes)
+        print(f"Processing {total:,} contracts...")
+
+        placeholders = ', '.join(['?'] * (3 + len(FACTOR_COLS) + 2))
         processed = 0
-        offset = 0
 
-        while offset < total:
-            cursor.execute(f"""
-                SELECT id, vendor_id, institution_id, sector_id,
-                       amount_mxn, is_direct_award, is_single_bid,
-                       is_year_end, publication_date, contract_date,
-                       contract_year, {phc_col}
-                FROM contracts
-                ORDER BY id
-                LIMIT ? OFFSET ?
-            """, (args.batch_size, offset))
-
-            rows = cursor.fetchall()
-            if not rows:
-                break
-
-            batch_results = []
-            for row in rows:
-                cid = row[0]
-                sector_id = row[3]
-                year = row[10]
-
-                # Compute raw features
-                raw = compute_raw_features(row, aux)
-
-                # Compute z-scores
-                z_values = []
-                for factor in FACTOR_NAMES:
-                    mean, stddev = baselines.get(factor, sector_id, year)
-                    is_binary = factor in binary_factors
-                    z = compute_z_score(raw[factor], mean, stddev, is_binary)
-                    z_values.append(z)
-
-                # Build insert tuple: contract_id, sector_id, year, z_values..., None, None
-                batch_results.append(
-                    (cid, sector_id, year) + tuple(z_values) + (None, None)
-                )
+        for offset in range(0, total, args.batch_size):
+            part = contracts.slice(offset, offset + args.batch_size)
+            z = compute_z_matrix(part, lookups, baselines)
 
             # Insert batch
-            placeholders = ', '.join(['?'] * (3 + len(FACTOR_COLS) + 2))
             cursor.execute("BEGIN IMMEDIATE TRANSACTION")
             cursor.executemany(f"""
                 INSERT INTO contract_z_features
                     (contract_id, sector_id, year, {', '.join(FACTOR_COLS)},
                      mahalanobis_distance, mahalanobis_pvalue)
                 VALUES ({placeholders})
-            """, batch_results)
+            """, z_feature_rows(part, z))
             cursor.execute("COMMIT")
 
-            processed += len(rows)
-            offset += args.batch_size
+            processed += len(part)
 
             elapsed = (datetime.now() - start).total_seconds()
             rate = processed / elapsed if elapsed > 0 else 0
@@ -36,6 +36,9 @@ import time
 import unicodedata
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from api.services.name_search_index import build_name_search_index
+
 # State-code prefixes (Mexican 32 entities) -- these are the ones that appear
 # in COMPRANET 2023+ name encodings. Order matters: longer prefixes first so
 # CHIS- isn't masked by CHIH-.
@@ -340,6 +343,13 @@ def main():
     print(f'  ({time.time() - t2:.1f}s)')
     print()
 
+    # Deleted duplicates must drop out of the trigram name-search index
+    print('Rebuilding name search index...')
+    stamp = build_name_search_index(conn)
+    if stamp:
+        print(f"  [ok] {stamp['institutions']:,} institutions, {stamp['vendors']:,} vendors indexed")
+    print()
+
     print(f'DONE in {time.time() - t0:.1f}s.')
 
 
@@ -39,6 +39,8 @@ logger = logging.getLogger('etl_pipeline')
 
 # Import our modules
 from etl_create_schema import main as create_schema_main, DB_PATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from api.services.name_search_index import build_name_search_index
 from etl_classify import (
     classify_contract, normalize_vendor_name, normalize_text,
     normalize_contract_type, normalize_procedure_type
@@ -1510,6 +1512,12 @@ def main():
     update_vendor_stats(conn)
     update_institution_stats(conn)
 
+    # Step 4b: Rebuild the trigram name-search index (rank by contract volume)
+    logger.info("Rebuilding vendor/institution name search index...")
+    stamp = build_name_search_index(conn)
+    if stamp:
+        logger.info(f"  Indexed {stamp['vendors']:,} vendors, {stamp['institutions']:,} institutions")
+
     # Step 5b: Calculate single bid (competitive procedures with only 1 vendor)
     logger.info("Calculating single bid indicators...")
     cursor = conn.cursor()
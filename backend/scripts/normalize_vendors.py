@@ -26,6 +26,7 @@ from hyperion.prometheus.normalize import (
     VendorNormalizer,
     update_vendors_with_normalization
 )
+from api.services.name_search_index import build_name_search_index
 
 
 # Database path
@@ -173,6 +174,11 @@ def main():
     conn = sqlite3.connect(DB_PATH)
     stats = get_statistics(conn)
 
+    # name_normalized changed: refresh the trigram name-search index
+    stamp = build_name_search_index(conn)
+    if stamp:
+        print(f"  Name search index rebuilt: {stamp['vendors']:,} vendors")
+
     print(f"\nVendor Statistics (After):")
     print(f"  Total vendors:       {stats['total']:,}")
     print(f"  Normalized:          {stats.get('normalized', 0):,}")
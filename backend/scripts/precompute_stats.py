@@ -1,12 +1,23 @@
 """
 Pre-compute dashboard statistics for instant loading.
 Run this after ETL or data updates.
+
+Afterwards rebuilds the contracts_cube pre-aggregate
+(api/services/contracts_cube.py), exports the columnar contract sidecar
+(api/columnar.py) and renders every @materialized API endpoint at the new
+data epoch (see api/materialized.py); pass --skip-cube / --skip-columnar /
+--skip-materialized to skip those steps.
 """
 import os
 import sqlite3
 import json
+import sys
 import time
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from api.data_epoch import bump_data_epoch
 
 DB_PATH = os.environ.get("DATABASE_PATH", "RUBLI_NORMALIZED.db")
 
@@ -1098,10 +1109,64 @@ def precompute_stats():
         """, (key, json.dumps(value), datetime.now().isoformat()))
 
     conn.commit()
+    epoch = bump_data_epoch(conn, "precompute_stats")
     conn.close()
 
-    print(f"\nDone! Pre-computed {len(stats)} stat groups.")
+    print(f"\nDone! Pre-computed {len(stats)} stat groups (data epoch {epoch}).")
     print("=" * 60)
 
+
+def build_cube() -> None:
+    """Rebuild the contracts_cube pre-aggregate the API routes sums/counts to."""
+    print("\n16. Building contracts_cube...")
+    start = time.time()
+    from api.services.contracts_cube import build_contracts_cube
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        stamp = build_contracts_cube(conn)
+    finally:
+        conn.close()
+    print(f"   {stamp['rows']:,} cells (contracts version {stamp['contracts_version']}, {time.time() - start:.1f}s)")
+
+
+def export_columnar_sidecar() -> None:
+    """Export the memory-mapped contract columns the API aggregates over."""
+    print("\n17. Exporting columnar contract sidecar...")
+    start = time.time()
+    os.environ["DATABASE_PATH"] = str(Path(DB_PATH).resolve())
+    from api.columnar import export_columns
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        manifest = export_columns(conn)
+    finally:
+        conn.close()
+    print(f"   {manifest['rows']:,} rows x {len(manifest['columns'])} columns "
+          f"(contracts version {manifest['contracts_version']}, {time.time() - start:.1f}s)")
+
+
+def render_materialized_endpoints(workers: int = 4) -> None:
+    """Render the API's materialized endpoint payloads into precomputed_stats."""
+    print("\n18. Rendering materialized endpoints...")
+    start = time.time()
+    # The API resolves its DB from DATABASE_PATH at import time; point it at ours.
+    os.environ["DATABASE_PATH"] = str(Path(DB_PATH).resolve())
+    try:
+        from api.materialized import load_registry, precompute
+        load_registry()
+    except ImportError as e:
+        print(f"   Skipped: API not importable ({e})")
+        return
+    summary = precompute(workers=workers)
+    print(f"   Rendered {summary['rendered']} payload(s), {summary['failed']} failed "
+          f"({time.time() - start:.1f}s)")
+
+
 if __name__ == "__main__":
     precompute_stats()
+    # Before rendering: materialized handlers aggregate over the cube and sidecar.
+    if "--skip-cube" not in sys.argv:
+        build_cube()
+    if "--skip-columnar" not in sys.argv:
+        export_columnar_sidecar()
+    if "--skip-materialized" not in sys.argv:
+        render_materialized_endpoints()
@@ -0,0 +1,47 @@
+"""
+Rebuild the API's derived copies of ``contracts`` after a stage rewrites it.
+
+contracts_cube (api/services/contracts_cube.py) and the columnar sidecar
+(api/columnar.py) are stamped with the contracts version and ignored by the
+API once a stage bumps it with ``bump_data_epoch(..., contracts_changed=True)``.
+The scoring scripts call refresh_contract_aggregates() right after that bump,
+so dashboards go back to the pre-aggregates instead of scanning ``contracts``
+until the next precompute_stats run.
+
+Usage (from another script):
+    from scripts.refresh_contract_aggregates import refresh_contract_aggregates
+    refresh_contract_aggregates(conn)
+"""
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from api.columnar import export_columns
+from api.services.contracts_cube import build_contracts_cube
+
+
+def refresh_contract_aggregates(conn: sqlite3.Connection) -> None:
+    """Rebuild contracts_cube and re-export the columnar sidecar next to ``conn``'s database.
+
+    A failure is reported and swallowed: the API falls back to scanning
+    ``contracts`` until the next successful rebuild.
+    """
+    start = time.time()
+    try:
+        stamp = build_contracts_cube(conn)
+        print(f"  contracts_cube rebuilt: {stamp['rows']:,} cells "
+              f"(contracts version {stamp['contracts_version']}, {time.time() - start:.1f}s)")
+    except sqlite3.Error as e:
+        print(f"  contracts_cube rebuild failed: {e}")
+
+    start = time.time()
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    out_dir = Path(os.environ.get("RUBLI_COLUMNAR_DIR") or Path(db_file).parent / "columnar")
+    try:
+        manifest = export_columns(conn, out_dir)
+        print(f"  Columnar sidecar exported: {manifest['rows']:,} rows "
+              f"(contracts version {manifest['contracts_version']}, {time.time() - start:.1f}s)")
+    except (OSError, sqlite3.Error) as e:
+        print(f"  Columnar sidecar export failed: {e}")
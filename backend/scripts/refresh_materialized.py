@@ -0,0 +1,40 @@
+"""
+Re-render @materialized API payloads after a pipeline stage bumps the data epoch.
+
+Stored payloads are only served while their epoch equals the current one
+(api/materialized.py), so after aria_pipeline, calculate_risk_scores_v6 or
+score_all_models every slow endpoint would fall back to its cold path until
+the next precompute_stats run. Each of those stages calls
+refresh_materialized() after bump_data_epoch().
+
+The renderer imports the whole API, so it runs as
+``python -m api.materialized --missing`` in a child process pointed at the
+stage's database; only absent or outdated payloads are rendered.
+
+Usage (from another script):
+    from scripts.refresh_materialized import refresh_materialized
+    refresh_materialized(DB_PATH)
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+DEFAULT_WORKERS = 4
+
+
+def refresh_materialized(db_path, workers: int = DEFAULT_WORKERS) -> int:
+    """Render absent/outdated payloads for ``db_path``; returns the renderer's exit code.
+
+    A failed render never fails the calling stage: the affected endpoints
+    simply serve their live handler until the next render.
+    """
+    cmd = [sys.executable, "-m", "api.materialized", "--missing", "--workers", str(workers)]
+    env = dict(os.environ, DATABASE_PATH=str(Path(db_path).resolve()))
+    try:
+        return subprocess.run(cmd, cwd=str(BACKEND_DIR), env=env).returncode
+    except OSError as e:
+        print(f"  Materialized refresh could not start: {e}")
+        return 1
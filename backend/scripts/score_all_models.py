@@ -0,0 +1,492 @@
+"""
+Multi-model scoring: every registered calibration in one pass over contract_z_features.
+
+Each scoring script used to re-read all 3.1M z-vectors for its own model.
+This stage reads contract_z_features once, in id-ordered chunks, and applies
+every model registered in model_calibration (the latest run of each
+model_version, global model plus per-sector sub-models) to the same chunk.
+
+Each model is scored the way its own scoring script scores it (ScorerSpec):
+  - z-scores winsorized at the scorer's cap before the logit
+  - sector routing: gated (sector sub-model only where n_positive >=
+    MIN_SECTOR_POSITIVES and auc_roc >= MIN_SECTOR_AUC), always, or global only
+  - Platt scaling from model_calibration.platt_a/platt_b where the scorer uses it
+  - PU correction (optionally floored at PU_C_FLOOR) and bootstrap CIs
+  - ghost companion boost from vendor_stats.new_vendor_risk_score where the
+    scorer applies it
+  - the scorer's own risk-level thresholds
+Versions in SCORERS follow their named script; any other version follows
+_score_v6_now.py, which scores whichever run is newest. Versions mapped to
+None (v0.8.5, whose full scorer reads contract_z_features_v2 and is not in
+scripts/) are skipped: this stage will not write a column it cannot
+reproduce.
+
+Every model writes its own score column (score_column(); created if
+missing), so scoring a candidate in shadow next to the live model costs one
+extra matrix product per chunk. ``--active VERSION`` additionally writes
+that model to risk_score / risk_level / CIs / risk_model_version. All
+columns are written together through scripts/score_writeback.py, one UPDATE
+every CHECKPOINT_BATCHES chunks; an interrupted run resumes with the
+--start-id printed at the last checkpoint.
+
+Models whose features have no z-column in contract_z_features are skipped.
+
+Usage:
+    python -m scripts.score_all_models --dry-run
+    python -m scripts.score_all_models                       # shadow columns only
+    python -m scripts.score_all_models --models v6.5 v7.0rc1
+    python -m scripts.score_all_models --active v6.5 --yes   # also overwrite risk_score
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from api.config.constants import RISK_THRESHOLDS_V4, RISK_THRESHOLDS_V6
+from api.services.active_model import normalize_coefficients
+from api.data_epoch import bump_data_epoch
+from scripts.refresh_contract_aggregates import refresh_contract_aggregates
+from scripts.refresh_materialized import refresh_materialized
+from scripts.score_writeback import CHECKPOINT_BATCHES, ScoreWriteBack, level_counts, risk_levels
+
+DB_PATH = Path(__file__).parent.parent / "RUBLI_NORMALIZED.db"
+
+ZSCORE_CAP = 5.0
+MIN_SECTOR_POSITIVES = 500
+MIN_SECTOR_AUC = 0.70
+PU_C_FLOOR = 0.30  # Elkan & Noto minimum
+DEFAULT_SECTOR = 12  # contracts without a sector are scored as "otros"
+
+# Versions whose scores already have a home; others get risk_score_<version>.
+# The v5.x family is calibrated as model_version 'v5.0' and labelled v5.1.
+SCORE_COLUMNS = {
+    'v5.0': 'risk_score_v5',
+    'v0.8.5': 'risk_score_v8',
+}
+
+
+@dataclass(frozen=True)
+class ScorerSpec:
+    """How a model family's own scoring script turns z-vectors into scores."""
+
+    script: str
+    zscore_cap: float
+    sector_routing: str  # 'gated', 'always' or 'global'
+    thresholds: dict
+    pu_floor: float = 0.0
+    platt: bool = False
+    ghost: bool = False
+    ci_fallback: float = 0.0  # +/- band around the score when a model has no bootstrap CI
+    inherit_global: bool = False  # sector rows without pu_c / CI borrow the global model's
+    label: Optional[str] = None  # risk_model_version written with --active (default: the version)
+
+
+V5_SCORER = ScorerSpec('calculate_risk_scores_v5.py', zscore_cap=10.0, sector_routing='always',
+                       thresholds=RISK_THRESHOLDS_V4, platt=True, ci_fallback=0.10,
+                       inherit_global=True, label='v5.1')
+V6_GLOBAL_SCORER = ScorerSpec('calculate_risk_scores_v6.py', zscore_cap=10.0, sector_routing='global',
+                              thresholds=RISK_THRESHOLDS_V4, ci_fallback=0.10)
+V6_SECTOR_SCORER = ScorerSpec('_score_v6_now.py', zscore_cap=ZSCORE_CAP, sector_routing='gated',
+                              thresholds=RISK_THRESHOLDS_V6, pu_floor=PU_C_FLOOR, ghost=True)
+
+# None: the version's scorer is not reproduced here, so it is never written.
+SCORERS = {
+    'v5.0': V5_SCORER,
+    'v6.0': V6_GLOBAL_SCORER,
+    'v0.8.5': None,
+}
+
+
+def scorer_spec(version: str) -> Optional[ScorerSpec]:
+    """ScorerSpec for ``version``, or None if this stage cannot reproduce its scorer."""
+    return SCORERS[version] if version in SCORERS else V6_SECTOR_SCORER
+
+
+def score_column(version: str) -> str:
+    """contracts column holding ``version``'s score."""
+    if version in SCORE_COLUMNS:
+        return SCORE_COLUMNS[version]
+    return 'risk_score_' + re.sub(r'\W+', '_', version).strip('_').lower()
+
+
+def sigmoid(x):
+    return np.where(x >= 0, 1.0 / (1.0 + np.exp(-x)), np.exp(x) / (1.0 + np.exp(x)))
+
+
+@dataclass
+class SubModel:
+    """One logistic model (global or per-sector) over a model's feature list."""
+
+    intercept: float
+    coef: np.ndarray
+    pu_c: float
+    ci_widths: Optional[np.ndarray]  # None: no bootstrap CI stored
+    n_positive: int = 0
+    auc_roc: float = 0.0
+    platt_a: float = 0.0
+    platt_b: float = 0.0
+
+    def predict(self, Z: np.ndarray, ci_fallback: float = 0.0):
+        logits = self.intercept + Z @ self.coef
+        if self.platt_a != 0.0 or self.platt_b != 0.0:
+            raw = sigmoid(-(self.platt_a * logits + self.platt_b))
+        else:
+            raw = sigmoid(logits)
+        scores = np.minimum(raw / self.pu_c, 1.0)
+        if self.ci_widths is None:
+            return scores, np.maximum(scores - ci_fallback, 0.0), np.minimum(scores + ci_fallback, 1.0)
+        se = np.sqrt(np.sum((Z * self.ci_widths) ** 2, axis=1))
+        lower = np.maximum(np.minimum(sigmoid(logits - 1.96 * se) / self.pu_c, scores), 0.0)
+        upper = np.minimum(np.maximum(sigmoid(logits + 1.96 * se) / self.pu_c, scores), 1.0)
+        return scores, lower, upper
+
+
+@dataclass
+class RegisteredModel:
+    """Latest model_calibration run of one model_version."""
+
+    version: str
+    run_id: str
+    features: list
+    global_model: SubModel
+    spec: ScorerSpec = V6_SECTOR_SCORER
+    sectors: dict = field(default_factory=dict)
+
+    @property
+    def column(self) -> str:
+        return score_column(self.version)
+
+    @property
+    def label(self) -> str:
+        """risk_model_version written when this model is active."""
+        return self.spec.label or self.version
+
+    def uses_sector_model(self, sector_id: int) -> bool:
+        m = self.sectors.get(sector_id)
+        if m is None or self.spec.sector_routing == 'global':
+            return False
+        if self.spec.sector_routing == 'always':
+            return True
+        return m.n_positive >= MIN_SECTOR_POSITIVES and m.auc_roc >= MIN_SECTOR_AUC
+
+    def score(self, Z: np.ndarray, sectors: np.ndarray):
+        """(scores, ci_lower, ci_upper) with each contract routed to its sector model or global.
+
+        ``Z`` holds this model's features, NaN-free; it is winsorized here at
+        the scorer's cap.
+        """
+        Z = np.clip(Z, -self.spec.zscore_cap, self.spec.zscore_cap)
+        scores = np.empty(len(Z))
+        lower = np.empty(len(Z))
+        upper = np.empty(len(Z))
+        routed = np.zeros(len(Z), dtype=bool)
+        for sid in np.unique(sectors):
+            if not self.uses_sector_model(int(sid)):
+                continue
+            mask = sectors == sid
+            scores[mask], lower[mask], upper[mask] = self.sectors[int(sid)].predict(
+                Z[mask], self.spec.ci_fallback)
+            routed |= mask
+        rest = ~routed
+        if rest.any():
+            scores[rest], lower[rest], upper[rest] = self.global_model.predict(
+                Z[rest], self.spec.ci_fallback)
+        return scores, lower, upper
+
+
+def _sub_model(row, features, spec: ScorerSpec, parent: Optional[SubModel] = None) -> SubModel:
+    _, intercept, coefficients, pu_c, bootstrap_ci, n_positive, auc_roc, platt_a, platt_b = row
+    coefs = normalize_coefficients(coefficients)
+    ci = json.loads(bootstrap_ci) if bootstrap_ci else {}
+    ci = {f: b for f, b in ci.items() if isinstance(b, (list, tuple)) and len(b) >= 2}
+    inherit = parent is not None and spec.inherit_global
+    if ci:
+        ci_widths = np.array([(ci[f][1] - ci[f][0]) / 2.0 if f in ci else 0.0 for f in features])
+    else:
+        ci_widths = parent.ci_widths if inherit else None
+    return SubModel(
+        intercept=float(intercept),
+        coef=np.array([coefs.get(f, 0.0) for f in features], dtype=np.float64),
+        pu_c=max(float(pu_c or (parent.pu_c if inherit else 1.0)), spec.pu_floor),
+        ci_widths=ci_widths,
+        n_positive=n_positive or 0,
+        auc_roc=auc_roc or 0.0,
+        platt_a=float(platt_a or 0.0) if spec.platt else 0.0,
+        platt_b=float(platt_b or 0.0) if spec.platt else 0.0,
+    )
+
+
+def load_registered_models(conn: sqlite3.Connection, versions: Optional[list] = None) -> list:
+    """Latest calibration run of every model_version (or just ``versions``), newest first.
+
+    The global row is ``sector_id = 0`` (v0.8.5+) or ``sector_id IS NULL``
+    (<= v6.x); coefficients in either stored shape are read through
+    normalize_coefficients(). A model's features are the keys of its global
+    coefficients; models with a feature that has no z-column in
+    contract_z_features, or whose scorer_spec() is None, are skipped.
+    """
+    z_columns = {r[1] for r in conn.execute("PRAGMA table_info(contract_z_features)")}
+    cal_columns = {r[1] for r in conn.execute("PRAGMA table_info(model_calibration)")}
+    platt = "platt_a, platt_b" if {'platt_a', 'platt_b'} <= cal_columns else "NULL, NULL"
+    runs = conn.execute("""
+        SELECT model_version, run_id FROM (
+            SELECT model_version, run_id, created_at,
+                   ROW_NUMBER() OVER (PARTITION BY model_version ORDER BY created_at DESC, id DESC) AS rn
+            FROM model_calibration
+            WHERE sector_id = 0 OR sector_id IS NULL
+        )
+        WHERE rn = 1
+        ORDER BY created_at DESC
+    """).fetchall()
+
+    models = []
+    for version, run_id in runs:
+        if versions and version not in versions:
+            continue
+        spec = scorer_spec(version)
+        if spec is None:
+            print(f"  {version}: skipped, its scorer is not reproduced by this stage")
+            continue
+        rows = conn.execute(f"""
+            SELECT sector_id, intercept, coefficients, pu_correction_factor, bootstrap_ci,
+                   n_positive, auc_roc, {platt}
+            FROM model_calibration
+            WHERE run_id = ? AND model_version = ?
+        """, (run_id, version)).fetchall()
+        global_row = next(r for r in rows if r[0] is None or r[0] == 0)
+        features = sorted(normalize_coefficients(global_row[2]))
+        missing = [f for f in features if f'z_{f}' not in z_columns]
+        if missing:
+            print(f"  {version}: skipped, no z-column for {missing}")
+            continue
+        global_model = _sub_model(global_row, features, spec)
+        models.append(RegisteredModel(
+            version=version,
+            run_id=run_id,
+            features=features,
+            global_model=global_model,
+            spec=spec,
+            sectors={r[0]: _sub_model(r, features, spec, global_model)
+                     for r in rows if r[0] not in (None, 0)},
+        ))
+    if versions:
+        unknown = set(versions) - {m.version for m in models}
+        if unknown:
+            raise ValueError(f"No usable calibration for: {sorted(unknown)}")
+    return models
+
+
+def load_ghost_scores(conn: sqlite3.Connection):
+    """(sorted vendor ids, new_vendor_risk_score) for vendors with a positive ghost score."""
+    rows = conn.execute("""
+        SELECT vendor_id, new_vendor_risk_score FROM vendor_stats
+        WHERE new_vendor_risk_score > 0 ORDER BY vendor_id
+    """).fetchall()
+    ids = np.array([r[0] for r in rows], dtype=np.float64)
+    return ids, np.array([r[1] for r in rows], dtype=np.float64)
+
+
+def ghost_boost(vendor_ids: np.ndarray, ghost) -> np.ndarray:
+    """Additive boost per contract: ghost_score times a confidence-graded weight (0 if none)."""
+    ghost_ids, ghost_scores = ghost
+    if not len(ghost_ids):
+        return np.zeros(len(vendor_ids))
+    pos = np.minimum(np.searchsorted(ghost_ids, vendor_ids), len(ghost_ids) - 1)
+    found = ghost_ids[pos] == vendor_ids  # NaN (no vendor) never matches
+    g = np.where(found, ghost_scores[pos], 0.0)
+    weight = np.select([g >= 0.8, g >= 0.6, g >= 0.4], [0.40, 0.30, 0.20], default=0.10)
+    return np.where(g > 0, g * weight, 0.0)
+
+
+def iter_z_chunks(conn: sqlite3.Connection, z_cols: list, start_id: int = 0, batch_size: int = 100_000):
+    """Yield (ids, Z, sectors, vendor_ids) chunks of contract_z_features in id order.
+
+    Z is NULL/NaN-safe but not winsorized (each model applies its scorer's
+    cap); column order is ``z_cols``.
+    """
+    z_select = ', '.join(f'zf.{c}' for c in z_cols)
+    last_id = start_id
+    while True:
+        rows = conn.execute(f"""
+            SELECT zf.contract_id, c.sector_id, c.vendor_id, {z_select}
+            FROM contract_z_features zf
+            JOIN contracts c ON zf.contract_id = c.id
+            WHERE zf.contract_id > ?
+            ORDER BY zf.contract_id
+            LIMIT ?
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            return
+        data = np.array(rows, dtype=np.float64)
+        ids = data[:, 0].astype(np.int64)
+        sectors = np.nan_to_num(data[:, 1], nan=DEFAULT_SECTOR).astype(np.int64)
+        sectors[sectors == 0] = DEFAULT_SECTOR
+        yield ids, np.nan_to_num(data[:, 3:], nan=0.0), sectors, data[:, 2]
+        last_id = int(ids[-1])
+
+
+def ensure_score_columns(conn: sqlite3.Connection, columns: list) -> None:
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(contracts)")}
+    for col in columns:
+        if col not in existing:
+            conn.execute(f"ALTER TABLE contracts ADD COLUMN {col} REAL DEFAULT NULL")
+            print(f"  Added column contracts.{col}")
+    conn.commit()
+
+
+def score_all_models(conn: sqlite3.Connection, models: list, active: Optional[str] = None,
+                     ghost=None, start_id: int = 0, batch_size: int = 100_000,
+                     dry_run: bool = False, checkpoint_batches: int = CHECKPOINT_BATCHES) -> dict:
+    """Score every model in one pass; returns {version: {level: count}}.
+
+    ``active`` names the model also written to risk_score and friends.
+    ``ghost`` is load_ghost_scores() output, or None to skip the boost; it is
+    only applied to models whose scorer applies it.
+    """
+    active_model = next((m for m in models if m.version == active), None)
+    if active is not None and active_model is None:
+        raise ValueError(f"active model {active} is not among the scored models")
+    z_cols = sorted({f'z_{f}' for m in models for f in m.features})
+    col_pos = {c: i for i, c in enumerate(z_cols)}
+    feature_idx = {m.version: [col_pos[f'z_{f}'] for f in m.features] for m in models}
+
+    staged = [m.column for m in models]
+    if active is not None:
+        staged += ['risk_score', 'risk_level', 'risk_confidence_lower', 'risk_confidence_upper']
+    writer = None
+    if not dry_run:
+        ensure_score_columns(conn, [m.column for m in models])
+        writer = ScoreWriteBack(conn, staged)
+
+    constants = {'risk_model_version': active_model.label} if active_model is not None else {}
+    dist = {m.version: {'critical': 0, 'high': 0, 'medium': 0, 'low': 0} for m in models}
+    processed = 0
+    updated = 0
+    t0 = time.time()
+    chunks = iter_z_chunks(conn, z_cols, start_id, batch_size)
+    for n, (ids, Z, sectors, vendor_ids) in enumerate(chunks, 1):
+        boost = ghost_boost(vendor_ids, ghost) if ghost is not None else None
+        values = []
+        active_cols = None
+        for m in models:
+            scores, lower, upper = m.score(Z[:, feature_idx[m.version]], sectors)
+            if boost is not None and m.spec.ghost:
+                scores = np.minimum(scores + boost, 1.0)
+                upper = np.minimum(upper + boost, 1.0)  # lower stays at the base model CI
+            scores = np.round(scores, 6)
+            levels = risk_levels(scores, m.spec.thresholds)
+            for lvl, n in level_counts(levels).items():
+                dist[m.version][lvl] += n
+            values.append(scores)
+            if m.version == active:
+                active_cols = [scores, levels, np.round(lower, 6), np.round(upper, 6)]
+        if writer is not None:
+            writer.stage(ids, *values, *(active_cols or []))
+
+        processed += len(ids)
+        elapsed = time.time() - t0
+        print(f"  {processed:,} contracts x {len(models)} models - "
+              f"{processed / elapsed if elapsed > 0 else 0:.0f}/sec", flush=True)
+        if writer is not None and n % checkpoint_batches == 0:
+            updated += writer.apply(**constants)
+            print(f"  Checkpoint: written through id {ids[-1]} (resume with --start-id {ids[-1]})", flush=True)
+
+    if writer is not None:
+        updated += writer.apply(**constants)
+        print(f"  Updated {updated:,} contracts ({', '.join(staged)})")
+        # The risk_score_v* columns alone feed neither contracts_cube nor the
+        # columnar sidecar; only --active rewrites the risk_score/risk_level they read.
+        rewrote_active = active is not None
+        epoch = bump_data_epoch(conn, "score_all_models", contracts_changed=rewrote_active)
+        print(f"  Data epoch bumped to {epoch}")
+        if rewrote_active:
+            refresh_contract_aggregates(conn)
+    return dist
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score every registered model in one pass')
+    parser.add_argument('--models', nargs='+', help='model_version values to score (default: all)')
+    parser.add_argument('--active', help='model_version to also write to risk_score/risk_level')
+    parser.add_argument('--start-id', type=int, default=0,
+                        help='Resume after this contract ID (printed at each checkpoint)')
+    parser.add_argument('--batch-size', type=int, default=100_000)
+    parser.add_argument('--checkpoint-batches', type=int, default=CHECKPOINT_BATCHES,
+                        help='Write staged scores every N batches')
+    parser.add_argument('--skip-ghost-blend', action='store_true',
+                        help='Disable the ghost companion boost')
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--skip-materialized', action='store_true',
+                        help='Do not re-render materialized API payloads after writing')
+    parser.add_argument('--yes', action='store_true',
+                        help='Skip the confirmation required with --active')
+    args = parser.parse_args()
+
+    if args.active and not args.dry_run and not args.yes and sys.stdin.isatty():
+        print(f"--active {args.active} overwrites risk_score, risk_level, CIs and "
+              "risk_model_version for every scored contract. Pass --yes to proceed.")
+        return 1
+
+    if not DB_PATH.exists():
+        print(f"ERROR: Database not found: {DB_PATH}")
+        return 1
+
+    conn = sqlite3.connect(DB_PATH, timeout=300)
+    conn.execute('PRAGMA busy_timeout=300000')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('PRAGMA cache_size=-200000')
+
+    try:
+        versions = list(args.models or [])
+        if args.active and versions and args.active not in versions:
+            versions.append(args.active)
+        models = load_registered_models(conn, versions or None)
+        if not models:
+            print("ERROR: No usable calibration in model_calibration")
+            return 1
+        for m in models:
+            sector_models = sorted(s for s in m.sectors if m.uses_sector_model(s))
+            marker = ' [active]' if m.version == args.active else ''
+            print(f"  {m.version} (run {m.run_id}) -> {m.column}{marker}: "
+                  f"{len(m.features)} features, sector models {sector_models or 'none'}, "
+                  f"as {m.spec.script}")
+
+        ghost = None if args.skip_ghost_blend else load_ghost_scores(conn)
+        if ghost is not None:
+            print(f"  Ghost companion: {len(ghost[0]):,} vendors with boost")
+
+        t0 = time.time()
+        dist = score_all_models(conn, models, active=args.active, ghost=ghost,
+                                start_id=args.start_id, batch_size=args.batch_size,
+                                dry_run=args.dry_run, checkpoint_batches=args.checkpoint_batches)
+
+        print(f"\n{'=' * 60}")
+        print(f"SCORED {len(models)} MODELS IN {time.time() - t0:.1f}s"
+              f"{' (DRY RUN)' if args.dry_run else ''}")
+        print(f"{'=' * 60}")
+        print(f"{'Model':<12} {'critical':>10} {'high':>10} {'medium':>10} {'low':>10} {'HR%':>7}")
+        for version, counts in dist.items():
+            total = sum(counts.values()) or 1
+            hr = 100 * (counts['critical'] + counts['high']) / total
+            print(f"{version:<12} {counts['critical']:>10,} {counts['high']:>10,} "
+                  f"{counts['medium']:>10,} {counts['low']:>10,} {hr:>6.1f}%")
+    finally:
+        conn.close()
+
+    if not args.dry_run and not args.skip_materialized:
+        print("\nRe-rendering materialized API payloads...")
+        refresh_materialized(DB_PATH)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Bulk score write-back for the scoring scripts.
+
+Scoring is vectorized, but writing 3.1M results back with
+``executemany("UPDATE contracts SET ... WHERE id = ?")`` costs one B-tree
+seek and rewrite per row plus a Python ``get_risk_level`` call each. Instead,
+scored batches are appended to a TEMP staging table keyed by contract id
+(an append-only insert in id order), and ``apply()`` writes them all with a
+single set-based statement:
+
+    UPDATE contracts SET risk_score = w.risk_score, ...
+    FROM temp._score_writeback AS w WHERE contracts.id = w.id
+
+Secondary indexes over the written columns (risk_score, risk_level, ...)
+are dropped for the UPDATE and rebuilt afterwards, in the same transaction:
+one sorted index build is far cheaper than millions of random index-entry
+moves. Risk levels are derived with ``risk_levels()`` over the whole score
+array.
+
+``apply()`` empties the staging table, so long runs can checkpoint: apply
+every N batches and everything up to the last staged id is on disk, which is
+what ``--start-id`` resumes from.
+
+Usage:
+    writer = ScoreWriteBack(conn, ['risk_score', 'risk_level', ...])
+    for n, batch in enumerate(...):
+        writer.stage(ids, scores, risk_levels(scores, RISK_THRESHOLDS_V6), ...)
+        if (n + 1) % CHECKPOINT_BATCHES == 0:
+            writer.apply(risk_model_version='v6.0')
+    updated = writer.apply(risk_model_version='v6.0')
+"""
+
+import re
+import sqlite3
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+
+STAGING_TABLE = '_score_writeback'
+
+# Indexes are rebuilt when the staged rows cover at least this share of the
+# table (estimated from its largest key); small partial rescoring keeps them.
+REBUILD_INDEX_FRACTION = 0.25
+
+# Scoring scripts apply staged rows every this many batches, so an interrupted
+# run loses at most one checkpoint of work and can be resumed with --start-id.
+CHECKPOINT_BATCHES = 10
+
+# UPDATE ... FROM arrived in SQLite 3.33; older builds use row-value subqueries.
+_HAS_UPDATE_FROM = sqlite3.sqlite_version_info >= (3, 33, 0)
+
+
+def risk_levels(scores: np.ndarray, thresholds: Mapping[str, float]) -> np.ndarray:
+    """Vectorized get_risk_level: 'critical'/'high'/'medium'/'low' per score.
+
+    ``thresholds`` holds the lower bounds for critical, high and medium
+    (e.g. RISK_THRESHOLDS_V6); bounds are inclusive, as in get_risk_level.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    return np.select(
+        [scores >= thresholds['critical'], scores >= thresholds['high'], scores >= thresholds['medium']],
+        ['critical', 'high', 'medium'],
+        default='low',
+    ).astype(object)
+
+
+def level_counts(levels: np.ndarray) -> dict:
+    """{level: count} for an array returned by risk_levels()."""
+    values, counts = np.unique(levels.astype(str), return_counts=True)
+    return {str(v): int(n) for v, n in zip(values, counts)}
+
+
+class ScoreWriteBack:
+    """Stage per-contract results in a TEMP table and apply them in one UPDATE.
+
+    ``columns`` are the target columns of ``table`` staged per row; NaN
+    values are stored as NULL. Constant columns (e.g. the model version)
+    are passed to ``apply()`` instead of being staged per row.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, columns: Sequence[str],
+                 table: str = 'contracts', key: str = 'id'):
+        self.conn = conn
+        self.columns = list(columns)
+        self.table = table
+        self.key = key
+        self.staged = 0
+        conn.execute(f"DROP TABLE IF EXISTS temp.{STAGING_TABLE}")
+        conn.execute(
+            f"CREATE TEMP TABLE {STAGING_TABLE} (id INTEGER PRIMARY KEY, {', '.join(self.columns)})"
+        )
+        conn.commit()
+
+    def stage(self, ids, *values) -> int:
+        """Append one batch: ``ids`` plus one array/list per staged column, in order."""
+        if len(values) != len(self.columns):
+            raise ValueError(f"expected {len(self.columns)} value columns, got {len(values)}")
+        cols = [v.tolist() if isinstance(v, np.ndarray) else list(v) for v in (ids, *values)]
+        placeholders = ', '.join('?' * len(cols))
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO temp.{STAGING_TABLE} VALUES ({placeholders})", zip(*cols)
+        )
+        self.conn.commit()
+        self.staged += len(cols[0])
+        return len(cols[0])
+
+    def _indexes_over(self, columns: Sequence[str]) -> list[tuple[str, str]]:
+        """(name, CREATE sql) of explicit indexes on ``table`` that involve ``columns``."""
+        wanted = {c.lower() for c in columns}
+        found = []
+        for name, sql in self.conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (self.table,),
+        ):
+            indexed = [r[2] for r in self.conn.execute(f'PRAGMA index_info("{name}")')]
+            if wanted & {c.lower() for c in indexed if c}:
+                found.append((name, sql))
+            elif (None in indexed or re.search(r'\bWHERE\b', sql, re.I)) and \
+                    wanted & {w.lower() for w in re.findall(r'\w+', sql)}:
+                # expression or partial index mentioning a written column
+                found.append((name, sql))
+        return found
+
+    def apply(self, rebuild_indexes: Optional[bool] = None, **constants) -> int:
+        """Write every staged row (and ``constants``) to ``table`` in one transaction. Commits.
+
+        With ``rebuild_indexes``, indexes over the written columns are dropped
+        before the UPDATE and recreated after it, inside the same transaction;
+        by default that happens when the staged rows cover at least
+        REBUILD_INDEX_FRACTION of the table. Returns the number of rows
+        updated; the staging table is emptied, so further batches can be
+        staged and applied with the same writer.
+        """
+        if not self.staged:
+            return 0
+        if rebuild_indexes is None:
+            max_key = self.conn.execute(f"SELECT MAX({self.key}) FROM {self.table}").fetchone()[0] or 0
+            rebuild_indexes = self.staged >= REBUILD_INDEX_FRACTION * max_key
+        names = self.columns + list(constants)
+        if _HAS_UPDATE_FROM:
+            assignments = [f"{c} = w.{c}" for c in self.columns] + [f"{c} = ?" for c in constants]
+            sql = f"""
+                UPDATE {self.table}
+                SET {', '.join(assignments)}
+                FROM temp.{STAGING_TABLE} AS w
+                WHERE {self.table}.{self.key} = w.id
+            """
+        else:
+            staged = ', '.join(f"w.{c}" for c in self.columns) + ''.join(', ?' for _ in constants)
+            sql = f"""
+                UPDATE {self.table}
+                SET ({', '.join(names)}) = (
+                    SELECT {staged} FROM temp.{STAGING_TABLE} AS w WHERE w.id = {self.table}.{self.key}
+                )
+                WHERE {self.key} IN (SELECT id FROM temp.{STAGING_TABLE})
+            """
+        if self.conn.in_transaction:
+            self.conn.commit()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            indexes = self._indexes_over(names) if rebuild_indexes else []
+            for name, _ in indexes:
+                self.conn.execute(f'DROP INDEX "{name}"')
+            updated = self.conn.execute(sql, list(constants.values())).rowcount
+            for _, create_sql in indexes:
+                self.conn.execute(create_sql)
+            self.conn.execute(f"DELETE FROM temp.{STAGING_TABLE}")
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.staged = 0
+        return updated
@@ -10,7 +10,7 @@ from pathlib import Path
 # Allow running as a module from backend/ directory
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from api.dependencies import get_db
+from api.dependencies import get_db_writer
 
 ANNUAL_RATES = {
     2002: 9.66,  2003: 10.79, 2004: 11.29, 2005: 10.90, 2006: 10.90,
@@ -22,7 +22,7 @@ ANNUAL_RATES = {
 
 
 def seed() -> None:
-    with get_db() as conn:
+    with get_db_writer() as conn:
         cursor = conn.cursor()
 
         # Table already exists (created by schema-architect).
@@ -2,6 +2,15 @@
 Pytest fixtures for API tests.
 """
 import contextlib
+import os
+import tempfile
+
+# Point the shared API cache at a throwaway file so test runs never read
+# entries persisted by a dev server (or by a previous run). Must be set
+# before api.cache is imported.
+os.environ.setdefault(
+    "RUBLI_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="rubli_cache_"), "api_cache.db")
+)
 
 import pytest
 from fastapi.testclient import TestClient
@@ -3,6 +3,8 @@ Tests for ARIA Phase 1 pipeline — unit tests only (no DB required).
 """
 
 import math
+import random
+import sqlite3
 import sys
 from pathlib import Path
 
@@ -11,18 +13,25 @@ import pytest
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from scripts.aria_pipeline import (
+    SECTOR_MAP,
     TIER1_THRESHOLD,
     TIER2_THRESHOLD,
     assign_tier,
     classify_patterns,
+    compute_burst_score,
     compute_external_flags_score,
     compute_ips,
+    get_primary_sector,
+    load_vendor_contract_profiles,
     normalize_financial,
     normalize_mahalanobis,
     normalize_risk_score,
     run_gt_auto_update,
+    score_vendor,
+    score_vendors,
     screen_false_positives,
 )
+from scripts import aria_pipeline
 
 
 # ---------------------------------------------------------------------------
@@ -769,3 +778,104 @@ class TestBurstScore:
         }
         patterns = classify_patterns(data)
         assert patterns["P3"] == 0.0
+
+
+# ---------------------------------------------------------------------------
+# Grouped contract profiles (set-based burst score + primary sector)
+# ---------------------------------------------------------------------------
+
+class TestVendorContractProfiles:
+    @pytest.fixture
+    def conn(self):
+        rng = random.Random(24)
+        conn = sqlite3.connect(":memory:")
+        conn.execute(
+            "CREATE TABLE contracts (id INTEGER PRIMARY KEY, vendor_id INTEGER, "
+            "sector_id INTEGER, contract_year INTEGER, amount_mxn REAL)"
+        )
+        conn.execute("CREATE INDEX idx_vendor ON contracts(vendor_id)")
+        for vid in range(1, 121):
+            first = rng.randint(2015, 2024)
+            size = rng.choice([1, 2, 3, 5, 12, 40, 101, 150])
+            for _ in range(size):
+                conn.execute(
+                    "INSERT INTO contracts (vendor_id, sector_id, contract_year, amount_mxn) VALUES (?, ?, ?, ?)",
+                    (
+                        vid,
+                        rng.choice([None, 1, 2, 2, 3, 12, 13]),
+                        rng.choice([None, first, first, first + 1, first + rng.randint(0, 7)]),
+                        rng.choice([None, 0, -10.0, 5e5, 2e11, 1e3 * rng.randint(5_000, 900_000)]),
+                    ),
+                )
+        conn.commit()
+        yield conn
+        conn.close()
+
+    def test_matches_per_vendor_queries(self, conn):
+        vendor_ids = list(range(1, 126))
+        burst, primary = load_vendor_contract_profiles(conn, vendor_ids)
+        flagged = 0
+        for vid in vendor_ids:
+            expected_burst = compute_burst_score(vid, conn)
+            assert burst.get(vid, (0.0, {})) == expected_burst, vid
+            flagged += expected_burst[0] > 0
+            sector_id, sector_name = primary.get(vid, (None, None))
+            expected_sector = get_primary_sector(vid, conn)
+            count = "SELECT COUNT(*) FROM contracts WHERE vendor_id = ? AND sector_id IS ?"
+            # ties may resolve differently; the chosen sector must have the top count
+            assert conn.execute(count, (vid, sector_id)).fetchone() == \
+                conn.execute(count, (vid, expected_sector[0])).fetchone()
+            assert sector_name == (SECTOR_MAP.get(sector_id, "otros") if vid <= 120 else None)
+        assert flagged > 5
+        assert 121 not in primary
+
+    def test_empty(self, conn):
+        assert load_vendor_contract_profiles(conn, []) == ({}, {})
+        assert load_vendor_contract_profiles(conn, [999]) == ({}, {})
+
+
+# ---------------------------------------------------------------------------
+# Sharded vendor scoring
+# ---------------------------------------------------------------------------
+
+class TestScoreVendors:
+    def _frame(self, n=300):
+        rng = random.Random(25)
+        vendors = [{
+            "id": vid, "name": rng.choice(["ACME SA", "Pfizer Mexico", "CFE Suministro", "Grupo X"]),
+            "rfc": rng.choice([None, "ABC010101XX0"]),
+            "total_contracts": rng.randint(1, 400), "total_value": rng.choice([None, 10 ** rng.uniform(4, 11)]),
+            "avg_risk_score": rng.random() * 0.8, "max_risk_score": rng.choice([None, 1e9, 5e10]),
+            "direct_award_rate": rng.uniform(0, 100), "single_bid_rate": rng.uniform(0, 100),
+            "sector_id": rng.randint(1, 12), "first_contract_year": rng.choice([None, 2010, 2020]),
+            "last_contract_year": rng.choice([None, 2024]),
+        } for vid in range(1, n + 1)]
+        lookups = {
+            "ext_data": {v: {"is_efos": 1, "efos_rfc": "ABC010101XX0"} for v in range(1, n, 17)},
+            "maha_map": {v: rng.uniform(0, 300) for v in range(1, n, 2)},
+            "ensemble_map": {v: rng.random() for v in range(1, n, 3)},
+            "sector_counts": {s: rng.choice([5, 800]) for s in range(1, 13)},
+            "concentration_map": {v: rng.random() * 0.5 for v in range(1, n, 4)},
+            "institution_features": {v: {"top_institution_ratio": rng.random()} for v in range(1, n, 5)},
+            "z_features": {v: {"avg_z_price_ratio": rng.uniform(-1, 4)} for v in range(1, n, 6)},
+            "co_bid_rates": {v: rng.random() for v in range(1, n, 7)},
+            "burst_profiles": {v: (0.6, {"activity_span_years": 1, "value_per_contract": 2e7, "is_disappeared": 1})
+                               for v in range(1, n, 11)},
+            "primary_sectors": {v: (1, "salud") for v in range(1, n)},
+        }
+        return vendors, lookups
+
+    def test_score_vendor_row(self):
+        vendors, lookups = self._frame()
+        row = score_vendor(vendors[0], "run", lookups)
+        assert row["vendor_id"] == 1 and row["aria_run_id"] == "run"
+        assert row["is_efos_definitivo"] == 1 and row["ips_tier"] <= 2
+        assert row["burst_score"] == 0.6 and row["activity_span_days"] == 365
+        assert row["primary_sector_name"] == "salud"
+
+    def test_sharded_pool_matches_in_process(self, monkeypatch):
+        monkeypatch.setattr(aria_pipeline, "MIN_PARALLEL_VENDORS", 0)
+        vendors, lookups = self._frame()
+        sequential = score_vendors(vendors, "run", lookups, workers=1)
+        assert score_vendors(vendors, "run", lookups, workers=3) == sequential
+        assert [r["vendor_id"] for r in sequential] == [v["id"] for v in vendors]
@@ -0,0 +1,145 @@
+"""
+Unit tests for the two-tier API cache (api/cache.py).
+
+The shared tier is exercised with a throwaway SQLite file; two AppCache
+instances over the same file stand in for two gunicorn workers.
+"""
+import time
+
+from api.cache import AppCache, SharedCacheStore, SimpleCache
+
+
+def _store(tmp_path):
+    return SharedCacheStore(str(tmp_path / "cache.db"))
+
+
+class TestSharedCacheStore:
+    def test_roundtrip(self, tmp_path):
+        store = _store(tmp_path)
+        store.set("ns", "k", {"a": [1, 2, 3]}, ttl=60, maxsize=8)
+        expires_at, value, _fresh_until = store.get("ns", "k")
+        assert value == {"a": [1, 2, 3]}
+        assert expires_at > time.time()
+
+    def test_expired_entry_is_a_miss(self, tmp_path):
+        store = _store(tmp_path)
+        store.set("ns", "k", 1, ttl=-1, maxsize=8)
+        assert store.get("ns", "k") is None
+
+    def test_namespace_maxsize_evicts_oldest(self, tmp_path):
+        store = _store(tmp_path)
+        for i in range(5):
+            store.set("ns", f"k{i}", i, ttl=60, maxsize=3)
+        assert store.get("ns", "k0") is None
+        assert store.get("ns", "k1") is None
+        assert store.get("ns", "k4")[1] == 4
+        assert store.stats()["namespaces"]["ns"]["size"] == 3
+
+    def test_delete_pattern(self, tmp_path):
+        store = _store(tmp_path)
+        store.set("ns", "yoy:1", 1, ttl=60, maxsize=8)
+        store.set("ns", "yoy:2", 2, ttl=60, maxsize=8)
+        store.set("ns", "other", 3, ttl=60, maxsize=8)
+        store.delete("ns", pattern="yoy:")
+        assert store.get("ns", "yoy:1") is None
+        assert store.get("ns", "other")[1] == 3
+
+    def test_unwritable_path_degrades(self, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("x")
+        store = SharedCacheStore(str(blocker / "cache.db"))
+        store.set("ns", "k", 1, ttl=60, maxsize=8)
+        assert store.get("ns", "k") is None
+        assert store.stats() == {"enabled": False}
+
+
+class TestAppCacheSharedTier:
+    def test_value_visible_to_other_worker(self, tmp_path):
+        worker_a = AppCache(store=_store(tmp_path))
+        worker_b = AppCache(store=_store(tmp_path))
+        worker_a.set("atlas_batch", "patterns:P1:10", {"clusters": []}, maxsize=8, ttl=60)
+        assert worker_b.get("atlas_batch", "patterns:P1:10") == {"clusters": []}
+
+    def test_invalidate_reaches_shared_tier(self, tmp_path):
+        worker_a = AppCache(store=_store(tmp_path))
+        worker_b = AppCache(store=_store(tmp_path))
+        worker_a.set("ns", "k", 1)
+        worker_a.invalidate("ns")
+        assert worker_b.get("ns", "k") is None
+
+    def test_per_entry_ttl(self):
+        cache = AppCache()
+        cache.set("ns", "short", 1, ttl=-1)
+        cache.set("ns", "long", 2, ttl=60)
+        assert cache.get("ns", "short") is None
+        assert cache.get("ns", "long") == 2
+
+
+class TestStaleWhileRevalidate:
+    def test_expired_entry_is_served_stale_by_lookup(self, tmp_path):
+        cache = AppCache(store=_store(tmp_path))
+        cache.set("ns", "k", "old", ttl=-1, stale_ttl=60)
+        assert cache.get("ns", "k") is None
+        assert cache.lookup("ns", "k") == ("old", False)
+        cache.set("ns", "k", "new", ttl=60, stale_ttl=60)
+        assert cache.lookup("ns", "k") == ("new", True)
+
+    def test_without_stale_window_lookup_misses(self):
+        cache = AppCache()
+        cache.set("ns", "k", "old", ttl=-1)
+        assert cache.lookup("ns", "k") is None
+
+    def test_previous_epoch_is_stale_not_gone(self, tmp_path):
+        epoch = {"value": 1}
+        worker_a = AppCache(store=_store(tmp_path), epoch_source=lambda: epoch["value"])
+        worker_b = AppCache(store=_store(tmp_path), epoch_source=lambda: epoch["value"])
+        worker_a.set("stories", "packages", "v1", ttl=None, stale_ttl=3600)
+        worker_a.set("stories", "other", "plain", ttl=None)
+        epoch["value"] = 2
+        assert worker_b.get("stories", "packages") is None
+        assert worker_b.lookup("stories", "packages") == ("v1", False)
+        assert worker_b.lookup("stories", "other") is None
+
+
+class TestSimpleCacheNamespace:
+    def test_namespaced_invalidate_pattern(self):
+        cache = SimpleCache(namespace="test_simple_cache")
+        cache.set("sector:1", "a")
+        cache.set("sector:2", "b")
+        cache.set("year:1", "c")
+        cache.invalidate("sector:")
+        assert cache.get("sector:1") is None
+        assert cache.get("year:1") == "c"
+        cache.invalidate()
+        assert cache.get("year:1") is None
+
+
+class TestDataEpoch:
+    def test_bump_and_read(self, tmp_path):
+        import sqlite3
+
+        from api.data_epoch import bump_data_epoch, read_data_epoch
+
+        conn = sqlite3.connect(str(tmp_path / "data.db"))
+        assert read_data_epoch(conn) == 0
+        assert bump_data_epoch(conn, "precompute_stats") == 1
+        assert bump_data_epoch(conn, "aria_pipeline") == 2
+        assert read_data_epoch(conn) == 2
+        conn.close()
+
+    def test_epoch_change_retires_both_tiers(self, tmp_path):
+        epoch = {"value": 1}
+        worker_a = AppCache(store=_store(tmp_path), epoch_source=lambda: epoch["value"])
+        worker_b = AppCache(store=_store(tmp_path), epoch_source=lambda: epoch["value"])
+        worker_a.set("analysis_yoy", "yoy:None:None:None", {"data": []}, ttl=None)
+        assert worker_b.get("analysis_yoy", "yoy:None:None:None") == {"data": []}
+        epoch["value"] = 2
+        assert worker_a.get("analysis_yoy", "yoy:None:None:None") is None
+        assert worker_b.get("analysis_yoy", "yoy:None:None:None") is None
+
+    def test_versioned_ttl_backstop(self):
+        from api.cache import UNVERSIONED_TTL, VERSIONED_MAX_TTL, resolve_ttl
+
+        assert resolve_ttl(60, 5) == 60
+        assert resolve_ttl(None, 0) == UNVERSIONED_TTL
+        assert resolve_ttl(None, 5) == VERSIONED_MAX_TTL
@@ -117,8 +117,7 @@ def _teardown_vendor_filter_data():
     conn.commit()
     conn.close()
     # Flush router cache so subsequent tests don't see stale data
-    with cases_router._cache_lock:
-        cases_router._cache.clear()
+    cases_router._cache.invalidate()
 
 
 # ---------------------------------------------------------------------------
@@ -212,8 +211,7 @@ class TestCasesVendorIdFilter:
     def setup_and_teardown(self):
         _seed_vendor_filter_data()
         # Flush cache so seeded rows are visible to the test client
-        with cases_router._cache_lock:
-            cases_router._cache.clear()
+        cases_router._cache.invalidate()
         yield
         _teardown_vendor_filter_data()
 
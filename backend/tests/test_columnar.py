@@ -0,0 +1,162 @@
+"""
+Unit tests for the columnar contract sidecar (api/columnar.py).
+
+A small contracts table with NULLs in every exported column is exported and
+the NumPy reductions are checked against the SQL aggregates they replace.
+"""
+import random
+import sqlite3
+
+import pytest
+
+from api import columnar
+from api.columnar import ColumnarStore, export_columns, row_mask, top_pairs, yearly_stats
+from api.data_epoch import bump_data_epoch, read_contracts_version
+from api.services.analysis_service import analysis_service
+
+
+def _maybe(value, rng, p=0.05):
+    return None if rng.random() < p else value
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    rng = random.Random(7)
+    conn = sqlite3.connect(str(tmp_path / "c.db"))
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE contracts (
+            id INTEGER PRIMARY KEY, amount_mxn REAL, contract_year INTEGER,
+            contract_month INTEGER, sector_id INTEGER, institution_id INTEGER,
+            vendor_id INTEGER, risk_score REAL, risk_level TEXT,
+            is_direct_award INTEGER, is_single_bid INTEGER
+        );
+        CREATE TABLE institutions (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE vendors (id INTEGER PRIMARY KEY, name TEXT);
+    """)
+    levels = ["low", "medium", "high", "critical"]
+    conn.executemany(
+        "INSERT INTO contracts VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                _maybe(round(rng.uniform(1, 5e6), 2), rng),
+                _maybe(rng.randint(2018, 2023), rng),
+                _maybe(rng.randint(1, 12), rng),
+                _maybe(rng.randint(1, 4), rng),
+                _maybe(rng.randint(1, 6), rng),
+                _maybe(rng.randint(1, 30), rng),
+                _maybe(round(rng.random(), 4), rng),
+                _maybe(rng.choice(levels), rng),
+                _maybe(rng.randint(0, 1), rng),
+                _maybe(rng.randint(0, 1), rng),
+            )
+            for _ in range(3000)
+        ],
+    )
+    conn.executemany("INSERT INTO institutions VALUES (?, ?)", [(i, f"I{i}") for i in range(1, 7)])
+    conn.executemany("INSERT INTO vendors VALUES (?, ?)", [(i, f"V{i}") for i in range(1, 31)])
+    conn.commit()
+    bump_data_epoch(conn, "test", contracts_changed=True)
+    version = {"value": read_contracts_version(conn)}
+    store = ColumnarStore(tmp_path / "columnar")
+    monkeypatch.setattr(columnar, "columnar_store", store)
+    monkeypatch.setattr(columnar, "current_contracts_version", lambda: version["value"])
+    yield conn, store, version
+    conn.close()
+
+
+def _sql_years(conn, **filters):
+    return [dict(r) for r in analysis_service._yearly_rows_sql(
+        conn, filters.get("sector_id"), filters.get("start_year"), filters.get("end_year"),
+    )]
+
+
+def _assert_rows_equal(expected, actual):
+    assert len(expected) == len(actual)
+    for e, a in zip(expected, actual):
+        assert e.keys() <= a.keys()
+        for key, value in e.items():
+            assert a[key] == pytest.approx(value), key
+
+
+class TestColumnarExport:
+    def test_export_roundtrip_and_manifest(self, db):
+        conn, store, version = db
+        manifest = export_columns(conn, store.directory)
+        assert manifest["rows"] == 3000 and manifest["contracts_version"] == version["value"]
+        cols = store.columns()
+        assert cols is not None and cols.rows == 3000
+        assert not cols.amount.flags.writeable
+
+    def test_contracts_write_disables_sidecar(self, db):
+        conn, store, version = db
+        export_columns(conn, store.directory)
+        bump_data_epoch(conn, "aria_pipeline")
+        version["value"] = read_contracts_version(conn)
+        assert store.columns() is not None
+        bump_data_epoch(conn, "calculate_risk_scores_v6", contracts_changed=True)
+        version["value"] = read_contracts_version(conn)
+        assert store.columns() is None
+
+    def test_missing_sidecar(self, db):
+        _, store, _ = db
+        assert store.columns() is None
+
+
+class TestReductions:
+    def test_yearly_stats_match_sql(self, db):
+        conn, store, _ = db
+        export_columns(conn, store.directory)
+        cols = store.columns()
+        _assert_rows_equal(_sql_years(conn), yearly_stats(cols, row_mask(cols)))
+        _assert_rows_equal(
+            _sql_years(conn, sector_id=2, start_year=2019, end_year=2021),
+            yearly_stats(cols, row_mask(cols, sector_id=2, start_year=2019, end_year=2021)),
+        )
+
+    def test_sector_year_grouping(self, db):
+        conn, store, _ = db
+        export_columns(conn, store.directory)
+        cols = store.columns()
+        rows = yearly_stats(cols, row_mask(cols), by_sector=True)
+        expected = conn.execute(
+            "SELECT contract_year, sector_id, COUNT(*), COUNT(DISTINCT vendor_id) FROM contracts "
+            "WHERE contract_year IS NOT NULL AND sector_id IS NOT NULL "
+            "GROUP BY contract_year, sector_id ORDER BY contract_year, sector_id"
+        ).fetchall()
+        assert [(r["year"], r["sector_id"], r["contracts"], r["vendor_count"]) for r in rows] == \
+            [tuple(e) for e in expected]
+
+    def test_top_pairs_match_sql(self, db):
+        conn, store, _ = db
+        export_columns(conn, store.directory)
+        cols = store.columns()
+        pairs = top_pairs(cols, row_mask(cols, year=2020, amount_between=(0, 1e11)), 5)
+        expected = conn.execute(
+            "SELECT institution_id, vendor_id, SUM(amount_mxn), COUNT(*) FROM contracts "
+            "WHERE contract_year = 2020 AND amount_mxn > 0 AND amount_mxn < 1e11 "
+            "AND institution_id IS NOT NULL AND vendor_id IS NOT NULL "
+            "GROUP BY institution_id, vendor_id ORDER BY SUM(amount_mxn) DESC LIMIT 5"
+        ).fetchall()
+        assert [(p["institution_id"], p["vendor_id"], p["contract_count"]) for p in pairs] == \
+            [(e[0], e[1], e[3]) for e in expected]
+        assert [p["total_value"] for p in pairs] == pytest.approx([e[2] for e in expected])
+
+
+class TestAnalysisService:
+    def test_year_over_year_same_either_way(self, db):
+        conn, store, _ = db
+        from_sql = analysis_service.get_year_over_year(conn, sector_id=3)
+        export_columns(conn, store.directory)
+        assert store.columns() is not None
+        assert analysis_service.get_year_over_year(conn, sector_id=3) == pytest.approx(from_sql)
+
+    def test_money_flow_same_either_way(self, db):
+        conn, store, _ = db
+        from_sql = analysis_service.get_money_flow(conn, year=2021, limit=10)
+        export_columns(conn, store.directory)
+        from_columns = analysis_service.get_money_flow(conn, year=2021, limit=10)
+        assert from_columns["total_contracts"] == from_sql["total_contracts"]
+        assert [f["value"] for f in from_columns["flows"]] == pytest.approx(
+            [f["value"] for f in from_sql["flows"]]
+        )
@@ -0,0 +1,162 @@
+"""
+Tests for the column-at-a-time z-feature engine (scripts/compute_z_features.py).
+
+The engine must reproduce the row-wise reference (compute_raw_features +
+compute_z_score) exactly, with and without vendor_rolling_stats.
+"""
+
+import random
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.compute_z_features import (
+    FACTOR_NAMES,
+    AuxArrays,
+    ContractColumns,
+    KeyIndex,
+    NULL_ID,
+    compute_raw_feature_arrays,
+    compute_raw_features,
+    compute_z_matrix,
+    compute_z_score,
+    load_auxiliary_data,
+    load_baselines,
+    load_contract_columns,
+    z_feature_rows,
+)
+
+_DATES = ["2019-01-15", "2019-02-01", "2020-12-20", "2021-03-03", "2021-3-9", "", None, "2021-03-03 10:00", "2020-01-02"]
+
+
+def _make_db(path, rolling: bool):
+    rng = random.Random(21)
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE contracts (
+            id INTEGER PRIMARY KEY, vendor_id INTEGER, institution_id INTEGER, sector_id INTEGER,
+            amount_mxn REAL, is_direct_award INTEGER, is_single_bid INTEGER, is_year_end INTEGER,
+            publication_date TEXT, contract_date TEXT, contract_year INTEGER,
+            price_hypothesis_confidence REAL
+        );
+        CREATE TABLE factor_baselines (
+            factor_name TEXT, sector_id INTEGER, year INTEGER, scope TEXT,
+            mean REAL, stddev REAL, count INTEGER
+        );
+        CREATE TABLE vendor_aliases (vendor_id INTEGER, group_id INTEGER);
+        CREATE TABLE vendor_co_bidding (vendor_id INTEGER, co_bid_rate REAL);
+        CREATE TABLE institutions (id INTEGER PRIMARY KEY, institution_type TEXT);
+        CREATE TABLE vendor_industries (id INTEGER PRIMARY KEY, sector_affinity INTEGER);
+        CREATE TABLE vendor_classifications (vendor_id INTEGER, industry_id INTEGER, industry_source TEXT);
+    """)
+
+    def maybe(value, p_null=0.08):
+        return None if rng.random() < p_null else value
+
+    for i in range(1, 1501):
+        conn.execute(
+            "INSERT INTO contracts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                i, maybe(rng.choice([0, *range(1, 41)])), maybe(rng.randint(1, 15)), maybe(rng.randint(1, 4)),
+                maybe(rng.choice([0, -5.0, round(rng.uniform(1, 5e6), 2), 2e11])),
+                maybe(rng.randint(0, 1)), maybe(rng.randint(0, 1)), maybe(rng.randint(0, 1)),
+                rng.choice(_DATES), rng.choice(_DATES), maybe(rng.choice([2019, 2020, 2021, 2022])),
+                maybe(round(rng.random(), 2), 0.5),
+            ),
+        )
+    for factor in FACTOR_NAMES:
+        conn.execute("INSERT INTO factor_baselines VALUES (?, NULL, NULL, 'global', ?, ?, 1500)",
+                     (factor, rng.random(), rng.uniform(0.01, 2)))
+        for sector in (1, 2, 3):
+            conn.execute("INSERT INTO factor_baselines VALUES (?, ?, NULL, 'sector', ?, ?, 300)",
+                         (factor, sector, rng.choice([0.0, 1.0, rng.random()]), rng.uniform(0.01, 2)))
+            for year in (2019, 2020, 2021):
+                conn.execute("INSERT INTO factor_baselines VALUES (?, ?, ?, 'sector_year', ?, ?, ?)",
+                             (factor, sector, year, rng.random(), rng.uniform(0.01, 2), rng.choice([5, 50])))
+    for vendor in range(1, 41, 3):
+        conn.execute("INSERT INTO vendor_aliases VALUES (?, ?)", (vendor, vendor % 4))
+        conn.execute("INSERT INTO vendor_co_bidding VALUES (?, ?)", (vendor, rng.random()))
+    for inst in range(1, 13):
+        conn.execute("INSERT INTO institutions VALUES (?, ?)", (inst, rng.choice(["municipal", "judicial", "unknown"])))
+    conn.executemany("INSERT INTO vendor_industries VALUES (?, ?)", [(1, 1), (2, 3), (3, None)])
+    for vendor in range(2, 41, 4):
+        conn.execute("INSERT INTO vendor_classifications VALUES (?, ?, 'verified_online')", (vendor, rng.randint(1, 3)))
+
+    if rolling:
+        conn.execute("""
+            CREATE TABLE vendor_rolling_stats (
+                vendor_id INTEGER NOT NULL, sector_id INTEGER NOT NULL, as_of_year INTEGER NOT NULL,
+                total_value REAL DEFAULT 0, total_count INTEGER DEFAULT 0, sum_sq_amount REAL DEFAULT 0,
+                comp_wins INTEGER DEFAULT 0, comp_total INTEGER DEFAULT 0, n_institutions INTEGER DEFAULT 0,
+                inst_hhi REAL DEFAULT 1.0, n_sectors INTEGER DEFAULT 0
+            )
+        """)
+        for vendor in range(1, 41):
+            for sector in (1, 2, 3, 4):
+                for year in (2018, 2019, 2020, 2021):
+                    if rng.random() < 0.5:
+                        conn.execute(
+                            "INSERT INTO vendor_rolling_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?)",
+                            (vendor, sector, year, rng.choice([0.0, rng.uniform(1, 1e7)]), rng.randint(0, 9),
+                             rng.uniform(0, 1e13), rng.randint(0, 5), rng.randint(0, 20),
+                             rng.random(), rng.randint(1, 4)),
+                        )
+    conn.commit()
+    return conn
+
+
+def _reference(conn):
+    baselines = load_baselines(conn)
+    aux = load_auxiliary_data(conn)
+    rows = conn.execute("""
+        SELECT id, vendor_id, institution_id, sector_id, amount_mxn, is_direct_award, is_single_bid,
+               is_year_end, publication_date, contract_date, contract_year, price_hypothesis_confidence
+        FROM contracts ORDER BY id
+    """).fetchall()
+    binary = {'single_bid', 'direct_award', 'year_end', 'industry_mismatch'}
+    out = []
+    for row in rows:
+        raw = compute_raw_features(row, aux)
+        z = [
+            compute_z_score(raw[f], *baselines.get(f, row[3], row[10]), f in binary)
+            for f in FACTOR_NAMES
+        ]
+        out.append((row[0], row[3], row[10]) + tuple(z) + (None, None))
+    return rows, aux, baselines, out
+
+
+@pytest.mark.parametrize("rolling", [True, False])
+def test_engine_matches_row_wise_reference(tmp_path, rolling, capsys):
+    conn = _make_db(tmp_path / "z.db", rolling)
+    rows, aux, baselines, expected = _reference(conn)
+
+    contracts = load_contract_columns(conn, "price_hypothesis_confidence", batch_size=400)
+    lookups = AuxArrays(aux, contracts.date_codes)
+    got = []
+    for start in range(0, len(contracts), 500):
+        part = contracts.slice(start, start + 500)
+        got.extend(z_feature_rows(part, compute_z_matrix(part, lookups, baselines)))
+    assert got == expected
+
+
+def test_raw_features_match_per_factor(tmp_path, capsys):
+    conn = _make_db(tmp_path / "z.db", rolling=True)
+    rows, aux, _, _ = _reference(conn)
+    contracts = ContractColumns.from_rows([rows])
+    raw = compute_raw_feature_arrays(contracts, AuxArrays(aux, contracts.date_codes))
+    for i, row in enumerate(rows):
+        ref = compute_raw_features(row, aux)
+        for factor in FACTOR_NAMES:
+            assert raw[factor][i] == ref[factor], (row, factor)
+
+
+def test_key_index_composite_and_null():
+    index = KeyIndex(np.array([5, 5, 7, NULL_ID]), np.array([2020, 2021, 2020, 2020]))
+    pos = index.find(np.array([5, 7, 7, 9, NULL_ID]), np.array([2021, 2020, 2021, 2020, 2020]))
+    assert pos.tolist() == [1, 2, -1, -1, -1]
+    assert KeyIndex(np.empty(0, dtype=np.int64)).find(np.array([1])).tolist() == [-1]
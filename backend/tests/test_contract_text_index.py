@@ -0,0 +1,92 @@
+"""
+Unit tests for the contract title/description FTS index (api/services/contract_text_index.py).
+"""
+import sqlite3
+
+import pytest
+
+from api.routers.export import build_contracts_where
+from api.services import contract_text_index
+from api.services.contract_text_index import (
+    build_contracts_fts,
+    contract_text_condition,
+    contracts_fts_ready,
+    fts_match_query,
+)
+
+_ROWS = [
+    ("CONSTRUCCIÓN DE CARRETERA FEDERAL", "Obra pública tramo norte"),
+    ("Adquisición de medicamentos", "Compra consolidada de insumos médicos"),
+    ("Servicio de limpieza", None),
+    (None, "Mantenimiento de carretera estatal"),
+    ("Arrendamiento de equipo de cómputo", "Servicios administrados"),
+]
+
+_FILTERS = dict(
+    sector_id=None, year=None, institution_id=None, vendor_id=None, risk_level=None,
+    is_direct_award=None, is_single_bid=None, min_amount=None, max_amount=None,
+    category_id=None, risk_factor=None,
+)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    conn = sqlite3.connect(str(tmp_path / "fts.db"))
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE contracts (id INTEGER PRIMARY KEY, title TEXT, description TEXT, amount_mxn REAL);
+        CREATE TABLE precomputed_stats (stat_key TEXT PRIMARY KEY, stat_value TEXT, updated_at TEXT);
+    """)
+    conn.executemany("INSERT INTO contracts (title, description, amount_mxn) VALUES (?, ?, 1)", _ROWS)
+    conn.commit()
+    monkeypatch.setattr(contract_text_index, "current_data_epoch", lambda: 1)
+    monkeypatch.setattr(contract_text_index, "_ready", {})
+    yield conn
+    conn.close()
+
+
+def _ids(conn, term):
+    clause, params = contract_text_condition(conn, term)
+    return sorted(r[0] for r in conn.execute(f"SELECT c.id FROM contracts c WHERE {clause}", params))
+
+
+def test_match_query_is_word_prefixes():
+    assert fts_match_query('carretera "OR" norte') == '"carretera"* "OR"* "norte"*'
+    assert fts_match_query(" %% ") is None
+
+
+class TestContractTextIndex:
+    def test_matches_title_and_description(self, db):
+        build_contracts_fts(db)
+        assert _ids(db, "carretera") == [1, 4]
+        assert _ids(db, "constru") == [1]
+        assert _ids(db, "medicos") == [2]  # accent-insensitive
+        assert _ids(db, "servicio") == [3, 5]
+        assert _ids(db, "carretera norte") == [1]
+
+    def test_triggers_keep_index_in_sync(self, db):
+        build_contracts_fts(db)
+        db.execute("INSERT INTO contracts (title, description) VALUES ('Puente peatonal', NULL)")
+        db.execute("UPDATE contracts SET description = 'Obra de drenaje' WHERE id = 1")
+        db.execute("DELETE FROM contracts WHERE id = 4")
+        assert _ids(db, "puente") == [6]
+        assert _ids(db, "carretera") == [1]
+        assert _ids(db, "norte") == []
+        assert _ids(db, "drenaje") == [1]
+
+    def test_title_only_table_keeps_like(self, db):
+        db.execute("CREATE VIRTUAL TABLE contracts_fts USING fts5(title, content='contracts', content_rowid='id')")
+        assert not contracts_fts_ready(db)
+        assert contract_text_condition(db, "carretera") is None
+        build_contracts_fts(db)
+        contract_text_index._ready.clear()
+        assert contracts_fts_ready(db)
+
+    def test_export_where_uses_index(self, db):
+        like_where, like_params = build_contracts_where(search="carretera", conn=db, **_FILTERS)
+        assert "LIKE" in like_where
+        build_contracts_fts(db)
+        where, params = build_contracts_where(search="carretera", conn=db, **_FILTERS)
+        assert "contracts_fts" in where and "LIKE" not in where
+        ids = sorted(r[0] for r in db.execute(f"SELECT c.id FROM contracts c WHERE {where}", params))
+        assert ids == sorted(r[0] for r in db.execute(f"SELECT c.id FROM contracts c WHERE {like_where}", like_params))
@@ -0,0 +1,148 @@
+"""
+Unit tests for the contracts_cube pre-aggregate and AggregateQuery routing.
+"""
+import random
+import sqlite3
+
+import pytest
+
+from api.data_epoch import bump_data_epoch, read_contracts_version
+from api.services import contracts_cube
+from api.services.analysis_service import analysis_service
+from api.services.contracts_cube import build_contracts_cube, cube_is_current
+from api.services.query_builder import AggregateQuery
+
+_LEVELS = ["low", "medium", "high", "critical", None]
+_PROCEDURES = ["licitacion", "invitacion", "adjudicacion", None]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    rng = random.Random(11)
+    conn = sqlite3.connect(str(tmp_path / "cube.db"))
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE contracts (
+            id INTEGER PRIMARY KEY, amount_mxn REAL, contract_year INTEGER,
+            contract_month INTEGER, sector_id INTEGER, institution_id INTEGER,
+            risk_score REAL, risk_level TEXT, is_direct_award INTEGER,
+            is_single_bid INTEGER, procedure_type_normalized TEXT
+        );
+        CREATE TABLE precomputed_stats (stat_key TEXT PRIMARY KEY, stat_value TEXT, updated_at TEXT);
+    """)
+    conn.executemany(
+        "INSERT INTO contracts VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                None if rng.random() < 0.05 else round(rng.uniform(1, 1e6), 2),
+                rng.choice([2020, 2021, 2022, None]),
+                rng.randint(1, 12),
+                rng.randint(1, 3),
+                rng.randint(1, 5),
+                None if rng.random() < 0.1 else round(rng.random(), 4),
+                rng.choice(_LEVELS),
+                rng.randint(0, 1),
+                rng.randint(0, 1),
+                rng.choice(_PROCEDURES),
+            )
+            for _ in range(2000)
+        ],
+    )
+    conn.commit()
+    bump_data_epoch(conn, "test", contracts_changed=True)
+    version = {"value": read_contracts_version(conn)}
+    monkeypatch.setattr(contracts_cube, "current_contracts_version", lambda: version["value"])
+    monkeypatch.setattr(contracts_cube, "_ready", {})
+    yield conn, version
+    conn.close()
+
+
+_QUERIES = [
+    lambda: AggregateQuery("contracts", "total_value").group_by("risk_level"),
+    lambda: AggregateQuery("contracts", "total_value", "avg_risk", "direct_awards", "single_bids")
+    .filter("sector_id", "=", 2).filter("contract_year", ">=", 2021).group_by("contract_year"),
+    lambda: AggregateQuery("contracts", "high_risk", "competitive", "institutions")
+    .filter("risk_level", "IN", ["high", "critical"]).group_by("sector_id", "procedure_type"),
+    lambda: AggregateQuery("contracts", "avg_risk").filter("contract_year", "IS NOT NULL", None),
+]
+
+
+def _rows(conn, query, use_cube):
+    sql, params = query.build(use_cube=use_cube)
+    return sorted(
+        (tuple(row) for row in conn.execute(sql, params)),
+        key=lambda r: tuple((v is None, v if v is not None else 0) for v in r),
+    )
+
+
+class TestAggregateQuery:
+    @pytest.mark.parametrize("make_query", _QUERIES)
+    def test_cube_matches_contracts(self, db, make_query):
+        conn, _ = db
+        build_contracts_cube(conn)
+        expected = _rows(conn, make_query(), use_cube=False)
+        actual = _rows(conn, make_query(), use_cube=True)
+        assert len(expected) == len(actual)
+        for e, a in zip(expected, actual):
+            assert a == pytest.approx(e)
+
+    def test_raw_condition_is_not_cube_eligible(self):
+        query = AggregateQuery("contracts").where_raw("amount_mxn > ?", 0)
+        assert not query.cube_eligible
+        with pytest.raises(ValueError):
+            query.build(use_cube=True)
+
+    def test_unknown_names_rejected(self):
+        with pytest.raises(ValueError):
+            AggregateQuery("median_amount")
+        with pytest.raises(ValueError):
+            AggregateQuery("contracts").group_by("vendor_id")
+
+
+class TestRouting:
+    def test_cube_used_until_contracts_change(self, db):
+        conn, version = db
+        assert not cube_is_current(conn)
+        build_contracts_cube(conn)
+        contracts_cube._ready.clear()
+        assert cube_is_current(conn)
+        # A stage that leaves contracts alone keeps the cube in use...
+        bump_data_epoch(conn, "aria_pipeline")
+        version["value"] = read_contracts_version(conn)
+        assert cube_is_current(conn)
+        # ...a re-score retires it until the cube is rebuilt.
+        bump_data_epoch(conn, "score_all_models", contracts_changed=True)
+        version["value"] = read_contracts_version(conn)
+        assert not cube_is_current(conn)
+        build_contracts_cube(conn)
+        contracts_cube._ready.clear()
+        assert cube_is_current(conn)
+
+    def test_service_reads_cube_when_current(self, db):
+        conn, _ = db
+        build_contracts_cube(conn)
+        contracts_cube._ready.clear()
+        # Diverge the fact table from the cube: the routed answer comes from the cube.
+        conn.execute("DELETE FROM contracts WHERE risk_level = 'critical'")
+        rows = analysis_service.aggregate(conn, AggregateQuery("contracts").filter("risk_level", "=", "critical"))
+        assert rows[0]["contracts"] > 0
+        rows = analysis_service.aggregate(
+            conn, AggregateQuery("contracts").filter("risk_level", "=", "critical").where_raw("1 = 1"),
+        )
+        assert rows[0]["contracts"] == 0
+
+
+class TestListTotals:
+    def test_list_total_from_cube_matches_count(self, db):
+        from api.services.contract_service import contract_service
+
+        conn, _ = db
+        expected = conn.execute(
+            "SELECT COUNT(*) FROM contracts WHERE sector_id = 2 AND risk_level = 'high' AND is_direct_award = 1"
+        ).fetchone()[0]
+        filters = dict(sector_id=2, year=None, vendor_id=None, institution_id=None,
+                       risk_level="HIGH", is_direct_award=True, is_single_bid=None)
+        assert contract_service._estimate_list_total(conn, **filters) is None  # cube not built
+        build_contracts_cube(conn)
+        contracts_cube._ready.clear()
+        assert contract_service._estimate_list_total(conn, **filters) == (expected, False)
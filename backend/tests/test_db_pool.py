@@ -0,0 +1,84 @@
+"""
+Unit tests for the pooled read-only connections in api/dependencies.py.
+
+Each test points DB_PATH at a throwaway SQLite file.
+"""
+import sqlite3
+
+import pytest
+
+from api import dependencies
+from api.dependencies import ReadConnectionPool
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = tmp_path / "pool.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("INSERT INTO t (name) VALUES ('a')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(dependencies, "DB_PATH", path)
+    return path
+
+
+class TestReadConnectionPool:
+    def test_connection_is_reused(self, db_path):
+        pool = ReadConnectionPool(max_idle=2)
+        conn = pool.acquire()
+        pool.release(conn)
+        assert pool.acquire() is conn
+
+    def test_connections_are_read_only(self, db_path):
+        pool = ReadConnectionPool(max_idle=2)
+        conn = pool.acquire()
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO t (name) VALUES ('b')")
+        pool.release(conn)
+
+    def test_release_beyond_max_idle_closes(self, db_path):
+        pool = ReadConnectionPool(max_idle=1)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        with pytest.raises(sqlite3.ProgrammingError):
+            second.execute("SELECT 1")
+        assert pool.acquire() is first
+
+    def test_release_restores_row_factory(self, db_path):
+        pool = ReadConnectionPool(max_idle=1)
+        conn = pool.acquire()
+        conn.row_factory = None
+        pool.release(conn)
+        row = pool.acquire().execute("SELECT name FROM t").fetchone()
+        assert row["name"] == "a"
+
+    def test_replaced_db_file_is_reopened(self, db_path, tmp_path):
+        pool = ReadConnectionPool(max_idle=1)
+        conn = pool.acquire()
+        pool.release(conn)
+
+        replacement = tmp_path / "new.db"
+        new = sqlite3.connect(str(replacement))
+        new.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+        new.execute("INSERT INTO t (name) VALUES ('z')")
+        new.commit()
+        new.close()
+        replacement.replace(db_path)
+
+        fresh = pool.acquire()
+        assert fresh is not conn
+        assert fresh.execute("SELECT name FROM t").fetchone()["name"] == "z"
+
+
+class TestWriterPath:
+    def test_writer_commits_visible_to_pooled_reader(self, db_path, monkeypatch):
+        monkeypatch.setattr(dependencies, "_read_pool", ReadConnectionPool(max_idle=1))
+        with dependencies.get_db() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+        with dependencies.get_db_writer() as conn:
+            conn.execute("INSERT INTO t (name) VALUES ('b')")
+            conn.commit()
+        with dependencies.get_db() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 2
@@ -0,0 +1,134 @@
+"""
+Unit tests for statement deadlines (api/deadlines.py) and DeadlineMiddleware.
+"""
+import sqlite3
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from api import metrics as metrics_module
+from api.deadlines import DeadlineExceeded, deadline, detached
+from api.metrics import InstrumentedConnection, instrument_connection
+from api.middleware import DeadlineMiddleware, register_error_handlers
+
+# Runs for many seconds unless interrupted.
+_ENDLESS_SQL = """
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 500000000)
+    SELECT SUM(i) FROM n
+"""
+
+
+def _instrumented():
+    conn = sqlite3.connect(":memory:", factory=InstrumentedConnection, check_same_thread=False)
+    instrument_connection(conn, "read")
+    return conn
+
+
+class TestDeadline:
+    def test_interrupts_instrumented_connection(self):
+        conn = _instrumented()
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded) as info:
+            with deadline(0.2, label="endless"):
+                conn.execute(_ENDLESS_SQL).fetchone()
+        assert time.monotonic() - started < 2.0
+        assert info.value.label == "endless"
+        # The connection stays usable.
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+
+    def test_enforced_with_sql_metrics_off(self, monkeypatch):
+        monkeypatch.setattr(metrics_module, "SQL_METRICS_ENABLED", False)
+        conn = _instrumented()
+        assert conn.statement_timer is None
+        with pytest.raises(DeadlineExceeded):
+            with deadline(0.2):
+                conn.execute(_ENDLESS_SQL).fetchone()
+
+    def test_passing_conn_keeps_pooled_handler_with_sql_metrics_off(self, monkeypatch):
+        monkeypatch.setattr(metrics_module, "SQL_METRICS_ENABLED", False)
+        conn = _instrumented()
+        with deadline(5, conn=conn):
+            conn.execute("SELECT 1").fetchone()
+        # The handler installed by instrument_connection must survive the block.
+        with pytest.raises(DeadlineExceeded):
+            with deadline(0.2):
+                conn.execute(_ENDLESS_SQL).fetchone()
+
+    def test_plain_connection_gets_handler_for_the_block(self):
+        conn = sqlite3.connect(":memory:")
+        with pytest.raises(DeadlineExceeded):
+            with deadline(0.2, conn=conn):
+                conn.execute(_ENDLESS_SQL).fetchone()
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+
+    def test_inner_deadline_cannot_extend_outer(self):
+        conn = _instrumented()
+        with deadline(0.2, label="outer") as outer:
+            with pytest.raises(DeadlineExceeded):
+                with deadline(30, label="inner") as inner:
+                    conn.execute(_ENDLESS_SQL).fetchone()
+        assert inner.fired and outer.fired
+
+    def test_detached_ignores_enclosing_deadline(self):
+        conn = _instrumented()
+        with deadline(0.01):
+            time.sleep(0.02)
+            with detached():
+                assert conn.execute("SELECT COUNT(*) FROM (SELECT 1 UNION SELECT 2)").fetchone() == (2,)
+
+    def test_unrelated_errors_pass_through(self):
+        conn = _instrumented()
+        with pytest.raises(sqlite3.OperationalError):
+            with deadline(5):
+                conn.execute("SELECT * FROM missing_table")
+
+
+@pytest.fixture(scope="module")
+def deadline_client():
+    app = FastAPI()
+    register_error_handlers(app)
+    app.add_middleware(
+        DeadlineMiddleware,
+        routes=(("/api/v1/exempt", None), ("/api/v1/slow", 0.2)),
+        default=10.0,
+    )
+
+    @app.get("/api/v1/slow/raw")
+    def slow_raw():
+        _instrumented().execute(_ENDLESS_SQL).fetchone()
+
+    @app.get("/api/v1/slow/wrapped")
+    def slow_wrapped():
+        try:
+            _instrumented().execute(_ENDLESS_SQL).fetchone()
+        except sqlite3.Error:
+            raise HTTPException(status_code=500, detail="Database error")
+
+    @app.get("/api/v1/exempt/fast")
+    def exempt_fast():
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        yield client
+
+
+class TestDeadlineMiddleware:
+    def test_route_deadline_answers_504(self, deadline_client):
+        response = deadline_client.get("/api/v1/slow/raw")
+        assert response.status_code == 504
+        assert response.json()["error"]["code"] == "DEADLINE_EXCEEDED"
+
+    def test_handler_wrapped_interrupt_becomes_504(self, deadline_client):
+        response = deadline_client.get("/api/v1/slow/wrapped")
+        assert response.status_code == 504
+
+    def test_exempt_prefix(self, deadline_client):
+        assert deadline_client.get("/api/v1/exempt/fast").json() == {"ok": True}
+
+    def test_budget_lookup(self):
+        middleware = DeadlineMiddleware(None, routes=(("/api/v1/export", None),), default=55.0)
+        assert middleware.budget_for("/api/v1/export/contracts") is None
+        assert middleware.budget_for("/api/v1/vendors/1") == 55.0
+        assert middleware.budget_for("/health") is None
@@ -0,0 +1,160 @@
+"""
+Tests for epoch-based ETag revalidation (api/middleware/etag.py).
+
+Uses a throwaway FastAPI app so the data epoch can be pinned without a DB.
+The review-epoch counter itself is exercised against a throwaway SQLite file.
+"""
+import ast
+import inspect
+import sqlite3
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import data_epoch, dependencies
+from api.middleware import etag as etag_module
+from api.middleware.etag import ETagMiddleware, etag_matches
+
+
+@pytest.fixture
+def etag_app(monkeypatch):
+    epoch = {"value": 7, "review": 0}
+    monkeypatch.setattr(etag_module, "current_data_epoch", lambda: epoch["value"])
+    monkeypatch.setattr(etag_module, "current_review_epoch", lambda: epoch["review"])
+    calls = {"n": 0}
+
+    app = FastAPI()
+    app.add_middleware(
+        ETagMiddleware,
+        prefixes=("/api/v1/analysis",),
+        exclude=("/api/v1/analysis/price-hypotheses",),
+    )
+
+    @app.get("/api/v1/analysis/overview")
+    def overview(sector_id: int = 0):
+        calls["n"] += 1
+        return {"sector_id": sector_id}
+
+    @app.get("/api/v1/analysis/price-hypotheses")
+    def hypotheses():
+        return {"data": []}
+
+    with TestClient(app) as client:
+        yield client, epoch, calls
+
+
+class TestETagMiddleware:
+    def test_sets_etag_on_200(self, etag_app):
+        client, _, _ = etag_app
+        resp = client.get("/api/v1/analysis/overview")
+        assert resp.status_code == 200
+        assert resp.headers["etag"].startswith('"e7-')
+
+    def test_304_skips_handler(self, etag_app):
+        client, _, calls = etag_app
+        tag = client.get("/api/v1/analysis/overview").headers["etag"]
+        resp = client.get("/api/v1/analysis/overview", headers={"If-None-Match": tag})
+        assert resp.status_code == 304
+        assert resp.headers["etag"] == tag
+        assert calls["n"] == 1
+
+    def test_query_order_is_normalized(self, etag_app):
+        client, _, _ = etag_app
+        a = client.get("/api/v1/analysis/overview?sector_id=1&x=2").headers["etag"]
+        b = client.get("/api/v1/analysis/overview?x=2&sector_id=1").headers["etag"]
+        c = client.get("/api/v1/analysis/overview?sector_id=2&x=2").headers["etag"]
+        assert a == b
+        assert a != c
+
+    def test_epoch_bump_changes_tag(self, etag_app):
+        client, epoch, _ = etag_app
+        tag = client.get("/api/v1/analysis/overview").headers["etag"]
+        epoch["value"] = 8
+        resp = client.get("/api/v1/analysis/overview", headers={"If-None-Match": tag})
+        assert resp.status_code == 200
+        assert resp.headers["etag"] != tag
+
+    def test_review_bump_changes_tag(self, etag_app):
+        client, epoch, calls = etag_app
+        tag = client.get("/api/v1/analysis/overview").headers["etag"]
+        epoch["review"] = 1
+        resp = client.get("/api/v1/analysis/overview", headers={"If-None-Match": tag})
+        assert resp.status_code == 200 and calls["n"] == 2
+        assert resp.headers["etag"] != tag
+
+    def test_unstamped_db_issues_no_tags(self, etag_app):
+        client, epoch, _ = etag_app
+        epoch["value"] = 0
+        assert "etag" not in client.get("/api/v1/analysis/overview").headers
+
+    def test_excluded_prefix(self, etag_app):
+        client, _, _ = etag_app
+        assert "etag" not in client.get("/api/v1/analysis/price-hypotheses").headers
+
+
+def test_etag_matches_lists_and_weak():
+    assert etag_matches('"a", "e1-x"', '"e1-x"')
+    assert etag_matches('W/"e1-x"', '"e1-x"')
+    assert etag_matches("*", '"e1-x"')
+    assert not etag_matches('"e2-x"', '"e1-x"')
+    assert not etag_matches("", '"e1-x"')
+
+
+def test_review_epoch_bump(tmp_path, monkeypatch):
+    path = tmp_path / "epochs.db"
+    monkeypatch.setattr(dependencies, "DB_PATH", path)
+    monkeypatch.setattr(data_epoch, "_review_tracker", data_epoch._EpochTracker(data_epoch.read_review_epoch))
+    conn = sqlite3.connect(str(path))
+    assert data_epoch.read_review_epoch(conn) == 0
+    assert data_epoch.bump_review_epoch(conn, "test") == 1
+    assert data_epoch.bump_review_epoch(conn, "test") == 2
+    assert data_epoch.current_review_epoch() == 2
+    assert data_epoch.read_data_epoch(conn) == 0
+    conn.close()
+
+
+def _process_local_caches(module) -> list[str]:
+    """Module-level ``*cache*`` names bound to a plain dict or a local class."""
+    tree = ast.parse(inspect.getsource(module))
+    local_classes = {n.name for n in tree.body if isinstance(n, ast.ClassDef)}
+    found = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target, value = node.targets[0], node.value
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            target, value = node.target, node.value
+        else:
+            continue
+        if not isinstance(target, ast.Name) or "cache" not in target.id.lower():
+            continue
+        called = value.func.id if isinstance(value, ast.Call) and isinstance(value.func, ast.Name) else None
+        if isinstance(value, ast.Dict) or called == "dict" or called in local_classes:
+            found.append(f"{module.__name__}.{target.id}")
+    return found
+
+
+def _endpoints(routes, prefix=""):
+    """(full path, endpoint) pairs, descending into nested included routers."""
+    for route in routes:
+        included = getattr(route, "original_router", None)
+        if included is not None:
+            yield from _endpoints(included.routes, prefix + route.include_context.prefix)
+        elif getattr(route, "endpoint", None) is not None:
+            yield prefix + route.path, route.endpoint
+
+
+def test_tagged_routes_only_use_epoch_scoped_caches():
+    import sys
+
+    from api import main
+
+    tagged = main._CACHE_LONG_PREFIXES + main._CACHE_MED_PREFIXES + main._CACHE_SHORT_PREFIXES
+    modules = {
+        endpoint.__module__
+        for path, endpoint in _endpoints(main.app.routes)
+        if path.startswith(tagged) and not path.startswith(main._ETAG_EXCLUDE_PREFIXES)
+    }
+    assert "api.routers.stats" in modules
+    offenders = [name for mod in sorted(modules) for name in _process_local_caches(sys.modules[mod])]
+    assert offenders == []
@@ -9,6 +9,8 @@ import io
 
 import pytest
 
+from api.routers.export import MAX_EXPORT_ROWS
+
 
 def _count_csv_data_rows(content: bytes) -> int:
     """Count CSV data rows (excluding the header), correctly handling quoted
@@ -64,7 +66,7 @@ class TestExportContractsCSV:
     def test_export_contracts_csv_limit_validation(self, client, base_url):
         """Test that limit parameter is validated."""
         # Limit exceeding max should fail
-        response = client.get(f"{base_url}/export/contracts/csv?limit=200000")
+        response = client.get(f"{base_url}/export/contracts/csv?limit={MAX_EXPORT_ROWS + 1}")
         assert response.status_code == 422
 
     # --- New facet tests ---
@@ -234,6 +236,100 @@ class TestExportContractsExcel:
             assert "cat5" in disposition
 
 
+@pytest.fixture
+def bulk_db(tmp_path, monkeypatch):
+    """Seeded contracts database behind the read pool (hermetic bulk export)."""
+    import sqlite3
+
+    from api import dependencies
+    from api.dependencies import ReadConnectionPool
+
+    path = tmp_path / "bulk.db"
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE sectors (id INTEGER PRIMARY KEY, name_es TEXT);
+        CREATE TABLE vendors (id INTEGER PRIMARY KEY, name TEXT, rfc TEXT, is_individual INTEGER);
+        CREATE TABLE institutions (id INTEGER PRIMARY KEY, name TEXT, institution_type TEXT);
+        CREATE TABLE contracts (
+            id INTEGER PRIMARY KEY, contract_number TEXT, procedure_number TEXT, title TEXT,
+            description TEXT, amount_mxn REAL, currency TEXT, contract_date TEXT, contract_year INTEGER,
+            start_date TEXT, end_date TEXT, sector_id INTEGER, vendor_id INTEGER, institution_id INTEGER,
+            procedure_type TEXT, contract_type TEXT, is_direct_award INTEGER, is_single_bid INTEGER,
+            category_id INTEGER, risk_score REAL, risk_level TEXT, risk_factors TEXT
+        );
+        INSERT INTO sectors VALUES (1, 'Salud'), (2, 'Educacion');
+        INSERT INTO vendors VALUES (1, 'ACME SA', 'ACM010101AAA', 0), (2, 'JUAN PEREZ', 'PEJJ800101AAA', 1);
+        INSERT INTO institutions VALUES (1, 'IMSS', 'federal');
+    """)
+    conn.executemany(
+        "INSERT INTO contracts VALUES (?, ?, 'P-1', ?, NULL, ?, 'MXN', ?, ?, NULL, NULL, ?, ?, 1, "
+        "'licitacion', 'servicios', ?, 0, 3, ?, 'low', NULL)",
+        [
+            (i, f"C-{i}", f"Contrato {i}", 1000.0 * i, f"{2020 + i % 4}-03-01", 2020 + i % 4,
+             1 + i % 2, 1 + i % 2, i % 2, 0.01 * i)
+            for i in range(1, 121)
+        ],
+    )
+    # SQLite keeps whatever is stored: text in an INTEGER column, a huge year
+    conn.execute("UPDATE contracts SET contract_year = '2023', is_direct_award = 1.0 WHERE id = 119")
+    conn.execute("UPDATE contracts SET contract_year = 70000, is_direct_award = 300 WHERE id = 120")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(dependencies, "DB_PATH", path)
+    monkeypatch.setattr(dependencies, "_read_pool", ReadConnectionPool(max_idle=1))
+    return path
+
+
+class TestExportContractsBulk:
+    """Tests for GET /export/contracts/bulk endpoint."""
+
+    def test_export_contracts_bulk_arrow(self, client, base_url, bulk_db):
+        """Arrow IPC stream with the CSV export's columns."""
+        pa = pytest.importorskip("pyarrow")
+        from api.routers.export import CONTRACT_EXPORT_COLUMNS, arrow_schema
+
+        response = client.get(f"{base_url}/export/contracts/bulk?sector_id=1&limit=100")
+        assert response.status_code == 200
+        assert "arrow" in response.headers["content-type"]
+        assert ".arrows" in response.headers.get("content-disposition", "")
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.schema == arrow_schema(CONTRACT_EXPORT_COLUMNS)
+        assert table.num_rows == 60
+        assert set(table.column("sector_id").to_pylist()) == {1}
+        assert set(table.column("vendor_rfc").to_pylist()) == {"ACM010101AAA"}
+
+    def test_export_contracts_bulk_parquet(self, client, base_url, bulk_db):
+        """Parquet file ordered by contract ID."""
+        pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        response = client.get(f"{base_url}/export/contracts/bulk?format=parquet&year=2023&limit=50")
+        assert response.status_code == 200
+        table = pq.read_table(io.BytesIO(response.content))
+        ids = table.column("id").to_pylist()
+        assert ids == sorted(ids)
+        assert ids == [i for i in range(3, 121, 4)]
+        assert table.num_rows == 30
+
+    def test_export_contracts_bulk_coerces_stored_values(self, client, base_url, bulk_db):
+        """Values of another storage class, or out of a narrow range, never break the stream."""
+        pa = pytest.importorskip("pyarrow")
+
+        response = client.get(f"{base_url}/export/contracts/bulk")
+        assert response.status_code == 200
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.num_rows == 120
+        rows = {r["id"]: r for r in table.to_pylist()}
+        assert (rows[119]["contract_year"], rows[119]["is_direct_award"]) == (2023, 1)
+        assert (rows[120]["contract_year"], rows[120]["is_direct_award"]) == (70000, 300)
+        assert rows[1]["vendor_rfc"] is None  # individuals' RFCs stay masked
+
+    def test_export_contracts_bulk_invalid_format(self, client, base_url):
+        """Unknown formats are rejected."""
+        response = client.get(f"{base_url}/export/contracts/bulk?format=feather")
+        assert response.status_code == 422
+
+
 class TestExportVendorsCSV:
     """Tests for GET /export/vendors/csv endpoint."""
 
@@ -344,7 +440,7 @@ class TestExportSecurityGuards:
 
     def test_max_export_rows_enforced(self, client, base_url):
         """Exceeding MAX_EXPORT_ROWS is rejected."""
-        response = client.get(f"{base_url}/export/contracts/csv?limit=200000")
+        response = client.get(f"{base_url}/export/contracts/csv?limit={MAX_EXPORT_ROWS + 1}")
         assert response.status_code == 422
 
     def test_max_amount_cap_enforced(self, client, base_url):
@@ -369,3 +465,89 @@ class TestExportSecurityGuards:
                 assert not (cell_stripped.startswith("=") and not cell_stripped.startswith("'=")), (
                     f"Unsanitized formula cell found: {cell_stripped[:30]}"
                 )
+
+
+class TestStreamingHelpers:
+    """Batch streaming used by the export endpoints (no full result in memory)."""
+
+    def test_stream_query_batches_uses_fetchmany(self, tmp_path, monkeypatch):
+        import sqlite3
+        from contextlib import contextmanager
+
+        from api.routers import export
+
+        conn = sqlite3.connect(str(tmp_path / "e.db"), check_same_thread=False)
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(1, 26)])
+        released = []
+
+        @contextmanager
+        def fake_db():
+            yield conn
+            released.append(True)
+
+        monkeypatch.setattr(export, "get_db", fake_db)
+        monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 10)
+        batches = export.stream_query_batches(lambda c: ("SELECT id FROM t WHERE id <= ?", [25]))
+        assert not released
+        assert [len(b) for b in batches] == [10, 10, 5]
+        assert released == [True]
+
+    def test_stream_query_batches_raises_before_streaming(self, tmp_path, monkeypatch):
+        import sqlite3
+        from contextlib import contextmanager
+
+        from api.routers import export
+
+        conn = sqlite3.connect(str(tmp_path / "e.db"))
+        released = []
+
+        @contextmanager
+        def fake_db():
+            yield conn
+            released.append(True)
+
+        monkeypatch.setattr(export, "get_db", fake_db)
+        with pytest.raises(sqlite3.OperationalError):
+            export.stream_query_batches(lambda c: ("SELECT * FROM missing", []))
+        assert released == [True]
+
+    def test_iter_csv_chunks_per_batch(self):
+        from api.routers.export import iter_csv
+
+        chunks = list(iter_csv(iter([[(1, "=cmd")], [(2, "ok")]]), ["id", "title"]))
+        assert len(chunks) == 2
+        rows = list(csv.reader(io.StringIO("".join(chunks))))
+        assert rows == [["id", "title"], ["1", "'=cmd"], ["2", "ok"]]
+        assert list(iter_csv(iter([]), ["id"])) == ["id\r\n"]
+
+    def test_iter_xlsx_write_only_round_trip(self):
+        openpyxl = pytest.importorskip("openpyxl")
+        from api.routers.export import iter_xlsx
+
+        data = b"".join(iter_xlsx(iter([[(1, "+x", 2.5)], [(2, None, 0)]]), ["ID", "Title", "Amount"], "Contracts"))
+        ws = openpyxl.load_workbook(io.BytesIO(data))["Contracts"]
+        rows = [tuple(c.value for c in row) for row in ws.iter_rows()]
+        assert rows == [("ID", "Title", "Amount"), (1, "'+x", 2.5), (2, None, 0)]
+        assert ws.cell(row=1, column=1).font.bold
+
+    @pytest.mark.parametrize("encoder", ["iter_arrow", "iter_parquet"])
+    def test_columnar_round_trip(self, encoder):
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        from api.routers import export
+
+        columns = (("id", "c.id", "int64"), ("amount", "c.amount_mxn", "float64"),
+                   ("flag", "c.is_direct_award", "int8"), ("title", "c.title", "string"))
+        schema = export.arrow_schema(columns)
+        batches = [[(1, 2.5, 1, "a"), (2, None, 0, None)], [(3, 0.0, None, "c")]]
+        data = b"".join(getattr(export, encoder)(iter(batches), schema))
+        if encoder == "iter_arrow":
+            table = pa.ipc.open_stream(data).read_all()
+        else:
+            table = pq.read_table(io.BytesIO(data))
+            assert pq.ParquetFile(io.BytesIO(data)).num_row_groups == 2
+        assert table.schema == schema
+        assert table.to_pylist()[1] == {"id": 2, "amount": None, "flag": 0, "title": None}
+        assert table.num_rows == 3
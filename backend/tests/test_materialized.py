@@ -0,0 +1,176 @@
+"""
+Unit tests for materialized endpoints (api/materialized.py).
+
+Handlers are registered under test-only names and rendered against a
+throwaway SQLite file.
+"""
+import sqlite3
+
+import pytest
+from fastapi import Depends, Query
+
+from api import dependencies, materialized as mv
+from api.cache import AppCache, SharedCacheStore
+from api.deadlines import DeadlineExceeded, deadline
+from api.dependencies import ReadConnectionPool, get_db_dep
+from api.materialized import grid, materialized, stat_key
+from api.single_flight import FlightGroup
+
+calls = []
+
+# ~0.5s of VM work: long enough for a short deadline to interrupt it.
+_SLOW_SQL = """
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 2000000)
+    SELECT SUM(i) FROM n
+"""
+
+
+@materialized("test_mv_rows", grid=grid(n=[1, 2]))
+def rows_handler(n: int = Query(5), conn: sqlite3.Connection = Depends(get_db_dep)):
+    calls.append(n)
+    total = conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    return {"n": n, "rows": total}
+
+
+@materialized("test_mv_float", grid=[{"min_z": 3}])
+def float_handler(min_z: float = Query(2.0)):
+    return {"min_z": min_z}
+
+
+@materialized("test_mv_slow")
+def slow_handler():
+    calls.append("slow")
+    with dependencies.get_db() as conn:
+        return {"total": conn.execute(_SLOW_SQL).fetchone()[0]}
+
+
+# Stale-while-revalidate group the handler below reads through (set per test).
+_swr = {}
+
+
+@materialized("test_mv_swr")
+def swr_handler():
+    def count():
+        with dependencies.get_db() as conn:
+            return {"rows": conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]}
+    return _swr["flights"].do("test_swr", "rows", count, ttl=None, stale_ttl=3600)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = tmp_path / "mv.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+    conn.execute("INSERT INTO t DEFAULT VALUES")
+    conn.execute(
+        "CREATE TABLE precomputed_stats (stat_key TEXT PRIMARY KEY, stat_value TEXT, updated_at TIMESTAMP)"
+    )
+    conn.commit()
+    conn.close()
+    epoch = {"value": 1}
+    monkeypatch.setattr(dependencies, "DB_PATH", path)
+    monkeypatch.setattr(dependencies, "_read_pool", ReadConnectionPool(max_idle=2))
+    monkeypatch.setattr(mv, "app_cache", AppCache())
+    monkeypatch.setattr(mv, "flights", FlightGroup(mv.app_cache))
+    monkeypatch.setattr(mv, "current_data_epoch", lambda: epoch["value"])
+    monkeypatch.setattr(mv, "refresh_data_epoch", lambda: epoch["value"])
+    calls.clear()
+    return path, epoch
+
+
+def _add_row(path):
+    conn = sqlite3.connect(str(path))
+    conn.execute("INSERT INTO t DEFAULT VALUES")
+    conn.commit()
+    conn.close()
+
+
+class TestRegistry:
+    def test_grid_is_cartesian_product(self):
+        assert grid(a=[1, 2], b=["x"]) == [{"a": 1, "b": "x"}, {"a": 2, "b": "x"}]
+
+    def test_points_fill_defaults_and_skip_connections(self):
+        assert mv.registry()["test_mv_rows"].points() == [{"n": 1}, {"n": 2}]
+
+    def test_stat_key_omits_none(self):
+        assert stat_key("x", {"b": 2, "a": None}) == "mv:x?b=2"
+        assert stat_key("x", {}) == "mv:x"
+
+
+class TestServing:
+    def test_precompute_then_serve_stored_payload(self, db):
+        path, _ = db
+        summary = mv.precompute(["test_mv_rows"], workers=2)
+        assert summary["rendered"] == 2 and summary["failed"] == 0
+        calls.clear()
+        _add_row(path)
+        with dependencies.get_db() as conn:
+            assert rows_handler(n=1, conn=conn) == {"n": 1, "rows": 1}
+        assert calls == []
+
+    def test_off_grid_call_runs_live(self, db):
+        mv.precompute(["test_mv_rows"])
+        calls.clear()
+        with dependencies.get_db() as conn:
+            assert rows_handler(n=7, conn=conn) == {"n": 7, "rows": 1}
+        assert calls == [7]
+
+    def test_older_epoch_payload_falls_back_to_live(self, db):
+        path, epoch = db
+        mv.precompute(["test_mv_rows"])
+        _add_row(path)
+        epoch["value"] = 2
+        with dependencies.get_db() as conn:
+            assert rows_handler(n=1, conn=conn) == {"n": 1, "rows": 2}
+
+    def test_cold_grid_point_rendered_once(self, db):
+        with dependencies.get_db() as conn:
+            assert rows_handler(n=2, conn=conn) == {"n": 2, "rows": 1}
+            assert rows_handler(n=2, conn=conn) == {"n": 2, "rows": 1}
+        assert calls == [2]
+
+    def test_cold_render_outlives_request_deadline(self, db):
+        with dependencies.get_db() as conn:
+            with pytest.raises(DeadlineExceeded):
+                with deadline(0.05):
+                    conn.execute(_SLOW_SQL).fetchone()
+        with deadline(0.05):
+            assert slow_handler() == {"total": 2000001000000}
+        assert slow_handler() == {"total": 2000001000000}
+        assert calls == ["slow"]
+
+    def test_missing_only_skips_current_payloads(self, db):
+        _, epoch = db
+        mv.precompute(["test_mv_rows"])
+        assert mv.precompute(["test_mv_rows"], missing_only=True)["skipped"] == 2
+        epoch["value"] = 2
+        assert mv.precompute(["test_mv_rows"], missing_only=True)["rendered"] == 2
+
+    def test_epoch_bump_stores_value_not_stale_one(self, db, tmp_path):
+        path, epoch = db
+        cache = AppCache(store=SharedCacheStore(str(tmp_path / "cache.db")),
+                         epoch_source=lambda: epoch["value"])
+        _swr["flights"] = FlightGroup(cache)
+        mv.precompute(["test_mv_swr"])
+        _add_row(path)
+        epoch["value"] = 2
+        assert cache.lookup("test_swr", "rows") == ({"rows": 1}, False)
+        assert mv.precompute(["test_mv_swr"])["rendered"] == 1
+        assert mv.load_payload(stat_key("test_mv_swr", {})) == {"rows": 2}
+
+    def test_render_spanning_epoch_bump_not_stored(self, db, monkeypatch):
+        _, epoch = db
+        seen = iter([1, 2])
+        monkeypatch.setattr(mv, "refresh_data_epoch", lambda: next(seen))
+        summary = mv.precompute(["test_mv_float"])
+        assert summary["rendered"] == 0 and summary["failed"] == 1
+        assert mv.load_payload(stat_key("test_mv_float", {"min_z": 3.0})) is None
+
+    def test_grid_values_coerced_to_annotation(self, db):
+        mv.precompute(["test_mv_float"])
+        key = stat_key("test_mv_float", {"min_z": 3.0})
+        assert mv.load_payload(key) == {"min_z": 3.0}
+
+    def test_unknown_endpoint_rejected(self, db):
+        with pytest.raises(KeyError):
+            mv.precompute(["no_such_endpoint"])
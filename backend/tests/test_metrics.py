@@ -0,0 +1,109 @@
+"""
+Unit tests for in-process metrics (api/metrics.py) and the /metrics endpoint.
+"""
+import sqlite3
+
+import pytest
+
+from api import dependencies
+from api import metrics as metrics_module
+from api.cache import AppCache
+from api.metrics import (
+    Histogram,
+    InstrumentedConnection,
+    Metrics,
+    instrument_connection,
+    metrics,
+    normalize_sql,
+)
+
+_SLOW_SQL = """
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000)
+    SELECT SUM(i) FROM n WHERE i > 5
+"""
+
+
+@pytest.fixture
+def fresh_metrics():
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+
+class TestHistogram:
+    def test_quantiles_interpolate_within_buckets(self):
+        hist = Histogram(buckets=(1.0, 2.0, 3.0))
+        for _ in range(50):
+            hist.observe(("r",), 0.5)
+        for _ in range(50):
+            hist.observe(("r",), 2.5)
+        counts, _total, max_seen = hist.snapshot()[("r",)]
+        assert hist.quantile(counts, 0.5, max_seen) == pytest.approx(1.0)
+        assert 2.0 < hist.quantile(counts, 0.95, max_seen) <= 2.5
+
+    def test_overflow_bucket_uses_max(self):
+        hist = Histogram(buckets=(1.0,))
+        hist.observe(("r",), 7.0)
+        counts, _total, max_seen = hist.snapshot()[("r",)]
+        assert hist.quantile(counts, 0.99, max_seen) <= 7.0
+
+
+class TestStatementTiming:
+    def test_normalize_strips_literals(self):
+        assert normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x'") == \
+            "SELECT * FROM t WHERE id IN (?...) AND name = ?"
+
+    def test_instrumented_connection_records_statements(self, fresh_metrics, monkeypatch):
+        monkeypatch.setattr(metrics_module, "SQL_PROGRESS_OPS", 1000)
+        conn = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+        instrument_connection(conn, "read")
+        conn.execute(_SLOW_SQL).fetchone()
+        conn.execute("SELECT 1").fetchone()
+        conn.close()
+        top = {sql: (calls, total) for sql, calls, total, _max in fresh_metrics.top_statements()}
+        slow = normalize_sql(_SLOW_SQL)
+        assert top[slow][0] == 1 and top[slow][1] > 0
+        assert "SELECT ?" in top
+
+    def test_statement_table_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(metrics_module, "_MAX_STATEMENTS", 3)
+        registry = Metrics()
+        for i, cost in enumerate([5.0, 1.0, 3.0, 4.0]):
+            registry.observe_statement("read", f"q{i}", cost)
+        assert [row[0] for row in registry.top_statements()] == ["q0", "q3", "q2"]
+
+
+class TestExposition:
+    def test_render_is_prometheus_text(self):
+        registry = Metrics()
+        registry.observe_request("GET", "/api/v1/sectors/{sector_id}", 200, 0.2)
+        text = registry.render({"sectors": {"size": 1, "hits": 3, "stale_hits": 0, "misses": 1}})
+        assert "# TYPE rubli_http_request_duration_seconds histogram" in text
+        assert 'route="/api/v1/sectors/{sector_id}",le="+Inf"} 1' in text
+        assert 'namespace="sectors",result="hit"} 3' in text
+        assert 'quantile="0.99"' in text
+
+    def test_app_cache_counts_hits_and_misses(self):
+        cache = AppCache()
+        cache.get("ns", "k")
+        cache.set("ns", "k", "v")
+        cache.get("ns", "k")
+        stats = cache.stats()["ns"]
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    def test_metrics_endpoint_reports_route_templates(self, client, fresh_metrics, monkeypatch):
+        monkeypatch.setattr(dependencies, "WRITE_API_KEY", "")
+        monkeypatch.setattr(dependencies, "_IS_DEV", True)
+        client.get("/api/v1/sectors/3")
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'route="/api/v1/sectors/{sector_id}"' in response.text
+        routes = client.get("/metrics?format=json").json()["routes"]
+        assert "GET /api/v1/sectors/{sector_id}" in routes
+
+    def test_metrics_endpoint_requires_write_key(self, client, monkeypatch):
+        monkeypatch.setattr(dependencies, "WRITE_API_KEY", "secret")
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"X-Rubli-Key": "wrong"}).status_code == 401
+        assert client.get("/metrics", headers={"X-Rubli-Key": "secret"}).status_code == 200
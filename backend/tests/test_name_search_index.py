@@ -0,0 +1,111 @@
+"""
+Unit tests for the trigram name-search index (api/services/name_search_index.py).
+"""
+import random
+import sqlite3
+
+import pytest
+
+from api.services import name_search_index
+from api.services.name_search_index import (
+    INSTITUTION_FTS,
+    VENDOR_FTS,
+    build_name_search_index,
+    name_match_condition,
+    name_search_ready,
+    ranked_matches,
+    trigram_supported,
+)
+from api.services.query_builder import QueryBuilder
+
+_WORDS = ["CONSTRUCTORA", "SERVICIOS", "MEDICOS", "GRUPO", "COMERCIAL", "DEL", "NORTE", "SA", "DE", "CV"]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    rng = random.Random(3)
+    conn = sqlite3.connect(str(tmp_path / "names.db"))
+    conn.row_factory = sqlite3.Row
+    if not trigram_supported(conn):
+        pytest.skip("SQLite without the FTS5 trigram tokenizer")
+    conn.executescript("""
+        CREATE TABLE vendors (
+            id INTEGER PRIMARY KEY, name TEXT, name_normalized TEXT, rfc TEXT, total_contracts INTEGER
+        );
+        CREATE TABLE vendor_stats (vendor_id INTEGER PRIMARY KEY, total_contracts INTEGER);
+        CREATE TABLE institutions (
+            id INTEGER PRIMARY KEY, name TEXT, name_normalized TEXT, siglas TEXT, total_contracts INTEGER
+        );
+    """)
+    for i in range(1, 801):
+        name = " ".join(rng.choice(_WORDS) for _ in range(4))
+        rfc = None if rng.random() < 0.3 else f"{rng.choice(['ABC', 'XYZ', 'MED'])}{rng.randint(100000, 999999)}"
+        conn.execute("INSERT INTO vendors VALUES (?, ?, ?, ?, 0)", (i, name.title(), name, rfc))
+        conn.execute("INSERT INTO vendor_stats VALUES (?, ?)", (i, rng.randint(0, 500)))
+    conn.executemany(
+        "INSERT INTO institutions VALUES (NULL, ?, ?, ?, ?)",
+        [
+            ("Instituto Mexicano del Seguro Social", "INSTITUTO MEXICANO DEL SEGURO SOCIAL", "IMSS", 900),
+            ("Petróleos Mexicanos", "PETROLEOS MEXICANOS", "PEMEX", 700),
+            ("Comisión Federal de Electricidad", "COMISION FEDERAL DE ELECTRICIDAD", "CFE", 800),
+        ],
+    )
+    conn.commit()
+    monkeypatch.setattr(name_search_index, "current_data_epoch", lambda: 1)
+    monkeypatch.setattr(name_search_index, "_ready", {})
+    yield conn
+    conn.close()
+
+
+def _like_ids(conn, term):
+    return {
+        r[0] for r in conn.execute(
+            "SELECT id FROM vendors WHERE name LIKE ? OR name_normalized LIKE ? OR rfc LIKE ?",
+            (f"%{term}%",) * 3,
+        )
+    }
+
+
+class TestVendorIndex:
+    @pytest.mark.parametrize("term", ["constru", "MED", "ios med", "XYZ1", "norte sa"])
+    def test_same_vendors_as_like(self, db, term):
+        build_name_search_index(db)
+        clause, params = name_match_condition(db, VENDOR_FTS, term, "v.id")
+        ids = {r[0] for r in db.execute(f"SELECT v.id FROM vendors v WHERE {clause}", params)}
+        assert ids == _like_ids(db, term)
+
+    def test_ranked_by_contract_volume(self, db):
+        build_name_search_index(db)
+        ids = ranked_matches(db, VENDOR_FTS, "servicios", 10)
+        volume = {r[0]: r[1] for r in db.execute("SELECT vendor_id, total_contracts FROM vendor_stats")}
+        expected = sorted(_like_ids(db, "servicios"), key=lambda i: (-volume[i], i))[:10]
+        assert ids == expected
+
+    def test_short_terms_and_missing_index_fall_back(self, db):
+        assert not name_search_ready(db)
+        assert ranked_matches(db, VENDOR_FTS, "constru", 5) is None
+        build_name_search_index(db)
+        assert name_search_ready(db)
+        assert ranked_matches(db, VENDOR_FTS, "sa", 5) is None
+        assert name_match_condition(db, VENDOR_FTS, " de ", "v.id") is None
+
+    def test_quotes_are_literal(self, db):
+        build_name_search_index(db)
+        assert ranked_matches(db, VENDOR_FTS, 'OR "x', 5) == []
+
+
+class TestInstitutionIndex:
+    def test_name_and_siglas_ranked(self, db):
+        build_name_search_index(db)
+        assert ranked_matches(db, INSTITUTION_FTS, "pemex", 5) == [2]
+        assert ranked_matches(db, INSTITUTION_FTS, "mexicano", 5) == [1, 2]
+
+    def test_query_builder_uses_index_condition(self, db):
+        build_name_search_index(db)
+        qb = QueryBuilder("institutions i").filter_search(
+            "comision", ["i.name", "i.siglas"],
+            indexed=name_match_condition(db, INSTITUTION_FTS, "comision", "i.id"),
+        )
+        sql, params = qb.build_select("i.id")
+        assert "LIKE" not in sql
+        assert [r[0] for r in db.execute(sql, params)] == [3]
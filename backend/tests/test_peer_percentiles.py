@@ -0,0 +1,94 @@
+"""
+Unit tests for the per-sector peer percentile index (api/services/peer_percentiles.py).
+"""
+import random
+import sqlite3
+
+import pytest
+
+from api.services import peer_percentiles
+from api.services.peer_percentiles import ALL_SECTORS, build_percentile_index, percentile_index
+
+_COLUMNS = ["avg_risk_score", "total_contracts", "total_value_mxn", "direct_award_pct", "single_bid_pct"]
+
+
+@pytest.fixture
+def db(tmp_path):
+    rng = random.Random(8)
+    conn = sqlite3.connect(str(tmp_path / "peers.db"))
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE vendors (id INTEGER PRIMARY KEY, avg_risk_score REAL);
+        CREATE TABLE vendor_stats (
+            vendor_id INTEGER PRIMARY KEY, primary_sector_id INTEGER, avg_risk_score REAL,
+            total_contracts INTEGER, total_value_mxn REAL, direct_award_pct REAL, single_bid_pct REAL
+        );
+    """)
+
+    def maybe(value, p_null=0.1):
+        return None if rng.random() < p_null else value
+
+    for i in range(1, 1201):
+        conn.execute("INSERT INTO vendors VALUES (?, ?)", (i, maybe(round(rng.random(), 3))))
+        conn.execute(
+            "INSERT INTO vendor_stats VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                i, maybe(rng.randint(1, 4)), maybe(round(rng.random(), 3)),
+                rng.choice([0, 1, 2, 5, 40, None]), maybe(round(rng.uniform(0, 1e6), 2)),
+                maybe(rng.choice([0.0, 25.0, 50.0, 100.0])), maybe(round(rng.uniform(0, 100), 1)),
+            ),
+        )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _sql_peer(conn, col, sector, value):
+    """The SQL the peer-comparison endpoint used to run per metric."""
+    where = "WHERE primary_sector_id = ?" if sector else ""
+    args = (sector,) if sector else ()
+    row = conn.execute(f"""
+        SELECT
+            (SELECT COUNT(*) FROM vendor_stats {where} {'AND' if sector else 'WHERE'} {col} <= ?) * 100.0 /
+            NULLIF((SELECT COUNT(*) FROM vendor_stats {where}), 0) AS pctile,
+            (SELECT {col} FROM vendor_stats {where} ORDER BY {col} LIMIT 1 OFFSET
+             (SELECT COUNT(*) / 2 FROM vendor_stats {where})) AS median_val
+    """, (*args, value, *args, *args, *args)).fetchone()
+    return row["pctile"], row["median_val"]
+
+
+class TestPercentileIndex:
+    @pytest.mark.parametrize("col", _COLUMNS)
+    @pytest.mark.parametrize("sector", [1, 3, None])
+    def test_matches_sql(self, db, col, sector):
+        index = build_percentile_index(db)
+        dist = index.distribution(sector if sector else ALL_SECTORS, col)
+        for value in (0, 0.5, 1, 25.0, 40, 5e5, 1e7):
+            pctile, median = _sql_peer(db, col, sector, value)
+            assert dist.count_le(value) * 100.0 / dist.size == pytest.approx(pctile)
+            assert (dist.median() is None) == (median is None)
+            if median is not None:
+                assert dist.median() == pytest.approx(median)
+
+    def test_vendor_score_rank_matches_sql(self, db):
+        index = build_percentile_index(db)
+        dist = index.distribution(2, "vendor_avg_risk_score")
+        row = db.execute("""
+            SELECT COUNT(*) AS total, SUM(CASE WHEN v.avg_risk_score < 0.4 THEN 1 ELSE 0 END) AS below
+            FROM vendors v JOIN vendor_stats vs ON v.id = vs.vendor_id
+            WHERE vs.primary_sector_id = 2 AND v.avg_risk_score IS NOT NULL
+        """).fetchone()
+        assert (len(dist.values), dist.count_lt(0.4)) == (row["total"], row["below"])
+
+    def test_unknown_group_is_empty(self, db):
+        dist = build_percentile_index(db).distribution(99, "total_contracts")
+        assert dist.size == 0 and dist.median() is None
+
+    def test_rebuilt_when_epoch_moves(self, db, monkeypatch):
+        epoch = {"value": 3}
+        monkeypatch.setattr(peer_percentiles, "current_data_epoch", lambda: epoch["value"])
+        monkeypatch.setattr(peer_percentiles, "_index", None)
+        first = percentile_index(db)
+        assert percentile_index(db) is first
+        epoch["value"] = 4
+        assert percentile_index(db) is not first
@@ -0,0 +1,77 @@
+"""
+Unit tests for slow-query plan capture (api/query_plans.py).
+"""
+import sqlite3
+
+import pytest
+
+from api import dependencies
+from api.query_plans import SlowQueryLog, param_shape, slow_queries
+
+
+@pytest.fixture
+def plan_log(tmp_path, monkeypatch):
+    path = tmp_path / "plans.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE contracts (id INTEGER PRIMARY KEY, vendor_id INTEGER, amount REAL)")
+    conn.execute("CREATE INDEX idx_contracts_vendor ON contracts(vendor_id)")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(dependencies, "DB_PATH", path)
+    return SlowQueryLog(threshold_ms=100)
+
+
+class TestParamShape:
+    def test_counts_literals_and_in_lists(self):
+        shape = param_shape("SELECT * FROM c WHERE id IN (1, 2, 3) AND rfc = 'AB''C' AND x > 0.5")
+        assert shape == "ints=3 floats=1 strings=1 in_lists=[3]"
+
+
+class TestSlowQueryLog:
+    def test_fast_statements_are_ignored(self, plan_log):
+        plan_log.observe("SELECT SUM(amount) FROM contracts", 0.01)
+        assert plan_log.entries() == []
+
+    def test_full_scan_is_flagged(self, plan_log):
+        plan_log.observe("SELECT SUM(amount) FROM contracts WHERE amount > 5", 0.5)
+        plan_log.flush()
+        (entry,) = plan_log.entries()
+        assert entry["flagged"]
+        assert "SCAN" in entry["flags"][0] and "contracts" in entry["flags"][0]
+        assert entry["statement"] == "SELECT SUM(amount) FROM contracts WHERE amount > ?"
+
+    def test_index_search_is_not_flagged(self, plan_log):
+        plan_log.observe("SELECT amount FROM contracts WHERE vendor_id = 42", 0.5)
+        plan_log.flush()
+        (entry,) = plan_log.entries()
+        assert not entry["flagged"]
+        assert any("SEARCH" in line for line in entry["plan"])
+
+    def test_repeats_update_counters_without_replanning(self, plan_log):
+        for seconds in (0.2, 0.9, 0.3):
+            plan_log.observe("SELECT amount FROM contracts WHERE vendor_id = 7", seconds)
+        plan_log.flush()
+        (entry,) = plan_log.entries()
+        assert (entry["count"], entry["max_ms"], entry["last_ms"]) == (3, 900.0, 300.0)
+
+    def test_different_in_list_sizes_are_separate_entries(self, plan_log):
+        plan_log.observe("SELECT * FROM contracts WHERE vendor_id IN (1, 2)", 0.5)
+        plan_log.observe("SELECT * FROM contracts WHERE vendor_id IN (1, 2, 3, 4)", 0.5)
+        plan_log.flush()
+        assert len(plan_log.entries()) == 2
+
+    def test_non_plannable_statements_skipped(self, plan_log):
+        plan_log.observe("PRAGMA optimize", 5.0)
+        plan_log.observe("COMMIT", 5.0)
+        assert plan_log.entries() == []
+
+
+class TestAdminEndpoint:
+    def test_lists_captured_entries(self, client, monkeypatch):
+        monkeypatch.setattr(dependencies, "WRITE_API_KEY", "")
+        monkeypatch.setattr(dependencies, "_IS_DEV", True)
+        response = client.get("/api/v1/admin/slow-queries")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["enabled"] == slow_queries.enabled
+        assert body["flag_tables"] == ["contracts"]
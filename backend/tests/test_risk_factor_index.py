@@ -0,0 +1,128 @@
+"""
+Unit tests for the risk-factor bitmask / inverted index (api/services/risk_factor_index.py).
+"""
+import random
+import sqlite3
+
+import pytest
+
+from api.services import risk_factor_index
+from api.services.risk_factor_index import (
+    FACTOR_IDS,
+    build_risk_factor_index,
+    factor_mask,
+    factor_name,
+    risk_factor_condition,
+    risk_factor_counts,
+    risk_factor_index_ready,
+)
+
+_TOKENS = [
+    "single_bid", "direct_award", "year_end", "split_2", "split_7", "network_4",
+    "price_hyp:outlier:0.81", "co_bid_high:40%:3p", "co_bid_med:22%:2p",
+    "vendor_concentration_high", "short_ad_<5d", "inst_risk:autonomous",
+]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    rng = random.Random(5)
+    conn = sqlite3.connect(str(tmp_path / "rf.db"))
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE contracts (
+            id INTEGER PRIMARY KEY, vendor_id INTEGER, sector_id INTEGER, risk_factors TEXT
+        );
+        CREATE TABLE precomputed_stats (stat_key TEXT PRIMARY KEY, stat_value TEXT, updated_at TEXT);
+    """)
+    rows = []
+    for _ in range(1500):
+        roll = rng.random()
+        if roll < 0.3:
+            text = None
+        elif roll < 0.35:
+            text = ""
+        else:
+            tokens = rng.sample(_TOKENS, rng.randint(1, 4))
+            # The pipeline only emits interaction:a+b when both a and b fired.
+            if "single_bid" in tokens and any(t.startswith("split") for t in tokens):
+                tokens.append("interaction:single_bid+split")
+            text = ",".join(tokens)
+        rows.append((rng.randint(1, 20), rng.randint(1, 4), text))
+    conn.executemany("INSERT INTO contracts VALUES (NULL, ?, ?, ?)", rows)
+    conn.commit()
+    monkeypatch.setattr(risk_factor_index, "current_data_epoch", lambda: 1)
+    monkeypatch.setattr(risk_factor_index, "_ready", {})
+    yield conn
+    conn.close()
+
+
+def _ids(conn, term):
+    clause, params = risk_factor_condition(conn, term)
+    return {r[0] for r in conn.execute(f"SELECT c.id FROM contracts c WHERE {clause}", params)}
+
+
+def test_token_parsing():
+    assert factor_name(" split_12 ") == "split"
+    assert factor_name("co_bid_high:40%:3p") == "co_bid_high"
+    assert factor_name("short_ad_<15d") == "short_ad_<15d"
+    assert factor_mask("split_3,price_hyp:x:0.5,unknown") == (
+        1 << FACTOR_IDS["split"] | 1 << FACTOR_IDS["price_hyp"]
+    )
+    assert factor_mask(None) == 0
+
+
+class TestIndexedFilter:
+    @pytest.mark.parametrize("term", ["co_bid", "split", "price_hyp", "network", "short_ad", "vendor_concentration"])
+    def test_same_contracts_as_like(self, db, term):
+        like = _ids(db, term)
+        build_risk_factor_index(db)
+        clause, params = risk_factor_condition(db, term)
+        assert "contract_risk_factors" in clause and params == []
+        assert _ids(db, term) == like
+
+    def test_unregistered_term_keeps_like(self, db):
+        build_risk_factor_index(db)
+        clause, params = risk_factor_condition(db, "autonomous")
+        assert "LIKE" in clause and params == ["%autonomous%"]
+
+    def test_not_ready_until_built(self, db):
+        assert not risk_factor_index_ready(db)
+        assert "LIKE" in risk_factor_condition(db, "split")[0]
+        build_risk_factor_index(db)
+        assert risk_factor_index_ready(db)
+
+    @pytest.mark.parametrize("update_from", [True, False])
+    def test_masks_match_risk_factors(self, db, monkeypatch, update_from):
+        monkeypatch.setattr(risk_factor_index, "_HAS_UPDATE_FROM", update_from)
+        stamp = build_risk_factor_index(db)
+        rows = db.execute("SELECT risk_factors, risk_factor_mask FROM contracts").fetchall()
+        assert all(mask == factor_mask(text) for text, mask in rows)
+        assert stamp["contracts"] == sum(1 for _, mask in rows if mask)
+        assert stamp["rows"] == sum(bin(mask).count("1") for _, mask in rows)
+
+    def test_rebuild_tracks_rescored_factors(self, db):
+        build_risk_factor_index(db)
+        db.execute("UPDATE contracts SET risk_factors = 'split_2' WHERE id = 1")
+        db.execute("UPDATE contracts SET risk_factors = NULL WHERE id = 2")
+        build_risk_factor_index(db)
+        assert 1 in _ids(db, "split")
+        mask = db.execute("SELECT risk_factor_mask FROM contracts WHERE id = 2").fetchone()[0]
+        assert mask == 0
+
+
+class TestFactorCounts:
+    def test_bitwise_counts_match_string_split(self, db):
+        expected = risk_factor_counts(db, "vendor_id = ?", (3,))
+        build_risk_factor_index(db)
+        actual = risk_factor_counts(db, "vendor_id = ?", (3,))
+        assert actual[0] == expected[0]
+        assert dict(actual[1]) == dict(expected[1])
+        assert [c for _, c in actual[1]] == sorted((c for _, c in actual[1]), reverse=True)
+
+    def test_unregistered_tokens_ignored_either_way(self, db):
+        db.execute("UPDATE contracts SET risk_factors = 'legacy_flag' WHERE id IN (1, 2)")
+        db.execute("UPDATE contracts SET risk_factors = 'split_2,legacy_flag:x' WHERE id = 3")
+        fallback = risk_factor_counts(db, "id <= ?", (3,))
+        build_risk_factor_index(db)
+        assert risk_factor_counts(db, "id <= ?", (3,)) == fallback == (1, [("split", 1)])
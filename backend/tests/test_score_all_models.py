@@ -0,0 +1,229 @@
+"""
+Tests for single-pass multi-model scoring (scripts/score_all_models.py).
+"""
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.config.constants import get_risk_level
+from api.data_epoch import read_contracts_version
+from scripts import calculate_risk_scores_v5 as v5_scorer
+from scripts import calculate_risk_scores_v6 as v6_scorer
+from scripts import score_all_models as sam
+from scripts.score_all_models import (
+    ghost_boost,
+    load_ghost_scores,
+    load_registered_models,
+    score_all_models,
+    score_column,
+)
+
+_FEATURES = ["direct_award", "price_ratio", "single_bid"]
+
+
+def _calibration(conn, version, run_id, sector_id, intercept, coefs, created, n_positive=1000, auc=0.8,
+                 parallel=False, pu=0.5, platt=(None, None), ci=True):
+    ci = {f: [c - 0.1, c + 0.1] for f, c in coefs.items()} if ci else None
+    # v0.8.5+ stores coefficients as parallel arrays; older runs as a flat dict
+    stored = {"names": list(coefs), "values": list(coefs.values())} if parallel else coefs
+    conn.execute(
+        "INSERT INTO model_calibration (model_version, run_id, sector_id, intercept, coefficients, "
+        "pu_correction_factor, bootstrap_ci, n_positive, auc_roc, created_at, platt_a, platt_b) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (version, run_id, sector_id, intercept, json.dumps(stored), pu, ci and json.dumps(ci),
+         n_positive, auc, created, *platt),
+    )
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    monkeypatch.setattr(sam, "refresh_contract_aggregates", lambda conn: None)
+    rng = np.random.default_rng(5)
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE contracts (
+            id INTEGER PRIMARY KEY, sector_id INTEGER, vendor_id INTEGER,
+            risk_score REAL, risk_level TEXT, risk_confidence_lower REAL, risk_confidence_upper REAL,
+            risk_model_version TEXT, risk_score_v5 REAL
+        );
+        CREATE TABLE contract_z_features (
+            contract_id INTEGER PRIMARY KEY, z_direct_award REAL, z_price_ratio REAL, z_single_bid REAL
+        );
+        CREATE TABLE vendor_stats (vendor_id INTEGER PRIMARY KEY, new_vendor_risk_score REAL);
+        CREATE TABLE model_calibration (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, model_version TEXT, run_id TEXT, sector_id INTEGER,
+            intercept REAL, coefficients TEXT, pu_correction_factor REAL, bootstrap_ci TEXT,
+            n_positive INTEGER, auc_roc REAL, test_auc REAL, created_at TEXT, platt_a REAL, platt_b REAL
+        );
+    """)
+    for i in range(1, 301):
+        conn.execute("INSERT INTO contracts (id, sector_id, vendor_id) VALUES (?, ?, ?)",
+                     (i, [None, 1, 2, 3][i % 4], None if i % 7 == 0 else i % 20))
+        z = rng.normal(0, 3, 3).tolist()
+        if i % 11 == 0:
+            z[1] = None
+        conn.execute("INSERT INTO contract_z_features VALUES (?, ?, ?, ?)", (i, *z))
+    conn.executemany("INSERT INTO vendor_stats VALUES (?, ?)", [(3, 0.9), (4, 0.5), (5, 0.0), (6, 0.2)])
+
+    _calibration(conn, "v6.5", "old", None, -3.0, {"direct_award": 1.0}, "2026-01-01")
+    _calibration(conn, "v6.5", "run6", None, -2.0, {"direct_award": 0.5, "price_ratio": 0.2, "single_bid": 0.1}, "2026-02-01")
+    _calibration(conn, "v6.5", "run6", 1, -1.5, {"direct_award": 0.9, "price_ratio": -0.3}, "2026-02-01")
+    _calibration(conn, "v6.5", "run6", 2, -1.0, {"direct_award": 2.0}, "2026-02-01", n_positive=100)
+    _calibration(conn, "v7.0rc1", "run7", None, -2.5, {"price_ratio": 0.7, "single_bid": 0.4}, "2026-03-01")
+    _calibration(conn, "v9", "run9", None, -2.0, {"bid_gap": 1.0}, "2026-04-01")
+    # v0.8.5 layout: global row at sector_id = 0, {"names": [...], "values": [...]}
+    _calibration(conn, "v0.8.5", "run85", 0, -1.8, {"direct_award": 0.6, "single_bid": 0.3}, "2026-05-02",
+                 parallel=True)
+    _calibration(conn, "v0.8.5", "run85", 3, -1.0, {"price_ratio": 1.1, "direct_award": 0.2}, "2026-05-02",
+                 n_positive=800, auc=0.75, parallel=True)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _expected(conn, intercept_coefs, sector_models, ghost=True):
+    """Straight-line reference for one model: routing, winsorizing, PU, ghost boost."""
+    ghost_scores = dict(conn.execute("SELECT vendor_id, new_vendor_risk_score FROM vendor_stats"))
+    out = {}
+    for cid, sector, vendor, *z in conn.execute("""
+        SELECT zf.contract_id, c.sector_id, c.vendor_id, zf.z_direct_award, zf.z_price_ratio, zf.z_single_bid
+        FROM contract_z_features zf JOIN contracts c ON c.id = zf.contract_id
+    """):
+        z = dict(zip(_FEATURES, (min(max(v if v is not None else 0.0, -5.0), 5.0) for v in z)))
+        intercept, coefs = sector_models.get(sector or 12, intercept_coefs)
+        logit = intercept + sum(z[f] * coefs.get(f, 0.0) for f in _FEATURES)
+        score = min(1 / (1 + np.exp(-logit)) / 0.5, 1.0)
+        g = ghost_scores.get(vendor, 0.0) if ghost else 0.0
+        if g > 0:
+            score = min(1.0, score + g * (0.4 if g >= 0.8 else 0.3 if g >= 0.6 else 0.2 if g >= 0.4 else 0.1))
+        out[cid] = round(score, 6)
+    return out
+
+
+def test_registry_latest_run_per_version(conn):
+    models = load_registered_models(conn)
+    assert [(m.version, m.run_id) for m in models] == [("v7.0rc1", "run7"), ("v6.5", "run6")]
+    v6 = models[1]
+    assert v6.uses_sector_model(1) and not v6.uses_sector_model(2)
+    assert v6.column == "risk_score_v6_5" and v6.spec is sam.V6_SECTOR_SCORER
+    assert score_column("v5.0") == "risk_score_v5" and score_column("v0.8.5") == "risk_score_v8"
+    with pytest.raises(ValueError):
+        load_registered_models(conn, ["v9"])
+
+
+def test_unreproducible_scorer_is_never_written(conn):
+    # v0.8.5's full scorer is not reproduced here, so risk_score_v8 is left alone
+    with pytest.raises(ValueError):
+        load_registered_models(conn, ["v0.8.5"])
+    score_all_models(conn, load_registered_models(conn), ghost=None)
+    assert "risk_score_v8" not in {r[1] for r in conn.execute("PRAGMA table_info(contracts)")}
+
+
+def test_all_models_scored_in_one_pass(conn):
+    models = load_registered_models(conn)
+    # 5 chunks of 64 with a checkpoint every 2: three UPDATEs cover every row.
+    dist = score_all_models(conn, models, active="v6.5", ghost=load_ghost_scores(conn), batch_size=64,
+                            checkpoint_batches=2)
+    assert sum(dist["v6.5"].values()) == sum(dist["v7.0rc1"].values()) == 300
+    assert read_contracts_version(conn) == 1  # risk_score/risk_level rewritten
+
+    v6 = _expected(conn, (-2.0, {"direct_award": 0.5, "price_ratio": 0.2, "single_bid": 0.1}),
+                   {1: (-1.5, {"direct_award": 0.9, "price_ratio": -0.3})})
+    v7 = _expected(conn, (-2.5, {"price_ratio": 0.7, "single_bid": 0.4}), {})
+    rows = conn.execute(
+        "SELECT id, risk_score_v6_5, risk_score_v7_0rc1, risk_score, risk_level, "
+        "risk_model_version, risk_confidence_lower, risk_confidence_upper FROM contracts"
+    ).fetchall()
+    for cid, s6, s7, live, level, version, lower, upper in rows:
+        assert s6 == pytest.approx(v6[cid], abs=1e-6)
+        assert s7 == pytest.approx(v7[cid], abs=1e-6)
+        assert live == s6 and version == "v6.5"
+        assert lower <= live <= upper
+        assert level == ("critical" if live >= 0.6 else "high" if live >= 0.4 else "medium" if live >= 0.25 else "low")
+
+
+def test_shadow_only_leaves_live_scores(conn):
+    conn.execute("UPDATE contracts SET risk_score = 0.123, risk_model_version = 'v0.8.5'")
+    conn.commit()
+    score_all_models(conn, load_registered_models(conn, ["v7.0rc1"]), ghost=None)
+    assert conn.execute("SELECT COUNT(*) FROM contracts WHERE risk_score_v7_0rc1 IS NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT DISTINCT risk_score, risk_model_version FROM contracts").fetchall() == [(0.123, "v0.8.5")]
+    assert read_contracts_version(conn) == 0
+
+
+def test_dry_run_writes_nothing(conn):
+    score_all_models(conn, load_registered_models(conn), active="v6.5", dry_run=True)
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(contracts)")}
+    assert "risk_score_v6_5" not in columns
+    assert conn.execute("SELECT COUNT(risk_score) FROM contracts").fetchone()[0] == 0
+
+
+def _z_matrix(conn, z_cols):
+    """contract ids, sectors and the 16-column z-matrix the named scorers read."""
+    rows = conn.execute("""
+        SELECT zf.contract_id, c.sector_id, zf.z_direct_award, zf.z_price_ratio, zf.z_single_bid
+        FROM contract_z_features zf JOIN contracts c ON c.id = zf.contract_id ORDER BY zf.contract_id
+    """).fetchall()
+    Z = np.zeros((len(rows), len(z_cols)))
+    for j, f in enumerate(_FEATURES):
+        Z[:, z_cols.index(f"z_{f}")] = [r[2 + j] if r[2 + j] is not None else 0.0 for r in rows]
+    sectors = np.array([r[1] or 12 for r in rows])
+    return [r[0] for r in rows], sectors, np.clip(Z, -10.0, 10.0)
+
+
+def test_v5_matches_calculate_risk_scores_v5(conn):
+    _calibration(conn, "v5.0", "run5", None, -2.0, {"direct_award": 0.5, "price_ratio": 0.3, "single_bid": 0.2},
+                 "2025-06-01", pu=0.85, platt=(-1.2, 0.3))
+    # sector 1: no pu_c, CI or Platt of its own; sector 2 is routed despite few positives
+    _calibration(conn, "v5.0", "run5", 1, -1.5, {"direct_award": 0.9, "price_ratio": -0.3}, "2025-06-01",
+                 pu=None, ci=False)
+    _calibration(conn, "v5.0", "run5", 2, -1.0, {"single_bid": 0.8}, "2025-06-01", n_positive=10, auc=0.5,
+                 pu=0.9, platt=(-0.8, 0.1))
+    conn.commit()
+    global_cal, sector_cals = v5_scorer.load_v5_calibrations(conn)
+    ids, sectors, Z = _z_matrix(conn, v5_scorer.Z_COLS)
+    probs, ci_lower, ci_upper = v5_scorer.compute_predictions(Z, sectors, global_cal, sector_cals)
+
+    dist = score_all_models(conn, load_registered_models(conn, ["v5.0"]), active="v5.0",
+                            ghost=load_ghost_scores(conn))
+    rows = dict((r[0], r[1:]) for r in conn.execute(
+        "SELECT id, risk_score_v5, risk_score, risk_level, risk_model_version, "
+        "risk_confidence_lower, risk_confidence_upper FROM contracts"))
+    for i, cid in enumerate(ids):
+        v5, live, level, version, lower, upper = rows[cid]
+        assert v5 == live == pytest.approx(round(probs[i], 6), abs=1e-6)
+        assert lower == pytest.approx(ci_lower[i], abs=1e-6)
+        assert upper == pytest.approx(ci_upper[i], abs=1e-6)
+        assert level == get_risk_level(live, "v4.0") and version == "v5.1"
+    assert dist["v5.0"]["critical"] + dist["v5.0"]["high"] > 0
+
+
+def test_v6_0_matches_calculate_risk_scores_v6(conn):
+    _calibration(conn, "v6.0", "run60", None, -2.2, {"direct_award": 0.7, "single_bid": 0.4}, "2025-09-01",
+                 pu=0.6)
+    _calibration(conn, "v6.0", "run60", 1, 1.0, {"direct_award": 3.0}, "2025-09-01", n_positive=5000, auc=0.9)
+    conn.commit()
+    cal = v6_scorer.load_v6_calibration(conn)
+    ids, _, Z = _z_matrix(conn, v6_scorer.Z_COLS)
+    scores, _, _ = v6_scorer.compute_predictions(Z, cal)
+
+    score_all_models(conn, load_registered_models(conn, ["v6.0"]), active="v6.0",
+                     ghost=load_ghost_scores(conn))
+    rows = dict((r[0], r[1:]) for r in conn.execute("SELECT id, risk_score_v6_0, risk_level FROM contracts"))
+    for i, cid in enumerate(ids):
+        s6, level = rows[cid]
+        assert s6 == pytest.approx(round(scores[i], 6), abs=1e-6)  # global only, no ghost, cap 10
+        assert level == get_risk_level(s6, "v4.0")
+
+
+def test_ghost_boost_weights():
+    ghost = (np.array([3.0, 4.0, 6.0]), np.array([0.9, 0.5, 0.2]))
+    boost = ghost_boost(np.array([3.0, 4.0, 6.0, 7.0, np.nan]), ghost)
+    assert boost.tolist() == pytest.approx([0.36, 0.1, 0.02, 0.0, 0.0])
@@ -0,0 +1,101 @@
+"""
+Tests for the bulk score write-back used by the scoring scripts (scripts/score_writeback.py).
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.config.constants import RISK_THRESHOLDS_V4, RISK_THRESHOLDS_V6, get_risk_level
+from scripts import score_writeback
+from scripts.score_writeback import ScoreWriteBack, level_counts, risk_levels
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE contracts (
+            id INTEGER PRIMARY KEY, risk_score REAL, risk_level TEXT,
+            mahalanobis_distance REAL, risk_model_version TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO contracts VALUES (?, 0.5, 'old', 1.0, 'v5.1')", [(i,) for i in range(1, 101)]
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("thresholds, version", [(RISK_THRESHOLDS_V4, "v4.0"), (RISK_THRESHOLDS_V6, "v6.0")])
+def test_risk_levels_match_get_risk_level(thresholds, version):
+    scores = np.array([0.0, 0.0999999, 0.1, 0.25, 0.3, 0.4, 0.5, 0.6, 1.0])
+    assert risk_levels(scores, thresholds).tolist() == [get_risk_level(s, version) for s in scores]
+    assert level_counts(risk_levels(scores, thresholds))["low"] == sum(
+        get_risk_level(s, version) == "low" for s in scores
+    )
+
+
+@pytest.mark.parametrize("update_from", [True, False])
+def test_staged_batches_applied_in_one_update(conn, monkeypatch, update_from):
+    monkeypatch.setattr(score_writeback, "_HAS_UPDATE_FROM", update_from)
+    writer = ScoreWriteBack(conn, ["risk_score", "risk_level", "mahalanobis_distance"])
+    for start in (1, 41):
+        ids = np.arange(start, start + 40)
+        scores = ids / 100.0
+        writer.stage(ids, scores, risk_levels(scores, RISK_THRESHOLDS_V6), np.where(ids % 2, ids * 1.5, np.nan))
+
+    untouched = conn.execute("SELECT risk_score, risk_level FROM contracts WHERE id = 1").fetchone()
+    assert untouched == (0.5, "old")
+
+    assert writer.apply(risk_model_version="v6.0") == 80
+    rows = {r[0]: r[1:] for r in conn.execute("SELECT * FROM contracts")}
+    assert rows[3] == (0.03, "low", 4.5, "v6.0")
+    assert rows[4] == (0.04, "low", None, "v6.0")
+    assert rows[70] == (0.7, "critical", None, "v6.0")
+    assert rows[81] == (0.5, "old", 1.0, "v5.1")
+    assert conn.execute("SELECT COUNT(*) FROM temp._score_writeback").fetchone()[0] == 0
+
+
+def test_apply_checkpoints_and_writer_stays_usable(conn):
+    writer = ScoreWriteBack(conn, ["risk_score"])
+    writer.stage([1, 2], [0.1, 0.2])
+    assert writer.apply() == 2
+    assert writer.staged == 0
+    assert writer.apply() == 0
+    writer.stage([3], [0.3])
+    assert writer.apply(risk_level="low") == 1
+    rows = {r[0]: r[1:3] for r in conn.execute("SELECT id, risk_score, risk_level FROM contracts WHERE id <= 4")}
+    assert rows == {1: (0.1, "old"), 2: (0.2, "old"), 3: (0.3, "low"), 4: (0.5, "old")}
+
+
+def test_stage_checks_column_count(conn):
+    writer = ScoreWriteBack(conn, ["risk_score", "risk_level"])
+    with pytest.raises(ValueError):
+        writer.stage([1], [0.1])
+
+
+def test_indexes_over_written_columns_rebuilt(conn):
+    conn.executescript("""
+        CREATE INDEX idx_score ON contracts(risk_score);
+        CREATE INDEX idx_level_version ON contracts(risk_level, risk_model_version);
+        CREATE INDEX idx_high ON contracts(id) WHERE risk_level = 'high';
+        CREATE INDEX idx_mahal ON contracts(mahalanobis_distance);
+    """)
+    writer = ScoreWriteBack(conn, ["risk_score"])
+    assert {n for n, _ in writer._indexes_over(["risk_score", "risk_level"])} == {
+        "idx_score", "idx_level_version", "idx_high",
+    }
+    writer.stage([5], [0.9])
+    assert writer.apply(rebuild_indexes=True, risk_level="high") == 1
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_score", "idx_level_version", "idx_high", "idx_mahal"} <= indexes
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert conn.execute("SELECT id FROM contracts INDEXED BY idx_high WHERE risk_level = 'high'").fetchall() == [(5,)]
+
@@ -3,7 +3,12 @@ Unit tests for the service layer: QueryBuilder, pagination, and base service.
 
 Tests the shared infrastructure that all domain services rely on.
 """
+import random
+import sqlite3
+
 import pytest
+from api.cache import app_cache
+from api.services.pagination import InvalidCursorError, count_total, paginate_query
 from api.services.query_builder import QueryBuilder
 
 
@@ -340,6 +345,151 @@ class TestQueryBuilderPagination:
         assert "LIMIT 1" in sql
 
 
+class TestKeysetPagination:
+    """Cursor pagination walks exactly the rows OFFSET pagination would."""
+
+    @pytest.fixture
+    def conn(self):
+        rng = random.Random(3)
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        conn.execute("CREATE TABLE contracts (id INTEGER PRIMARY KEY, sector_id INTEGER, score REAL, dist REAL)")
+        conn.executemany(
+            "INSERT INTO contracts VALUES (NULL, ?, ?, ?)",
+            [
+                (
+                    rng.randint(1, 3),
+                    None if rng.random() < 0.15 else rng.choice([0.1, 0.5, 1.0]),
+                    None if rng.random() < 0.3 else rng.randint(0, 4),
+                )
+                for _ in range(400)
+            ],
+        )
+        yield conn
+        conn.close()
+
+    def _qb(self, order, keyset=None):
+        qb = QueryBuilder("contracts c")
+        qb.where("c.sector_id != ?", 2)
+        if keyset:
+            qb.keyset(*keyset, descending=order == "desc")
+        else:
+            qb.sort("score", order, whitelist={"score": "c.score"})
+        return qb
+
+    def _walk(self, conn, order, keyset=None):
+        ids, cursor, pages = [], None, 0
+        while True:
+            result = paginate_query(
+                conn, self._qb(order, keyset), "c.id", 1, 37, cursor=cursor, count_mode="exact",
+            )
+            ids.extend(row["id"] for row in result.data)
+            pages += 1
+            cursor = result.pagination["next_cursor"]
+            if cursor is None:
+                return ids, pages
+
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    @pytest.mark.parametrize("keyset", [None, ("c.score", "c.dist")])
+    def test_cursor_walk_matches_full_ordering(self, conn, order, keyset):
+        direction = order.upper()
+        keys = keyset or ("c.score",)
+        expected = [r[0] for r in conn.execute(
+            "SELECT c.id FROM contracts c WHERE c.sector_id != 2 ORDER BY "
+            + ", ".join(f"{k} {direction}" for k in keys + ("c.id",))
+        )]
+        ids, pages = self._walk(conn, order, keyset)
+        assert ids == expected
+        assert pages == -(-len(expected) // 37)
+
+    def test_page_number_and_cursor_agree(self, conn):
+        page_two = paginate_query(conn, self._qb("desc"), "c.id", 2, 37, count_mode="exact")
+        first = paginate_query(conn, self._qb("desc"), "c.id", 1, 37, count_mode="exact")
+        via_cursor = paginate_query(
+            conn, self._qb("desc"), "c.id", 1, 37, cursor=first.pagination["next_cursor"], count_mode="exact",
+        )
+        assert [r["id"] for r in via_cursor.data] == [r["id"] for r in page_two.data]
+        assert via_cursor.pagination["page"] == 2
+        assert "_seek_0" not in via_cursor.data[0]
+
+    def test_low_estimate_keeps_next_cursor(self, conn):
+        result = paginate_query(
+            conn, self._qb("desc"), "c.id", 1, 37, count_mode="estimate", estimate=lambda: (10, True),
+        )
+        assert len(result.data) == 37
+        assert result.pagination["next_cursor"] is not None
+
+    def test_first_page_uses_clamped_page_size(self, conn):
+        expected = [r[0] for r in conn.execute(
+            "SELECT c.id FROM contracts c WHERE c.sector_id != 2 ORDER BY c.score DESC, c.id DESC"
+        )]
+        first = paginate_query(conn, self._qb("desc"), "c.id", 1, 500, count_mode="exact")
+        assert first.pagination["per_page"] == 100 and len(first.data) == 100
+        second = paginate_query(
+            conn, self._qb("desc"), "c.id", 1, 500, cursor=first.pagination["next_cursor"], count_mode="exact",
+        )
+        assert [r["id"] for r in first.data + second.data] == expected[:200]
+        assert second.pagination["page"] == 2
+
+    def test_cursor_from_other_sort_rejected(self, conn):
+        cursor = paginate_query(conn, self._qb("desc"), "c.id", 1, 37, count_mode="exact").pagination["next_cursor"]
+        with pytest.raises(InvalidCursorError):
+            paginate_query(conn, self._qb("asc"), "c.id", 1, 37, cursor=cursor)
+        with pytest.raises(InvalidCursorError):
+            paginate_query(conn, self._qb("desc"), "c.id", 1, 37, cursor="not-a-cursor")
+
+    def test_default_sort_with_function_is_seekable(self):
+        qb = QueryBuilder("institutions i")
+        qb.sort(None, "desc", whitelist={}, default="COALESCE(s.total_contracts, i.total_contracts) DESC")
+        assert qb.seek_keys == (["COALESCE(s.total_contracts, i.total_contracts)", "i.id"], True)
+        qb.order_by("i.name ASC, i.id ASC")
+        assert qb.seek_keys is None
+
+
+class TestCountModes:
+    """count_total: exact, cached by filter signature, pre-aggregate estimates."""
+
+    @pytest.fixture
+    def conn(self):
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        conn.execute("CREATE TABLE count_mode_rows (id INTEGER PRIMARY KEY, sector_id INTEGER)")
+        conn.executemany("INSERT INTO count_mode_rows VALUES (NULL, ?)", [(i % 4,) for i in range(200)])
+        app_cache.invalidate("list_counts")
+        yield conn
+        app_cache.invalidate("list_counts")
+        conn.close()
+
+    def _qb(self, sector_id):
+        return QueryBuilder("count_mode_rows r").filter_sector(sector_id, column="r.sector_id")
+
+    def test_exact_counts_every_time(self, conn):
+        assert count_total(conn, self._qb(1), "exact") == (50, False)
+        conn.execute("DELETE FROM count_mode_rows WHERE id <= 8")
+        assert count_total(conn, self._qb(1), "exact") == (48, False)
+
+    def test_cached_reuses_count_per_filter_signature(self, conn):
+        assert count_total(conn, self._qb(1), "cached") == (50, False)
+        conn.execute("DELETE FROM count_mode_rows WHERE id <= 8")
+        assert count_total(conn, self._qb(1), "cached") == (50, False)
+        assert count_total(conn, self._qb(2), "cached") == (48, False)
+
+    def test_estimate_falls_back_to_count(self, conn):
+        assert count_total(conn, self._qb(1), "estimate", lambda: (1_200_000, True)) == (1_200_000, True)
+        assert count_total(conn, self._qb(1), "estimate", lambda: None) == (50, False)
+
+    def test_estimate_flag_in_pagination(self, conn):
+        result = paginate_query(
+            conn, self._qb(None), "r.id", 1, 10, count_mode="estimate", estimate=lambda: (999, True),
+        )
+        assert result.pagination["total"] == 999
+        assert result.pagination["total_is_estimate"] is True
+
+    def test_unknown_mode_rejected(self, conn):
+        with pytest.raises(ValueError):
+            count_total(conn, self._qb(1), "guess")
+
+
 class TestQueryBuilderGroupBy:
     """Test GROUP BY and HAVING."""
 
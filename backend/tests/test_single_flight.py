@@ -0,0 +1,207 @@
+"""
+Unit tests for single-flight coalescing (api/single_flight.py).
+
+Two FlightGroups over AppCaches that share one SharedCacheStore file stand
+in for two gunicorn workers.
+"""
+import sqlite3
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from api import single_flight as sf
+from api.cache import AppCache, SharedCacheStore, fresh_only
+from api.single_flight import FlightGroup, SingleFlightTimeout
+
+
+def _worker(tmp_path) -> FlightGroup:
+    return FlightGroup(AppCache(store=SharedCacheStore(str(tmp_path / "cache.db"))))
+
+
+def _in_thread(fn):
+    """Run ``fn`` in another thread (lease owners are per-thread) and wait."""
+    out = {}
+    t = threading.Thread(target=lambda: out.setdefault("v", fn()))
+    t.start()
+    t.join()
+    return out.get("v")
+
+
+class TestInProcess:
+    def test_concurrent_calls_compute_once(self, tmp_path):
+        group = _worker(tmp_path)
+        calls = []
+        gate = threading.Event()
+
+        def compute():
+            calls.append(1)
+            gate.wait(2)
+            return {"n": 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(group.do("ns", "k", compute)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+        assert results == [{"n": 42}] * 8
+
+    def test_result_is_cached(self, tmp_path):
+        group = _worker(tmp_path)
+        calls = []
+        group.do("ns", "k", lambda: calls.append(1) or "v")
+        assert group.do("ns", "k", lambda: calls.append(1) or "v") == "v"
+        assert len(calls) == 1
+
+    def test_error_reaches_waiters_and_is_not_cached(self, tmp_path):
+        group = _worker(tmp_path)
+        gate = threading.Event()
+
+        def compute():
+            gate.wait(2)
+            raise HTTPException(status_code=404, detail="missing")
+
+        errors = []
+
+        def call():
+            try:
+                group.do("ns", "k", compute)
+            except HTTPException as e:
+                errors.append(e.status_code)
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join()
+        assert errors == [404] * 4
+        assert group.do("ns", "k", lambda: "recovered") == "recovered"
+
+    def test_cache_if_vetoes_partial_result(self, tmp_path):
+        group = _worker(tmp_path)
+        group.do("ns", "k", lambda: {"a": None}, cache_if=lambda v: None not in v.values())
+        assert group.do("ns", "k", lambda: {"a": 1}) == {"a": 1}
+
+
+class TestStaleWhileRevalidate:
+    def test_stale_value_served_while_refreshing(self, tmp_path):
+        group = _worker(tmp_path)
+        group._cache.set("ns", "k", "old", ttl=-1, stale_ttl=60)
+        gate = threading.Event()
+
+        def refresh():
+            gate.wait(2)
+            return "new"
+
+        assert group.do("ns", "k", refresh, stale_ttl=60) == "old"
+        assert group.in_flight("ns", "k")
+        assert group.do("ns", "k", refresh, stale_ttl=60) == "old"
+        gate.set()
+        deadline = time.time() + 2
+        while group.in_flight("ns", "k") and time.time() < deadline:
+            time.sleep(0.01)
+        assert group.do("ns", "k", refresh, stale_ttl=60) == "new"
+
+    def test_get_or_start_never_blocks(self, tmp_path):
+        group = _worker(tmp_path)
+        gate = threading.Event()
+
+        def compute():
+            gate.wait(2)
+            return "v"
+
+        assert group.get_or_start("ns", "k", compute, ttl=60) is None
+        gate.set()
+        deadline = time.time() + 2
+        while group.in_flight("ns", "k") and time.time() < deadline:
+            time.sleep(0.01)
+        assert group.get_or_start("ns", "k", compute, ttl=60) == "v"
+
+    def test_fresh_only_recomputes_instead_of_serving_stale(self, tmp_path):
+        group = _worker(tmp_path)
+        group._cache.set("ns", "k", "old", ttl=-1, stale_ttl=60)
+        with fresh_only():
+            assert group.do("ns", "k", lambda: "new", stale_ttl=60) == "new"
+            assert group.get_or_start("ns", "k2", lambda: "v", ttl=60) == "v"
+
+    def test_result_spanning_epoch_bump_not_published(self, tmp_path):
+        epoch = {"value": 1}
+        group = FlightGroup(AppCache(store=SharedCacheStore(str(tmp_path / "cache.db")),
+                                     epoch_source=lambda: epoch["value"]))
+
+        def compute():
+            epoch["value"] = 2
+            return "computed-at-1"
+
+        assert group.do("ns", "k", compute, ttl=None) == "computed-at-1"
+        assert group._cache.get("ns", "k") is None
+
+
+class TestAcrossWorkers:
+    def test_waits_for_other_workers_result(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sf, "_POLL_MIN_S", 0.01)
+        worker_a, worker_b = _worker(tmp_path), _worker(tmp_path)
+        store_a = worker_a._cache.store
+        assert _in_thread(lambda: store_a.acquire_lease("ns\x1fk", 10)) is True
+
+        def publish():
+            time.sleep(0.2)
+            worker_a._cache.set("ns", "k", "from-a", ttl=60)
+
+        threading.Thread(target=publish).start()
+        assert worker_b.do("ns", "k", lambda: "from-b", timeout=5) == "from-a"
+
+    def test_reraises_other_workers_error(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sf, "_POLL_MIN_S", 0.01)
+        worker_a, worker_b = _worker(tmp_path), _worker(tmp_path)
+        store_a = worker_a._cache.store
+        leased = threading.Event()
+
+        def fail_in_a():
+            store_a.acquire_lease("ns\x1fk", 10)
+            leased.set()
+            time.sleep(0.2)
+            store_a.release_lease(
+                "ns\x1fk", error=sf._dump_error(HTTPException(status_code=422, detail="bad"))
+            )
+
+        threading.Thread(target=fail_in_a).start()
+        leased.wait(2)
+        with pytest.raises(HTTPException) as exc:
+            worker_b.do("ns", "k", lambda: "from-b", timeout=5)
+        assert exc.value.status_code == 422
+
+    def test_times_out_while_other_worker_holds_lease(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sf, "_POLL_MIN_S", 0.01)
+        worker_a, worker_b = _worker(tmp_path), _worker(tmp_path)
+        _in_thread(lambda: worker_a._cache.store.acquire_lease("ns\x1fk", 10))
+        with pytest.raises(SingleFlightTimeout):
+            worker_b.do("ns", "k", lambda: "from-b", timeout=0.2)
+        assert worker_b.in_flight("ns", "k")
+
+
+class TestDecorator:
+    def test_key_ignores_connections(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sf, "flights", _worker(tmp_path))
+        calls = []
+
+        @sf.single_flight("ns")
+        def handler(year, conn=None):
+            calls.append(year)
+            return {"year": year}
+
+        conn_a, conn_b = sqlite3.connect(":memory:"), sqlite3.connect(":memory:")
+        assert handler(2020, conn=conn_a) == {"year": 2020}
+        assert handler(2020, conn=conn_b) == {"year": 2020}
+        assert handler(2021, conn=conn_a) == {"year": 2021}
+        assert calls == [2020, 2021]